@@ -23,10 +23,11 @@ from pydantic import BaseModel, Field
 from sse_starlette.sse import EventSourceResponse
 
 from utils.event_emitter import EventEmitter
-from utils.metrics import MetricsCollector
+from utils.metrics import initialize as initialize_metrics
 from utils.agents_loop import AIAgentLoop
 from utils.error_handler import ErrorResponse, raise_error
 from utils.security import validate_user
+from utils.tracing import tracer
 from services.docx_formatter import generate_docx_async, get_document_metrics
 
 router = APIRouter()
@@ -38,11 +39,15 @@ EventData = Dict[str, Union[str, float, Dict[str, Any], None]]
 
 # Initialize global state
 tasks_cache: Dict[str, TaskData] = {}
+# Bounded per-subscriber queues so a slow SSE client cannot grow memory unboundedly
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("SSE_SUBSCRIBER_QUEUE_SIZE", "256"))
+# How long a status update may wait for room in a full subscriber queue
+SUBSCRIBER_PUT_TIMEOUT = float(os.getenv("SSE_SUBSCRIBER_PUT_TIMEOUT", "5.0"))
 event_subscribers: Dict[str, Dict[str, asyncio.Queue[EventData]]] = {}
 
 # Initialize metrics collector
-metrics_collector = MetricsCollector(
-    metrics_file=Path(__file__).parent.parent / "data" / "metrics.json"
+metrics_collector = initialize_metrics(
+    Path(__file__).parent.parent / "data" / "metrics.json"
 )
 
 # Initialize AI agent loop
@@ -413,6 +418,27 @@ async def cancel_task(task_id: str):
     return {"success": False, "message": "Task not found"}
 
 
+@router.get("/task-trace/{task_id}")
+async def get_task_trace(
+    task_id: str, format: str = Query("waterfall", pattern="^(waterfall|otlp)$")
+) -> Dict[str, Any]:
+    """
+    Get the per-stage timing of a report generation task, either as a
+    waterfall of spans or as OTLP/JSON for an OpenTelemetry collector
+    """
+    trace_id = tracer.get_task_trace_id(task_id)
+    trace = None
+    if trace_id:
+        trace = (
+            tracer.to_otlp(trace_id)
+            if format == "otlp"
+            else tracer.waterfall(trace_id)
+        )
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found for task")
+    return trace
+
+
 @router.get("/subscribe/{task_id}")
 async def subscribe_to_task(task_id: str, request: Request) -> Response:
     """Subscribe to task progress updates via server-sent events."""
@@ -425,7 +451,7 @@ async def subscribe_to_task(task_id: str, request: Request) -> Response:
             tasks_cache[task_id]["subscribers"] = {}
 
         # Create a queue for this subscriber
-        queue = asyncio.Queue[EventData]()
+        queue = asyncio.Queue[EventData](maxsize=SUBSCRIBER_QUEUE_SIZE)
         tasks_cache[task_id]["subscribers"][subscriber_id] = queue
 
         logger.info(f"New subscriber {subscriber_id} for task {task_id}")
@@ -463,6 +489,18 @@ async def subscribe_to_task(task_id: str, request: Request) -> Response:
 
             yield format_sse(data)
 
+            # Late subscribers catch up with the draft streamed so far
+            streamed_draft = tasks_cache[task_id].get("streamed_draft")
+            if streamed_draft:
+                yield format_sse(
+                    {
+                        "task_id": task_id,
+                        "type": "draft_delta",
+                        "delta": streamed_draft,
+                        "offset": 0,
+                    }
+                )
+
             # Send periodic keepalive pings to prevent connection timeout
             keepalive_task = asyncio.create_task(send_keepalive_pings(queue))
 
@@ -485,6 +523,9 @@ async def subscribe_to_task(task_id: str, request: Request) -> Response:
             if task_id in tasks_cache and "subscribers" in tasks_cache[task_id]:
                 if subscriber_id in tasks_cache[task_id]["subscribers"]:
                     del tasks_cache[task_id]["subscribers"][subscriber_id]
+                    tasks_cache[task_id].get("lagging_subscribers", set()).discard(
+                        subscriber_id
+                    )
                     logger.info(
                         f"Removed subscriber {subscriber_id} for task {task_id}"
                     )
@@ -498,7 +539,9 @@ async def send_keepalive_pings(queue: asyncio.Queue[EventData]) -> None:
         while True:
             # Send a ping every 30 seconds
             await asyncio.sleep(30)
-            await queue.put({"type": "ping", "time": time.time()})
+            # A full queue already has events pending, so the ping can be skipped
+            if not queue.full():
+                queue.put_nowait({"type": "ping", "time": time.time()})
     except asyncio.CancelledError:
         pass
 
@@ -506,7 +549,47 @@ async def send_keepalive_pings(queue: asyncio.Queue[EventData]) -> None:
 def format_sse(data: EventData) -> Dict[str, str]:
     """Format a Server-Sent Events message"""
     json_data = json.dumps(data)
-    return {"event": "update", "data": json_data}
+    event = "draft_delta" if data.get("type") == "draft_delta" else "update"
+    return {"event": event, "data": json_data}
+
+
+def publish_draft_delta(task_id: str, delta: Dict[str, Any]) -> None:
+    """
+    Push a partial draft chunk to every subscriber without blocking the writer.
+
+    Deltas carry the character offset they start at. When a subscriber's queue is
+    full the delta is dropped and the subscriber is marked as lagging; once it has
+    room again it receives the whole accumulated draft at offset 0 instead.
+    """
+    task = tasks_cache[task_id]
+    offset = int(delta.get("offset", 0))
+    text = delta.get("delta", "")
+
+    # Keep the accumulated draft so lagging subscribers can resync
+    draft = task.get("streamed_draft", "") if offset > 0 else ""
+    task["streamed_draft"] = draft[:offset] + text
+    lagging = task.setdefault("lagging_subscribers", set())
+
+    for subscriber_id, subscriber_queue in task.get("subscribers", {}).items():
+        if subscriber_queue.full():
+            lagging.add(subscriber_id)
+            continue
+
+        if subscriber_id in lagging:
+            event_delta, event_offset = task["streamed_draft"], 0
+            lagging.discard(subscriber_id)
+        else:
+            event_delta, event_offset = text, offset
+
+        subscriber_queue.put_nowait(
+            {
+                "task_id": task_id,
+                "type": "draft_delta",
+                "delta": event_delta,
+                "offset": event_offset,
+                "iteration": delta.get("iteration"),
+            }
+        )
 
 
 async def update_task_status(
@@ -518,9 +601,16 @@ async def update_task_status(
     error: Optional[str] = None,
     stage: Optional[str] = None,
     estimated_time_remaining: Optional[float] = None,
+    draft_delta: Optional[Dict[str, Any]] = None,
 ) -> None:
-    """Update task status and notify all subscribers"""
-    if task_id in tasks_cache:
+    """
+    Update task status and notify all subscribers.
+    When draft_delta ({"delta", "offset", "iteration"}) is given, only a
+    draft_delta event is published, without blocking on slow subscribers.
+    """
+    if task_id in tasks_cache and draft_delta is not None:
+        publish_draft_delta(task_id, draft_delta)
+    elif task_id in tasks_cache:
         # Update task status
         tasks_cache[task_id]["status"] = status
         tasks_cache[task_id]["progress"] = progress
@@ -555,9 +645,15 @@ async def update_task_status(
 
         # Notify all subscribers
         if "subscribers" in tasks_cache[task_id]:
-            for subscriber_queue in tasks_cache[task_id]["subscribers"].values():
+            for subscriber_queue in list(tasks_cache[task_id]["subscribers"].values()):
                 try:
-                    await subscriber_queue.put(data)
+                    await asyncio.wait_for(
+                        subscriber_queue.put(data), timeout=SUBSCRIBER_PUT_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        f"Dropped status update for slow subscriber of task {task_id}"
+                    )
                 except Exception as e:
                     logger.error(f"Error notifying subscriber: {e}")
 
@@ -577,6 +673,7 @@ async def process_report_generation(
     transaction_id: Optional[str] = None,
 ) -> None:
     """Process the report generation in the background"""
+    tracer.bind_task(task_id)
     try:
         # Update task status to processing
         await update_task_status(
@@ -603,8 +700,22 @@ async def process_report_generation(
                 estimated_time_remaining=estimated_time_remaining,
             )
 
+        # Forward partial writer output as draft_delta events
+        async def draft_callback(delta: str, offset: int, iteration: int) -> None:
+            await update_task_status(
+                task_id=task_id,
+                status=tasks_cache[task_id]["status"],
+                message=tasks_cache[task_id]["message"],
+                progress=float(tasks_cache[task_id]["progress"]),
+                draft_delta={"delta": delta, "offset": offset, "iteration": iteration},
+            )
+
         # Create AI Agent Loop
-        agent_loop = AIAgentLoop(max_loops=3, progress_callback=progress_callback)
+        agent_loop = AIAgentLoop(
+            max_loops=3,
+            progress_callback=progress_callback,
+            draft_callback=draft_callback,
+        )
 
         # Format the user content
         formatted_content = format_insurance_data(insurance_data, document_ids)
@@ -624,7 +735,10 @@ async def process_report_generation(
         )
 
         # Generate report
-        result: Dict[str, Any] = await agent_loop.generate_report(formatted_content)
+        with tracer.span("agent_loop", max_iterations=max_iterations):
+            result: Dict[str, Any] = await agent_loop.generate_report(
+                formatted_content
+            )
 
         # Update task with AI result
         tasks_cache[task_id]["progress"] = 90
@@ -641,7 +755,10 @@ async def process_report_generation(
         docx_path = f"generated_reports/{safe_name}_{task_id[:8]}.docx"
 
         # Generate the DOCX file
-        docx_result = await generate_docx_async(str(result.get("draft", "")), docx_path)
+        with tracer.span("docx_render"):
+            docx_result = await generate_docx_async(
+                str(result.get("draft", "")), docx_path
+            )
 
         # Update with final result
         await update_task_status(
@@ -668,6 +785,10 @@ async def process_report_generation(
             error=str(e),
         )
         raise
+    finally:
+        trace_id = tracer.get_task_trace_id(task_id)
+        if trace_id:
+            await tracer.export(trace_id)
 
 
 async def process_report_refinement(
@@ -777,8 +898,10 @@ async def process_report_generation_v2(task_id: str, request: AgentLoopRequest)
     """
     temp_files = []  # Track temporary files for cleanup
     start_time = time.time()
+    trace_id = tracer.bind_task(task_id)
     report_metrics = {
         "task_id": task_id,
+        "trace_id": trace_id,
         "report_id": request.report_id,
         "iterations": 0,
         "generation_time": 0,
@@ -812,6 +935,13 @@ async def process_report_generation_v2(task_id: str, request: AgentLoopRequest)
                 stage=stage,
                 estimated_time_remaining=estimated_time_remaining,
             ),
+            draft_callback=lambda delta, offset, iteration: update_task_status(
+                task_id=task_id,
+                status=tasks_cache[task_id]["status"],
+                message=tasks_cache[task_id]["message"],
+                progress=float(tasks_cache[task_id]["progress"]),
+                draft_delta={"delta": delta, "offset": offset, "iteration": iteration},
+            ),
         )
 
         # Run the agent loop
@@ -829,7 +959,8 @@ async def process_report_generation_v2(task_id: str, request: AgentLoopRequest)
         )
 
         # Generate report
-        result = await agent_loop.generate_report(request.additional_info or "")
+        with tracer.span("agent_loop"):
+            result = await agent_loop.generate_report(request.additional_info or "")
 
         # Update task with AI result
         tasks_cache[task_id]["progress"] = 90
@@ -872,7 +1003,9 @@ async def process_report_generation_v2(task_id: str, request: AgentLoopRequest)
             ),
         }
 
-        docx_result = await generate_docx_async(content, metadata=document_metadata)
+        with tracer.span("docx_render", content_length=len(content)) as span:
+            docx_result = await generate_docx_async(content, metadata=document_metadata)
+            span["attributes"]["from_cache"] = docx_result.get("from_cache", False)
 
         # If document generation failed
         if "error" in docx_result:
@@ -956,6 +1089,8 @@ async def process_report_generation_v2(task_id: str, request: AgentLoopRequest)
         )
 
     finally:
+        await tracer.export(trace_id)
+
         # Clean up any temporary files
         for file_path in temp_files:
             try:
@@ -1,5 +1,7 @@
 import os
 import time
+import traceback
+from datetime import datetime
 from typing import Any, Dict, List, Optional, TypeVar, cast
 
 from fastapi import (
@@ -21,8 +23,9 @@ try:
         generate_report_text,
         refine_report_text,
     )
-    from services.pdf_extractor import extract_text_from_file
+    from services.pdf_extractor import extract_text_from_file, extract_texts_concurrently
     from services.template_processor import template_processor
+    from services.worker_pool import worker_pool
     from utils.auth import get_current_user
     from utils.error_handler import (
         api_error_handler,
@@ -35,6 +38,7 @@ try:
         NotFoundException,
     )
     from utils.file_utils import temporary_directory
+    from utils.llm_cache import DETERMINISTIC_TEMPERATURE
 except ImportError:
     # Fallback to imports with 'backend.' prefix (for local dev)
     from config import settings
@@ -45,8 +49,9 @@ except ImportError:
         generate_report_text,
         refine_report_text,
     )
-    from services.pdf_extractor import extract_text_from_file
+    from services.pdf_extractor import extract_text_from_file, extract_texts_concurrently
     from services.template_processor import template_processor
+    from services.worker_pool import worker_pool
     from utils.auth import get_current_user
     from utils.error_handler import (
         api_error_handler,
@@ -59,6 +64,7 @@ except ImportError:
         NotFoundException,
     )
     from utils.file_utils import temporary_directory
+    from utils.llm_cache import DETERMINISTIC_TEMPERATURE
 
 import logging
 import shutil
@@ -74,6 +80,7 @@ from utils.file_utils import safe_path_join
 from utils.supabase_helper import async_supabase_client_context
 from utils.storage import get_absolute_file_path, validate_file_exists
 from utils.db_utils import supabase_transaction
+from utils.document_store import fetch_files, update_file_contents
 from models.report import Report, ReportCreate
 from models.file import FileRecord
 from services.agent_service import AgentService
@@ -248,11 +255,13 @@ async def fetch_reference_reports():
                 for file_path in reference_files:
                     try:
                         print(f"Extracting text from reference file: {file_path}")
-                        extracted_text = extract_text_from_file(file_path)
+                        extracted_text = await worker_pool.run_io(
+                            extract_text_from_file, file_path
+                        )
 
-                        if not extracted_text or extracted_text.startswith("Error:"):
+                        if not extracted_text:
                             print(
-                                f"Warning: Could not extract text from {file_path}: {extracted_text}"
+                                f"Warning: No text extracted from {file_path}"
                             )
                             continue
 
@@ -565,69 +574,94 @@ async def analyze_documents(request: AnalyzeRequest):
 
     with temporary_directory(settings.UPLOAD_DIR) as tmp_dir:
         try:
+            # One batched read for all documents and one bulk write at the end;
+            # no pooled client is held while the documents are extracted
             async with async_supabase_client_context() as supabase:
-                for doc_id in document_ids:
-                    try:
-                        file_response = await supabase.table("files").select("*").eq("file_id", str(doc_id)).execute()
-                        if not file_response.data:
-                            extraction_results.append({
-                                "document_id": doc_id,
-                                "status": "error",
-                                "error": "File not found in database"
-                            })
-                            continue
-
-                        file_record = file_response.data[0]
-                        abs_file_path = get_absolute_file_path(file_record["file_path"])
-                        
-                        if not validate_file_exists(abs_file_path):
-                            extraction_results.append({
-                                "document_id": doc_id,
-                                "status": "error",
-                                "error": "File not found on disk"
-                            })
-                            continue
-
-                        try:
-                            text = await extract_text_from_file(abs_file_path)
-                            if text:
-                                document_text.append(f"Document '{file_record['filename']}': {text}")
-                                extraction_results.append({
-                                    "document_id": doc_id,
-                                    "status": "success",
-                                    "chars_extracted": len(text)
-                                })
-                                
-                                # Update file record with extracted text
-                                await supabase.table("files").update({
-                                    "content": text,
-                                    "processed_at": datetime.utcnow().isoformat()
-                                }).eq("file_id", str(doc_id)).execute()
-                                
-                            else:
-                                extraction_results.append({
-                                    "document_id": doc_id,
-                                    "status": "warning",
-                                    "error": "No text could be extracted"
-                                })
-                        except Exception as e:
-                            logger.error(f"Error extracting text from document {doc_id}: {str(e)}")
-                            logger.error(f"Full error: {traceback.format_exc()}")
-                            extraction_results.append({
-                                "document_id": doc_id,
-                                "status": "error",
-                                "error": str(e),
-                                "error_type": e.__class__.__name__
-                            })
+                file_records = await fetch_files(supabase, document_ids)
+            processed_updates = []
+
+            # Resolve every document first; results keep the request order
+            extraction_results = [None] * len(document_ids)
+            pending = []
+            for position, doc_id in enumerate(document_ids):
+                file_record = file_records.get(str(doc_id))
+                if not file_record:
+                    extraction_results[position] = {
+                        "document_id": doc_id,
+                        "status": "error",
+                        "error": "File not found in database"
+                    }
+                    continue
 
-                    except Exception as e:
-                        logger.error(f"Error processing document {doc_id}: {str(e)}")
-                        extraction_results.append({
+                try:
+                    abs_file_path = get_absolute_file_path(file_record["file_path"])
+                    if not validate_file_exists(abs_file_path):
+                        extraction_results[position] = {
                             "document_id": doc_id,
                             "status": "error",
-                            "error": str(e),
-                            "error_type": e.__class__.__name__
-                        })
+                            "error": "File not found on disk"
+                        }
+                        continue
+                except Exception as e:
+                    logger.error(f"Error processing document {doc_id}: {str(e)}")
+                    extraction_results[position] = {
+                        "document_id": doc_id,
+                        "status": "error",
+                        "error": str(e),
+                        "error_type": e.__class__.__name__
+                    }
+                    continue
+
+                pending.append((position, doc_id, file_record, abs_file_path))
+
+            # Extract all found documents concurrently
+            extractions = await extract_texts_concurrently(
+                [abs_file_path for _, _, _, abs_file_path in pending]
+            )
+
+            for (position, doc_id, file_record, _), extraction in zip(pending, extractions):
+                text = extraction["text"]
+                error = extraction["error"]
+                duration_ms = round(extraction["duration"] * 1000, 1)
+                if error is not None:
+                    logger.error(f"Error extracting text from document {doc_id}: {str(error)}")
+                    extraction_results[position] = {
+                        "document_id": doc_id,
+                        "status": "error",
+                        "error": str(error),
+                        "error_type": error.__class__.__name__,
+                        "duration_ms": duration_ms
+                    }
+                elif text:
+                    document_text.append(f"Document '{file_record['filename']}': {text}")
+                    extraction_results[position] = {
+                        "document_id": doc_id,
+                        "status": "success",
+                        "chars_extracted": len(text),
+                        "duration_ms": duration_ms
+                    }
+
+                    # Store the extracted text with the other updates
+                    processed_updates.append({
+                        "file_id": file_record["file_id"],
+                        "content": text,
+                        "processed_at": datetime.utcnow().isoformat()
+                    })
+                else:
+                    extraction_results[position] = {
+                        "document_id": doc_id,
+                        "status": "warning",
+                        "error": "No text could be extracted",
+                        "duration_ms": duration_ms
+                    }
+
+            if processed_updates:
+                try:
+                    async with async_supabase_client_context() as supabase:
+                        await update_file_contents(supabase, processed_updates)
+                except Exception as e:
+                    # The analysis can go on without the stored text
+                    logger.error(f"Error storing extracted text: {str(e)}")
 
             if not document_text:
                 return {
@@ -668,7 +702,7 @@ async def analyze_documents(request: AnalyzeRequest):
             return {
                 "status": "error",
                 "message": "An error occurred while analyzing documents",
-                "extraction_results": extraction_results,
+                "extraction_results": [result for result in extraction_results if result],
                 "findings": [],
                 "suggestions": [],
                 "extracted_variables": {}
@@ -740,7 +774,12 @@ async def generate_from_structure(
             # Extract text from documents
             logger.info("Extracting text from documents...")
             from services.pdf_extractor import extract_text_from_files
-            document_text = extract_text_from_files(document_paths)
+            from utils.prompt_builder import PROMPT_DOCUMENTS_TOKEN_BUDGET
+            document_text = await worker_pool.run_io(
+                extract_text_from_files,
+                document_paths,
+                max_tokens=PROMPT_DOCUMENTS_TOKEN_BUDGET,
+            )
 
             # Get the structure to use
             custom_format_template = request.structure or """
@@ -861,7 +900,10 @@ async def _generate_and_save_report(
 
         # Call the OpenRouter API
         response = await call_openrouter_api(
-            messages=messages, max_retries=2, timeout=120.0
+            messages=messages,
+            max_retries=2,
+            timeout=120.0,
+            temperature=DETERMINISTIC_TEMPERATURE,
         )
 
         # Calculate time taken
@@ -1068,7 +1110,7 @@ async def generate_report_from_id(
             file_path = file.get("file_path")
             if file_path and os.path.exists(file_path):
                 try:
-                    text = extract_text_from_file(file_path)
+                    text = await worker_pool.run_io(extract_text_from_file, file_path)
                     if text:
                         filename = os.path.basename(file_path)
                         document_text += f"\n--- Document: {filename} ---\n{text}\n\n"
@@ -1125,15 +1167,14 @@ async def get_report_files_endpoint(report_id: UUID4):
                 logger.info(f"No document IDs found for report {report_id}")
                 return APIResponse(status="success", data=[])
             
-            # Collect file records for each document ID
+            # Collect file records for all document IDs in one batched read
+            document_ids = [doc_id for doc_id in document_ids if doc_id]  # Skip null IDs
+            file_records = await fetch_files(supabase, document_ids)
             files = []
             for doc_id in document_ids:
-                if not doc_id:  # Skip null IDs
-                    continue
-                    
-                file_response = await supabase.table("files").select("*").eq("file_id", doc_id).execute()
-                if file_response.data:
-                    files.append(file_response.data[0])
+                file_record = file_records.get(str(doc_id))
+                if file_record:
+                    files.append(file_record)
                 else:
                     logger.warning(f"File with ID {doc_id} referenced by report {report_id} not found")
             
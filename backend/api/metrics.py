@@ -10,9 +10,18 @@ from typing import Any, Dict
 
 from fastapi import APIRouter, HTTPException, Query
 from services.docx_formatter import docx_formatter
-from utils.metrics import MetricsCollector
-
-from ..utils.resource_manager import resource_manager
+from services.worker_pool import worker_pool
+from utils.extraction_cache import extraction_cache
+from utils.http_client import http_client_pool
+from utils.llm_cache import llm_cache
+from utils.metrics import initialize as initialize_metrics
+from utils.monitoring import (
+    QUANTILE_HISTOGRAMS,
+    review_parse_stats,
+    summarize_histogram,
+)
+from utils.resource_manager import resource_manager
+from utils.supabase_helper import get_supabase_pool_stats
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -20,9 +29,9 @@ logger = logging.getLogger(__name__)
 # Initialize router
 router = APIRouter()
 
-# Create metrics collector instance
+# Shared metrics collector (one per process, so readers see every writer)
 metrics_file = Path(__file__).parent.parent / "data" / "metrics.json"
-metrics_collector = MetricsCollector(metrics_file=metrics_file)
+metrics_collector = initialize_metrics(metrics_file)
 
 
 @router.get("/metrics/summary", response_model=Dict[str, Any])
@@ -93,6 +102,7 @@ async def get_metrics_summary():
                 "error_rate": len(error_metrics)
                 / max(1, total_reports + len(error_metrics)),
             },
+            "llm_cache": llm_cache.get_stats(),
             "resources": {
                 "total_tracked": resource_count,
                 "by_type": {
@@ -155,8 +165,8 @@ async def get_report_metrics(limit: int = Query(10, ge=1, le=100)):
         )
 
         # Calculate summary statistics
-        total_reports = len(metrics_collector.get_metrics("report_generation"))
-        total_errors = len(metrics_collector.get_metrics("report_generation_error"))
+        total_reports = metrics_collector.count("report_generation")
+        total_errors = metrics_collector.count("report_generation_error")
 
         # Calculate averages if we have data
         if report_metrics:
@@ -194,6 +204,125 @@ async def get_report_metrics(limit: int = Query(10, ge=1, le=100)):
         )
 
 
+@router.get("/metrics/http-pool", response_model=Dict[str, Any])
+async def get_http_pool_metrics():
+    """
+    Get connection pool statistics for the shared outbound HTTP client
+    """
+    try:
+        return {"status": "success", "pool": http_client_pool.get_stats()}
+    except Exception as e:
+        logger.error(f"Error getting HTTP pool metrics: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Error generating HTTP pool metrics: {str(e)}"
+        )
+
+
+@router.get("/metrics/extraction-cache", response_model=Dict[str, Any])
+async def get_extraction_cache_metrics():
+    """
+    Get hit/miss statistics for the document text extraction cache
+    """
+    try:
+        return {"status": "success", "cache": extraction_cache.get_stats()}
+    except Exception as e:
+        logger.error(f"Error getting extraction cache metrics: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating extraction cache metrics: {str(e)}",
+        )
+
+
+@router.get("/metrics/llm-cache", response_model=Dict[str, Any])
+async def get_llm_cache_metrics():
+    """
+    Get hit/miss statistics for the LLM response cache
+    """
+    try:
+        return {"status": "success", "cache": llm_cache.get_stats()}
+    except Exception as e:
+        logger.error(f"Error getting LLM cache metrics: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating LLM cache metrics: {str(e)}",
+        )
+
+
+@router.get("/metrics/supabase-pool", response_model=Dict[str, Any])
+async def get_supabase_pool_metrics():
+    """
+    Get size, checkout and wait-time statistics for the Supabase connection pool
+    """
+    try:
+        return {"status": "success", "pool": get_supabase_pool_stats()}
+    except Exception as e:
+        logger.error(f"Error getting Supabase pool metrics: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating Supabase pool metrics: {str(e)}",
+        )
+
+
+@router.get("/metrics/worker-pool", response_model=Dict[str, Any])
+async def get_worker_pool_metrics():
+    """
+    Get queue depth and utilization of the shared CPU and I/O worker pools
+    """
+    try:
+        return {"status": "success", "pools": worker_pool.get_stats()}
+    except Exception as e:
+        logger.error(f"Error getting worker pool metrics: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating worker pool metrics: {str(e)}",
+        )
+
+
+@router.get("/metrics/aggregates/{category}", response_model=Dict[str, Any])
+async def get_metric_aggregates(
+    category: str, window: int = Query(3600, ge=60, le=86400)
+):
+    """
+    Get count/sum/avg/min/max of a metric category's numeric fields over the
+    last `window` seconds
+    """
+    try:
+        return {
+            "status": "success",
+            "aggregates": metrics_collector.get_aggregates(category, window),
+        }
+    except Exception as e:
+        logger.error(f"Error getting metric aggregates: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Error generating metric aggregates: {str(e)}"
+        )
+
+
+@router.get("/metrics/latency", response_model=Dict[str, Any])
+async def get_latency_metrics():
+    """
+    Get count, sum and p50/p95/p99 estimates of the request, LLM call,
+    extraction and DOCX generation histograms since process start.
+    The same quantiles are exposed as *_quantile gauges on /metrics.
+    Also reports how reviewer replies were parsed and how often a second
+    reviewer call was needed.
+    """
+    try:
+        return {
+            "status": "success",
+            "histograms": {
+                name: summarize_histogram(histogram)
+                for name, histogram in QUANTILE_HISTOGRAMS.items()
+            },
+            "reviewer_parsing": review_parse_stats(),
+        }
+    except Exception as e:
+        logger.error(f"Error getting latency metrics: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Error generating latency metrics: {str(e)}"
+        )
+
+
 @router.post("/metrics/record-startup")
 async def record_startup():
     """
@@ -1,6 +1,7 @@
 from typing import Any, Dict, List
 
 from fastapi import APIRouter, HTTPException
+from utils.document_store import fetch_files
 from utils.supabase_helper import async_supabase_client_context
 
 # Use imports with fallbacks for better compatibility across environments
@@ -114,16 +115,13 @@ async def get_report_files(report_id: str) -> Dict[str, Any]:
                     "files": []
                 }
             
-            # Get all files associated with the document IDs
-            files = []
-            for doc_id in document_ids:
-                file_response = await supabase.table("files") \
-                    .select("*") \
-                    .eq("file_id", doc_id) \
-                    .execute()
-                
-                if file_response.data:
-                    files.extend(file_response.data)
+            # Get all files associated with the document IDs in one batched read
+            file_records = await fetch_files(supabase, document_ids)
+            files = [
+                file_records[str(doc_id)]
+                for doc_id in document_ids
+                if str(doc_id) in file_records
+            ]
             
             return {
                 "report_id": report_id,
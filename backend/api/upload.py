@@ -31,7 +31,9 @@ try:
     from models import Template, User
     from services.pdf_extractor import extract_text_from_file
     from services.upload_service import upload_service
+    from services.worker_pool import worker_pool
     from utils.auth import get_current_user
+    from utils.document_store import append_document_ids
     from utils.error_handler import api_error_handler, logger
     from utils.exceptions import (
         DatabaseException,
@@ -51,7 +53,9 @@ except ImportError:
     from models import Template, User
     from services.pdf_extractor import extract_text_from_file
     from services.upload_service import upload_service
+    from services.worker_pool import worker_pool
     from utils.auth import get_current_user
+    from utils.document_store import append_document_ids
     from utils.error_handler import api_error_handler, logger
     from utils.exceptions import (
         DatabaseException,
@@ -93,6 +97,7 @@ class ChunkedUploadInit(BaseModel):
     fileSize: int
     fileType: str
     totalChunks: int
+    chunkSize: Optional[int] = None
     reportId: Optional[str] = None
     templateId: Optional[str] = None
 
@@ -101,6 +106,7 @@ class ChunkUploadComplete(BaseModel):
     """Request model for completing a chunked upload"""
 
     uploadId: str
+    checksum: Optional[str] = None
 
 
 # Background task to process an uploaded file
@@ -127,9 +133,11 @@ async def process_file_in_background(
         # Extract content if it's a text-based file
         content = None
         if FileProcessor.is_text_file(abs_file_path):
-            content = FileProcessor.extract_text(abs_file_path)
+            content = await worker_pool.run_io(
+                FileProcessor.extract_text, abs_file_path
+            )
 
-        # Update the file record and link to report in a single transaction
+        # Update the file record, then link it to the report atomically
         async with async_supabase_client_context() as supabase:
             # Update file content and mime type
             await supabase.table("files").update({
@@ -138,17 +146,9 @@ async def process_file_in_background(
                 "processed": True
             }).eq("file_id", file_metadata["file_id"]).execute()
 
-            # Get current document_ids from report
-            report_data = await supabase.table("reports").select("document_ids").eq("report_id", report_id).execute()
-
-            if report_data.data:
-                current_docs = report_data.data[0].get("document_ids", []) or []
-                # Only add if not already in list
-                if file_metadata["file_id"] not in current_docs:
-                    updated_docs = current_docs + [file_metadata["file_id"]]
-                    await supabase.table("reports").update({
-                        "document_ids": updated_docs
-                    }).eq("report_id", report_id).execute()
+            # Appended server-side, so concurrent uploads to the same report
+            # cannot drop each other's ids
+            await append_document_ids(supabase, report_id, [file_metadata["file_id"]])
 
     except Exception as e:
         logger.error(f"Error processing file {file_path}: {str(e)}")
@@ -246,7 +246,7 @@ async def upload_template(
 
         try:
             # Extract content from PDF
-            content = extract_text_from_file(file_path)
+            content = await worker_pool.run_io(extract_text_from_file, file_path)
         except Exception as e:
             raise FileProcessingException(
                 message=f"Failed to extract text from template: {str(e)}",
@@ -303,7 +303,9 @@ async def upload_files(
                 # Extract content if it's a text-based file
                 content = None
                 if FileProcessor.is_text_file(file_path):
-                    content = FileProcessor.extract_text(file_path)
+                    content = await worker_pool.run_io(
+                        FileProcessor.extract_text, file_path
+                    )
 
                 # Create file record with client IP in metadata
                 file_record = {
@@ -698,6 +700,7 @@ async def init_chunked_upload(request: ChunkedUploadInit):
             file_size=request.fileSize,
             mime_type=request.fileType,
             directory=upload_dir,
+            chunk_size=request.chunkSize,
         )
 
         return {
@@ -721,7 +724,12 @@ async def init_chunked_upload(request: ChunkedUploadInit):
     response_model=APIResponse[Dict[str, Any]],
 )
 @api_error_handler
-async def upload_chunk(upload_id: str, chunk_index: int, file: UploadFile = File(...)):
+async def upload_chunk(
+    upload_id: str,
+    chunk_index: int,
+    file: UploadFile = File(...),
+    checksum: Optional[str] = Form(None),
+):
     """
     Upload a chunk of a file
 
@@ -731,6 +739,7 @@ async def upload_chunk(upload_id: str, chunk_index: int, file: UploadFile = File
         upload_id: Unique ID for this upload from init_chunked_upload
         chunk_index: Index of this chunk (0-based)
         file: The chunk data
+        checksum: Optional digest of the chunk; mismatching chunks are rejected
 
     Returns:
         Standardized API response with updated upload status
@@ -738,7 +747,10 @@ async def upload_chunk(upload_id: str, chunk_index: int, file: UploadFile = File
     try:
         # Process the chunk using FileProcessor
         upload_info = FileProcessor.save_chunk(
-            upload_id=upload_id, chunk_index=chunk_index, chunk_data=file.file
+            upload_id=upload_id,
+            chunk_index=chunk_index,
+            chunk_data=file.file,
+            checksum=checksum,
         )
 
         return {
@@ -749,8 +761,11 @@ async def upload_chunk(upload_id: str, chunk_index: int, file: UploadFile = File
                 "received": upload_info["received_chunks"],
                 "total": upload_info["total_chunks"],
                 "status": upload_info["status"],
+                "checksum": upload_info["chunk_checksums"][str(chunk_index)],
             },
         }
+    except ValidationException:
+        raise
     except ValueError as e:
         logger.error(f"Invalid chunk upload request: {str(e)}")
         raise ValidationException(
@@ -829,8 +844,11 @@ async def complete_chunked_upload(
             target_dir = os.path.dirname(chunks_dir)
 
             # Complete the upload using FileProcessor
-            result = FileProcessor.complete_chunked_upload(
-                upload_id=upload_id, target_directory=target_dir
+            result = await worker_pool.run_io(
+                FileProcessor.complete_chunked_upload,
+                upload_id=upload_id,
+                target_directory=target_dir,
+                checksum=request.checksum,
             )
 
             # Create a database record for the file
@@ -875,8 +893,13 @@ async def complete_chunked_upload(
                 "fileSize": file_info["size_bytes"],
                 "mimeType": result["mime_type"],
                 "reportId": report_id,
+                "checksum": result["checksum"],
+                "checksumAlgorithm": result["checksum_algorithm"],
+                "deduplicated": result["deduplicated"],
             },
         }
+    except ValidationException:
+        raise
     except ValueError as e:
         logger.error(f"Error completing chunked upload: {str(e)}")
         raise ValidationException(
@@ -12,7 +12,7 @@ import tempfile
 import uuid
 from datetime import datetime
 from pathlib import Path, PurePath
-from typing import Any, Dict, Optional, Set
+from typing import Any, Callable, Dict, Optional, Set
 
 from config import settings
 from fastapi import (
@@ -24,7 +24,24 @@ from fastapi import (
     UploadFile,
     Depends,
 )
+from utils.chunk_assembly import (
+    ASSEMBLY_FILENAME,
+    commit_assembled_file,
+    link_duplicate,
+    preallocate_file,
+    replace_with_copy,
+    write_chunk_at,
+)
 from utils.error_handler import raise_error
+from utils.upload_checksum import (
+    CHECKSUM_ALGORITHM,
+    checksums_match,
+    combine_chunk_checksums,
+    combine_content_digests,
+    hash_chunk,
+)
+from utils.upload_index import session_lock, upload_session_index
+from services.worker_pool import worker_pool
 from utils.supabase_helper import async_supabase_client_context
 from utils.auth import get_current_user
 
@@ -231,6 +248,44 @@ def safely_open_file(path: Optional[Path], mode: str = "r") -> Optional[Any]:
         return None
 
 
+def update_upload_metadata(
+    upload_dir: Path, update: Callable[[Dict[str, Any]], None]
+) -> Dict[str, Any]:
+    """
+    Read-modify-write an upload's metadata.json under the session lock.
+    Blocks, so call it in a worker thread.
+
+    Args:
+        upload_dir: Validated upload directory holding metadata.json
+        update: Function that modifies the metadata dict in place; it gets an
+            empty dict when the upload has no metadata yet
+
+    Returns:
+        The metadata as written
+    """
+    metadata_path = upload_dir / "metadata.json"
+    with session_lock(upload_dir):
+        metadata: Dict[str, Any] = {}
+        if metadata_path.exists():
+            f = safely_open_file(metadata_path, "r")
+            if f is None:
+                raise IOError(f"Cannot read metadata file {metadata_path}")
+            with f:
+                metadata = json.load(f)
+
+        update(metadata)
+
+        # Replace atomically so unlocked readers never see a partial file
+        tmp_path = metadata_path.with_name("metadata.json.tmp")
+        f = safely_open_file(tmp_path, "w")
+        if f is None:
+            raise IOError(f"Cannot write metadata file {metadata_path}")
+        with f:
+            json.dump(metadata, f)
+        os.replace(tmp_path, metadata_path)
+    return metadata
+
+
 @router.post("/initialize")
 async def initialize_chunked_upload(
     request: Request,
@@ -341,95 +396,53 @@ async def initialize_chunked_upload(
         chunk_size = calculate_chunk_size(fileSize)
         total_chunks = math.ceil(fileSize / chunk_size)
 
-        # Check if this is a new upload or resuming an existing one
-        metadata = {}
-        if metadata_path.exists():
-            # Resuming an existing upload
-            f = safely_open_file(metadata_path, "r")
-            if f is None:
-                raise_error(
-                    message="Cannot read metadata file",
-                    detail="Path validation failed for metadata file",
-                    status_code=400,
-                )
-            try:
-                metadata = json.load(f)
-                f.close()
-            except Exception as e:
-                logging.error(f"Error reading metadata file: {str(e)}")
-                raise HTTPException(
-                    status_code=500, detail="Error reading metadata file"
+        def prepare_metadata(metadata: Dict[str, Any]) -> None:
+            if metadata:
+                # Resuming an existing upload; update the metadata if needed
+                metadata["fileSize"] = fileSize
+                metadata["mimeType"] = mimeType
+                metadata["filename"] = safe_filename
+                if reportId:
+                    metadata["reportId"] = reportId
+            else:
+                # New upload
+                metadata.update(
+                    {
+                        "uploadId": upload_id,
+                        "filename": safe_filename,
+                        "fileSize": fileSize,
+                        "mimeType": mimeType,
+                        "reportId": reportId,
+                        "chunkSize": chunk_size,
+                        "totalChunks": total_chunks,
+                        "uploadedChunks": [],
+                        "createdAt": str(datetime.now()),
+                        "status": "initialized",
+                        "assembly": "in_place",
+                    }
                 )
 
-            # Update the metadata if needed
-            metadata["fileSize"] = fileSize
-            metadata["mimeType"] = mimeType
-            metadata["filename"] = safe_filename
-            if reportId:
-                metadata["reportId"] = reportId
-        else:
-            # New upload
-            metadata = {
-                "uploadId": upload_id,
-                "filename": safe_filename,
-                "fileSize": fileSize,
-                "mimeType": mimeType,
-                "reportId": reportId,
-                "chunkSize": chunk_size,
-                "totalChunks": total_chunks,
-                "uploadedChunks": [],
-                "createdAt": str(datetime.now()),
-                "status": "initialized",
-            }
-
-        # Store metadata
-        f = safely_open_file(metadata_path, "w")
-        if f is None:
-            raise_error(
-                message="Cannot write metadata file",
-                detail="Path validation failed for metadata file",
-                status_code=400,
-            )
-        try:
-            json.dump(metadata, f)
-            f.close()
-        except Exception as e:
-            logging.error(f"Error writing metadata file: {str(e)}")
-            raise HTTPException(status_code=500, detail="Error writing metadata file")
-
-        # Check which chunks have already been uploaded
-        if not safe_upload_dir:
-            raise_error(
-                message="Invalid upload path",
-                detail="Could not validate upload directory path",
-                status_code=400,
-            )
-
-        # Only iterate over files if directory exists
-        uploaded_chunks = []
-        if safe_upload_dir is not None and safe_upload_dir.exists():
-            chunk_files = list(safe_upload_dir.glob("chunk_*.bin"))
-
-            for chunk_file in chunk_files:
-                try:
-                    chunk_index = int(chunk_file.stem.split("_")[1])
-                    uploaded_chunks.append(chunk_index)
-                except (ValueError, IndexError):
-                    continue
+                # Reserve the final file; chunks are written into it at their offsets
+                preallocate_file(safe_upload_dir / ASSEMBLY_FILENAME, fileSize)
 
-        # Update metadata with uploaded chunks
-        metadata["uploadedChunks"] = sorted(uploaded_chunks)
+            # Check which chunks have already been uploaded. In-place chunks
+            # live inside the preallocated file, so the metadata (updated under
+            # the session lock by every chunk request) is their record.
+            if metadata.get("assembly") != "in_place":
+                uploaded_chunks = []
+                for chunk_file in safe_upload_dir.glob("chunk_*.bin"):
+                    try:
+                        uploaded_chunks.append(int(chunk_file.stem.split("_")[1]))
+                    except (ValueError, IndexError):
+                        continue
+                metadata["uploadedChunks"] = uploaded_chunks
+            metadata["uploadedChunks"] = sorted(metadata.get("uploadedChunks", []))
 
-        f = safely_open_file(metadata_path, "w")
-        if f is None:
-            raise_error(
-                message="Cannot update metadata file",
-                detail="Path validation failed for metadata file",
-                status_code=400,
-            )
+        # Check if this is a new upload or resuming an existing one
         try:
-            json.dump(metadata, f)
-            f.close()
+            metadata = await worker_pool.run_io(
+                update_upload_metadata, safe_upload_dir, prepare_metadata
+            )
         except Exception as e:
             logging.error(f"Error updating metadata file: {str(e)}")
             raise HTTPException(status_code=500, detail="Error updating metadata file")
@@ -462,6 +475,7 @@ async def upload_chunk(
     start: int = Form(...),
     end: int = Form(...),
     chunk: UploadFile = File(...),
+    chunkHash: Optional[str] = Form(None),
 ):
     """
     Upload a single chunk of a file.
@@ -472,6 +486,7 @@ async def upload_chunk(
         start: Start byte position of the chunk
         end: End byte position of the chunk
         chunk: The chunk data
+        chunkHash: Optional digest of the chunk; mismatching chunks are rejected
 
     Returns:
         JSON response with chunk upload status
@@ -572,43 +587,87 @@ async def upload_chunk(
                 status_code=400,
             )
 
-        # Save the chunk
-        f = safely_open_file(chunk_path, "wb")
-        if f is None:
+        # Verify the chunk before it is written anywhere
+        chunk_checksum, content_digest = await worker_pool.run_io(hash_chunk, chunk_data)
+        if not checksums_match(chunkHash, chunk_checksum):
             raise_error(
-                message="Cannot save chunk file",
-                detail="Path validation failed for chunk file",
+                message="Chunk checksum mismatch",
+                detail=f"Chunk {chunkIndex} {CHECKSUM_ALGORITHM} is {chunk_checksum}, expected {chunkHash}",
                 status_code=400,
             )
-        try:
-            f.write(chunk_data)
-            f.close()
-        except Exception as e:
-            logging.error(f"Error writing chunk file: {str(e)}")
-            raise HTTPException(status_code=500, detail="Error writing chunk file")
 
-        # Verify file was written
-        if not chunk_path.exists():
-            raise_error(
-                message="Failed to save chunk",
-                detail="Chunk file could not be saved",
-                status_code=500,
-            )
+        if metadata.get("assembly") == "in_place":
+            # Write straight into the preallocated file at the chunk's offset.
+            # Completion is tracked by index, so the range must be the one the
+            # index covers or a misplaced chunk would leave a zero-filled gap
+            chunk_start = chunkIndex * metadata["chunkSize"]
+            chunk_end = min(chunk_start + metadata["chunkSize"], metadata["fileSize"])
+            if start != chunk_start or end != chunk_end:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Chunk {chunkIndex} covers range {chunk_start}-{chunk_end}, got {start}-{end}",
+                )
+            if actual_size != end - start:
+                raise_error(
+                    message="Chunk size mismatch",
+                    detail=f"Chunk has {actual_size} bytes but covers range {start}-{end}",
+                    status_code=400,
+                )
+            try:
+                await worker_pool.run_io(
+                    write_chunk_at, safe_upload_dir / ASSEMBLY_FILENAME, start, chunk_data
+                )
+            except Exception as e:
+                logging.error(f"Error writing chunk at offset {start}: {str(e)}")
+                raise HTTPException(status_code=500, detail="Error writing chunk")
+        else:
+            # Save the chunk
+            f = safely_open_file(chunk_path, "wb")
+            if f is None:
+                raise_error(
+                    message="Cannot save chunk file",
+                    detail="Path validation failed for chunk file",
+                    status_code=400,
+                )
+            try:
+                f.write(chunk_data)
+                f.close()
+            except Exception as e:
+                logging.error(f"Error writing chunk file: {str(e)}")
+                raise HTTPException(status_code=500, detail="Error writing chunk file")
+
+            # Verify file was written
+            if not chunk_path.exists():
+                raise_error(
+                    message="Failed to save chunk",
+                    detail="Chunk file could not be saved",
+                    status_code=500,
+                )
+
+            actual_size = chunk_path.stat().st_size
 
-        actual_size = chunk_path.stat().st_size
         if actual_size != expected_size:
             # This is not a fatal error, but log it
             logger.warning(
                 f"Chunk size mismatch: expected {expected_size} bytes, got {actual_size} bytes"
             )
 
-        # Update metadata
-        if chunkIndex not in metadata["uploadedChunks"]:
-            metadata["uploadedChunks"].append(chunkIndex)
-            metadata["uploadedChunks"].sort()
+        # Update metadata; re-read under the lock so concurrent chunks of the
+        # same upload don't overwrite each other's entries
+        def record_chunk(metadata: Dict[str, Any]) -> None:
+            if chunkIndex not in metadata["uploadedChunks"]:
+                metadata["uploadedChunks"].append(chunkIndex)
+                metadata["uploadedChunks"].sort()
+            metadata.setdefault("chunkChecksums", {})[str(chunkIndex)] = chunk_checksum
+            metadata.setdefault("chunkContentDigests", {})[str(chunkIndex)] = content_digest
 
-        with safely_open_file(metadata_path, "w") as f:
-            json.dump(metadata, f)
+        try:
+            metadata = await worker_pool.run_io(
+                update_upload_metadata, safe_upload_dir, record_chunk
+            )
+        except Exception as e:
+            logging.error(f"Error updating metadata file: {str(e)}")
+            raise HTTPException(status_code=500, detail="Error updating metadata file")
 
         # Check if upload is complete
         is_complete = len(metadata["uploadedChunks"]) == metadata["totalChunks"]
@@ -619,6 +678,8 @@ async def upload_chunk(
             "start": start,
             "end": end,
             "isComplete": is_complete,
+            "checksum": chunk_checksum,
+            "checksumAlgorithm": CHECKSUM_ALGORITHM,
         }
     except Exception as e:
         logger.exception(f"Failed to upload chunk {chunkIndex}")
@@ -638,15 +699,19 @@ async def finalize_chunked_upload(
     uploadId: str = Form(...),
     filename: str = Form(...),
     reportId: Optional[str] = Form(None),
+    checksum: Optional[str] = Form(None),
     current_user: Optional[dict] = Depends(get_current_user),
 ):
     """
     Finalize a chunked upload, combining all chunks into a single file.
+    An upload identical to a file stored earlier is hard-linked to it instead
+    of being written again.
 
     Args:
         uploadId: ID of the upload session
         filename: Name of the final file
         reportId: Optional report ID to associate this upload with
+        checksum: Optional whole-file checksum (hash of the ordered chunk digests)
         current_user: Current user information
 
     Returns:
@@ -718,6 +783,17 @@ async def finalize_chunked_upload(
                 status_code=400,
             )
 
+        # Whole-file checksum from the per-chunk digests; no need to re-read
+        file_checksum = combine_chunk_checksums(
+            metadata.get("chunkChecksums", {}), metadata["totalChunks"]
+        )
+        if checksum and not checksums_match(checksum, file_checksum or ""):
+            raise_error(
+                message="Upload checksum mismatch",
+                detail=f"Upload {CHECKSUM_ALGORITHM} is {file_checksum}, expected {checksum}",
+                status_code=400,
+            )
+
         # Validate the file type based on metadata
         if not is_allowed_file_type(metadata["mimeType"]):
             raise_error(
@@ -743,72 +819,106 @@ async def finalize_chunked_upload(
 
         output_path = report_dir / filename
 
-        # First combine chunks into a temporary file for virus scanning
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            temp_path = temp_file.name
-
-            # Combine chunks
-            file_size = 0
-            for i in range(metadata["totalChunks"]):
-                chunk_path = safe_upload_dir / f"chunk_{i}.bin"
-                if not chunk_path.exists():
-                    raise_error(
-                        message="Chunk file missing",
-                        detail=f"Chunk {i} is missing from upload directory",
-                        status_code=500,
-                    )
-
-                # Additional safety check for the chunk path
-                if not chunk_path.is_relative_to(safe_upload_dir):
-                    raise_error(
-                        message="Invalid chunk path",
-                        detail=f"Chunk {i} path is outside the upload directory",
-                        status_code=400,
-                    )
-
-                with safely_open_file(chunk_path, "rb") as chunk_file:
-                    if chunk_file is None:
+        partial_path = safe_upload_dir / ASSEMBLY_FILENAME
+        content_digest = combine_content_digests(
+            metadata.get("chunkContentDigests", {}), metadata["totalChunks"]
+        )
+        duplicate_of = (
+            upload_session_index.find_duplicate(content_digest, metadata["fileSize"])
+            if content_digest
+            else None
+        )
+        deduplicated = bool(duplicate_of) and link_duplicate(duplicate_of, output_path)
+
+        if deduplicated:
+            logger.info(f"Upload {uploadId} is identical to {duplicate_of}; linked")
+            file_size = metadata["fileSize"]
+            partial_path.unlink(missing_ok=True)
+        elif metadata.get("assembly") == "in_place" and partial_path.exists():
+            # Chunks were written in place; finalizing only moves the file
+            file_size = partial_path.stat().st_size
+            if file_size != metadata["fileSize"]:
+                raise_error(
+                    message="Assembled file size mismatch",
+                    detail=f"Expected {metadata['fileSize']} bytes, got {file_size} bytes",
+                    status_code=500,
+                )
+
+            await worker_pool.run_io(commit_assembled_file, partial_path, output_path)
+        else:
+            # First combine chunks into a temporary file for virus scanning
+            with tempfile.NamedTemporaryFile(delete=False) as temp_file:
+                temp_path = temp_file.name
+
+                # Combine chunks
+                file_size = 0
+                for i in range(metadata["totalChunks"]):
+                    chunk_path = safe_upload_dir / f"chunk_{i}.bin"
+                    if not chunk_path.exists():
                         raise_error(
-                            message="Cannot read chunk file",
-                            detail=f"Path validation failed for chunk {i}",
-                            status_code=400,
+                            message="Chunk file missing",
+                            detail=f"Chunk {i} is missing from upload directory",
+                            status_code=500,
                         )
-                    chunk_data = chunk_file.read()
-                    temp_file.write(chunk_data)
-                    file_size += len(chunk_data)
 
-        # Verify file size against metadata
-        if file_size != metadata["fileSize"]:
-            logger.warning(
-                f"Final file size mismatch: expected {metadata['fileSize']} bytes, got {file_size} bytes"
-            )
+                    # Additional safety check for the chunk path
+                    if not chunk_path.is_relative_to(safe_upload_dir):
+                        raise_error(
+                            message="Invalid chunk path",
+                            detail=f"Chunk {i} path is outside the upload directory",
+                            status_code=400,
+                        )
 
-        # TODO: Add virus scanning here
-        # scan_result = scan_file(temp_path)
-        # if not scan_result.is_clean:
-        #     os.unlink(temp_path)
-        #     raise_error(
-        #         message="File contains malware",
-        #         detail=f"Virus scan detected: {scan_result.threat_name}",
-        #         status_code=400,
-        #     )
+                    with safely_open_file(chunk_path, "rb") as chunk_file:
+                        if chunk_file is None:
+                            raise_error(
+                                message="Cannot read chunk file",
+                                detail=f"Path validation failed for chunk {i}",
+                                status_code=400,
+                            )
+                        chunk_data = chunk_file.read()
+                        temp_file.write(chunk_data)
+                        file_size += len(chunk_data)
+
+            # Verify file size against metadata
+            if file_size != metadata["fileSize"]:
+                logger.warning(
+                    f"Final file size mismatch: expected {metadata['fileSize']} bytes, got {file_size} bytes"
+                )
 
-        # Copy from temp file to final location
-        shutil.copy2(temp_path, output_path)
+            # TODO: Add virus scanning here
+            # scan_result = scan_file(temp_path)
+            # if not scan_result.is_clean:
+            #     os.unlink(temp_path)
+            #     raise_error(
+            #         message="File contains malware",
+            #         detail=f"Virus scan detected: {scan_result.threat_name}",
+            #         status_code=400,
+            #     )
+
+            # Copy from temp file to final location; the path may be a link
+            # to another upload, so replace it instead of writing through it
+            await worker_pool.run_io(replace_with_copy, temp_path, output_path)
+
+            # Clean up temp file
+            try:
+                os.unlink(temp_path)
+            except Exception as e:
+                logger.warning(f"Failed to delete temporary file: {str(e)}")
 
-        # Clean up temp file
-        try:
-            os.unlink(temp_path)
-        except Exception as e:
-            logger.warning(f"Failed to delete temporary file: {str(e)}")
+        if content_digest and not deduplicated:
+            upload_session_index.record_checksum(content_digest, str(output_path))
 
         # Update metadata
-        metadata["status"] = "completed"
-        metadata["finalPath"] = str(output_path)
-        metadata["finalSize"] = file_size
-
-        with safely_open_file(metadata_path, "w") as f:
-            json.dump(metadata, f)
+        def mark_completed(metadata: Dict[str, Any]) -> None:
+            metadata["status"] = "completed"
+            metadata["finalPath"] = str(output_path)
+            metadata["finalSize"] = file_size
+            metadata["checksum"] = file_checksum
+
+        metadata = await worker_pool.run_io(
+            update_upload_metadata, safe_upload_dir, mark_completed
+        )
 
         # Create file info for database
         file_info = {
@@ -872,7 +982,10 @@ async def finalize_chunked_upload(
             "size": file_size,
             "mimeType": metadata["mimeType"],
             "path": str(output_path),
-            "url": f"/files/{filename}"
+            "url": f"/files/{filename}",
+            "checksum": file_checksum,
+            "checksumAlgorithm": CHECKSUM_ALGORITHM,
+            "deduplicated": deduplicated,
         }
     except Exception as e:
         logger.exception("Failed to finalize upload")
@@ -892,13 +1005,11 @@ async def finalize_chunked_upload(
             # Don't delete immediately to allow for potential error recovery
             # Just mark for cleanup in metadata
             if metadata_path.exists():
-                with safely_open_file(metadata_path, "r") as f:
-                    metadata = json.load(f)
-
-                metadata["pendingCleanup"] = True
-
-                with safely_open_file(metadata_path, "w") as f:
-                    json.dump(metadata, f)
+                await worker_pool.run_io(
+                    update_upload_metadata,
+                    safe_upload_dir,
+                    lambda metadata: metadata.update(pendingCleanup=True),
+                )
         except Exception as e:
             logger.error(f"Error marking chunks for cleanup: {str(e)}")
 
@@ -139,6 +139,55 @@ class Settings(BaseSettings):
     # Token limit
     MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", "16000"))
 
+    # Shared outbound HTTP client pool
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(
+        os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")
+    )
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP_MAX_PER_HOST: int = int(os.getenv("HTTP_MAX_PER_HOST", "10"))
+    HTTP2_ENABLED: bool = Field(
+        default=os.getenv("HTTP2_ENABLED", "true").lower() in ("true", "1", "yes"),
+        description="Whether outbound API calls negotiate HTTP/2",
+    )
+
+    # Multimodal (vision) document processing
+    MULTIMODAL_RENDER_DPI: int = int(os.getenv("MULTIMODAL_RENDER_DPI", "300"))
+    # 0 sends every page in a single request. A positive value opts in to
+    # splitting the document into separate requests of that many pages; the
+    # model then sees no context across batches and the answers are joined
+    MULTIMODAL_PAGES_PER_REQUEST: int = int(
+        os.getenv("MULTIMODAL_PAGES_PER_REQUEST", "0")
+    )
+    MULTIMODAL_MAX_CONCURRENT_REQUESTS: int = int(
+        os.getenv("MULTIMODAL_MAX_CONCURRENT_REQUESTS", "2")
+    )
+    MULTIMODAL_API_TIMEOUT: float = float(os.getenv("MULTIMODAL_API_TIMEOUT", "180"))
+
+    # OCR fallback for PDF pages without a text layer
+    OCR_FALLBACK_ENABLED: bool = Field(
+        default=os.getenv("OCR_FALLBACK_ENABLED", "true").lower() in ("true", "1", "yes"),
+        description="Whether scanned PDF pages are run through Tesseract",
+    )
+    # Documents extracted at once when a request analyzes several files
+    EXTRACTION_CONCURRENCY: int = int(
+        os.getenv("EXTRACTION_CONCURRENCY", str(max(2, os.cpu_count() or 2)))
+    )
+    # Shared worker pools for all blocking document work (services/worker_pool.py):
+    # rendering, PDF extraction, OCR and agent document extraction included
+    WORKER_POOL_CPU_WORKERS: int = int(
+        os.getenv("WORKER_POOL_CPU_WORKERS", str(max(1, os.cpu_count() or 1)))
+    )
+    WORKER_POOL_IO_WORKERS: int = int(
+        os.getenv("WORKER_POOL_IO_WORKERS", str(min(32, (os.cpu_count() or 1) + 4)))
+    )
+    OCR_LANGUAGES: str = os.getenv("OCR_LANGUAGES", "ita+eng")
+    OCR_MIN_TEXT_CHARS: int = int(os.getenv("OCR_MIN_TEXT_CHARS", "20"))
+    OCR_DEFAULT_DPI: int = int(os.getenv("OCR_DEFAULT_DPI", "300"))
+    OCR_MIN_DPI: int = int(os.getenv("OCR_MIN_DPI", "150"))
+    OCR_MAX_DPI: int = int(os.getenv("OCR_MAX_DPI", "400"))
+    TESSERACT_CMD_PATH: str = os.getenv("TESSERACT_CMD_PATH", "")
+
     # CORS Settings
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "https://report-gen-liard.vercel.app")
     CORS_ALLOW_ALL: bool = Field(
@@ -52,18 +52,24 @@ from fastapi.staticfiles import StaticFiles
 # Import our custom middleware and monitoring
 from middleware.error_handler import error_handler_middleware
 from middleware.rate_limiter import rate_limit_middleware
+from utils.middleware import RequestLoggingMiddleware
 
 # Import utilities
 from utils.file_utils import safe_path_join
-from utils.metrics import MetricsCollector
+from utils.metrics import initialize as initialize_metrics
 from utils.supabase_helper import (
     cleanup_expired_connections,
+    close_all_connections,
     async_supabase_client_context,
     create_supabase_client,
 )
 from utils.api_rate_limiter import ApiRateLimiter
 from utils.monitoring import setup_monitoring, get_metrics
 from utils.api_rate_limiter import setup_rate_limiters
+from utils.http_client import close_http_client_pool, start_http_client_pool
+from services.worker_pool import worker_pool
+from utils.reference_index import reference_index
+from utils.static_assets import STATIC_ASSETS_RELOAD_INTERVAL, static_assets
 
 # Ensure required directories exist
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
@@ -94,6 +100,7 @@ async def lifespan(app: FastAPI):
     # Initialize task variables
     supabase_cleanup_task = None
     rate_limiter_cleanup_task = None
+    static_assets_reload_task = None
 
     # Startup - run initialization
     logger.info("Starting application...")
@@ -112,6 +119,43 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error initializing API rate limiter: {e}")
 
+    # Open the shared outbound HTTP client pool
+    try:
+        logger.info("Initializing shared HTTP client pool...")
+        await start_http_client_pool()
+    except Exception as e:
+        logger.error(f"Error initializing shared HTTP client pool: {e}")
+
+    # Start the shared CPU and I/O worker pools for blocking document work
+    try:
+        logger.info("Starting worker pools...")
+        worker_pool.start()
+    except Exception as e:
+        logger.error(f"Error starting worker pools: {e}")
+
+    # OCR scanned PDF pages wherever FileProcessor extracts PDF text
+    try:
+        logger.info("Registering OCR-aware PDF extractor...")
+        from services.pdf_extractor import register_hybrid_pdf_extractor
+
+        register_hybrid_pdf_extractor()
+    except Exception as e:
+        logger.error(f"Error registering OCR-aware PDF extractor: {e}")
+
+    # Read the brand guide, prompts, examples and templates once for the process
+    try:
+        logger.info("Loading static assets...")
+        static_assets.load_all()
+    except Exception as e:
+        logger.error(f"Error loading static assets: {e}")
+
+    # Vectorize the reference reports once instead of on every agent loop
+    try:
+        logger.info("Building reference report index...")
+        reference_index.build()
+    except Exception as e:
+        logger.error(f"Error building reference report index: {e}")
+
     # Create background tasks
     try:
         logger.info("Creating background cleanup tasks...")
@@ -125,6 +169,12 @@ async def lifespan(app: FastAPI):
         rate_limiter_cleanup_task = asyncio.create_task(
             start_rate_limiter_cleanup_scheduler()
         )
+
+        # Task reloading static assets whose files changed
+        if STATIC_ASSETS_RELOAD_INTERVAL > 0:
+            static_assets_reload_task = asyncio.create_task(
+                static_assets.watch(STATIC_ASSETS_RELOAD_INTERVAL)
+            )
     except Exception as e:
         logger.error(f"Error creating background tasks: {e}")
 
@@ -140,6 +190,35 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error stopping API rate limiter: {e}")
 
+    # Close the shared HTTP client pool
+    try:
+        logger.info("Closing shared HTTP client pool...")
+        await close_http_client_pool()
+    except Exception as e:
+        logger.error(f"Error closing shared HTTP client pool: {e}")
+
+    # Drop the pooled Supabase clients
+    try:
+        logger.info("Closing Supabase connection pool...")
+        await close_all_connections()
+    except Exception as e:
+        logger.error(f"Error closing Supabase connection pool: {e}")
+
+    # Stop the shared CPU and I/O worker pools, which run all blocking
+    # document work (rendering, PDF extraction, OCR, agent extraction)
+    try:
+        logger.info("Stopping worker pools...")
+        worker_pool.shutdown()
+    except Exception as e:
+        logger.error(f"Error stopping worker pools: {e}")
+
+    # Write out metrics still waiting for the background flush
+    try:
+        logger.info("Flushing metrics...")
+        metrics_collector.close()
+    except Exception as e:
+        logger.error(f"Error flushing metrics: {e}")
+
     # Cancel cleanup tasks
     try:
         logger.info("Canceling background tasks...")
@@ -148,6 +227,9 @@ async def lifespan(app: FastAPI):
 
         if "rate_limiter_cleanup_task" in locals() and rate_limiter_cleanup_task:
             rate_limiter_cleanup_task.cancel()
+
+        if static_assets_reload_task:
+            static_assets_reload_task.cancel()
     except Exception as e:
         logger.error(f"Error canceling background tasks: {e}")
 
@@ -188,6 +270,12 @@ app.add_middleware(
 # Add our custom middleware
 app.middleware("http")(error_handler_middleware)
 app.middleware("http")(rate_limit_middleware)
+# Added last so it wraps the others and times requests end to end
+app.add_middleware(
+    RequestLoggingMiddleware,
+    log_headers=False,
+    exclude_paths=["/docs", "/openapi.json", "/redoc", "/favicon.ico", "/metrics"],
+)
 
 # Remove the old exception handlers as they're now handled by error_handler_middleware
 # ... remove existing exception handlers ...
@@ -202,6 +290,7 @@ app.middleware("http")(rate_limit_middleware)
 from api import tasks
 from api.agent_loop import router as agent_loop_router, register_startup_tasks
 from api.generate import router as generate_router
+from api.metrics import router as metrics_router
 
 app.include_router(documents.router, prefix="/api/documents", tags=["Documents"])
 app.include_router(reports.router, prefix="/api/reports", tags=["Reports"])
@@ -211,6 +300,7 @@ app.include_router(share.router, prefix="/api/share", tags=["Share"])
 app.include_router(upload_chunked_router, prefix="/api/uploads", tags=["Uploads"])
 app.include_router(agent_loop_router, prefix="/api/agent-loop", tags=["agent-loop"])
 app.include_router(generate_router, prefix="/api/agent-loop/generate-report", tags=["Generate"])
+app.include_router(metrics_router, prefix="/api", tags=["Metrics"])
 
 # Register the agent_loop startup tasks
 register_startup_tasks(app)
@@ -225,8 +315,8 @@ temp_dir = Path("./temp_files")
 temp_dir.mkdir(exist_ok=True)
 
 # Initialize metrics collector
-metrics_collector = MetricsCollector(
-    metrics_file=Path(project_root) / "data" / "metrics.json",
+metrics_collector = initialize_metrics(
+    Path(__file__).parent / "data" / "metrics.json",
 )
 
 # Mount static file directories
@@ -367,7 +457,7 @@ async def start_supabase_connection_cleanup_scheduler():
     """Start a background task that cleans up stale Supabase connections"""
     while True:
         try:
-            removed = cleanup_expired_connections()
+            removed = await cleanup_expired_connections()
             if removed > 0:
                 logger.info(f"Cleaned up {removed} expired Supabase connections")
         except Exception as e:
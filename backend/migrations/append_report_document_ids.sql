@@ -0,0 +1,22 @@
+-- Append document ids to a report in a single statement, so concurrent
+-- uploads to the same report cannot overwrite each other's ids.
+-- Ids already linked to the report are skipped; the order of the rest is kept.
+CREATE OR REPLACE FUNCTION append_report_document_ids(
+    p_report_id UUID,
+    p_document_ids UUID[]
+)
+RETURNS UUID[] AS $$
+    UPDATE reports
+    SET document_ids = COALESCE(document_ids, ARRAY[]::UUID[]) || ARRAY(
+            SELECT new_id
+            FROM unnest(p_document_ids) WITH ORDINALITY AS t(new_id, position)
+            WHERE new_id <> ALL(COALESCE(document_ids, ARRAY[]::UUID[]))
+            GROUP BY new_id
+            ORDER BY MIN(position)
+        ),
+        updated_at = NOW()
+    WHERE report_id = p_report_id
+    RETURNING document_ids;
+$$ LANGUAGE sql;
+
+COMMENT ON FUNCTION append_report_document_ids(UUID, UUID[]) IS 'Atomically append document UUIDs to reports.document_ids, skipping duplicates';
@@ -0,0 +1,17 @@
+-- Store the extracted text of several files in a single statement.
+-- p_updates is a JSON array of {"file_id", "content", "processed_at"} objects;
+-- only those two columns are written, and ids without a row are skipped.
+CREATE OR REPLACE FUNCTION update_file_contents(
+    p_updates JSONB
+)
+RETURNS SETOF UUID AS $$
+    UPDATE files AS f
+    SET content = u.content,
+        processed_at = u.processed_at
+    FROM jsonb_to_recordset(p_updates)
+        AS u(file_id UUID, content TEXT, processed_at TIMESTAMPTZ)
+    WHERE f.file_id = u.file_id
+    RETURNING f.file_id;
+$$ LANGUAGE sql;
+
+COMMENT ON FUNCTION update_file_contents(JSONB) IS 'Batch update files.content and files.processed_at by file_id';
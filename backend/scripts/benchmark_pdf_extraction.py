@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark PDF text extraction: the original single-threaded `text +=` loop
+against the parallel page-range engine in utils/parallel_pdf.py.
+
+Usage:
+    python backend/scripts/benchmark_pdf_extraction.py
+    python backend/scripts/benchmark_pdf_extraction.py --workers 4 --repeat 5 path/to/file.pdf
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the parent directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+import fitz  # noqa: E402
+
+from services.worker_pool import worker_pool  # noqa: E402
+from utils.parallel_pdf import (  # noqa: E402
+    extract_pdf_pages_parallel,
+    get_page_count,
+)
+
+REFERENCE_REPORTS_DIR = backend_dir / "reference_reports"
+
+
+def extract_sequential(file_path: str) -> str:
+    """The original FileProcessor._extract_text_from_pdf loop"""
+    doc = fitz.open(file_path)
+    text = ""
+    for page_num in range(doc.page_count):
+        page = doc[page_num]
+        text += page.get_text()
+    doc.close()
+    return text
+
+
+def extract_parallel(file_path: str, workers: int) -> str:
+    """The parallel engine, forced to fan out even for short documents"""
+    return "".join(extract_pdf_pages_parallel(file_path, max_workers=workers))
+
+
+def time_call(func, *args, repeat: int) -> float:
+    """Return the median wall time of func(*args) over repeat runs"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("pdfs", nargs="*", help="PDF files (defaults to reference_reports/)")
+    parser.add_argument("--workers", type=int, default=4, help="Page ranges to fan out")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+    args = parser.parse_args()
+
+    pdfs = [Path(p) for p in args.pdfs] or sorted(REFERENCE_REPORTS_DIR.glob("*.pdf"))
+    if not pdfs:
+        print(f"No PDFs found in {REFERENCE_REPORTS_DIR}")
+        return
+
+    # The parallel engine only fans out above PDF_PARALLEL_MIN_PAGES; lower the
+    # threshold so the pool is measured on the (short) reference reports too
+    import utils.parallel_pdf as parallel_pdf
+
+    parallel_pdf.PDF_PARALLEL_MIN_PAGES = 0
+
+    # Warm the pool so process start-up is not billed to the first file
+    extract_parallel(str(pdfs[0]), args.workers)
+
+    print(f"{'file':<48} {'pages':>5} {'sequential':>11} {'parallel':>10} {'speedup':>8}")
+    totals = [0.0, 0.0]
+    for pdf in pdfs:
+        path = str(pdf)
+        sequential = time_call(extract_sequential, path, repeat=args.repeat)
+        parallel = time_call(extract_parallel, path, args.workers, repeat=args.repeat)
+        totals[0] += sequential
+        totals[1] += parallel
+
+        # Both paths must produce identical text
+        assert extract_sequential(path) == extract_parallel(path, args.workers), pdf.name
+
+        print(
+            f"{pdf.name[:48]:<48} {get_page_count(path):>5} "
+            f"{sequential * 1000:>9.1f}ms {parallel * 1000:>8.1f}ms "
+            f"{sequential / parallel:>7.2f}x"
+        )
+
+    print(
+        f"{'total':<48} {'':>5} {totals[0] * 1000:>9.1f}ms {totals[1] * 1000:>8.1f}ms "
+        f"{totals[0] / totals[1]:>7.2f}x"
+    )
+    worker_pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,50 @@
 import asyncio
 import logging
+import threading
 import uuid
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 # Use imports with fallbacks for better compatibility across environments
 try:
     # First try imports without 'backend.' prefix (for Render)
     from config import get_settings
     from models.report import ReportCreate
+    from services.pdf_extractor import extract_pages_from_file
     from services.task_manager import task_manager
+    from utils.document_store import fetch_files
+    from utils.parallel_pdf import offload_small_pdfs
+    from utils.storage import get_absolute_file_path, validate_file_exists
+    from utils.supabase_helper import async_supabase_client_context
+    from services.worker_pool import worker_pool
 except ImportError:
     # Fallback to imports with 'backend.' prefix (for local dev)
     from config import get_settings
     from models.report import ReportCreate
+    from services.pdf_extractor import extract_pages_from_file
     from services.task_manager import task_manager
+    from utils.document_store import fetch_files
+    from utils.parallel_pdf import offload_small_pdfs
+    from utils.storage import get_absolute_file_path, validate_file_exists
+    from utils.supabase_helper import async_supabase_client_context
+    from services.worker_pool import worker_pool
 
 logger = logging.getLogger(__name__)
 
 
+class ReportCancelledError(Exception):
+    """Raised by extraction work that starts after its report was cancelled"""
+
+    pass
+
+
 class AgentService:
     def __init__(self):
         self.settings = get_settings()
         self._agent_states = {}  # Keep track of agent states for recovery
+        # Running agent loops and their cancellation flags, by report ID
+        self._loop_tasks: Dict[str, asyncio.Task] = {}
+        self._cancel_events: Dict[str, threading.Event] = {}
 
     async def generate_report(self, report_data: ReportCreate) -> Dict[str, Any]:
         """
@@ -60,12 +82,15 @@ class AgentService:
         Run the writer/reviewer agent loop with resource optimization.
         This is the main processing function executed by the task manager.
         """
+        cancel_event = threading.Event()
+        self._cancel_events[report_id] = cancel_event
+        self._loop_tasks[report_id] = asyncio.current_task()
         try:
             self._update_agent_state(report_id, {"status": "processing"})
 
             # Extract document content - potentially resource intensive
             document_content = await self._extract_document_content(
-                report_data.file_ids
+                report_data.file_ids, cancel_event
             )
 
             # Run the writer/reviewer loop
@@ -163,40 +188,85 @@ class AgentService:
                 },
             )
             raise
+        finally:
+            self._loop_tasks.pop(report_id, None)
+            self._cancel_events.pop(report_id, None)
 
-    async def _extract_document_content(self, file_ids: List[str]) -> Dict[str, Any]:
+    async def _extract_document_content(
+        self, file_ids: List[str], cancel_event: Optional[threading.Event] = None
+    ) -> Dict[str, Any]:
         """
-        Extract content from documents - uses thread pool for CPU-bound operations.
+        Extract content from all documents concurrently in the shared I/O
+        pool; PDF pages and OCR are further fanned out to the CPU pool.
+        If the report is cancelled, queued extractions are dropped and the
+        ones already running are left to finish in the background.
         """
-        content = {}
-        for file_id in file_ids:
-            # This is a CPU-bound operation, run in thread pool
-            file_content = await task_manager.run_in_thread(
-                self._extract_single_document, file_id
+        cancel_event = cancel_event or threading.Event()
+
+        async with async_supabase_client_context() as supabase:
+            file_records = await fetch_files(supabase, file_ids)
+
+        futures = [
+            asyncio.create_task(
+                worker_pool.run_io(
+                    self._extract_single_document,
+                    file_id,
+                    file_records.get(str(file_id)),
+                    cancel_event,
+                )
             )
-            content[file_id] = file_content
+            for file_id in file_ids
+        ]
+        try:
+            results = await asyncio.gather(*futures)
+        except BaseException:
+            cancel_event.set()
+            for future in futures:
+                future.cancel()
+            raise
 
-        return content
+        return dict(zip(file_ids, results))
 
-    def _extract_single_document(self, file_id: str) -> Dict[str, Any]:
+    def _extract_single_document(
+        self,
+        file_id: str,
+        file_record: Optional[Dict[str, Any]],
+        cancel_event: threading.Event,
+    ) -> Dict[str, Any]:
         """
         CPU-bound operation to extract content from a single document.
-        This runs in a thread pool to avoid blocking the event loop.
+        This runs in the I/O pool to avoid blocking the event loop.
         """
-        # Simulate document extraction
-        # In production, this would use libraries like PyPDF2, python-docx, etc.
-        import random
-        import time
-
-        time.sleep(random.uniform(0.5, 2.0))  # Simulate processing time
-
-        return {
-            "text": f"Document content for {file_id}",
-            "metadata": {
-                "page_count": random.randint(1, 20),
-                "word_count": random.randint(100, 5000),
-            },
+        if cancel_event.is_set():
+            raise ReportCancelledError(f"Extraction of {file_id} cancelled")
+
+        if not file_record:
+            logger.warning(f"File {file_id} not found in database")
+            return {"text": "", "metadata": {"error": "File not found in database"}}
+
+        file_path = get_absolute_file_path(file_record["file_path"])
+        if not validate_file_exists(file_path):
+            logger.warning(f"File {file_id} not found on disk: {file_path}")
+            return {"text": "", "metadata": {"error": "File not found on disk"}}
+
+        # Other documents are extracted at the same time, so small PDFs are
+        # sent to the PDF process pool rather than run in this thread
+        with offload_small_pdfs():
+            extraction = extract_pages_from_file(file_path)
+
+        metadata = {
+            "filename": file_record.get("filename"),
+            "page_count": len(extraction["pages"]),
         }
+        if "error" in extraction:
+            logger.warning(
+                f"Could not extract text from {file_id}: {extraction['error']}"
+            )
+            metadata["error"] = extraction["error"]
+            return {"text": "", "metadata": {**metadata, "word_count": 0}}
+
+        text = extraction["text"]
+        return {"text": text, "metadata": {**metadata, "word_count": len(text.split())}}
 
     async def _run_writer_agent(
         self, document_content: Dict[str, Any], iteration: int
@@ -316,9 +386,22 @@ class AgentService:
 
         state = self._agent_states[report_id]
 
-        # If the report has a task_id, cancel the task
+        # Drop queued extractions, then stop the agent loop itself
+        cancel_event = self._cancel_events.get(report_id)
+        if cancel_event:
+            cancel_event.set()
+        loop_task = self._loop_tasks.get(report_id)
+        if loop_task and not loop_task.done():
+            loop_task.cancel()
+
+        # If the report has a task_id, mark the task as cancelled
         if "task_id" in state and state["task_id"]:
-            await task_manager.cancel_task(state["task_id"])
+            try:
+                task_manager.cancel_task(state["task_id"])
+            except Exception as e:
+                logger.warning(
+                    f"Could not mark task {state['task_id']} cancelled: {str(e)}"
+                )
 
         # Update the state
         self._update_agent_state(
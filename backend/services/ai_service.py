@@ -2,14 +2,26 @@ import asyncio
 import json
 import os
 import re
+import time
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 import httpx
 from config import settings
 from pydantic import UUID4
+from services.worker_pool import worker_pool
 from utils.error_handler import logger
 from utils.file_processor import FileProcessor
+from utils.http_client import http_client_pool
+from utils.llm_cache import DETERMINISTIC_TEMPERATURE, llm_cache
+from utils.monitoring import observe_llm_call
+from utils.prompt_builder import (
+    FAIR_SHARE,
+    HEAD_TAIL,
+    PROMPT_DOCUMENTS_TOKEN_BUDGET,
+    PROMPT_TOKEN_BUDGET,
+    PromptBuilder,
+)
 from utils.supabase_helper import async_supabase_client_context
 
 
@@ -75,15 +87,19 @@ async def call_openrouter_api(
     model: str = None,
     max_retries: int = 3,
     timeout: float = 30.0,
+    temperature: Optional[float] = None,
 ) -> Dict[str, Any]:
     """
     Call the OpenRouter API with retry logic.
+    Requests with an explicit deterministic temperature are answered from the
+    LLM response cache when it is enabled (see utils/llm_cache.py).
 
     Args:
         messages: List of message objects for the API
         model: Model to use (defaults to settings.DEFAULT_MODEL)
         max_retries: Maximum number of retry attempts
         timeout: Timeout in seconds for the API call
+        temperature: Sampling temperature (provider default if None)
 
     Returns:
         API response as a dictionary
@@ -97,25 +113,53 @@ async def call_openrouter_api(
     if model is None:
         model = settings.DEFAULT_MODEL
 
+    cache_key = None
+    if llm_cache.is_cacheable(temperature):
+        cache_key = llm_cache.make_key(model, messages, temperature)
+        cached = await asyncio.to_thread(llm_cache.get, cache_key)
+        if cached is not None:
+            logger.info(f"LLM response cache hit for {model}")
+            return cached
+    elif llm_cache.enabled:
+        llm_cache.record_bypass()
+
+    payload = {"model": model, "messages": messages}
+    if temperature is not None:
+        payload["temperature"] = temperature
+
     # Define the operation to retry
     async def api_call_operation():
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                settings.OPENROUTER_API_ENDPOINT,
-                headers={
-                    "Authorization": "Bearer " + settings.OPENROUTER_API_KEY,
-                    "Content-Type": "application/json",
-                    "HTTP-Referer": settings.APP_DOMAIN,
-                    "X-Title": settings.APP_NAME,
-                },
-                json={"model": model, "messages": messages},
-                timeout=timeout,
-            )
+        start_time = time.time()
+        async with http_client_pool.host_slot(
+            settings.OPENROUTER_API_ENDPOINT
+        ) as client:
+            try:
+                response = await client.post(
+                    settings.OPENROUTER_API_ENDPOINT,
+                    headers={
+                        "Authorization": "Bearer " + settings.OPENROUTER_API_KEY,
+                        "Content-Type": "application/json",
+                        "HTTP-Referer": settings.APP_DOMAIN,
+                        "X-Title": settings.APP_NAME,
+                    },
+                    json=payload,
+                    timeout=timeout,
+                )
+
+                # Check for successful status code
+                response.raise_for_status()
 
-            # Check for successful status code
-            response.raise_for_status()
+                result = response.json()
+            except Exception:
+                observe_llm_call(model, time.time() - start_time, outcome="error")
+                raise
 
-            return response.json()
+            observe_llm_call(model, time.time() - start_time, result.get("usage"))
+            if cache_key and result.get("choices"):
+                await asyncio.to_thread(
+                    llm_cache.put, cache_key, result, time.time() - start_time
+                )
+            return result
 
     # Retry exceptions specific to network issues
     retry_exceptions = (
@@ -223,6 +267,13 @@ async def extract_template_variables(
         AIServiceError: For other AI service errors
     """
     try:
+        builder = PromptBuilder(
+            budget_tokens=PROMPT_DOCUMENTS_TOKEN_BUDGET, name="extract_template_variables"
+        )
+        builder.add_section("content", content, priority=1, mode=HEAD_TAIL)
+        builder.add_section("additional_info", additional_info, priority=2)
+        sections = builder.build()
+
         messages = [
             {
                 "role": "system",
@@ -230,11 +281,13 @@ async def extract_template_variables(
             },
             {
                 "role": "user",
-                "content": f"Extract key variables from this content:\n\n{content}\n\nAdditional info:\n{additional_info}",
+                "content": f"Extract key variables from this content:\n\n{sections['content']}\n\nAdditional info:\n{sections['additional_info']}",
             },
         ]
 
-        response = await call_openrouter_api(messages)
+        response = await call_openrouter_api(
+            messages, temperature=DETERMINISTIC_TEMPERATURE
+        )
 
         try:
             return json.loads(response["choices"][0]["message"]["content"])
@@ -344,18 +397,27 @@ async def analyze_reference_reports(reference_paths: List[str]) -> Dict[str, Any
         reference_texts = []  # Create a list to store the extracted texts
         for path in reference_paths:
             # Use FileProcessor to extract text from files
-            text = FileProcessor.extract_text(path)
+            text = await worker_pool.run_io(FileProcessor.extract_text, path)
             combined_text += text + "\n\n"
             reference_texts.append(text)  # Add each text to the list
 
         # Create prompt for analyzing style and format
-        # Avoid f-strings entirely for this section - concatenate parts safely
-        joined_reports = "\n\n".join(
+        # Avoid f-strings entirely for this section - concatenate parts safely.
+        # Every report keeps a share of the budget, long ones are cut in the
+        # middle so their opening and closing sections are still analyzed.
+        builder = PromptBuilder(
+            budget_tokens=PROMPT_TOKEN_BUDGET, name="analyze_reference_reports"
+        )
+        builder.add_section(
+            "reports",
             [
                 "=== Report " + str(i + 1) + " ===\n" + text
                 for i, text in enumerate(reference_texts)
-            ]
+            ],
+            priority=1,
+            mode=FAIR_SHARE,
         )
+        joined_reports = builder.build()["reports"]
 
         analysis_prompt = (
             "Sei un esperto analista di documenti assicurativi. Analizza questi report di riferimento "
@@ -409,6 +471,7 @@ async def analyze_reference_reports(reference_paths: List[str]) -> Dict[str, Any
                 {"role": "user", "content": analysis_prompt},
             ],
             timeout=60.0,
+            temperature=DETERMINISTIC_TEMPERATURE,
         )
 
         if not (
@@ -511,24 +574,32 @@ async def generate_report_text(
                 if response.data:
                     template_content = response.data[0]["content"]
 
+        # Fit the prompt into the budget, shortening the template before the variables
+        builder = PromptBuilder(name="generate_report_text")
+        builder.add_section("variables", json.dumps(variables, indent=2), priority=2)
+        builder.add_section("template", template_content or "", priority=1)
+        sections = builder.build()
+
         # Generate report text
         messages = [
             {"role": "system", "content": "You are an expert insurance report writer."},
             {
                 "role": "user",
-                "content": f"Generate a report based on these variables:\n{json.dumps(variables, indent=2)}",
+                "content": f"Generate a report based on these variables:\n{sections['variables']}",
             },
         ]
 
-        if template_content:
+        if sections["template"]:
             messages.append(
                 {
                     "role": "user",
-                    "content": f"Use this template format:\n{template_content}",
+                    "content": f"Use this template format:\n{sections['template']}",
                 }
             )
 
-        response = await call_openrouter_api(messages)
+        response = await call_openrouter_api(
+            messages, temperature=DETERMINISTIC_TEMPERATURE
+        )
 
         try:
             content = response["choices"][0]["message"]["content"]
@@ -581,7 +652,9 @@ async def refine_report_text(
         ]
 
         # Call the OpenRouter API
-        response = await call_openrouter_api(messages)
+        response = await call_openrouter_api(
+            messages, temperature=DETERMINISTIC_TEMPERATURE
+        )
 
         try:
             content = response["choices"][0]["message"]["content"]
@@ -643,7 +716,9 @@ async def analyze_template(template_id: UUID4) -> Dict[str, Any]:
             },
         ]
 
-        response = await call_openrouter_api(messages)
+        response = await call_openrouter_api(
+            messages, temperature=DETERMINISTIC_TEMPERATURE
+        )
 
         try:
             content = response["choices"][0]["message"]["content"]
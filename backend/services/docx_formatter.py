@@ -1,13 +1,13 @@
 import asyncio
 import datetime
 import hashlib
+import io
 import os
 import re
 import shutil
 import tempfile
 import time
 import traceback
-import uuid as uuid_lib
 import logging
 from pathlib import Path
 from threading import Lock
@@ -18,17 +18,17 @@ from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
 
-# Import the resource manager 
-from utils.resource_manager import resource_manager
-
 # Setup logger directly instead of importing from error_handler
 logger = logging.getLogger(__name__)
 
 # Import metrics collector
-from utils.metrics import MetricsCollector
+from utils.metrics import initialize as initialize_metrics
+from utils.monitoring import DOCX_GENERATION_DURATION
+from utils.static_assets import static_assets
 
 # Import our service
 from .docx_service import docx_service
+from .worker_pool import worker_pool
 
 # Simple local exception handler to avoid circular imports
 def local_handle_exception(e: Exception, operation: str) -> None:
@@ -287,7 +287,7 @@ class DocxFormatter:
 
         # Initialize metrics collector
         metrics_file = Path(__file__).parent.parent / "data" / "metrics.json"
-        self.metrics_collector = MetricsCollector(metrics_file=metrics_file)
+        self.metrics_collector = initialize_metrics(metrics_file)
 
     def _load_templates(self) -> Dict[str, Path]:
         """Load available templates from the template directory"""
@@ -454,9 +454,6 @@ class DocxFormatter:
         quality_metrics["score"] = max(0.0, min(1.0, base_score - issue_penalty))
         quality_metrics["passed"] = quality_metrics["score"] >= QUALITY_THRESHOLD
 
-        if not quality_metrics["passed"]:
-            self.metrics["quality_check_failures"] += 1
-
         return quality_metrics["passed"], quality_metrics
 
     def _check_basic_grammar(self, content: str) -> List[str]:
@@ -527,9 +524,10 @@ class DocxFormatter:
         if cached_doc:
             logger.info(f"Using cached document for key {cache_key}")
             # Copy cached document to output path
-            shutil.copy(cached_doc, output_path)
+            await worker_pool.run_io(shutil.copy, cached_doc, output_path)
 
             generation_time = time.time() - start_time
+            DOCX_GENERATION_DURATION.labels(source="cache").observe(generation_time)
             return {
                 "path": output_path,
                 "url": f"/reports/{os.path.basename(output_path)}",
@@ -543,49 +541,33 @@ class DocxFormatter:
 
         # Begin document creation
         result = None
-        temp_files = []
 
         try:
-            # Create a document from template
-            template_path = self._get_template(template_type)
-            document = Document(template_path)
-
-            # Add content with proper formatting
-            self._format_document(document, content)
-
-            # Add metadata
-            timestamp = datetime.datetime.now()
+            # Merge default with provided metadata
             default_metadata = {
-                "created": timestamp,
+                "created": datetime.datetime.now(),
                 "version": "1.0",
                 "generator": "Insurance Report Generator",
             }
-
-            # Merge default with provided metadata
             full_metadata = {**default_metadata, **metadata}
-            self._add_document_metadata(document, full_metadata)
 
-            # Perform quality checks
-            passed_quality, quality_metrics = self._validate_document_quality(
-                content, document
+            # Build, check and save the document in the CPU worker pool
+            template_path = self._get_template(template_type)
+            passed_quality, quality_metrics = await worker_pool.run_cpu(
+                _render_document,
+                static_assets.get_file(template_path),
+                content,
+                full_metadata,
+                output_path,
             )
 
-            # Create atomic save (save to temp file first, then move)
-            temp_file_id = str(uuid_lib.uuid4())
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as temp_file:
-                document.save(temp_file.name)
-                temp_path = temp_file.name
-                # Register the temp file for cleanup
-                resource_manager.register_resource("temp_file", temp_file_id, temp_path)
-                temp_files.append(temp_file_id)
-
-            # Move the temp file to the final location
-            os.replace(temp_path, output_path)
-
             # Save to cache if quality check passed
             if passed_quality:
                 cache_path = CACHE_DIR / f"{cache_key}.docx"
-                shutil.copy(output_path, cache_path)
+                await worker_pool.run_io(shutil.copy, output_path, cache_path)
+            else:
+                with self.metrics_lock:
+                    self.metrics["quality_check_failures"] += 1
 
             # Calculate metrics
             generation_time = time.time() - start_time
@@ -594,6 +576,7 @@ class DocxFormatter:
             self.metrics["avg_generation_time"] = (
                 avg_time * (doc_count - 1) + generation_time
             ) / doc_count
+            DOCX_GENERATION_DURATION.labels(source="generated").observe(generation_time)
 
             # Schedule cache cleaning if this isn't a cached document
             asyncio.create_task(self._clean_cache())
@@ -620,11 +603,10 @@ class DocxFormatter:
                     "path": None,
                     "generation_time": time.time() - start_time,
                 }
+                DOCX_GENERATION_DURATION.labels(source="error").observe(
+                    result["generation_time"]
+                )
             return result
-        finally:
-            # Clean up any registered temp files
-            for temp_id in temp_files:
-                resource_manager.cleanup_resource("temp_file", temp_id)
 
     def _format_document(self, document: Document, content: str) -> None:
         """Format the document with the provided content"""
@@ -713,6 +695,47 @@ class DocxFormatter:
 docx_formatter = DocxFormatter()
 
 
+def _render_document(
+    template_bytes: bytes,
+    content: str,
+    metadata: Dict[str, Any],
+    output_path: str,
+) -> Tuple[bool, Dict[str, Any]]:
+    """
+    Build a document from a template, check its quality and save it atomically.
+    Runs in the CPU worker pool.
+
+    Args:
+        template_bytes: Contents of the DOCX template
+        content: Document text content
+        metadata: Full document metadata
+        output_path: Path to save the document
+
+    Returns:
+        Tuple of (passed quality check, quality metrics)
+    """
+    document = Document(io.BytesIO(template_bytes))
+    docx_formatter._format_document(document, content)
+    docx_formatter._add_document_metadata(document, metadata)
+    passed_quality, quality_metrics = docx_formatter._validate_document_quality(
+        content, document
+    )
+
+    # Save to a temp file next to the output, then move it into place
+    handle, temp_path = tempfile.mkstemp(
+        suffix=".docx", dir=os.path.dirname(output_path) or None
+    )
+    os.close(handle)
+    try:
+        document.save(temp_path)
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return passed_quality, quality_metrics
+
+
 async def generate_docx_async(
     content: str,
     output_path: Optional[str] = None,
@@ -1,21 +1,26 @@
+import asyncio
 import base64
 import json
 import os
 import tempfile
 import time
 from html.parser import HTMLParser
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import fitz  # PyMuPDF for PDF handling
-import requests
 from config import settings
 from utils.error_handler import logger
 from utils.file_processor import FileProcessor
 from utils.file_utils import safe_path_join
+from utils.http_client import http_client_pool
+from services.worker_pool import worker_pool
 
 # Maximum number of pages to process to avoid excessive API usage
 MAX_PAGES = 10
 
+# Select a model that supports vision capabilities
+VISION_MODEL = "anthropic/claude-3-5-sonnet"
+
 
 def convert_document_to_images(
     file_path: str, output_dir: Optional[str] = None
@@ -377,83 +382,132 @@ def image_to_base64(image_path: str) -> str:
         return ""
 
 
-async def process_document_with_multimodal_api(
-    file_path: str, prompt: str, system_message: str
-) -> Dict[str, Any]:
+def _get_pdf_page_count(pdf_path: str) -> int:
+    """Return the number of pages in a PDF"""
+    with fitz.open(pdf_path) as pdf_document:
+        return pdf_document.page_count
+
+
+def render_pdf_page_to_base64(pdf_path: str, page_num: int, dpi: int) -> str:
     """
-    Process a document file using multimodal API by converting it to images
+    Render a single PDF page to a base64 PNG data URL.
+    Runs in a worker process, so it opens its own document handle.
 
     Args:
-        file_path: Path to the document file
-        prompt: Text prompt describing what to extract from the document
-        system_message: System message for the AI
+        pdf_path: Path to the PDF file
+        page_num: Zero-based page index
+        dpi: Rendering resolution
 
     Returns:
-        API response dictionary
+        Base64 encoded data URL of the rendered page
     """
-    try:
-        # Create temporary directory for images
-        with tempfile.TemporaryDirectory(prefix="doc_images_") as temp_dir:
-            # Convert document to images
-            start_time = time.time()
-            logger.info(f"Converting document to images: {file_path}")
-
-            image_paths = convert_document_to_images(file_path, temp_dir)
-
-            if not image_paths:
-                logger.error(f"Failed to convert document to images: {file_path}")
-                return {"error": "Failed to convert document to images"}
-
-            logger.info(
-                f"Generated {len(image_paths)} images in {time.time() - start_time:.2f} seconds"
-            )
-
-            # Convert images to base64
-            base64_images = []
-            for img_path in image_paths:
-                base64_str = image_to_base64(img_path)
-                if base64_str:
-                    base64_images.append(base64_str)
-
-            if not base64_images:
-                logger.error("Failed to convert any images to base64")
-                return {"error": "Failed to convert images to base64"}
+    with fitz.open(pdf_path) as pdf_document:
+        pix = pdf_document[page_num].get_pixmap(dpi=dpi)
+        png_bytes = pix.tobytes("png")
+    return f"data:image/png;base64,{base64.b64encode(png_bytes).decode('ascii')}"
 
-            logger.info(f"Converted {len(base64_images)} images to base64")
 
-            # Prepare messages for the API
-            messages = [{"role": "system", "content": system_message}]
-
-            # Add each image with the prompt to user message
-            content_items = [{"type": "text", "text": prompt}]
+async def iter_document_pages_base64(
+    file_path: str,
+) -> AsyncIterator[Tuple[int, str]]:
+    """
+    Render a document to base64 page images without blocking the event loop.
+    PDF pages are rendered in parallel in the shared CPU pool; other formats go
+    through convert_document_to_images in the shared I/O pool. Pages are yielded in
+    order as soon as each one is ready.
 
-            # Add images (limit to first 10 to avoid token limits)
-            max_images = min(10, len(base64_images))
-            for i in range(max_images):
-                content_items.append(
-                    {"type": "image_url", "image_url": {"url": base64_images[i]}}
-                )
+    Args:
+        file_path: Path to the document file
 
-            # Add image count info to the prompt
-            if len(base64_images) > max_images:
-                content_items.append(
-                    {
-                        "type": "text",
-                        "text": f"Note: Only showing {max_images} out of {len(base64_images)} pages from this document due to token limits.",
-                    }
+    Yields:
+        Tuples of (zero-based page number, base64 data URL)
+    """
+    if os.path.splitext(file_path)[1].lower() == ".pdf":
+        page_count = await worker_pool.run_io(_get_pdf_page_count, file_path)
+        max_pages = min(page_count, MAX_PAGES)
+        logger.info(f"Rendering {max_pages} pages from PDF {file_path}")
+
+        futures = [
+            asyncio.create_task(
+                worker_pool.run_cpu(
+                    render_pdf_page_to_base64,
+                    file_path,
+                    page_num,
+                    settings.MULTIMODAL_RENDER_DPI,
                 )
+            )
+            for page_num in range(max_pages)
+        ]
+        try:
+            for page_num, future in enumerate(futures):
+                try:
+                    yield page_num, await future
+                except Exception as page_error:
+                    logger.error(
+                        f"Error rendering PDF page {page_num + 1}: {str(page_error)}"
+                    )
+        finally:
+            for future in futures:
+                future.cancel()
+        return
+
+    with tempfile.TemporaryDirectory(prefix="doc_images_") as temp_dir:
+        image_paths = await worker_pool.run_io(
+            convert_document_to_images, file_path, temp_dir
+        )
+        for page_num, image_path in enumerate(image_paths):
+            base64_str = await worker_pool.run_io(image_to_base64, image_path)
+            if base64_str:
+                yield page_num, base64_str
+
+
+async def _call_vision_model(
+    prompt: str,
+    system_message: str,
+    images: List[Tuple[int, str]],
+    semaphore: asyncio.Semaphore,
+    batched: bool = False,
+) -> Dict[str, Any]:
+    """
+    Send page images to the vision model.
 
-            # Add user message with text and images
-            messages.append({"role": "user", "content": content_items})
-
-            # Call the OpenRouter API
-            start_time = time.time()
-            logger.info("Calling OpenRouter multimodal API")
+    Args:
+        prompt: Text prompt describing what to extract
+        system_message: System message for the AI
+        images: List of (page number, base64 data URL) tuples
+        semaphore: Limits the number of concurrent API calls
+        batched: Whether the images are one batch of a larger document, in
+            which case the model is told which pages it is looking at
 
-            # Select a model that supports vision capabilities
-            vision_model = "anthropic/claude-3-5-sonnet"
+    Returns:
+        API response dictionary, or a dictionary with an "error" key
+    """
+    first_page, last_page = images[0][0] + 1, images[-1][0] + 1
+    content_items = [{"type": "text", "text": prompt}]
+    if batched:
+        content_items.append(
+            {
+                "type": "text",
+                "text": f"The following images are pages {first_page}-{last_page} of the document.",
+            }
+        )
+    content_items.extend(
+        {"type": "image_url", "image_url": {"url": image}} for _, image in images
+    )
+    messages = [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": content_items},
+    ]
 
-            response = requests.post(
+    async with semaphore:
+        start_time = time.time()
+        logger.info(
+            f"Calling OpenRouter multimodal API for pages {first_page}-{last_page}"
+        )
+        async with http_client_pool.host_slot(
+            settings.OPENROUTER_API_ENDPOINT
+        ) as client:
+            response = await client.post(
                 settings.OPENROUTER_API_ENDPOINT,
                 headers={
                     "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
@@ -462,25 +516,142 @@ async def process_document_with_multimodal_api(
                     "X-Title": settings.APP_NAME,
                 },
                 json={
-                    "model": vision_model,
+                    "model": VISION_MODEL,
                     "messages": messages,
                     "temperature": 0.2,  # Lower temperature for more factual output
                     "max_tokens": 6000,  # Increase max tokens for detailed analysis of more pages
                 },
-                timeout=180,  # Longer timeout for processing more images
+                timeout=settings.MULTIMODAL_API_TIMEOUT,
             )
+        logger.info(
+            f"OpenRouter API call for pages {first_page}-{last_page} completed in {time.time() - start_time:.2f} seconds"
+        )
 
-            api_time = time.time() - start_time
-            logger.info(f"OpenRouter API call completed in {api_time:.2f} seconds")
+    if response.status_code != 200:
+        logger.error(f"API error: {response.status_code} - {response.text}")
+        return {"error": f"API error: {response.status_code} - {response.text}"}
 
-            # Check for errors
-            if response.status_code != 200:
-                logger.error(f"API error: {response.status_code} - {response.text}")
-                return {"error": f"API error: {response.status_code} - {response.text}"}
+    return response.json()
 
-            # Parse response
-            response_data = response.json()
-            return response_data
+
+def _merge_batch_responses(responses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine per-batch API responses into a single response in page order.
+    Failed batches are logged and skipped unless every batch failed.
+    """
+    successful = [r for r in responses if "error" not in r and r.get("choices")]
+    for failed in (r for r in responses if r not in successful):
+        logger.warning(f"Multimodal batch failed: {failed.get('error', failed)}")
+
+    if not successful:
+        return responses[0] if responses else {"error": "No pages were processed"}
+    if len(responses) == 1:
+        return successful[0]
+
+    usage: Dict[str, int] = {}
+    for response in successful:
+        for key, value in response.get("usage", {}).items():
+            if isinstance(value, (int, float)):
+                usage[key] = usage.get(key, 0) + value
+
+    return {
+        "id": successful[0].get("id"),
+        "model": successful[0].get("model", VISION_MODEL),
+        "choices": [
+            {
+                "index": 0,
+                "message": {
+                    "role": "assistant",
+                    "content": "\n\n".join(
+                        r["choices"][0]["message"]["content"] for r in successful
+                    ),
+                },
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": usage,
+        "batches": {"total": len(responses), "failed": len(responses) - len(successful)},
+    }
+
+
+async def process_document_with_multimodal_api(
+    file_path: str, prompt: str, system_message: str
+) -> Dict[str, Any]:
+    """
+    Process a document file using multimodal API by converting it to images.
+    Pages are rendered off the event loop and sent to the model in a single
+    request. When MULTIMODAL_PAGES_PER_REQUEST is set, the document is instead
+    split into batches of that many pages, with at most
+    MULTIMODAL_MAX_CONCURRENT_REQUESTS API calls in flight; a batch is sent as
+    soon as its pages are ready and the answers are merged in page order.
+
+    Args:
+        file_path: Path to the document file
+        prompt: Text prompt describing what to extract from the document
+        system_message: System message for the AI
+
+    Returns:
+        API response dictionary
+    """
+    try:
+        if not os.path.exists(file_path):
+            logger.error(f"File not found: {file_path}")
+            return {"error": "Failed to convert document to images"}
+
+        start_time = time.time()
+        logger.info(f"Converting document to images: {file_path}")
+
+        semaphore = asyncio.Semaphore(settings.MULTIMODAL_MAX_CONCURRENT_REQUESTS)
+        batch_size = settings.MULTIMODAL_PAGES_PER_REQUEST
+        batched = batch_size > 0
+        batch_tasks: List[asyncio.Task] = []
+        batch: List[Tuple[int, str]] = []
+        page_total = 0
+
+        try:
+            async for page in iter_document_pages_base64(file_path):
+                batch.append(page)
+                page_total += 1
+                if batched and len(batch) >= batch_size:
+                    batch_tasks.append(
+                        asyncio.create_task(
+                            _call_vision_model(
+                                prompt, system_message, batch, semaphore, batched
+                            )
+                        )
+                    )
+                    batch = []
+
+            if batch:
+                batch_tasks.append(
+                    asyncio.create_task(
+                        _call_vision_model(
+                            prompt, system_message, batch, semaphore, batched
+                        )
+                    )
+                )
+
+            if not batch_tasks:
+                logger.error(f"Failed to convert document to images: {file_path}")
+                return {"error": "Failed to convert document to images"}
+
+            logger.info(
+                f"Rendered {page_total} pages in {time.time() - start_time:.2f} seconds, "
+                f"sent in {len(batch_tasks)} batches"
+            )
+
+            responses = await asyncio.gather(*batch_tasks, return_exceptions=True)
+        except BaseException:
+            for task in batch_tasks:
+                task.cancel()
+            raise
+
+        return _merge_batch_responses(
+            [
+                {"error": str(r)} if isinstance(r, BaseException) else r
+                for r in responses
+            ]
+        )
 
     except Exception as e:
         logger.error(f"Error in multimodal document processing: {str(e)}")
@@ -1,17 +1,181 @@
+import asyncio
+import multiprocessing
 import os
 import re
-from typing import Any, Dict, List, Optional
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
 
 import fitz  # PyMuPDF
 import pytesseract
+from PIL import Image
 from config import settings
 from utils.error_handler import logger
 from utils.file_processor import FileProcessor
+from utils.parallel_pdf import extract_pdf_pages_parallel, offload_small_pdfs
+from services.worker_pool import worker_pool
 
 # Configure Tesseract path if specified in settings
 if hasattr(settings, "TESSERACT_CMD_PATH") and settings.TESSERACT_CMD_PATH:
     pytesseract.pytesseract.tesseract_cmd = settings.TESSERACT_CMD_PATH
 
+def choose_ocr_dpi(page: "fitz.Page") -> int:
+    """
+    Pick a render resolution for OCR of a page.
+    Scanned pages are rendered at the native resolution of their largest
+    embedded image, so the scan is neither upsampled nor thrown away;
+    the result is clamped to [OCR_MIN_DPI, OCR_MAX_DPI].
+
+    Args:
+        page: PyMuPDF page
+
+    Returns:
+        Render resolution in dots per inch
+    """
+    native_dpi = 0.0
+    for image in page.get_images(full=True):
+        xref, width = image[0], image[2]
+        for rect in page.get_image_rects(xref):
+            if rect.width > 0:
+                native_dpi = max(native_dpi, width * 72.0 / rect.width)
+
+    dpi = native_dpi or settings.OCR_DEFAULT_DPI
+    return int(min(max(dpi, settings.OCR_MIN_DPI), settings.OCR_MAX_DPI))
+
+
+def find_pages_needing_ocr(file_path: str, page_texts: List[str]) -> Dict[int, int]:
+    """
+    Find the pages of a PDF that have no usable text layer.
+    A page qualifies when its extracted text is shorter than OCR_MIN_TEXT_CHARS
+    and it contains at least one image; blank pages are skipped.
+
+    Args:
+        file_path: Path to the PDF file
+        page_texts: Text layer of each page, in order
+
+    Returns:
+        Mapping of page index to the DPI it should be rendered at
+    """
+    candidates = [
+        page_num
+        for page_num, text in enumerate(page_texts)
+        if len(text.strip()) < settings.OCR_MIN_TEXT_CHARS
+    ]
+    if not candidates:
+        return {}
+
+    pages = {}
+    with fitz.open(file_path) as doc:
+        for page_num in candidates:
+            page = doc[page_num]
+            if page.get_images():
+                pages[page_num] = choose_ocr_dpi(page)
+    return pages
+
+
+def ocr_pdf_page(file_path: str, page_num: int, dpi: int, languages: str) -> str:
+    """
+    Rasterize one PDF page and run Tesseract over it.
+    Runs in a worker process, so it opens its own document handle.
+
+    Args:
+        file_path: Path to the PDF file
+        page_num: Page index
+        dpi: Render resolution
+        languages: Tesseract language codes, e.g. "ita+eng"
+
+    Returns:
+        Recognized text of the page
+    """
+    # The pool already runs one page per core; keep Tesseract single-threaded
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+    with fitz.open(file_path) as doc:
+        pix = doc[page_num].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+
+    try:
+        return pytesseract.image_to_string(image, lang=languages)
+    except pytesseract.TesseractError:
+        # Language data may be missing; fall back to Tesseract's default
+        return pytesseract.image_to_string(image)
+
+
+def iter_pdf_pages_hybrid(file_path: Union[str, Path]) -> Iterator[str]:
+    """
+    Yield the text of each page of a PDF, using OCR only for scanned pages.
+    The text layer is extracted for the whole document first; pages without
+    one are rasterized and recognized in the OCR pool while the rest are
+    yielded, and every page comes out in its original order.
+
+    Args:
+        file_path: Path to the PDF file
+
+    Yields:
+        Text of one page
+    """
+    file_path = str(file_path)
+    page_texts = extract_pdf_pages_parallel(file_path)
+
+    ocr_pages = (
+        find_pages_needing_ocr(file_path, page_texts)
+        if settings.OCR_FALLBACK_ENABLED
+        else {}
+    )
+    if not ocr_pages:
+        yield from page_texts
+        return
+
+    logger.info(
+        f"Running OCR on {len(ocr_pages)} of {len(page_texts)} pages of {file_path}"
+    )
+
+    # Pages are OCRed in the shared CPU pool; pool workers are daemonic and
+    # cannot submit to it, so they OCR inline
+    futures: Dict[int, Future] = {}
+    if not multiprocessing.current_process().daemon:
+        futures = {
+            page_num: worker_pool.submit_cpu(
+                ocr_pdf_page, file_path, page_num, dpi, settings.OCR_LANGUAGES
+            )
+            for page_num, dpi in ocr_pages.items()
+        }
+
+    try:
+        for page_num, text in enumerate(page_texts):
+            if page_num not in ocr_pages:
+                yield text
+                continue
+
+            try:
+                if page_num in futures:
+                    ocr_text = futures[page_num].result()
+                else:
+                    ocr_text = ocr_pdf_page(
+                        file_path, page_num, ocr_pages[page_num], settings.OCR_LANGUAGES
+                    )
+            except Exception as e:
+                logger.warning(f"OCR failed for page {page_num + 1} of {file_path}: {e}")
+                ocr_text = ""
+
+            # Keep whatever text layer there was if OCR found less
+            yield ocr_text if len(ocr_text.strip()) > len(text.strip()) else text
+    finally:
+        for future in futures.values():
+            future.cancel()
+
+
+def register_hybrid_pdf_extractor() -> None:
+    """
+    Route PDFs through iter_pdf_pages_hybrid, so FileProcessor.extract_text
+    (and the upload and analysis paths built on it) OCRs scanned pages too.
+    Called once on application startup.
+    """
+    FileProcessor.register_text_extractor(
+        iter_pdf_pages_hybrid, ".pdf", "application/pdf"
+    )
+
 
 def extract_pdf_metadata(file_path: str) -> Dict[str, Any]:
     """
@@ -144,12 +308,73 @@ def extract_text_from_file(file_path):
         file_path: Path to the file
 
     Returns:
-        Extracted text or error message
+        Extracted text
+
+    Raises:
+        IOError: If the file does not exist or extraction failed
     """
     # Use FileProcessor to extract text
     return FileProcessor.extract_text(file_path)
 
 
+def extract_pages_from_file(file_path: str) -> Dict[str, Any]:
+    """
+    Extract text from a file together with its per-page index.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        Dictionary with "text", "pages" and, if extraction failed, "error"
+        (see FileProcessor.extract_pages)
+    """
+    return FileProcessor.extract_pages(file_path)
+
+
+def _extract_text_offloaded(file_path: str) -> str:
+    """Extract text from a file with small PDFs sent to the process pool"""
+    with offload_small_pdfs():
+        return extract_text_from_file(file_path)
+
+
+async def extract_texts_concurrently(
+    file_paths: Sequence[str], max_concurrency: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Extract text from several files at once.
+    Each file is read and hashed for the extraction cache in the shared I/O pool,
+    while PDF page extraction and OCR run in their process pools, so files
+    are processed in parallel instead of one after another.
+
+    Args:
+        file_paths: Paths of the files to extract
+        max_concurrency: Files extracted at once (defaults to
+            settings.EXTRACTION_CONCURRENCY)
+
+    Returns:
+        One entry per file, in the order of file_paths, with "text" (None if
+        extraction raised), "duration" in seconds and "error" (the exception
+        raised, or None)
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or settings.EXTRACTION_CONCURRENCY)
+
+    async def extract(file_path: str) -> Dict[str, Any]:
+        async with semaphore:
+            start_time = time.perf_counter()
+            try:
+                text = await worker_pool.run_io(_extract_text_offloaded, file_path)
+                error = None
+            except Exception as e:
+                text, error = None, e
+            return {
+                "text": text,
+                "duration": time.perf_counter() - start_time,
+                "error": error,
+            }
+
+    return await asyncio.gather(*(extract(file_path) for file_path in file_paths))
+
+
 def detect_file_type(file_path: str) -> Optional[str]:
     """
     Detect the actual file type based on the file signature (magic bytes).
@@ -174,7 +399,12 @@ def extract_text_from_pdf(file_path: str) -> str:
     Returns:
         Extracted text from the PDF
     """
-    return FileProcessor._extract_text_from_pdf(file_path)
+    # Shares its cache entry with FileProcessor.extract_pages once the hybrid
+    # extractor is registered for PDFs
+    extraction = FileProcessor.extract_pages(file_path, extractor=iter_pdf_pages_hybrid)
+    if "error" in extraction:
+        return f"Error extracting text from PDF: {extraction['error']}"
+    return extraction["text"]
 
 
 def extract_text_from_docx(file_path: str) -> str:
@@ -223,17 +453,20 @@ def extract_text_from_image(file_path: str) -> str:
     return FileProcessor._extract_text_from_image(file_path)
 
 
-def extract_text_from_files(file_paths: List[str]) -> str:
+def extract_text_from_files(
+    file_paths: List[str], max_tokens: Optional[int] = None
+) -> str:
     """
     Extract text from multiple files and combine the results.
 
     Args:
         file_paths: List of paths to files
+        max_tokens: Optional token budget for the combined text
 
     Returns:
         Combined extracted text from all files
     """
-    return FileProcessor.extract_text_from_files(file_paths)
+    return FileProcessor.extract_text_from_files(file_paths, max_tokens)
 
 
 def extract_structured_data_from_text(text: str) -> Dict[str, Any]:
@@ -307,3 +540,4 @@ def extract_structured_data_from_text(text: str) -> Dict[str, Any]:
 
     logger.info(f"Extracted {len(structured_data)} structured data fields from text")
     return structured_data
+
@@ -8,7 +8,7 @@ import platform
 import subprocess
 import tempfile
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Tuple
 
 # Third-party imports
 import mammoth
@@ -19,6 +19,7 @@ from pydantic import UUID4
 
 # Local imports
 from services.docx_service import docx_service
+from services.worker_pool import worker_pool
 from utils.error_handler import handle_exception, logger
 from utils.file_processor import FileProcessor
 from utils.file_utils import safe_path_join
@@ -37,6 +38,34 @@ else:
     logger.info("Running on non-Windows platform, using alternative PDF conversion")
 
 
+def _embed_image(image) -> Dict[str, str]:
+    """Inline a DOCX image as a data URI"""
+    return {
+        "src": f"data:{image.content_type};base64,{image.base64_bytes.decode('utf-8')}",
+        "class": "document-image",
+    }
+
+
+def _convert_docx_to_html(docx_path: str, style_map: str) -> Tuple[str, List[str]]:
+    """
+    Convert a DOCX file to HTML. Runs in the CPU worker pool.
+
+    Args:
+        docx_path: Path to the DOCX file
+        style_map: Mammoth style map
+
+    Returns:
+        Tuple of (HTML body, conversion warnings)
+    """
+    with open(docx_path, "rb") as docx_file:
+        result = mammoth.convert_to_html(
+            docx_file,
+            style_map=style_map,
+            convert_image=mammoth.images.img_element(_embed_image),
+        )
+    return result.value, [str(message) for message in result.messages]
+
+
 class PreviewService:
     def __init__(self):
         self.preview_dir = Path("previews")
@@ -73,17 +102,9 @@ class PreviewService:
             preview_path = docx_service.get_preview_path(report_id)
 
             # Convert DOCX to HTML with enhanced options
-            with open(docx_path, "rb") as docx_file:
-                result = mammoth.convert_to_html(
-                    docx_file,
-                    style_map=self.style_map,
-                    convert_image=mammoth.images.img_element(
-                        lambda image: {
-                            "src": f"data:{image.content_type};base64,{image.base64_bytes.decode('utf-8')}",
-                            "class": "document-image",
-                        }
-                    ),
-                )
+            body_html, messages = await worker_pool.run_cpu(
+                _convert_docx_to_html, str(docx_path), self.style_map
+            )
 
             # Add enhanced styles and responsive design
             html_content = f"""
@@ -217,7 +238,7 @@ class PreviewService:
             </head>
             <body>
                 <div class="preview-container">
-                    {result.value}
+                    {body_html}
                 </div>
                 <script>
                     // Add table responsiveness
@@ -236,8 +257,8 @@ class PreviewService:
             preview_path.write_text(html_content, encoding="utf-8")
 
             # Log any warnings
-            if result.messages:
-                for message in result.messages:
+            if messages:
+                for message in messages:
                     logger.warning(f"Preview warning for {report_id}: {message}")
 
             logger.info(f"Generated enhanced preview for report {report_id}")
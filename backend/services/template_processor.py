@@ -1,3 +1,4 @@
+import io
 import re
 from pathlib import Path
 from typing import Any, Dict, List, Optional
@@ -6,6 +7,27 @@ from config import settings
 from docxtpl import DocxTemplate, RichText
 from pydantic import UUID4
 from utils.error_handler import handle_exception, logger
+from utils.static_assets import static_assets
+
+
+def _render_docx_template(
+    template_bytes: bytes, variables: Dict[str, Any], output_path: str
+) -> str:
+    """
+    Render a template and save the result.
+
+    Args:
+        template_bytes: Contents of the template file
+        variables: Processed variables to render
+        output_path: Path to save the rendered file
+
+    Returns:
+        Path to the rendered file
+    """
+    doc = DocxTemplate(io.BytesIO(template_bytes))
+    doc.render(variables)
+    doc.save(output_path)
+    return output_path
 
 
 class TemplateProcessor:
@@ -38,6 +60,9 @@ class TemplateProcessor:
         # Create output directory if it doesn't exist
         self.output_dir.mkdir(exist_ok=True)
 
+        # Template names already located, so lookups don't search the disk again
+        self._template_paths: Dict[str, Path] = {}
+
         # Initialize RichText instances for styled variables
         self.rich_text_fields = [
             "dinamica_eventi_accertamenti",
@@ -55,15 +80,31 @@ class TemplateProcessor:
         Returns:
             Path to the template file or None if not found
         """
+        if template_name in self._template_paths:
+            return self._template_paths[template_name]
+
         for template_dir in self.template_dirs:
             template_path = template_dir / template_name
             if template_path.exists():
                 logger.info(f"Found template at {template_path}")
+                self._template_paths[template_name] = template_path
                 return template_path
 
         logger.warning(f"Template {template_name} not found")
         return None
 
+    def _load_template(self, template_path: Path) -> DocxTemplate:
+        """
+        Open a template from the static asset registry instead of the disk.
+
+        Args:
+            template_path: Path to the template file
+
+        Returns:
+            A fresh DocxTemplate for the template
+        """
+        return DocxTemplate(io.BytesIO(static_assets.get_file(template_path)))
+
     def _convert_to_rich_text(self, text: str) -> RichText:
         """
         Convert text with markdown-like syntax to RichText.
@@ -243,9 +284,6 @@ class TemplateProcessor:
             if not template_path:
                 raise FileNotFoundError(f"Template {template_name} not found")
 
-            # Load template
-            doc = DocxTemplate(str(template_path))
-
             # Process variables
             processed_vars = self.process_variables(variables)
 
@@ -254,11 +292,10 @@ class TemplateProcessor:
                 report_id = UUID4()
                 output_path = str(self.output_dir / f"report_{report_id}.docx")
 
-            # Render template
-            doc.render(processed_vars)
-            doc.save(output_path)
-
-            return output_path
+            # Render template from the in-memory copy
+            return _render_docx_template(
+                static_assets.get_file(template_path), processed_vars, output_path
+            )
 
         except Exception as e:
             handle_exception(e, "Template rendering")
@@ -282,7 +319,7 @@ class TemplateProcessor:
                 return []
 
             # Load the template
-            doc = DocxTemplate(str(template_path))
+            doc = self._load_template(template_path)
 
             # Get all variables
             variables = doc.get_undeclared_template_variables()
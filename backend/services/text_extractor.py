@@ -6,11 +6,32 @@ import docx2txt
 import PyPDF2
 from aiofiles import open as aio_open
 
+from utils.extraction_cache import extraction_cache
+
 logger = logging.getLogger(__name__)
 
 async def extract_text_from_file(file_path: str) -> str:
     """
     Extract text content from a file based on its type.
+    Served from the shared extraction cache when the file contents are known.
+    
+    Args:
+        file_path: Path to the file
+        
+    Returns:
+        Extracted text content
+        
+    Raises:
+        ValueError: If file type is not supported
+    """
+    return await extraction_cache.aget_or_extract(
+        file_path, _extract_text_uncached, namespace="text_extractor"
+    )
+
+
+async def _extract_text_uncached(file_path: str) -> str:
+    """
+    Extract text content from a file based on its type, bypassing the cache.
     
     Args:
         file_path: Path to the file
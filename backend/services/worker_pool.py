@@ -0,0 +1,325 @@
+"""
+Shared worker pools for blocking document work.
+
+CPU-bound work (DOCX rendering, PDF layout, DOCX to HTML conversion, PDF
+page-range extraction, page rendering, OCR) is submitted to a process pool,
+and blocking I/O (text extraction through the extraction cache, file copies,
+agent document extraction) to a thread pool, so none of it runs on the event
+loop. Functions sent to the process pool must be defined at module level so
+they can be pickled. These two pools are the application's whole worker
+budget; no other module keeps an executor of its own. Only short cache
+lookups in utils modules still go through asyncio.to_thread.
+
+Both pools are started and stopped with the application. A call made before
+start(), from a script or a test, starts them on demand.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import settings
+from utils.monitoring import (
+    WORKER_POOL_BUSY_WORKERS,
+    WORKER_POOL_QUEUE_DEPTH,
+    WORKER_POOL_TASK_DURATION,
+    WORKER_POOL_WAIT,
+)
+
+logger = logging.getLogger(__name__)
+
+# Pool names, as used in metric labels
+CPU = "cpu"
+IO = "io"
+
+
+def _timed_call(
+    func: Callable, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+) -> Tuple[float, float, Any]:
+    """Run a task in a worker and report when it started and finished"""
+    started_at = time.time()
+    result = func(*args, **kwargs)
+    return started_at, time.time(), result
+
+
+class _Pool:
+    """An executor with the counters used for its queue and utilization metrics"""
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.executor: Optional[Executor] = None
+        self.in_flight = 0
+        # Tasks are also submitted from worker threads (see submit_cpu)
+        self.lock = threading.Lock()
+        self.metrics = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "wait_time": 0.0,
+            "busy_time": 0.0,
+        }
+
+    def create_executor(self) -> Executor:
+        if self.name == CPU:
+            return ProcessPoolExecutor(max_workers=self.max_workers)
+        return ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="worker-pool-io"
+        )
+
+    @property
+    def running(self) -> int:
+        """Tasks being run; the rest of the tasks in flight are queued"""
+        return min(self.in_flight, self.max_workers)
+
+    def update_gauges(self) -> None:
+        WORKER_POOL_BUSY_WORKERS.labels(pool=self.name).set(self.running)
+        WORKER_POOL_QUEUE_DEPTH.labels(pool=self.name).set(
+            self.in_flight - self.running
+        )
+
+    def task_submitted(self) -> None:
+        with self.lock:
+            self.metrics["submitted"] += 1
+            self.in_flight += 1
+            self.update_gauges()
+
+    def task_finished(
+        self,
+        task_name: str,
+        submitted_at: float,
+        timing: Optional[Tuple[float, float]] = None,
+        failed: bool = False,
+    ) -> None:
+        """Record a task that left the pool; timing is (started_at, finished_at)"""
+        with self.lock:
+            self.in_flight -= 1
+            if failed:
+                self.metrics["failed"] += 1
+            elif timing is not None:
+                started_at, finished_at = timing
+                wait_time = max(0.0, started_at - submitted_at)
+                run_time = finished_at - started_at
+                self.metrics["completed"] += 1
+                self.metrics["wait_time"] += wait_time
+                self.metrics["busy_time"] += run_time
+                WORKER_POOL_WAIT.labels(pool=self.name).observe(wait_time)
+                WORKER_POOL_TASK_DURATION.labels(
+                    pool=self.name, task=task_name
+                ).observe(run_time)
+            self.update_gauges()
+
+    def replace_broken(self, broken: Executor) -> None:
+        """Replace an executor whose worker died, unless that was already done"""
+        with self.lock:
+            if self.executor is not broken:
+                return
+            logger.error(f"Worker pool {self.name} broken, restarting it")
+            self.executor = self.create_executor()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+
+class WorkerPoolService:
+    """
+    Process pool for CPU-bound work and thread pool for blocking I/O
+
+    Usage:
+        path = await worker_pool.run_cpu(render_report_pdf, text, output_path)
+        text = await worker_pool.run_io(extract_text_from_file, file_path)
+        future = worker_pool.submit_cpu(extract_page_range, path, 0, 10)
+    """
+
+    def __init__(
+        self,
+        cpu_workers: int = settings.WORKER_POOL_CPU_WORKERS,
+        io_workers: int = settings.WORKER_POOL_IO_WORKERS,
+    ):
+        """
+        Initialize the service; pools are created by start()
+
+        Args:
+            cpu_workers: Processes in the CPU pool
+            io_workers: Threads in the I/O pool
+        """
+        self._pools = {CPU: _Pool(CPU, cpu_workers), IO: _Pool(IO, io_workers)}
+        self._started_at: Optional[float] = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def cpu_workers(self) -> int:
+        """Processes in the CPU pool, e.g. to decide how finely to split work"""
+        return self._pools[CPU].max_workers
+
+    def start(self) -> None:
+        """Create both pools. Called on application startup."""
+        with self._start_lock:
+            for pool in self._pools.values():
+                if pool.executor is None:
+                    pool.executor = pool.create_executor()
+            if self._started_at is None:
+                self._started_at = time.time()
+                logger.info(
+                    f"Started worker pools with {self._pools[CPU].max_workers} processes "
+                    f"and {self._pools[IO].max_workers} threads"
+                )
+
+    def shutdown(self) -> None:
+        """Shut down both pools, dropping queued tasks. Called on application shutdown."""
+        with self._start_lock:
+            for pool in self._pools.values():
+                if pool.executor is not None:
+                    pool.executor.shutdown(wait=False, cancel_futures=True)
+                    pool.executor = None
+                pool.in_flight = 0
+                pool.update_gauges()
+            self._started_at = None
+
+    async def run_cpu(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """
+        Run a CPU-bound function in the process pool
+
+        Args:
+            func: Module-level function to run
+            *args: Positional arguments, which must be picklable
+            **kwargs: Keyword arguments, which must be picklable
+
+        Returns:
+            The function's result
+        """
+        return await self._run(self._pools[CPU], func, args, kwargs)
+
+    async def run_io(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """
+        Run a blocking I/O function in the thread pool
+
+        Args:
+            func: Function to run
+            *args: Positional arguments
+            **kwargs: Keyword arguments
+
+        Returns:
+            The function's result
+        """
+        return await self._run(self._pools[IO], func, args, kwargs)
+
+    def submit_cpu(self, func: Callable, *args: Any, **kwargs: Any) -> Future:
+        """
+        Submit a CPU-bound function to the process pool from synchronous code,
+        such as an extractor running in a worker thread
+
+        Args:
+            func: Module-level function to run
+            *args: Positional arguments, which must be picklable
+            **kwargs: Keyword arguments, which must be picklable
+
+        Returns:
+            Future resolving to the function's result; cancelling it cancels
+            the task if it has not started yet
+        """
+        pool = self._pools[CPU]
+        executor = pool.executor or self._started_executor(pool)
+        task_name = getattr(func, "__name__", type(func).__name__)
+        submitted_at = time.time()
+        result: Future = Future()
+
+        pool.task_submitted()
+        try:
+            task = executor.submit(_timed_call, func, args, kwargs)
+        except BaseException:
+            pool.task_finished(task_name, submitted_at, failed=True)
+            raise
+
+        def on_task_done(task: Future) -> None:
+            if task.cancelled():
+                pool.task_finished(task_name, submitted_at)
+                result.cancel()
+                return
+            error = task.exception()
+            if error is not None:
+                if isinstance(error, BrokenProcessPool):
+                    pool.replace_broken(executor)
+                pool.task_finished(task_name, submitted_at, failed=True)
+                if result.set_running_or_notify_cancel():
+                    result.set_exception(error)
+                return
+            started_at, finished_at, value = task.result()
+            pool.task_finished(task_name, submitted_at, (started_at, finished_at))
+            if result.set_running_or_notify_cancel():
+                result.set_result(value)
+
+        task.add_done_callback(on_task_done)
+        result.add_done_callback(lambda done: done.cancelled() and task.cancel())
+        return result
+
+    def _started_executor(self, pool: _Pool) -> Executor:
+        """Start the pools on demand and return this pool's executor"""
+        self.start()
+        return pool.executor
+
+    async def _run(
+        self, pool: _Pool, func: Callable, args: Tuple, kwargs: Dict[str, Any]
+    ) -> Any:
+        """Submit a task to a pool and record its wait and run times"""
+        executor = pool.executor or self._started_executor(pool)
+        loop = asyncio.get_running_loop()
+        task_name = getattr(func, "__name__", type(func).__name__)
+        submitted_at = time.time()
+        pool.task_submitted()
+        try:
+            started_at, finished_at, result = await loop.run_in_executor(
+                executor, _timed_call, func, args, kwargs
+            )
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); replace the pool so
+            # later tasks do not all fail
+            pool.replace_broken(executor)
+            pool.task_finished(task_name, submitted_at, failed=True)
+            raise
+        except BaseException:
+            pool.task_finished(task_name, submitted_at, failed=True)
+            raise
+
+        pool.task_finished(task_name, submitted_at, (started_at, finished_at))
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get pool statistics.
+
+        Returns:
+            Dictionary per pool with its size, current queue depth and busy
+            workers, task counters, and utilization now and since start
+        """
+        uptime = time.time() - self._started_at if self._started_at else 0.0
+        stats = {}
+        for name, pool in self._pools.items():
+            completed = pool.metrics["completed"]
+            capacity = uptime * pool.max_workers
+            stats[name] = {
+                "started": pool.executor is not None,
+                "max_workers": pool.max_workers,
+                "queue_depth": pool.in_flight - pool.running,
+                "busy_workers": pool.running,
+                "utilization": pool.running / pool.max_workers,
+                "avg_utilization": (
+                    min(1.0, pool.metrics["busy_time"] / capacity) if capacity else 0.0
+                ),
+                **pool.metrics,
+                "avg_wait_time": (
+                    pool.metrics["wait_time"] / completed if completed else 0.0
+                ),
+            }
+        return stats
+
+
+# Global instance shared by all blocking call sites
+worker_pool = WorkerPoolService()
@@ -0,0 +1,75 @@
+"""
+Tests for publishing streamed draft deltas to SSE subscribers.
+
+Usage:
+    pytest backend/tests/api/test_draft_stream.py
+"""
+
+import asyncio
+
+import pytest
+
+from api.agent_loop import publish_draft_delta, tasks_cache
+
+TASK_ID = "task-draft-stream"
+
+
+@pytest.fixture
+def subscribers():
+    """A task with one fast and one slow (bounded, size 2) subscriber queue."""
+    queues = {"fast": asyncio.Queue(maxsize=100), "slow": asyncio.Queue(maxsize=2)}
+    tasks_cache[TASK_ID] = {"subscribers": queues}
+    yield queues
+    tasks_cache.pop(TASK_ID, None)
+
+
+def drain(queue):
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+
+def test_deltas_are_delivered_with_offsets(subscribers):
+    """Test that every subscriber receives each delta with its offset."""
+    publish_draft_delta(TASK_ID, {"delta": "Buon", "offset": 0, "iteration": 1})
+    publish_draft_delta(TASK_ID, {"delta": "giorno", "offset": 4, "iteration": 1})
+
+    events = drain(subscribers["fast"])
+    assert [(e["delta"], e["offset"]) for e in events] == [("Buon", 0), ("giorno", 4)]
+    assert all(e["type"] == "draft_delta" and e["iteration"] == 1 for e in events)
+    assert tasks_cache[TASK_ID]["streamed_draft"] == "Buongiorno"
+
+
+def test_full_queue_never_blocks_the_writer(subscribers):
+    """Test that deltas to a full queue are dropped and the subscriber marked lagging."""
+    for i, chunk in enumerate("abcde"):
+        publish_draft_delta(TASK_ID, {"delta": chunk, "offset": i, "iteration": 1})
+
+    assert subscribers["slow"].qsize() == 2
+    assert len(drain(subscribers["fast"])) == 5
+    assert tasks_cache[TASK_ID]["lagging_subscribers"] == {"slow"}
+
+
+def test_lagging_subscriber_resyncs_with_the_whole_draft(subscribers):
+    """Test that a lagging subscriber gets the accumulated draft at offset 0."""
+    for i, chunk in enumerate("abcd"):
+        publish_draft_delta(TASK_ID, {"delta": chunk, "offset": i, "iteration": 1})
+    drain(subscribers["slow"])
+
+    publish_draft_delta(TASK_ID, {"delta": "e", "offset": 4, "iteration": 1})
+
+    resync = drain(subscribers["slow"])
+    assert [(e["delta"], e["offset"]) for e in resync] == [("abcde", 0)]
+    assert tasks_cache[TASK_ID]["lagging_subscribers"] == set()
+
+    publish_draft_delta(TASK_ID, {"delta": "f", "offset": 5, "iteration": 1})
+    assert [(e["delta"], e["offset"]) for e in drain(subscribers["slow"])] == [("f", 5)]
+
+
+def test_new_stream_restarts_the_draft(subscribers):
+    """Test that a delta at offset 0 (new iteration or retry) replaces the draft."""
+    publish_draft_delta(TASK_ID, {"delta": "Prima bozza", "offset": 0, "iteration": 1})
+    publish_draft_delta(TASK_ID, {"delta": "Seconda", "offset": 0, "iteration": 2})
+
+    assert tasks_cache[TASK_ID]["streamed_draft"] == "Seconda"
@@ -0,0 +1,126 @@
+"""
+Tests for the chunked upload endpoints.
+
+Usage:
+    pytest backend/tests/api/test_upload_chunked.py
+"""
+
+import asyncio
+import io
+import json
+import os
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from api import upload_chunked
+
+FILE_SIZE = 5 * 1024 * 1024
+
+
+@pytest.fixture
+def chunks_dir(tmp_path, monkeypatch):
+    """Keep upload sessions in a temporary chunks directory."""
+    monkeypatch.setattr(upload_chunked, "CHUNKS_DIR", tmp_path)
+    return tmp_path
+
+
+async def start_upload():
+    return await upload_chunked.initialize_chunked_upload(
+        request=None,
+        filename="report.pdf",
+        fileSize=FILE_SIZE,
+        mimeType="application/pdf",
+        uploadId=None,
+        reportId=None,
+    )
+
+
+async def send_chunk(upload, index, data):
+    start = index * upload["chunkSize"]
+    return await upload_chunked.upload_chunk(
+        request=None,
+        uploadId=upload["uploadId"],
+        chunkIndex=index,
+        start=start,
+        end=start + len(data),
+        chunk=UploadFile(file=io.BytesIO(data), filename="blob"),
+        chunkHash=None,
+    )
+
+
+def test_concurrent_chunks_are_all_recorded(chunks_dir):
+    """Test that chunks of one upload received at the same time are all recorded."""
+    data = os.urandom(FILE_SIZE)
+
+    async def run():
+        upload = await start_upload()
+        size = upload["chunkSize"]
+        await asyncio.gather(
+            *(
+                send_chunk(upload, i, data[i * size : (i + 1) * size])
+                for i in range(upload["totalChunks"])
+            )
+        )
+        return upload
+
+    upload = asyncio.run(run())
+
+    metadata = json.loads(
+        (chunks_dir / upload["uploadId"] / "metadata.json").read_text()
+    )
+    assert metadata["uploadedChunks"] == list(range(upload["totalChunks"]))
+    assert len(metadata["chunkChecksums"]) == upload["totalChunks"]
+
+
+def test_resume_reports_chunks_written_in_place(chunks_dir):
+    """Test that resuming an in-place upload reports the chunks already received."""
+    data = os.urandom(FILE_SIZE)
+
+    async def run():
+        upload = await start_upload()
+        size = upload["chunkSize"]
+        await asyncio.gather(
+            send_chunk(upload, 0, data[:size]),
+            send_chunk(upload, 2, data[2 * size : 3 * size]),
+        )
+        return await upload_chunked.initialize_chunked_upload(
+            request=None,
+            filename="report.pdf",
+            fileSize=FILE_SIZE,
+            mimeType="application/pdf",
+            uploadId=upload["uploadId"],
+            reportId=None,
+        )
+
+    resumed = asyncio.run(run())
+
+    assert resumed["uploadedChunks"] == [0, 2]
+
+
+def test_in_place_chunk_must_cover_its_index_range(chunks_dir):
+    """Test that an in-place chunk sent with another chunk's offsets is rejected."""
+    data = os.urandom(FILE_SIZE)
+
+    async def run():
+        upload = await start_upload()
+        size = upload["chunkSize"]
+        with pytest.raises(HTTPException) as excinfo:
+            await upload_chunked.upload_chunk(
+                request=None,
+                uploadId=upload["uploadId"],
+                chunkIndex=1,
+                start=0,
+                end=size,
+                chunk=UploadFile(file=io.BytesIO(data[:size]), filename="blob"),
+                chunkHash=None,
+            )
+        return upload, excinfo.value
+
+    upload, error = asyncio.run(run())
+
+    assert error.status_code == 400
+    metadata = json.loads(
+        (chunks_dir / upload["uploadId"] / "metadata.json").read_text()
+    )
+    assert metadata["uploadedChunks"] == []
@@ -0,0 +1,99 @@
+"""
+Tests for document extraction in the agent service.
+
+Usage:
+    pytest backend/tests/test_agent_service.py
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+
+import services.agent_service as agent_service_module
+from services.agent_service import AgentService, ReportCancelledError
+from services.worker_pool import WorkerPoolService
+
+
+@pytest.fixture
+def io_pool(monkeypatch):
+    """A private worker pool with four I/O threads."""
+    pool = WorkerPoolService(cpu_workers=1, io_workers=4)
+    monkeypatch.setattr(agent_service_module, "worker_pool", pool)
+    yield pool
+    pool.shutdown()
+
+
+def _patch_storage(monkeypatch, extract):
+    records = {
+        f"file-{i}": {
+            "file_id": f"file-{i}",
+            "file_path": f"doc{i}.pdf",
+            "filename": f"doc{i}.pdf",
+        }
+        for i in range(4)
+    }
+
+    @asynccontextmanager
+    async def fake_context():
+        yield None
+
+    async def fake_fetch_files(supabase, file_ids):
+        return {
+            str(file_id): records[file_id] for file_id in file_ids if file_id in records
+        }
+
+    monkeypatch.setattr(
+        agent_service_module, "async_supabase_client_context", fake_context
+    )
+    monkeypatch.setattr(agent_service_module, "fetch_files", fake_fetch_files)
+    monkeypatch.setattr(
+        agent_service_module, "get_absolute_file_path", lambda path: path
+    )
+    monkeypatch.setattr(agent_service_module, "validate_file_exists", lambda path: True)
+    monkeypatch.setattr(agent_service_module, "extract_pages_from_file", extract)
+
+
+def test_documents_are_extracted_concurrently(monkeypatch, io_pool):
+    """Test that all files are extracted at once and keyed by file id."""
+
+    def extract(path):
+        time.sleep(0.2)
+        return {"text": f"Testo di {path}", "pages": [{"page": 1}]}
+
+    _patch_storage(monkeypatch, extract)
+    service = AgentService()
+    file_ids = ["file-0", "file-1", "file-2", "file-3", "missing"]
+
+    start = time.time()
+    content = asyncio.run(service._extract_document_content(file_ids))
+    elapsed = time.time() - start
+
+    assert elapsed < 0.6
+    assert list(content) == file_ids
+    assert content["file-2"]["text"] == "Testo di doc2.pdf"
+    assert content["file-2"]["metadata"]["word_count"] == 3
+    assert content["missing"]["metadata"]["error"] == "File not found in database"
+
+
+def test_cancelled_extractions_do_not_start(monkeypatch, io_pool):
+    """Test that extraction work queued after a cancellation is skipped."""
+    started = []
+
+    def extract(path):
+        started.append(path)
+        return {"text": "Testo", "pages": []}
+
+    _patch_storage(monkeypatch, extract)
+    service = AgentService()
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    with pytest.raises(ReportCancelledError):
+        asyncio.run(
+            service._extract_document_content(["file-0", "file-1"], cancel_event)
+        )
+
+    assert started == []
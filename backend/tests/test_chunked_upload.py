@@ -10,6 +10,7 @@ import shutil
 import sys
 import tempfile
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from os.path import abspath, dirname
 from typing import TypedDict, Optional
 
@@ -26,6 +27,7 @@ from utils.exceptions import (
     ValidationException,
 )
 from utils.file_processor import FileProcessor
+from utils.upload_checksum import combine_chunk_checksums, hash_bytes
 
 
 class UploadStatus(TypedDict):
@@ -156,6 +158,117 @@ class TestFileProcessorChunkedUpload:
         with open(self.test_file, "rb") as f1, open(result["file_path"], "rb") as f2:
             assert f1.read() == f2.read()
 
+    def test_chunked_upload_in_place(self):
+        """Test that chunks written in place, out of order, assemble into the original file"""
+        upload_id = str(uuid.uuid4())
+        FileProcessor.init_chunked_upload(
+            upload_id=upload_id,
+            filename="test_file.txt",
+            total_chunks=len(self.chunks),
+            file_size=self.file_size,
+            mime_type="text/plain",
+            directory=self.test_dir,
+            chunk_size=1024 * 512,
+        )
+
+        for i in reversed(range(len(self.chunks))):
+            FileProcessor.save_chunk(
+                upload_id=upload_id, chunk_index=i, chunk_data=io.BytesIO(self.chunks[i])
+            )
+
+        # A chunk of the wrong size is rejected
+        with pytest.raises(ValidationException):
+            FileProcessor.save_chunk(
+                upload_id=upload_id, chunk_index=0, chunk_data=io.BytesIO(b"short")
+            )
+
+        result = FileProcessor.complete_chunked_upload(
+            upload_id=upload_id, target_directory=self.test_dir
+        )
+
+        with open(self.test_file, "rb") as f1, open(result["file_path"], "rb") as f2:
+            assert f1.read() == f2.read()
+
+    def test_chunk_checksums(self):
+        """Test that corrupt chunks are rejected and identical uploads are deduplicated"""
+        results = []
+        for _ in range(2):
+            upload_id = str(uuid.uuid4())
+            FileProcessor.init_chunked_upload(
+                upload_id=upload_id,
+                filename="test_file.txt",
+                total_chunks=len(self.chunks),
+                file_size=self.file_size,
+                mime_type="text/plain",
+                directory=self.test_dir,
+                chunk_size=1024 * 512,
+            )
+
+            with pytest.raises(ValidationException):
+                FileProcessor.save_chunk(
+                    upload_id=upload_id,
+                    chunk_index=0,
+                    chunk_data=io.BytesIO(self.chunks[0]),
+                    checksum=hash_bytes(b"something else"),
+                )
+
+            chunk_checksums = {}
+            for i, chunk in enumerate(self.chunks):
+                FileProcessor.save_chunk(
+                    upload_id=upload_id,
+                    chunk_index=i,
+                    chunk_data=io.BytesIO(chunk),
+                    checksum=hash_bytes(chunk),
+                )
+                chunk_checksums[str(i)] = hash_bytes(chunk)
+
+            results.append(
+                FileProcessor.complete_chunked_upload(
+                    upload_id=upload_id,
+                    target_directory=self.test_dir,
+                    checksum=combine_chunk_checksums(chunk_checksums, len(self.chunks)),
+                )
+            )
+
+        assert results[0]["checksum"] == results[1]["checksum"]
+        assert results[0]["deduplicated"] is False
+        assert results[1]["deduplicated"] is True
+        with open(self.test_file, "rb") as f1, open(results[1]["file_path"], "rb") as f2:
+            assert f1.read() == f2.read()
+
+    def test_rewritten_file_is_not_linked(self):
+        """Test that a stored file changed after it was recorded is not reused for deduplication"""
+        results = []
+        for _ in range(2):
+            upload_id = str(uuid.uuid4())
+            FileProcessor.init_chunked_upload(
+                upload_id=upload_id,
+                filename="test_file.txt",
+                total_chunks=len(self.chunks),
+                file_size=self.file_size,
+                mime_type="text/plain",
+                directory=self.test_dir,
+            )
+            for i, chunk in enumerate(self.chunks):
+                FileProcessor.save_chunk(upload_id, i, io.BytesIO(chunk))
+            results.append(
+                FileProcessor.complete_chunked_upload(
+                    upload_id=upload_id, target_directory=self.test_dir
+                )
+            )
+
+            if len(results) == 1:
+                # Overwrite the stored file in place, as a later write would
+                stored = results[0]["file_path"]
+                with open(stored, "r+b") as f:
+                    f.write(b"x" * 1024)
+                stat = os.stat(stored)
+                os.utime(stored, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        assert results[1]["deduplicated"] is False
+        with open(self.test_file, "rb") as f1, open(results[1]["file_path"], "rb") as f2:
+            assert f1.read() == f2.read()
+
     def test_get_upload_status(self):
         """Test getting the status of a chunked upload"""
         # Initialize upload
@@ -186,6 +299,98 @@ class TestFileProcessorChunkedUpload:
         assert status["status"] == "initialized"
         assert status["received_chunks"] == 0
 
+    def test_upload_found_after_restart(self):
+        """Test that an upload is found through the session index when it is not in memory"""
+        upload_id = str(uuid.uuid4())
+        FileProcessor.init_chunked_upload(
+            upload_id=upload_id,
+            filename="test_file.txt",
+            total_chunks=len(self.chunks),
+            file_size=self.file_size,
+            mime_type="text/plain",
+            directory=self.test_dir,
+        )
+
+        # Simulate a restart (or a request landing on another worker)
+        del FileProcessor._chunked_uploads[upload_id]
+
+        chunk_info = FileProcessor.save_chunk(
+            upload_id=upload_id, chunk_index=0, chunk_data=io.BytesIO(self.chunks[0])
+        )
+        assert chunk_info["received_chunks"] == 1
+
+        del FileProcessor._chunked_uploads[upload_id]
+        status = FileProcessor.get_chunked_upload_status(upload_id)
+        assert status is not None
+        assert status["received_chunks"] == 1
+
+        del FileProcessor._chunked_uploads[upload_id]
+        assert FileProcessor.cleanup_chunked_upload(upload_id) is True
+        assert FileProcessor.get_chunked_upload_status(upload_id) is None
+
+    def test_chunks_spread_across_workers(self, monkeypatch):
+        """Test that workers with stale in-memory state do not lose each other's chunks"""
+        upload_id = str(uuid.uuid4())
+        worker_a, worker_b = {}, {}
+
+        # Worker A starts the upload and receives the first chunk
+        monkeypatch.setattr(FileProcessor, "_chunked_uploads", worker_a)
+        FileProcessor.init_chunked_upload(
+            upload_id=upload_id,
+            filename="test_file.txt",
+            total_chunks=len(self.chunks),
+            file_size=self.file_size,
+            mime_type="text/plain",
+            directory=self.test_dir,
+        )
+        FileProcessor.save_chunk(upload_id, 0, io.BytesIO(self.chunks[0]))
+
+        # The remaining chunks alternate between the two workers
+        for i in range(1, len(self.chunks)):
+            worker = worker_b if i % 2 else worker_a
+            monkeypatch.setattr(FileProcessor, "_chunked_uploads", worker)
+            info = FileProcessor.save_chunk(upload_id, i, io.BytesIO(self.chunks[i]))
+            assert info["received_chunks"] == i + 1
+
+        # Worker A still remembers an older state but completes the upload
+        monkeypatch.setattr(FileProcessor, "_chunked_uploads", worker_a)
+        result = FileProcessor.complete_chunked_upload(
+            upload_id=upload_id, target_directory=self.test_dir
+        )
+        with open(result["file_path"], "rb") as f:
+            assert f.read() == b"".join(self.chunks)
+
+        monkeypatch.setattr(FileProcessor, "_chunked_uploads", worker_b)
+        assert FileProcessor.get_chunked_upload_status(upload_id)["completed"] is True
+        FileProcessor.cleanup_chunked_upload(upload_id)
+
+    def test_concurrent_chunks_are_all_recorded(self):
+        """Test that chunks saved at the same time are all counted once"""
+        upload_id = str(uuid.uuid4())
+        chunks = split_file_into_chunks(self.test_file, 1024 * 64)
+        FileProcessor.init_chunked_upload(
+            upload_id=upload_id,
+            filename="test_file.txt",
+            total_chunks=len(chunks),
+            file_size=self.file_size,
+            mime_type="text/plain",
+            directory=self.test_dir,
+            chunk_size=1024 * 64,
+        )
+
+        def save(i):
+            FileProcessor.save_chunk(upload_id, i, io.BytesIO(chunks[i]))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(save, range(len(chunks))))
+        # A resent chunk does not count twice
+        save(0)
+
+        status = FileProcessor.get_chunked_upload_status(upload_id)
+        assert status["received_chunks"] == len(chunks)
+        assert status["status"] == "ready_to_combine"
+        FileProcessor.cleanup_chunked_upload(upload_id)
+
     def test_cleanup_chunked_upload(self):
         """Test cleaning up a chunked upload"""
         # Initialize upload
@@ -1,8 +1,12 @@
+import asyncio
 import io
 import os
 import tempfile
+import uuid
 
+import pytest
 from PIL import Image
+from services.pdf_extractor import extract_texts_concurrently
 from utils.file_processor import FileProcessor
 
 
@@ -185,13 +189,56 @@ class TestFileProcessor:
             assert extracted_text.strip() == test_content
 
             # Test non-existent file
-            error_text = FileProcessor.extract_text("non_existent_file.txt")
-            assert "File does not exist" in error_text
+            with pytest.raises(IOError, match="File does not exist"):
+                FileProcessor.extract_text("non_existent_file.txt")
 
         finally:
             # Clean up
             os.unlink(temp_file_path)
 
+    def test_extract_pages_dispatches_to_registered_extractor(self):
+        """Test that extract_pages uses the registry and builds a page index"""
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
+            # Unique content so the extraction cache cannot answer for us
+            temp_file.write(b"%PDF-1.4 " + uuid.uuid4().hex.encode())
+            temp_file_path = temp_file.name
+
+        original = FileProcessor._text_extractors.get(".pdf")
+        FileProcessor.register_text_extractor(
+            lambda path: iter(["first page", "second"]), ".pdf"
+        )
+        try:
+            result = FileProcessor.extract_pages(temp_file_path)
+            separator = FileProcessor.PAGE_SEPARATOR
+
+            assert result["text"] == "first page" + separator + "second"
+            assert [p["page"] for p in result["pages"]] == [1, 2]
+            second = result["pages"][1]
+            assert result["text"][second["start"] : second["end"]] == "second"
+        finally:
+            FileProcessor.register_text_extractor(original, ".pdf")
+            os.unlink(temp_file_path)
+
+    def test_corrupt_pdf_is_not_returned_as_text(self):
+        """Test that a PDF that cannot be parsed fails instead of yielding error text"""
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
+            temp_file.write(b"%PDF-1.4\n" + uuid.uuid4().hex.encode() + b"\x00garbage")
+            temp_file_path = temp_file.name
+
+        try:
+            result = FileProcessor.extract_pages(temp_file_path)
+            assert result["text"] == ""
+            assert result["error"]
+
+            with pytest.raises(IOError):
+                FileProcessor.extract_text(temp_file_path)
+
+            extraction = asyncio.run(extract_texts_concurrently([temp_file_path]))[0]
+            assert extraction["text"] is None
+            assert isinstance(extraction["error"], IOError)
+        finally:
+            os.unlink(temp_file_path)
+
     def test_file_operations(self):
         """Test file operations (exists, delete, copy)"""
         # Create test file
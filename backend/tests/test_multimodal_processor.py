@@ -0,0 +1,130 @@
+"""
+Tests for sending rendered document pages to the vision model.
+Rendering and the API are replaced by stubs, so no network access is needed.
+
+Usage:
+    pytest backend/tests/test_multimodal_processor.py
+"""
+
+import asyncio
+
+import pytest
+
+import services.multimodal_processor as multimodal_processor
+from config import settings
+from services.multimodal_processor import (
+    _merge_batch_responses,
+    process_document_with_multimodal_api,
+)
+
+
+def _response(content, tokens=10):
+    return {
+        "choices": [{"message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": tokens, "completion_tokens": 1},
+    }
+
+
+@pytest.fixture
+def vision_calls(monkeypatch, tmp_path):
+    """Render 7 fake pages and record the image pages sent in each API call."""
+    calls = []
+
+    async def fake_pages(file_path):
+        for page_num in range(7):
+            yield page_num, f"data:image/png;base64,page{page_num}"
+
+    class FakeResponse:
+        status_code = 200
+
+        def __init__(self, content):
+            self.content = content
+
+        def json(self):
+            return _response(self.content)
+
+    class FakeClient:
+        async def post(self, url, json=None, **kwargs):
+            items = json["messages"][1]["content"]
+            pages = [i["image_url"]["url"][-1] for i in items if i["type"] == "image_url"]
+            texts = [i["text"] for i in items if i["type"] == "text"]
+            calls.append({"pages": pages, "texts": texts})
+            return FakeResponse("pagine " + ",".join(pages))
+
+    class FakeSlot:
+        async def __aenter__(self):
+            return FakeClient()
+
+        async def __aexit__(self, *args):
+            return False
+
+    monkeypatch.setattr(multimodal_processor, "iter_document_pages_base64", fake_pages)
+    monkeypatch.setattr(
+        multimodal_processor.http_client_pool, "host_slot", lambda url: FakeSlot()
+    )
+    document = tmp_path / "perizia.pdf"
+    document.write_bytes(b"%PDF-1.4")
+    return calls, str(document)
+
+
+def test_document_is_sent_in_a_single_request_by_default(monkeypatch, vision_calls):
+    """Test that all pages go to the model together, with no batch note."""
+    monkeypatch.setattr(settings, "MULTIMODAL_PAGES_PER_REQUEST", 0)
+    calls, document = vision_calls
+
+    result = asyncio.run(
+        process_document_with_multimodal_api(document, "Estrai il testo", "Sistema")
+    )
+
+    assert [call["pages"] for call in calls] == [list("0123456")]
+    assert calls[0]["texts"] == ["Estrai il testo"]
+    assert result["choices"][0]["message"]["content"] == "pagine 0,1,2,3,4,5,6"
+    assert "batches" not in result
+
+
+def test_batching_is_opt_in(monkeypatch, vision_calls):
+    """Test that a page limit splits the document and merges answers in page order."""
+    monkeypatch.setattr(settings, "MULTIMODAL_PAGES_PER_REQUEST", 3)
+    calls, document = vision_calls
+
+    result = asyncio.run(
+        process_document_with_multimodal_api(document, "Estrai il testo", "Sistema")
+    )
+
+    assert sorted(call["pages"] for call in calls) == [
+        list("012"),
+        list("345"),
+        list("6"),
+    ]
+    assert all(
+        call["texts"][1].startswith("The following images are pages") for call in calls
+    )
+    assert result["choices"][0]["message"]["content"] == (
+        "pagine 0,1,2\n\npagine 3,4,5\n\npagine 6"
+    )
+    assert result["batches"] == {"total": 3, "failed": 0}
+
+
+def test_merge_sums_usage_and_skips_failed_batches():
+    """Test that failed batches are dropped and counted while usage is summed."""
+    merged = _merge_batch_responses(
+        [_response("uno", 10), {"error": "API error: 502"}, _response("tre", 5)]
+    )
+
+    assert merged["choices"][0]["message"]["content"] == "uno\n\ntre"
+    assert merged["usage"] == {"prompt_tokens": 15, "completion_tokens": 2}
+    assert merged["batches"] == {"total": 3, "failed": 1}
+
+
+def test_merge_returns_the_error_when_every_batch_failed():
+    """Test that a document whose batches all failed is reported as an error."""
+    merged = _merge_batch_responses([{"error": "API error: 502"}, {"error": "timeout"}])
+
+    assert merged == {"error": "API error: 502"}
+
+
+def test_merge_keeps_a_single_response_unchanged():
+    """Test that an unbatched response is returned as the model sent it."""
+    response = _response("tutto")
+
+    assert _merge_batch_responses([response]) is response
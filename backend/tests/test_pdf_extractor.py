@@ -0,0 +1,137 @@
+"""
+Tests for the hybrid PDF extractor (text layer with OCR for scanned pages).
+Tesseract is replaced by a stub, so it does not need to be installed.
+
+Usage:
+    pytest backend/tests/test_pdf_extractor.py
+"""
+
+import io
+import os
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import fitz
+import pytest
+from PIL import Image
+
+import services.pdf_extractor as pdf_extractor
+from config import settings
+from services.pdf_extractor import (
+    iter_pdf_pages_hybrid,
+    register_hybrid_pdf_extractor,
+)
+from utils.file_processor import FileProcessor
+
+
+def _make_pdf(layout):
+    """PDF with one page per entry: "text" pages have a text layer, "scan" pages only an image."""
+    png = io.BytesIO()
+    Image.new("RGB", (200, 100), "white").save(png, format="PNG")
+    handle, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(handle)
+    with fitz.open() as doc:
+        for number, kind in enumerate(layout, start=1):
+            page = doc.new_page()
+            if kind == "text":
+                page.insert_text((72, 72), f"Pagina {number} con testo sufficiente")
+            else:
+                page.insert_image(fitz.Rect(72, 72, 272, 172), stream=png.getvalue())
+        # Unique metadata so the extraction cache cannot answer for us
+        doc.set_metadata({"title": uuid.uuid4().hex})
+        doc.save(path)
+    return path
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    """Run OCR in threads and record the pages it is asked to recognize."""
+    executor = ThreadPoolExecutor(max_workers=2)
+    ocr_calls = []
+
+    def ocr_pdf_page(file_path, page_num, dpi, languages):
+        ocr_calls.append(page_num)
+        return f"Testo OCR della pagina {page_num + 1}"
+
+    monkeypatch.setattr(settings, "OCR_FALLBACK_ENABLED", True)
+    monkeypatch.setattr(
+        pdf_extractor, "worker_pool", SimpleNamespace(submit_cpu=executor.submit)
+    )
+    monkeypatch.setattr(pdf_extractor, "ocr_pdf_page", ocr_pdf_page)
+    yield ocr_calls
+    executor.shutdown()
+
+
+def test_only_scanned_pages_are_ocred_in_order(fake_ocr):
+    """Test that OCR runs on image-only pages and pages keep their order."""
+    path = _make_pdf(["text", "scan", "text", "scan"])
+    try:
+        pages = list(iter_pdf_pages_hybrid(path))
+    finally:
+        os.remove(path)
+
+    assert sorted(fake_ocr) == [1, 3]
+    assert [page.strip() for page in pages] == [
+        "Pagina 1 con testo sufficiente",
+        "Testo OCR della pagina 2",
+        "Pagina 3 con testo sufficiente",
+        "Testo OCR della pagina 4",
+    ]
+
+
+def test_text_pdfs_skip_ocr(fake_ocr):
+    """Test that a PDF with a text layer on every page never reaches OCR."""
+    path = _make_pdf(["text", "text"])
+    try:
+        pages = list(iter_pdf_pages_hybrid(path))
+    finally:
+        os.remove(path)
+
+    assert fake_ocr == []
+    assert len(pages) == 2
+
+
+def test_failed_ocr_keeps_the_page(monkeypatch, fake_ocr):
+    """Test that a page whose OCR fails is kept with its (empty) text layer."""
+
+    def failing_ocr(file_path, page_num, dpi, languages):
+        raise RuntimeError("tesseract not found")
+
+    monkeypatch.setattr(pdf_extractor, "ocr_pdf_page", failing_ocr)
+    path = _make_pdf(["text", "scan"])
+    try:
+        pages = list(iter_pdf_pages_hybrid(path))
+    finally:
+        os.remove(path)
+
+    assert pages[0].strip() == "Pagina 1 con testo sufficiente"
+    assert pages[1].strip() == ""
+
+
+def test_ocr_fallback_can_be_disabled(monkeypatch, fake_ocr):
+    """Test that OCR_FALLBACK_ENABLED=false returns the text layer only."""
+    monkeypatch.setattr(settings, "OCR_FALLBACK_ENABLED", False)
+    path = _make_pdf(["scan"])
+    try:
+        pages = list(iter_pdf_pages_hybrid(path))
+    finally:
+        os.remove(path)
+
+    assert fake_ocr == []
+    assert pages == [""]
+
+
+def test_registration_routes_extract_text_through_ocr(fake_ocr):
+    """Test that the hybrid extractor is only used for PDFs once registered."""
+    original = FileProcessor._text_extractors[".pdf"]
+    assert original is not iter_pdf_pages_hybrid
+
+    path = _make_pdf(["scan"])
+    try:
+        register_hybrid_pdf_extractor()
+        assert "Testo OCR della pagina 1" in FileProcessor.extract_text(path)
+    finally:
+        FileProcessor.register_text_extractor(original, ".pdf", "application/pdf")
+        os.remove(path)
@@ -0,0 +1,100 @@
+"""
+Tests for the shared CPU and I/O worker pools.
+
+Usage:
+    pytest backend/tests/test_worker_pool.py
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from services.worker_pool import WorkerPoolService
+
+
+def _square(value):
+    return value * value, os.getpid()
+
+
+def _fail(message):
+    raise ValueError(message)
+
+
+def _slow_square(value, delay):
+    time.sleep(delay)
+    return value * value
+
+
+def test_cpu_tasks_run_in_worker_processes():
+    """Test that CPU tasks run outside this process and keep their order."""
+    pool = WorkerPoolService(cpu_workers=2, io_workers=2)
+
+    async def run():
+        return await asyncio.gather(*(pool.run_cpu(_square, i) for i in range(6)))
+
+    try:
+        results = asyncio.run(run())
+        stats = pool.get_stats()
+    finally:
+        pool.shutdown()
+
+    assert [value for value, _ in results] == [0, 1, 4, 9, 16, 25]
+    assert os.getpid() not in {pid for _, pid in results}
+    assert stats["cpu"]["completed"] == 6
+    assert stats["cpu"]["queue_depth"] == 0
+    assert stats["io"]["submitted"] == 0
+
+
+def test_io_queue_depth_and_errors():
+    """Test that waiting tasks are counted as queued and errors propagate."""
+    pool = WorkerPoolService(cpu_workers=1, io_workers=1)
+    release = threading.Event()
+
+    async def run():
+        tasks = [asyncio.create_task(pool.run_io(release.wait)) for _ in range(3)]
+        await asyncio.sleep(0.1)
+        stats = pool.get_stats()["io"]
+        release.set()
+        await asyncio.gather(*tasks)
+        with pytest.raises(ValueError, match="rotto"):
+            await pool.run_io(_fail, "rotto")
+        return stats
+
+    try:
+        busy = asyncio.run(run())
+        stats = pool.get_stats()["io"]
+    finally:
+        pool.shutdown()
+
+    assert busy["busy_workers"] == 1
+    assert busy["queue_depth"] == 2
+    assert busy["utilization"] == 1.0
+    assert stats["completed"] == 3
+    assert stats["failed"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_cpu_tasks_submitted_from_threads():
+    """Test that synchronous callers share the CPU pool and its metrics."""
+    pool = WorkerPoolService(cpu_workers=1, io_workers=1)
+
+    try:
+        first = pool.submit_cpu(_slow_square, 3, 0.3)
+        second = pool.submit_cpu(_slow_square, 4, 0)
+        time.sleep(0.1)
+        busy = pool.get_stats()["cpu"]
+        assert [first.result(timeout=10), second.result(timeout=10)] == [9, 16]
+        with pytest.raises(ValueError, match="rotto"):
+            pool.submit_cpu(_fail, "rotto").result(timeout=10)
+        stats = pool.get_stats()["cpu"]
+    finally:
+        pool.shutdown()
+
+    assert busy["busy_workers"] == 1 and busy["queue_depth"] == 1
+    assert stats["submitted"] == 3
+    assert stats["completed"] == 2
+    assert stats["failed"] == 1
+    assert stats["queue_depth"] == 0 and stats["busy_workers"] == 0
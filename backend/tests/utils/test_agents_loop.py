@@ -0,0 +1,394 @@
+"""
+Tests for the fan-out generation mode of the agent loop. Model calls are
+replaced by a stub, so no API key or network access is needed.
+
+Usage:
+    pytest backend/tests/utils/test_agents_loop.py
+"""
+
+import asyncio
+import json
+
+from utils.agents_loop import FAN_OUT, AIAgentLoop
+
+SCORES = {"Bozza 0": 0.7, "Bozza 1": 0.85, "Bozza 2": 0.6}
+
+
+def make_loop(candidates=3, refined_score=0.95):
+    """Agent loop whose writer returns numbered drafts and whose reviewer scores them."""
+    loop = AIAgentLoop(mode=FAN_OUT, candidates=candidates)
+    calls = {"writer": 0, "reviewer": 0, "in_flight": 0, "max_in_flight": 0}
+
+    async def fake_call_model(prompt, system_prompt, **kwargs):
+        calls["in_flight"] += 1
+        calls["max_in_flight"] = max(calls["max_in_flight"], calls["in_flight"])
+        await asyncio.sleep(0.01)
+        calls["in_flight"] -= 1
+
+        if system_prompt == loop.writer_prompt:
+            calls["writer"] += 1
+            if prompt.startswith("=== BOZZA DA MIGLIORARE ==="):
+                return "Bozza migliorata"
+            return f"Bozza {calls['writer'] - 1}"
+
+        calls["reviewer"] += 1
+        draft = prompt.split("\n", 1)[1]
+        score = SCORES.get(draft, refined_score)
+        return json.dumps({"score": score, "suggestions": ["a", "b"]})
+
+    loop._call_model = fake_call_model
+    return loop, calls
+
+
+def test_fan_out_keeps_the_best_scored_candidate(monkeypatch):
+    """Test that candidates run concurrently and the best one is refined."""
+    monkeypatch.setattr("utils.agents_loop.AGENT_LOOP_REFINE", True)
+    loop, calls = make_loop()
+
+    result = asyncio.run(loop.generate_report("Sinistro: incendio capannone"))
+
+    assert calls["writer"] == 4  # three candidates and one refinement
+    assert calls["reviewer"] == 4
+    assert calls["max_in_flight"] == 3
+    assert result["draft"] == "Bozza migliorata"
+    assert result["iterations"] == 2
+    assert result["candidates"] == 3
+    ranked = [e for e in loop.logs if e["type"] == "candidates_ranked"][0]
+    assert [entry["score"] for entry in ranked["ranking"]] == [0.85, 0.7, 0.6]
+
+
+def test_worse_refinement_is_discarded(monkeypatch):
+    """Test that the refinement only replaces the best candidate if it scores higher."""
+    monkeypatch.setattr("utils.agents_loop.AGENT_LOOP_REFINE", True)
+    loop, _ = make_loop(refined_score=0.5)
+
+    result = asyncio.run(loop.generate_report("Sinistro: incendio capannone"))
+
+    assert result["draft"] == "Bozza 1"
+    assert result["feedback"]["score"] == 0.85
+
+
+def test_failed_candidates_are_skipped(monkeypatch):
+    """Test that one failing writer call does not fail the run."""
+    monkeypatch.setattr("utils.agents_loop.AGENT_LOOP_REFINE", False)
+    loop, calls = make_loop(candidates=2)
+    call_model = loop._call_model
+
+    async def flaky_call_model(prompt, system_prompt, **kwargs):
+        if system_prompt == loop.writer_prompt and calls["writer"] == 0:
+            calls["writer"] += 1
+            raise Exception("API call failed with status 500")
+        return await call_model(prompt, system_prompt, **kwargs)
+
+    loop._call_model = flaky_call_model
+
+    result = asyncio.run(loop.generate_report("Sinistro: incendio capannone"))
+
+    assert result["draft"] == "Bozza 1"
+    assert result["iterations"] == 1
+    assert result["candidates"] == 1
+
+
+def test_repairable_review_needs_no_retry(monkeypatch):
+    """Test that a fenced, single-quoted review is parsed without a second call."""
+    monkeypatch.setattr("utils.agents_loop.AGENT_LOOP_REFINE", False)
+    loop, calls = make_loop(candidates=1)
+
+    async def fenced_reviewer(prompt, system_prompt, **kwargs):
+        if system_prompt == loop.writer_prompt:
+            return "Bozza 0"
+        calls["reviewer"] += 1
+        assert kwargs["response_format"]["type"] == "json_schema"
+        return "```json\n{'score': 0.95, 'suggestions': []}\n```"
+
+    loop._call_model = fenced_reviewer
+
+    result = asyncio.run(loop.generate_report("Sinistro: incendio capannone"))
+
+    assert calls["reviewer"] == 1
+    assert result["feedback"] == {"score": 0.95, "suggestions": []}
+
+
+def use_fake_client(monkeypatch, tmp_path, requests, content="Report"):
+    """Route _call_model's requests to a canned reply and enable the response cache."""
+    from utils.llm_cache import LLMResponseCache
+
+    cache = LLMResponseCache(tmp_path, enabled=True)
+    monkeypatch.setattr("utils.agents_loop.llm_cache", cache)
+    monkeypatch.setattr("utils.agents_loop.OPENROUTER_API_KEY", "test-key")
+
+    class FakeResponse:
+        status_code = 200
+
+        def json(self):
+            return {"choices": [{"message": {"content": content}}], "usage": {}}
+
+    class FakeClient:
+        async def post(self, url, **kwargs):
+            requests.append(kwargs["json"])
+            return FakeResponse()
+
+    class FakeSlot:
+        async def __aenter__(self):
+            return FakeClient()
+
+        async def __aexit__(self, *args):
+            return False
+
+    monkeypatch.setattr(
+        "utils.agents_loop.http_client_pool.host_slot", lambda url: FakeSlot()
+    )
+    return cache
+
+
+def test_repeated_deterministic_call_is_served_from_cache(monkeypatch, tmp_path):
+    """Test that an identical deterministic request does not reach the provider twice."""
+    requests = []
+    cache = use_fake_client(monkeypatch, tmp_path, requests)
+    loop = AIAgentLoop()
+
+    async def run():
+        first = await loop._call_model("Redigi il report.", "Sistema", temperature=0)
+        second = await loop._call_model("Redigi il report.", "Sistema", temperature=0)
+        sampled = await loop._call_model("Redigi il report.", "Sistema", temperature=0.9)
+        default = await loop._call_model("Redigi il report.", "Sistema")
+        return first, second, sampled, default
+
+    assert asyncio.run(run()) == ("Report", "Report", "Report", "Report")
+    assert len(requests) == 3
+    assert requests[0]["temperature"] == 0
+    # Without a temperature the provider default is kept and the cache skipped
+    assert "temperature" not in requests[2]
+    assert cache.get_stats()["memory_hits"] == 1
+    assert cache.get_stats()["bypassed"] == 2
+
+
+def test_repeated_review_is_served_from_cache(monkeypatch, tmp_path):
+    """Test that reviewing the same draft again is answered from the response cache."""
+    requests = []
+    review = json.dumps({"score": 0.9, "suggestions": ["Aggiungi la data"]})
+    cache = use_fake_client(monkeypatch, tmp_path, requests, content=review)
+    loop = AIAgentLoop()
+
+    async def run():
+        first = await loop._review_draft("Bozza", "Contesto", iteration=1)
+        second = await AIAgentLoop()._review_draft("Bozza", "Contesto", iteration=1)
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first == second == {"score": 0.9, "suggestions": ["Aggiungi la data"]}
+    assert len(requests) == 1
+    assert requests[0]["temperature"] == 0
+    assert cache.get_stats()["memory_hits"] == 1
+
+
+class FakeStreamResponse:
+    """Server-sent event stream as returned by OpenRouter."""
+
+    status_code = 200
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    async def aiter_lines(self):
+        for line in self.lines:
+            yield line
+
+    async def aread(self):
+        return b""
+
+
+def use_fake_stream(monkeypatch, lines, requests):
+    """Route _call_model's streaming request to a canned event stream."""
+
+    class FakeStream:
+        async def __aenter__(self):
+            return FakeStreamResponse(lines)
+
+        async def __aexit__(self, *args):
+            return False
+
+    class FakeClient:
+        def stream(self, method, url, **kwargs):
+            requests.append(kwargs["json"])
+            return FakeStream()
+
+    class FakeSlot:
+        async def __aenter__(self):
+            return FakeClient()
+
+        async def __aexit__(self, *args):
+            return False
+
+    monkeypatch.setattr("utils.agents_loop.OPENROUTER_API_KEY", "test-key")
+    monkeypatch.setattr(
+        "utils.agents_loop.http_client_pool.host_slot", lambda url: FakeSlot()
+    )
+
+
+def test_streamed_call_forwards_deltas_with_offsets(monkeypatch):
+    """Test that streamed chunks reach on_delta in order with running offsets."""
+    requests = []
+    chunks = ["Il sinistro ", "è avvenuto ", "il 3 marzo."]
+    lines = [": OPENROUTER PROCESSING", ""]
+    lines += [
+        "data: " + json.dumps({"choices": [{"delta": {"content": chunk}}]})
+        for chunk in chunks
+    ]
+    lines += [
+        "data: not json",
+        "data: " + json.dumps({"choices": [], "usage": {"total_tokens": 42}}),
+        "data: [DONE]",
+    ]
+    use_fake_stream(monkeypatch, lines, requests)
+    loop = AIAgentLoop()
+    deltas = []
+
+    async def on_delta(delta, offset):
+        deltas.append((delta, offset))
+
+    content = asyncio.run(
+        loop._call_model("Redigi il report.", "Sistema", stream=True, on_delta=on_delta)
+    )
+
+    assert content == "".join(chunks)
+    assert deltas == [("Il sinistro ", 0), ("è avvenuto ", 12), ("il 3 marzo.", 23)]
+    assert requests[0]["stream"] is True
+    success = [e for e in loop.logs if e["type"] == "api_success"][0]
+    assert success["streamed"] is True and success["tokens"] == 42
+
+
+def test_stream_error_chunk_fails_the_call(monkeypatch):
+    """Test that an error event in the stream is raised instead of returning partial text."""
+    lines = [
+        "data: " + json.dumps({"choices": [{"delta": {"content": "Parziale"}}]}),
+        "data: " + json.dumps({"error": {"message": "overloaded"}}),
+    ]
+    use_fake_stream(monkeypatch, lines, [])
+    loop = AIAgentLoop()
+
+    try:
+        asyncio.run(loop._call_model("Redigi il report.", "Sistema", stream=True, retries=1))
+    except Exception as e:
+        assert "Stream error from provider" in str(e)
+    else:
+        raise AssertionError("stream error was not raised")
+
+
+def test_async_progress_updates_are_awaited_in_order(monkeypatch):
+    """Test that each async progress update finishes before the run moves on."""
+    monkeypatch.setattr("utils.agents_loop.AGENT_LOOP_REFINE", False)
+    updates = []
+
+    async def progress_callback(progress, message, stage=None, **kwargs):
+        # Earlier updates take longer, so unawaited callbacks would finish out of order
+        await asyncio.sleep(0.02 if progress < 50 else 0)
+        updates.append(progress)
+
+    loop, _ = make_loop(candidates=2)
+    loop.progress_callback = progress_callback
+
+    asyncio.run(loop.generate_report("Sinistro: incendio capannone"))
+
+    assert updates == sorted(updates)
+    assert updates[0] == 10 and updates[-1] == 100
+
+
+def make_sequential_loop(monkeypatch):
+    """Sequential agent loop whose model calls record the messages they would send."""
+    monkeypatch.setattr("utils.agents_loop.PROMPT_CACHE_ENABLED", True)
+    monkeypatch.setattr(AIAgentLoop, "brand_guide", "Guida brand")
+    monkeypatch.setattr(AIAgentLoop, "writer_prompt", "Sei il redattore.")
+    monkeypatch.setattr(AIAgentLoop, "reviewer_prompt", "Sei il revisore.")
+    loop = AIAgentLoop(max_loops=2, mode="sequential")
+    loop._load_references = lambda query: [
+        {"messages": [{"content": "Esempio input"}, {"content": "Esempio output"}]}
+    ]
+    calls = []
+
+    async def recording_call_model(prompt, system_prompt, prefix=None, **kwargs):
+        calls.append(
+            {
+                "role": "writer" if system_prompt == loop.writer_prompt else "reviewer",
+                "prompt": prompt,
+                "messages": loop._build_messages(prompt, system_prompt, prefix),
+            }
+        )
+        if calls[-1]["role"] == "writer":
+            return f"Bozza {len(calls)}"
+        return json.dumps({"score": 0.5, "suggestions": ["Aggiungi la data"]})
+
+    loop._call_model = recording_call_model
+    return loop, calls
+
+
+def test_cached_prefix_is_identical_across_writer_and_reviewer(monkeypatch):
+    """Test that every call of a run sends a byte-identical cache_control prefix."""
+    loop, calls = make_sequential_loop(monkeypatch)
+
+    asyncio.run(loop.generate_report("Sinistro: incendio capannone"))
+
+    assert [c["role"] for c in calls] == ["writer", "reviewer"] * 2
+    prefixes = [c["messages"][0]["content"][0] for c in calls]
+    assert prefixes[0]["cache_control"] == {"type": "ephemeral"}
+    assert "Sinistro: incendio capannone" in prefixes[0]["text"]
+    assert "Esempio output" in prefixes[0]["text"]
+    assert len({json.dumps(p, sort_keys=True) for p in prefixes}) == 1
+    # The role's system prompt follows the prefix, outside the cached block
+    assert calls[1]["messages"][0]["content"][1] == {
+        "type": "text",
+        "text": "Sei il revisore.",
+    }
+
+
+def test_per_call_suffix_carries_only_the_feedback(monkeypatch):
+    """Test that rewrites send the reviewer feedback, not the content again."""
+    loop, calls = make_sequential_loop(monkeypatch)
+
+    asyncio.run(loop.generate_report("Sinistro: incendio capannone"))
+
+    writers = [c for c in calls if c["role"] == "writer"]
+    assert writers[0]["prompt"] == "Redigi il report sulla base del contenuto utente."
+    assert writers[1]["prompt"] == "=== FEEDBACK PRECEDENTE ===\n- Aggiungi la data"
+    assert calls[1]["prompt"] == "=== TESTO GENERATO ===\nBozza 1"
+    for call in calls:
+        assert "Sinistro" not in call["messages"][1]["content"]
+
+
+def test_prefix_is_inlined_when_prompt_cache_is_disabled(monkeypatch):
+    """Test that without cache hints the prefix leads a plain system message."""
+    monkeypatch.setattr("utils.agents_loop.PROMPT_CACHE_ENABLED", False)
+    loop = AIAgentLoop()
+
+    messages = loop._build_messages("Richiesta", "Sistema", prefix="Contesto")
+
+    assert messages == [
+        {"role": "system", "content": "Contesto\n\nSistema"},
+        {"role": "user", "content": "Richiesta"},
+    ]
+    assert loop._build_messages("Richiesta", "Sistema")[0]["content"] == "Sistema"
+
+
+def test_prompt_token_report():
+    """Test that the report splits prompt tokens into prefix and suffix."""
+    from utils.prompt_builder import count_tokens
+
+    loop = AIAgentLoop()
+    prefix = "=== GUIDA BRAND ===\nGuida brand\n\n=== CONTENUTO UTENTE ===\nSinistro"
+    usage = {"prompt_tokens_details": {"cached_tokens": 17}}
+
+    report = loop._prompt_token_report("Redigi il report.", "Sistema", prefix, usage)
+
+    assert report == {
+        "prefix_tokens": count_tokens(prefix),
+        "suffix_tokens": count_tokens("Sistema") + count_tokens("Redigi il report."),
+        "cached_tokens": 17,
+    }
+    assert report["prefix_tokens"] > 0
+    no_prefix = loop._prompt_token_report("Redigi", "Sistema", None, {})
+    assert no_prefix["prefix_tokens"] == 0 and no_prefix["cached_tokens"] == 0
+    null_details = loop._prompt_token_report(
+        "Redigi", "Sistema", None, {"prompt_tokens_details": None}
+    )
+    assert null_details["cached_tokens"] == 0
@@ -0,0 +1,127 @@
+"""
+Tests for batched file and report data access.
+
+Usage:
+    pytest backend/tests/utils/test_document_store.py
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import utils.document_store as document_store
+from utils.document_store import (
+    append_document_ids,
+    fetch_files,
+    update_file_contents,
+)
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.ids = None
+
+    def select(self, columns):
+        return self
+
+    def in_(self, column, values):
+        self.ids = values
+        return self
+
+    async def execute(self):
+        self.client.round_trips += 1
+        return SimpleNamespace(
+            data=[self.client.files[i] for i in self.ids if i in self.client.files]
+        )
+
+
+class FakeRpc:
+    def __init__(self, client, name, params):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    async def execute(self):
+        self.client.round_trips += 1
+        self.client.rpc_calls.append((self.name, self.params))
+        if self.name == "update_file_contents":
+            updated = []
+            for update in self.params["p_updates"]:
+                record = self.client.files.get(update["file_id"])
+                if record is not None:
+                    record["content"] = update["content"]
+                    record["processed_at"] = update["processed_at"]
+                    updated.append(update["file_id"])
+            return SimpleNamespace(data=updated)
+        return SimpleNamespace(data=self.params["p_document_ids"])
+
+
+class FakeSupabase:
+    def __init__(self, files):
+        self.files = {record["file_id"]: record for record in files}
+        self.round_trips = 0
+        self.rpc_calls = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        return FakeRpc(self, name, params)
+
+
+def _files(count):
+    return [
+        {"file_id": f"id-{i}", "filename": f"doc{i}.pdf", "file_path": f"/f/{i}"}
+        for i in range(count)
+    ]
+
+
+def test_fetch_files_reads_in_batches(monkeypatch):
+    """Test that records are read with one request per batch of ids."""
+    monkeypatch.setattr(document_store, "DOCUMENT_STORE_BATCH_SIZE", 8)
+    supabase = FakeSupabase(_files(20))
+    ids = [f"id-{i}" for i in range(20)] + ["id-3", "missing"]
+
+    records = asyncio.run(fetch_files(supabase, ids))
+
+    assert supabase.round_trips == 3
+    assert len(records) == 20
+    assert records["id-3"]["filename"] == "doc3.pdf"
+    assert "missing" not in records
+
+
+def test_update_file_contents_sends_only_content_columns(monkeypatch):
+    """Test that extracted text is stored in batches without resending whole rows."""
+    monkeypatch.setattr(document_store, "DOCUMENT_STORE_BATCH_SIZE", 2)
+    supabase = FakeSupabase(_files(3))
+    updates = [
+        {"file_id": f"id-{i}", "content": f"text {i}", "processed_at": "2024-01-01"}
+        for i in range(3)
+    ]
+    updates.append({"file_id": "missing", "content": "x", "processed_at": "2024-01-01"})
+
+    asyncio.run(update_file_contents(supabase, updates))
+
+    assert supabase.round_trips == 2
+    sent = [row for _, params in supabase.rpc_calls for row in params["p_updates"]]
+    assert all(set(row) == {"file_id", "content", "processed_at"} for row in sent)
+    assert supabase.files["id-1"]["content"] == "text 1"
+    assert supabase.files["id-1"]["file_path"] == "/f/1"
+    assert "missing" not in supabase.files
+
+
+def test_append_document_ids_uses_one_rpc():
+    """Test that ids are appended through the atomic database function."""
+    supabase = FakeSupabase([])
+
+    result = asyncio.run(append_document_ids(supabase, "report-1", ["id-1", "id-2"]))
+    asyncio.run(append_document_ids(supabase, "report-1", []))
+
+    assert result == ["id-1", "id-2"]
+    assert supabase.rpc_calls == [
+        (
+            "append_report_document_ids",
+            {"p_report_id": "report-1", "p_document_ids": ["id-1", "id-2"]},
+        )
+    ]
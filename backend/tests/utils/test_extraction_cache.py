@@ -0,0 +1,100 @@
+"""
+Tests for the content-addressed extraction cache.
+
+Usage:
+    pytest backend/tests/utils/test_extraction_cache.py
+"""
+
+import os
+import tempfile
+
+import pytest
+
+from utils.extraction_cache import ExtractionCache, compute_file_hash
+
+
+def _write(directory, name, content):
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return path
+
+
+def test_identical_content_is_extracted_once():
+    """Test that two files with the same bytes share one cache entry."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ExtractionCache(os.path.join(temp_dir, "cache"))
+        first = _write(temp_dir, "a.txt", "same content")
+        second = _write(temp_dir, "b.txt", "same content")
+        calls = []
+
+        def extractor(path):
+            calls.append(path)
+            return "extracted"
+
+        assert cache.get_or_extract(first, extractor) == "extracted"
+        assert cache.get_or_extract(second, extractor) == "extracted"
+        assert len(calls) == 1
+
+        stats = cache.get_stats()
+        assert stats["misses"] == 1
+        assert stats["memory_hits"] == 1
+
+
+def test_disk_tier_survives_restart():
+    """Test that entries are served from disk by a new cache instance."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_dir = os.path.join(temp_dir, "cache")
+        path = _write(temp_dir, "doc.txt", "content")
+        content_hash = compute_file_hash(path)
+
+        ExtractionCache(cache_dir).put(content_hash, "text", "extracted")
+
+        reloaded = ExtractionCache(cache_dir)
+        assert reloaded.get(content_hash, "text") == "extracted"
+        assert reloaded.get_stats()["disk_hits"] == 1
+
+
+def test_namespaces_are_isolated():
+    """Test that different extractors do not share entries."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ExtractionCache(temp_dir)
+        cache.put("abc", "text", "from text")
+
+        assert cache.get("abc", "text") == "from text"
+        assert cache.get("abc", "text_extractor") is None
+
+
+def test_disk_eviction_respects_size_limit():
+    """Test that the least recently used disk entries are evicted first."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ExtractionCache(temp_dir, max_memory_items=0, max_disk_bytes=25)
+        cache.put("first", "text", "x" * 10)
+        cache.put("second", "text", "y" * 10)
+        cache.put("third", "text", "z" * 10)
+
+        stats = cache.get_stats()
+        assert stats["disk_bytes"] <= 25
+        assert stats["disk_evictions"] == 1
+        assert cache.get("first", "text") is None
+        assert cache.get("third", "text") == "z" * 10
+
+
+def test_failed_extractions_are_not_cached():
+    """Test that only a raised exception marks an extraction as failed."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ExtractionCache(os.path.join(temp_dir, "cache"))
+        path = _write(temp_dir, "doc.pdf", "not really a pdf")
+
+        def failing_extractor(p):
+            raise ValueError("corrupt PDF")
+
+        with pytest.raises(ValueError):
+            cache.get_or_extract(path, failing_extractor)
+        assert cache.get_stats()["stores"] == 0
+
+        # Text that merely starts with "Error" is a real document
+        result = cache.get_or_extract(path, lambda p: "Errore materiale nel preventivo")
+
+        assert result == "Errore materiale nel preventivo"
+        assert cache.get_stats()["stores"] == 1
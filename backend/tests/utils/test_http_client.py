@@ -0,0 +1,95 @@
+"""
+Tests for the shared HTTP client pool.
+
+Usage:
+    pytest backend/tests/utils/test_http_client.py
+"""
+
+import asyncio
+
+import pytest
+
+from utils.http_client import HttpClientPool
+
+URL = "https://openrouter.ai/api/v1/chat/completions"
+
+
+def test_host_slot_limits_concurrency_per_host():
+    """Test that no more than max_per_host requests run at once for a host."""
+    pool = HttpClientPool(max_per_host=2, http2=False)
+    in_flight = 0
+    peak = 0
+
+    async def request():
+        nonlocal in_flight, peak
+        async with pool.host_slot(URL):
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(6)))
+        await pool.close()
+
+    asyncio.run(run())
+
+    assert peak == 2
+
+
+def test_host_slot_limits_are_per_host():
+    """Test that a busy host does not block requests to another host."""
+    pool = HttpClientPool(max_per_host=1, http2=False)
+
+    async def run():
+        async with pool.host_slot(URL):
+            async with pool.host_slot("https://api.example.com/v1"):
+                stats = pool.get_stats()
+        await pool.close()
+        return stats
+
+    stats = asyncio.run(run())
+
+    assert stats["hosts"]["openrouter.ai"]["in_flight"] == 1
+    assert stats["hosts"]["api.example.com"]["in_flight"] == 1
+
+
+def test_stats_count_requests_and_failures():
+    """Test that requests and failures are counted per host and in total."""
+    pool = HttpClientPool(max_per_host=4, http2=False)
+
+    async def run():
+        for _ in range(3):
+            async with pool.host_slot(URL):
+                pass
+        with pytest.raises(RuntimeError):
+            async with pool.host_slot(URL):
+                raise RuntimeError("boom")
+        stats = pool.get_stats()
+        await pool.close()
+        return stats
+
+    stats = asyncio.run(run())
+
+    host = stats["hosts"]["openrouter.ai"]
+    assert host == {"requests": 4, "in_flight": 0, "waiting": 0, "failures": 1}
+    assert stats["total_requests"] == 4
+    assert stats["failed_requests"] == 1
+
+
+def test_close_resets_stats():
+    """Test that closing the pool clears per-host stats and counters."""
+    pool = HttpClientPool(max_per_host=4, http2=False)
+
+    async def run():
+        async with pool.host_slot(URL):
+            pass
+        await pool.close()
+
+    asyncio.run(run())
+
+    stats = pool.get_stats()
+    assert stats["hosts"] == {}
+    assert stats["total_requests"] == 0
+    assert stats["failed_requests"] == 0
+    assert stats["active"] is False
@@ -0,0 +1,74 @@
+"""
+Tests for the LLM response cache.
+
+Usage:
+    pytest backend/tests/utils/test_llm_cache.py
+"""
+
+import os
+import tempfile
+
+from utils.llm_cache import LLMResponseCache
+
+MESSAGES = [
+    {"role": "system", "content": "Sei un perito assicurativo."},
+    {"role": "user", "content": "Redigi il report."},
+]
+
+
+def test_identical_requests_share_an_entry():
+    """Test that the key depends on model, messages and temperature."""
+    key = LLMResponseCache.make_key("model-a", MESSAGES, 0.0)
+
+    assert key == LLMResponseCache.make_key("model-a", list(MESSAGES), 0.0)
+    assert key != LLMResponseCache.make_key("model-b", MESSAGES, 0.0)
+    assert key != LLMResponseCache.make_key("model-a", MESSAGES, 0.2)
+    assert key != LLMResponseCache.make_key("model-a", MESSAGES[:1], 0.0)
+
+
+def test_entries_survive_a_restart_and_expire():
+    """Test the disk tier and the TTL."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = LLMResponseCache(temp_dir, ttl_seconds=60, enabled=True)
+        key = cache.make_key("model-a", MESSAGES, 0.0)
+        cache.put(key, "Report generato", duration=12.5)
+
+        restarted = LLMResponseCache(temp_dir, ttl_seconds=60, enabled=True)
+        assert restarted.get(key) == "Report generato"
+        assert restarted.get_stats()["disk_hits"] == 1
+        assert restarted.get_stats()["time_saved"] == 12.5
+
+        expired = LLMResponseCache(temp_dir, ttl_seconds=0, enabled=True)
+        assert expired.get(key) is None
+        assert expired.get_stats()["expired"] == 1
+        assert not any(name.endswith(".json") for _, _, files in os.walk(temp_dir) for name in files)
+
+
+def test_least_recently_used_entries_are_evicted():
+    """Test that the disk tier keeps at most max_disk_items entries."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = LLMResponseCache(
+            temp_dir, max_memory_items=1, max_disk_items=2, enabled=True
+        )
+        keys = [cache.make_key("model-a", MESSAGES, float(i)) for i in range(3)]
+        cache.put(keys[0], "uno")
+        cache.put(keys[1], "due")
+        assert cache.get(keys[0]) == "uno"  # now the most recently used
+        cache.put(keys[2], "tre")
+
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) == "uno"
+        assert cache.get_stats()["evictions"] == 1
+
+
+def test_only_deterministic_requests_are_cacheable():
+    """Test the temperature bypass and the disabled cache."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = LLMResponseCache(temp_dir, max_temperature=0.2, enabled=True)
+        assert cache.is_cacheable(0.0)
+        assert cache.is_cacheable(0.2)
+        assert not cache.is_cacheable(0.9)
+        assert not cache.is_cacheable(None)
+
+        disabled = LLMResponseCache(temp_dir, enabled=False)
+        assert not disabled.is_cacheable(0.0)
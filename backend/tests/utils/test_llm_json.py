@@ -0,0 +1,59 @@
+"""
+Tests for tolerant parsing of model JSON replies.
+
+Usage:
+    pytest backend/tests/utils/test_llm_json.py
+"""
+
+from utils.llm_json import FAILED, PARSED, REPAIRED, parse_json_object, parse_review
+
+
+def test_valid_json_is_parsed_as_is():
+    """Test that a bare JSON reply needs no repair."""
+    review, outcome = parse_review('{"score": 0.8, "suggestions": ["Citare la polizza"]}')
+
+    assert outcome == PARSED
+    assert review == {"score": 0.8, "suggestions": ["Citare la polizza"]}
+
+
+def test_code_fence_and_surrounding_text_are_stripped():
+    """Test replies wrapped in a Markdown fence with text around it."""
+    reply = (
+        "Ecco la revisione richiesta:\n"
+        '```json\n{"score": 0.72, "suggestions": ["Usa {importo} in euro"]}\n```\n'
+        "Resto a disposizione."
+    )
+    review, outcome = parse_review(reply)
+
+    assert outcome == REPAIRED
+    assert review["score"] == 0.72
+    assert review["suggestions"] == ["Usa {importo} in euro"]
+
+
+def test_single_quoted_keys_as_in_the_reviewer_prompt():
+    """Test the Python-style format shown in prompts.json, with apostrophes."""
+    reply = (
+        "{\n  'score': 0.65,\n"
+        "  'suggestions': ['Riformula l'introduzione', \"Indica l'importo\",],\n"
+        "  'completo': False\n}"
+    )
+    review, outcome = parse_review(reply)
+
+    assert outcome == REPAIRED
+    assert review["score"] == 0.65
+    assert review["suggestions"] == ["Riformula l'introduzione", "Indica l'importo"]
+    assert review["completo"] is False
+
+
+def test_scores_are_normalized():
+    """Test that scores on other scales and string suggestions are coerced."""
+    review, _ = parse_review('{"score": "85", "suggestions": "Aggiungere la data"}')
+
+    assert review == {"score": 0.85, "suggestions": ["Aggiungere la data"]}
+
+
+def test_unrecoverable_replies_fail():
+    """Test that text without a usable object is reported as a failure."""
+    assert parse_review("Il report è ottimo.") == (None, FAILED)
+    assert parse_review('{"suggestions": []}') == (None, FAILED)
+    assert parse_json_object("{'score': 0.5") == (None, FAILED)
@@ -0,0 +1,70 @@
+"""
+Tests for the append-only metrics collector.
+
+Usage:
+    pytest backend/tests/utils/test_metrics.py
+"""
+
+import json
+import os
+import tempfile
+
+from utils.metrics import MetricsCollector
+
+
+def test_metrics_are_appended_and_reloaded():
+    """Test that flushed metrics survive a restart and are returned newest first."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        metrics_file = os.path.join(temp_dir, "metrics.json")
+        collector = MetricsCollector(metrics_file)
+        for i in range(3):
+            collector.add_metric("report_generation", {"duration": i, "timestamp": 100 + i})
+        collector.close()
+
+        with open(os.path.join(temp_dir, "metrics.jsonl")) as f:
+            assert len(f.readlines()) == 3
+
+        reloaded = MetricsCollector(metrics_file)
+        recent = reloaded.get_metrics("report_generation", limit=2)
+        assert [m["duration"] for m in recent] == [2, 1]
+        assert reloaded.count("report_generation") == 3
+        reloaded.close()
+
+
+def test_ring_buffer_is_bounded():
+    """Test that only the most recent metrics are kept in memory."""
+    collector = MetricsCollector(ring_size=5)
+    for i in range(20):
+        collector.add_metric("document_generation", {"value": i})
+
+    metrics = collector.get_metrics("document_generation")
+    assert [m["value"] for m in metrics] == [19, 18, 17, 16, 15]
+    assert collector.count("document_generation") == 20
+
+
+def test_windowed_aggregates():
+    """Test count/avg/min/max over the numeric fields of recent metrics."""
+    collector = MetricsCollector()
+    for duration in (1.0, 2.0, 6.0):
+        collector.add_metric("report_generation", {"duration": duration, "model": "x"})
+
+    aggregates = collector.get_aggregates("report_generation", window_seconds=300)
+    assert aggregates["count"] == 3
+    duration = aggregates["fields"]["duration"]
+    assert duration["avg"] == 3.0
+    assert duration["min"] == 1.0
+    assert duration["max"] == 6.0
+    assert "model" not in aggregates["fields"]
+
+
+def test_legacy_json_file_is_migrated():
+    """Test that a metrics.json from the old whole-file format is converted."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        metrics_file = os.path.join(temp_dir, "metrics.json")
+        with open(metrics_file, "w") as f:
+            json.dump({"report_generation": [{"duration": 4, "timestamp": 1}]}, f)
+
+        collector = MetricsCollector(metrics_file)
+        assert collector.get_metrics("report_generation")[0]["duration"] == 4
+        assert not os.path.exists(metrics_file)
+        collector.close()
@@ -0,0 +1,58 @@
+"""
+Tests for the histogram quantile helpers used by the /metrics exposition.
+
+Usage:
+    pytest backend/tests/utils/test_monitoring.py
+"""
+
+from prometheus_client import CollectorRegistry, Histogram, generate_latest
+
+from utils.monitoring import (
+    HistogramQuantileCollector,
+    histogram_quantile,
+    summarize_histogram,
+)
+
+
+def test_histogram_quantile_interpolates_within_bucket():
+    """Test linear interpolation inside the bucket that holds the quantile."""
+    buckets = [(1.0, 0), (2.0, 50), (4.0, 100), (float("inf"), 100)]
+    assert histogram_quantile(0.5, buckets) == 2.0
+    assert histogram_quantile(0.25, buckets) == 1.5
+    assert histogram_quantile(0.75, buckets) == 3.0
+
+
+def test_histogram_quantile_edge_cases():
+    """Test empty histograms and quantiles falling in the +Inf bucket."""
+    assert histogram_quantile(0.5, []) is None
+    assert histogram_quantile(0.5, [(1.0, 0), (float("inf"), 0)]) is None
+    assert histogram_quantile(0.99, [(1.0, 1), (float("inf"), 10)]) == 1.0
+
+
+def test_quantiles_are_exposed_per_label_set():
+    """Test that summaries and the text exposition carry p50/p95/p99 per series."""
+    registry = CollectorRegistry()
+    histogram = Histogram(
+        "test_latency_seconds",
+        "Test latency",
+        ["route"],
+        buckets=(0.1, 0.5, 1.0),
+        registry=registry,
+    )
+    for _ in range(90):
+        histogram.labels(route="/fast").observe(0.05)
+    for _ in range(10):
+        histogram.labels(route="/fast").observe(0.8)
+    histogram.labels(route="/slow").observe(0.7)
+
+    summaries = {s["labels"]["route"]: s for s in summarize_histogram(histogram)}
+    assert summaries["/fast"]["count"] == 100
+    assert summaries["/fast"]["quantiles"]["p50"] < 0.1
+    assert 0.5 < summaries["/fast"]["quantiles"]["p99"] <= 1.0
+    assert set(summaries["/slow"]["quantiles"]) == {"p50", "p95", "p99"}
+
+    registry.register(
+        HistogramQuantileCollector({"test_latency_seconds": histogram})
+    )
+    exposition = generate_latest(registry).decode()
+    assert 'test_latency_seconds_quantile{quantile="0.99",route="/fast"}' in exposition
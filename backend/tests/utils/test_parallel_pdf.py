@@ -0,0 +1,147 @@
+"""
+Tests for parallel PDF text extraction.
+
+Usage:
+    pytest backend/tests/utils/test_parallel_pdf.py
+"""
+
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import fitz
+
+import services.worker_pool
+import utils.parallel_pdf as parallel_pdf
+from utils.parallel_pdf import (
+    iter_pdf_pages_parallel,
+    offload_small_pdfs,
+    split_page_ranges,
+)
+
+
+class RecordingExecutor(ThreadPoolExecutor):
+    def __init__(self, delays=None):
+        super().__init__(max_workers=4)
+        self.ranges = []
+        # Seconds each range start waits before extracting
+        self.delays = delays or {}
+
+    def submit(self, fn, file_path, start, end):
+        self.ranges.append((start, end))
+        delay = self.delays.get(start, 0)
+
+        def run():
+            time.sleep(delay)
+            return fn(file_path, start, end)
+
+        return super().submit(run)
+
+
+def use_executor(monkeypatch, executor):
+    """Send the page ranges meant for the shared CPU pool to a test executor."""
+    monkeypatch.setattr(
+        services.worker_pool, "worker_pool", SimpleNamespace(submit_cpu=executor.submit)
+    )
+
+
+def _make_pdf(pages):
+    handle, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(handle)
+    with fitz.open() as doc:
+        for number in range(pages):
+            doc.new_page().insert_text((72, 72), f"Pagina {number + 1}")
+        doc.save(path)
+    return path
+
+
+def test_split_page_ranges():
+    """Test that pages are split into contiguous, nearly equal ranges."""
+    assert split_page_ranges(10, 3) == [(0, 4), (4, 7), (7, 10)]
+    assert split_page_ranges(2, 8) == [(0, 1), (1, 2)]
+    assert split_page_ranges(5, 1) == [(0, 5)]
+
+
+def test_pages_are_yielded_in_order(monkeypatch):
+    """Test that pages come back in document order even if early ranges finish last."""
+    executor = RecordingExecutor(delays={0: 0.2, 3: 0.1})
+    use_executor(monkeypatch, executor)
+    path = _make_pdf(9)
+    try:
+        pages = list(iter_pdf_pages_parallel(path, max_workers=3, min_pages=4))
+        assert executor.ranges == [(0, 3), (3, 6), (6, 9)]
+        assert [page.strip() for page in pages] == [
+            f"Pagina {number}" for number in range(1, 10)
+        ]
+    finally:
+        executor.shutdown()
+        os.remove(path)
+
+
+def test_small_pdfs_are_extracted_inline(monkeypatch):
+    """Test that documents under the page threshold never touch the pool."""
+    executor = RecordingExecutor()
+    use_executor(monkeypatch, executor)
+    path = _make_pdf(3)
+    try:
+        pages = list(iter_pdf_pages_parallel(path, max_workers=4, min_pages=16))
+        assert executor.ranges == []
+        assert [page.strip() for page in pages] == ["Pagina 1", "Pagina 2", "Pagina 3"]
+    finally:
+        executor.shutdown()
+        os.remove(path)
+
+
+def test_extraction_inside_a_pool_worker_runs_inline(monkeypatch):
+    """Test that a call from a daemonic pool worker does not start a nested pool."""
+    executor = RecordingExecutor()
+    use_executor(monkeypatch, executor)
+    monkeypatch.setattr(
+        parallel_pdf.multiprocessing,
+        "current_process",
+        lambda: SimpleNamespace(daemon=True),
+    )
+    path = _make_pdf(6)
+    try:
+        pages = list(iter_pdf_pages_parallel(path, max_workers=3, min_pages=2))
+        assert executor.ranges == []
+        assert len(pages) == 6
+    finally:
+        executor.shutdown()
+        os.remove(path)
+
+
+def test_small_pdfs_are_offloaded_whole(monkeypatch):
+    """Test that small PDFs go to the pool as one range only when offloading."""
+    executor = RecordingExecutor()
+    use_executor(monkeypatch, executor)
+    path = _make_pdf(3)
+    try:
+        inline = list(iter_pdf_pages_parallel(path, max_workers=4, min_pages=16))
+        assert executor.ranges == []
+
+        with offload_small_pdfs():
+            offloaded = list(iter_pdf_pages_parallel(path, max_workers=4, min_pages=16))
+        assert executor.ranges == [(0, 3)]
+        assert offloaded == inline
+        assert "Pagina 2" in offloaded[1]
+    finally:
+        executor.shutdown()
+        os.remove(path)
+
+
+def test_large_pdfs_are_split_into_ranges(monkeypatch):
+    """Test that large PDFs are still split across the workers."""
+    executor = RecordingExecutor()
+    use_executor(monkeypatch, executor)
+    path = _make_pdf(6)
+    try:
+        with offload_small_pdfs():
+            pages = list(iter_pdf_pages_parallel(path, max_workers=3, min_pages=4))
+        assert executor.ranges == [(0, 2), (2, 4), (4, 6)]
+        assert len(pages) == 6
+    finally:
+        executor.shutdown()
+        os.remove(path)
@@ -0,0 +1,114 @@
+"""
+Tests for the token-budgeted prompt builder, using the documents in
+tests/fixtures/prompt_docs.
+
+Usage:
+    pytest backend/tests/utils/test_prompt_builder.py
+"""
+
+from pathlib import Path
+
+from utils.prompt_builder import (
+    FAIR_SHARE,
+    HEAD_TAIL,
+    TRUNCATION_MARKER,
+    PromptBuilder,
+    count_tokens,
+    truncate_text,
+)
+
+FIXTURES_DIR = Path(__file__).parent.parent / "fixtures" / "prompt_docs"
+
+
+def load_fixture(name):
+    return (FIXTURES_DIR / name).read_text(encoding="utf-8")
+
+
+def test_prompt_within_budget_is_unchanged():
+    """Test that nothing is trimmed when all sections fit."""
+    brand_guide = load_fixture("brand_guide.txt")
+    note = load_fixture("nota_breve.txt")
+
+    builder = PromptBuilder(budget_tokens=10000)
+    builder.add_section("brand_guide", brand_guide, priority=2)
+    builder.add_section("user_docs", [note], priority=3)
+    sections = builder.build()
+
+    assert sections == {"brand_guide": brand_guide, "user_docs": note}
+    assert all(entry["action"] == "kept" for entry in builder.report)
+
+
+def test_lowest_priority_sections_are_trimmed_first():
+    """Test that references go before the brand guide, and user docs are kept."""
+    brand_guide = load_fixture("brand_guide.txt")
+    report = load_fixture("perizia_lunga.txt")
+    references = [report, report]
+    budget = count_tokens(brand_guide) + count_tokens(report)
+
+    builder = PromptBuilder(budget_tokens=budget)
+    builder.add_section("references", references, priority=1)
+    builder.add_section("brand_guide", brand_guide, priority=2)
+    builder.add_section("user_docs", report, priority=3)
+    sections = builder.build()
+
+    report_by_section = {entry["section"]: entry for entry in builder.report}
+    assert report_by_section["references"]["action"] == "dropped"
+    assert report_by_section["references"]["items"] == 0
+    assert report_by_section["references"]["total_items"] == 2
+    assert sections["brand_guide"] == brand_guide
+    assert sections["user_docs"] == report
+    assert sum(entry["tokens"] for entry in builder.report) <= budget
+
+
+def test_min_tokens_is_respected_and_reserve_is_kept_free():
+    """Test that a section is not cut below its minimum and the reserve is honoured."""
+    report = load_fixture("perizia_lunga.txt")
+    brand_guide = load_fixture("brand_guide.txt")
+
+    builder = PromptBuilder(budget_tokens=1500, reserved_tokens=500)
+    builder.add_section("brand_guide", brand_guide, priority=1, min_tokens=60)
+    builder.add_section("user_docs", report, priority=2, min_tokens=500, mode=HEAD_TAIL)
+    sections = builder.build()
+
+    assert count_tokens(sections["user_docs"]) <= 1000
+    assert count_tokens(sections["brand_guide"]) >= 60
+    # Head and tail of the document survive the cut
+    assert sections["user_docs"].startswith("Perizia di stima danni")
+    assert sections["user_docs"].rstrip().endswith("Ing. M. Bianchi.")
+    assert TRUNCATION_MARKER in sections["user_docs"]
+
+
+def test_fair_share_keeps_short_documents_whole():
+    """Test that a short document keeps its full text while a long one is cut."""
+    note = load_fixture("nota_breve.txt")
+    report = load_fixture("perizia_lunga.txt")
+
+    builder = PromptBuilder(budget_tokens=800)
+    builder.add_section("user_docs", [report, note], priority=1, mode=FAIR_SHARE)
+    text = builder.build()["user_docs"]
+
+    assert note in text
+    assert "Perizia di stima danni" in text
+    assert count_tokens(text) <= 800
+
+
+def test_max_tokens_caps_a_section_even_within_budget():
+    """Test that a per-section cap applies when the prompt fits overall."""
+    report = load_fixture("perizia_lunga.txt")
+
+    builder = PromptBuilder(budget_tokens=100000)
+    builder.add_section("feedback", report, priority=1, max_tokens=100)
+    sections = builder.build()
+
+    assert count_tokens(sections["feedback"]) <= 100
+    assert builder.report[0]["action"] == "trimmed"
+
+
+def test_truncate_text():
+    """Test head truncation and the no-op case."""
+    report = load_fixture("perizia_lunga.txt")
+    short = truncate_text(report, 50)
+
+    assert count_tokens(short) <= 50
+    assert short.endswith(TRUNCATION_MARKER)
+    assert truncate_text("breve", 50) == "breve"
@@ -0,0 +1,87 @@
+"""
+Tests for the reference report similarity index.
+
+Usage:
+    pytest backend/tests/utils/test_reference_index.py
+"""
+
+from utils.reference_index import ReferenceIndex, tokenize
+
+
+def make_example(request, report):
+    return {
+        "messages": [
+            {"role": "user", "content": request},
+            {"role": "assistant", "content": report},
+        ]
+    }
+
+
+EXAMPLES = [
+    make_example(
+        "Incendio in un capannone industriale",
+        "Le fiamme hanno danneggiato il tetto del capannone e i macchinari.",
+    ),
+    make_example(
+        "Tamponamento tra due autovetture",
+        "Il veicolo assicurato ha subito danni al paraurti posteriore.",
+    ),
+    make_example(
+        "Infiltrazione d'acqua da tubazione condominiale",
+        "La rottura della tubazione ha causato macchie di umidità sul soffitto.",
+    ),
+    make_example(
+        "Furto di merce dal magazzino",
+        "Ignoti hanno forzato la serranda del magazzino asportando la merce.",
+    ),
+]
+
+
+def build_index(tmp_path):
+    path = tmp_path / "reference_reports.jsonl"
+    index = ReferenceIndex(path)
+    index.build(EXAMPLES)
+    return index
+
+
+def test_top_k_ranks_the_most_similar_claim_first(tmp_path):
+    """Test that the closest example is returned first."""
+    index = build_index(tmp_path)
+
+    results = index.top_k("Perdita d'acqua dalla tubazione, umidità sul soffitto", k=2)
+
+    assert len(results) == 2
+    assert results[0] is EXAMPLES[2]
+
+
+def test_selection_is_deterministic(tmp_path):
+    """Test that the same query always gives the same examples in the same order."""
+    index = build_index(tmp_path)
+    query = "Incendio del magazzino con furto di merce"
+
+    assert index.top_k(query, k=3) == index.top_k(query, k=3)
+    assert index.top_k("", k=2) == EXAMPLES[:2]
+
+
+def test_index_is_built_from_file_on_first_use(tmp_path):
+    """Test lazy loading from the JSON Lines file."""
+    import json
+
+    path = tmp_path / "reference_reports.jsonl"
+    path.write_text(
+        "\n".join(json.dumps(example) for example in EXAMPLES) + "\n",
+        encoding="utf-8",
+    )
+    index = ReferenceIndex(path)
+
+    assert index.top_k("tamponamento autovetture paraurti", k=1) == [EXAMPLES[1]]
+    assert index.top_k("furto", k=10) == index.top_k("furto", k=len(EXAMPLES))
+
+
+def test_tokenize_drops_stopwords_and_numbers():
+    """Test that function words and figures are not indexed."""
+    assert tokenize("Il danno della tubazione è di 1.200 euro") == [
+        "danno",
+        "tubazione",
+        "euro",
+    ]
@@ -0,0 +1,97 @@
+"""
+Tests for the static asset registry.
+
+Usage:
+    pytest backend/tests/utils/test_static_assets.py
+"""
+
+import json
+import os
+
+import pytest
+
+from utils.static_assets import StaticAssetRegistry, read_json, read_text
+
+
+def bump_mtime(path):
+    """Move a file's mtime forward so the change is seen on coarse filesystems."""
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_assets_are_read_once(tmp_path):
+    """Test that repeated lookups return the same in-memory value."""
+    guide = tmp_path / "brand_guide.txt"
+    guide.write_text("Tono formale.", encoding="utf-8")
+    registry = StaticAssetRegistry()
+    registry.register("brand_guide", guide, read_text)
+
+    first = registry.get("brand_guide")
+    guide.write_text("Modificato senza cambiare mtime.", encoding="utf-8")
+    os.utime(guide, ns=(guide.stat().st_atime_ns, registry._assets["brand_guide"].mtime))
+
+    assert registry.get("brand_guide") is first
+
+
+def test_json_assets_are_immutable(tmp_path):
+    """Test that parsed JSON cannot be modified by a caller."""
+    prompts = tmp_path / "prompts.json"
+    prompts.write_text(json.dumps({"writer_system_prompt": "Scrivi", "tags": ["a"]}))
+    registry = StaticAssetRegistry()
+    registry.register("prompts", prompts, read_json)
+
+    value = registry.get("prompts")
+    assert value["writer_system_prompt"] == "Scrivi"
+    with pytest.raises(TypeError):
+        value["writer_system_prompt"] = "Altro"
+    assert value["tags"] == ("a",)
+
+
+def test_changed_files_are_reloaded_and_listeners_notified(tmp_path):
+    """Test mtime-based reloading and reload notifications."""
+    guide = tmp_path / "brand_guide.txt"
+    guide.write_text("Versione 1", encoding="utf-8")
+    registry = StaticAssetRegistry()
+    registry.register("brand_guide", guide, read_text)
+    received = []
+    registry.subscribe("brand_guide", received.append)
+    registry.load_all()
+
+    assert registry.refresh() == []
+
+    guide.write_text("Versione 2", encoding="utf-8")
+    bump_mtime(guide)
+
+    assert registry.refresh() == ["brand_guide"]
+    assert registry.get("brand_guide") == "Versione 2"
+    assert received == ["Versione 2"]
+
+
+def test_failed_reload_keeps_previous_value(tmp_path):
+    """Test that a broken file does not replace a good value."""
+    prompts = tmp_path / "prompts.json"
+    prompts.write_text(json.dumps({"writer_system_prompt": "Scrivi"}))
+    registry = StaticAssetRegistry()
+    registry.register("prompts", prompts, read_json)
+    registry.load_all()
+
+    prompts.write_text("{non valido")
+    bump_mtime(prompts)
+
+    assert registry.refresh() == []
+    assert registry.get("prompts")["writer_system_prompt"] == "Scrivi"
+
+
+def test_get_file_caches_bytes_by_path(tmp_path):
+    """Test that files looked up by path are cached and reloaded."""
+    template = tmp_path / "template.docx"
+    template.write_bytes(b"v1")
+    registry = StaticAssetRegistry()
+
+    assert registry.get_file(template) == b"v1"
+    assert registry.get_file(str(template)) is registry.get_file(template)
+
+    template.write_bytes(b"v2")
+    bump_mtime(template)
+    registry.refresh()
+    assert registry.get_file(template) == b"v2"
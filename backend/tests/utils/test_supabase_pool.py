@@ -0,0 +1,147 @@
+"""
+Tests for the Supabase connection pool.
+
+Usage:
+    pytest backend/tests/utils/test_supabase_pool.py
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import utils.supabase_helper as supabase_helper
+from utils.supabase_helper import SupabaseConnectionError, SupabaseConnectionPool
+
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FakeClient:
+    def __init__(self):
+        self._postgrest = FakeSession()
+
+    @property
+    def closed(self):
+        return self._postgrest.closed
+
+
+def _use_fake_clients(monkeypatch):
+    created = []
+
+    async def fake_create():
+        client = FakeClient()
+        created.append(client)
+        return client
+
+    monkeypatch.setattr(supabase_helper, "create_supabase_client", fake_create)
+    return created
+
+
+def test_clients_are_reused(monkeypatch):
+    """Test that a returned client is handed out again."""
+    created = _use_fake_clients(monkeypatch)
+    pool = SupabaseConnectionPool(max_size=2)
+
+    async def run():
+        for _ in range(5):
+            client = await pool.acquire()
+            await pool.release(client)
+
+    asyncio.run(run())
+
+    assert len(created) == 1
+    assert not created[0].closed
+    stats = pool.get_stats()
+    assert stats["checkouts"] == 5
+    assert stats["idle"] == 1 and stats["in_use"] == 0
+
+
+def test_pool_is_bounded_and_callers_wait(monkeypatch):
+    """Test that no more than max_size clients exist and waiters time out."""
+    created = _use_fake_clients(monkeypatch)
+    pool = SupabaseConnectionPool(max_size=2, acquire_timeout=0.05)
+
+    async def run():
+        first = await pool.acquire()
+        await pool.acquire()
+        with pytest.raises(SupabaseConnectionError):
+            await pool.acquire()
+
+        waiter = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0.01)
+        await pool.release(first)
+        return await waiter
+
+    assert asyncio.run(run()) is created[0]
+    assert len(created) == 2
+    assert pool.get_stats()["timeouts"] == 1
+
+
+def test_expired_idle_clients_are_closed(monkeypatch):
+    """Test that clients idle for too long are closed, at cleanup or at checkout."""
+    created = _use_fake_clients(monkeypatch)
+    pool = SupabaseConnectionPool(max_size=2, max_idle_seconds=100)
+
+    async def run():
+        client = await pool.acquire()
+        await pool.release(client)
+        pool._idle[-1].last_used = time.time() - 200
+        assert await pool.cleanup_expired() == 1
+
+        client = await pool.acquire()
+        await pool.release(client)
+        pool._idle[-1].last_used = time.time() - 200
+        assert await pool.acquire() is not client
+        return client
+
+    asyncio.run(run())
+
+    assert len(created) == 3
+    assert created[0].closed and created[1].closed
+    assert not created[2].closed
+    assert pool.get_stats()["discarded"] == 2
+
+
+def test_clear_closes_idle_clients(monkeypatch):
+    """Test that closing the pool closes its idle clients."""
+    created = _use_fake_clients(monkeypatch)
+    pool = SupabaseConnectionPool(max_size=2)
+
+    async def run():
+        first = await pool.acquire()
+        await pool.acquire()
+        await pool.release(first)
+        await pool.clear()
+
+    asyncio.run(run())
+
+    assert created[0].closed
+    assert not created[1].closed
+    assert pool.get_stats()["idle"] == 0
+
+
+def test_context_discards_client_after_connection_error(monkeypatch):
+    """Test that a client whose request failed at transport level is not reused."""
+    created = _use_fake_clients(monkeypatch)
+    monkeypatch.setattr(supabase_helper, "_connection_pool", SupabaseConnectionPool())
+
+    async def run():
+        with pytest.raises(httpx.ConnectError):
+            async with supabase_helper.async_supabase_client_context():
+                raise httpx.ConnectError("connection reset")
+        with pytest.raises(ValueError):
+            async with supabase_helper.async_supabase_client_context():
+                raise ValueError("bad query")
+        async with supabase_helper.async_supabase_client_context() as client:
+            return client
+
+    assert asyncio.run(run()) is created[1]
+    assert len(created) == 2
+    assert created[0].closed and not created[1].closed
@@ -0,0 +1,86 @@
+"""
+Tests for the pipeline tracer.
+
+Usage:
+    pytest backend/tests/utils/test_tracing.py
+"""
+
+import asyncio
+
+import pytest
+
+from utils.tracing import Tracer, set_trace_id
+
+
+def test_spans_nest_into_a_waterfall():
+    """Test that nested spans record their parent and depth."""
+    tracer = Tracer()
+    set_trace_id("8d1f6c2e-3f1a-4a7b-9c55-0a1b2c3d4e5f")
+    tracer.bind_task("task-1")
+
+    with tracer.span("agent_loop"):
+        with tracer.span("writer", iteration=1):
+            pass
+        with pytest.raises(ValueError):
+            with tracer.span("reviewer", iteration=1):
+                raise ValueError("bad json")
+
+    trace_id = tracer.get_task_trace_id("task-1")
+    waterfall = tracer.waterfall(trace_id)
+    spans = {s["name"]: s for s in waterfall["spans"]}
+
+    assert [s["name"] for s in waterfall["spans"]] == ["agent_loop", "writer", "reviewer"]
+    assert spans["writer"]["parent_id"] == spans["agent_loop"]["span_id"]
+    assert spans["writer"]["depth"] == 1
+    assert spans["reviewer"]["status"] == "error"
+    assert spans["reviewer"]["attributes"]["error"] == "bad json"
+
+
+def test_unbound_traces_are_not_stored():
+    """Test that spans outside a task trace are not recorded."""
+    tracer = Tracer()
+    set_trace_id("request-without-task")
+    with tracer.span("supabase"):
+        pass
+    assert tracer.waterfall("request-without-task") is None
+
+
+def test_trace_follows_background_tasks():
+    """Test that spans in tasks started by a traced task join its trace."""
+    tracer = Tracer()
+
+    async def stage(name):
+        with tracer.span(name):
+            await asyncio.sleep(0)
+
+    async def pipeline():
+        set_trace_id("request-1")
+        tracer.bind_task("task-2")
+        with tracer.span("pipeline"):
+            await asyncio.gather(
+                asyncio.create_task(stage("extraction")),
+                asyncio.create_task(stage("extraction")),
+            )
+
+    asyncio.run(pipeline())
+    waterfall = tracer.waterfall(tracer.get_task_trace_id("task-2"))
+    root = waterfall["spans"][0]
+    assert root["name"] == "pipeline"
+    assert [s["parent_id"] for s in waterfall["spans"][1:]] == [root["span_id"]] * 2
+
+
+def test_otlp_export_format():
+    """Test that exported spans use OTLP/JSON ids and timestamps."""
+    tracer = Tracer()
+    set_trace_id("request-2")
+    tracer.bind_task("task-3")
+    with tracer.span("docx_render", from_cache=False, pages=3):
+        pass
+
+    otlp = tracer.to_otlp(tracer.get_task_trace_id("task-3"))
+    span = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert len(span["traceId"]) == 32
+    assert len(span["spanId"]) == 16
+    assert int(span["endTimeUnixNano"]) >= int(span["startTimeUnixNano"])
+    assert {"key": "pages", "value": {"intValue": "3"}} in span["attributes"]
+    assert {"key": "from_cache", "value": {"boolValue": False}} in span["attributes"]
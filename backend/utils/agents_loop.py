@@ -1,16 +1,24 @@
 import asyncio
+import functools
+import inspect
 import json
 import logging
 import os
-import random
 import time
 from hashlib import md5
-from pathlib import Path
-from typing import Callable, Dict, List, Optional, Tuple
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 
 import httpx
 
 from .api_rate_limiter import rate_limiter
+from .http_client import http_client_pool
+from .llm_cache import DETERMINISTIC_TEMPERATURE, llm_cache
+from .llm_json import FAILED, REVIEW_RESPONSE_FORMAT, RETRIED, parse_review
+from .monitoring import LLM_REVIEW_PARSE, observe_llm_call
+from .prompt_builder import HEAD_TAIL, PromptBuilder, count_tokens, truncate_text
+from .reference_index import REFERENCE_TOP_K, reference_index
+from .static_assets import BRAND_GUIDE, PROMPTS, TEMPLATE_DOCX, static_assets
+from .tracing import tracer
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,16 +31,46 @@ OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")  # Empty string as fall
 FRONTEND_URL = os.getenv("FRONTEND_URL", "https://report-gen-liard.vercel.app/")
 APP_NAME = os.getenv("APP_NAME", "Generatore di Perizie")
 DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "google/gemini-2.0-pro-exp-02-05:free")
+# Mark the shared prompt prefix with cache_control breakpoints for providers that
+# need explicit hints (Anthropic, Gemini); others reuse identical prefixes implicitly
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE_ENABLED", "true").lower() == "true"
+# Part of the prompt budget kept for the per-call suffix (system prompt, draft, feedback)
+PROMPT_SUFFIX_RESERVE_TOKENS = int(os.getenv("PROMPT_SUFFIX_RESERVE_TOKENS", "16000"))
+# Cap on the reviewer feedback passed back to the writer
+PROMPT_FEEDBACK_MAX_TOKENS = int(os.getenv("PROMPT_FEEDBACK_MAX_TOKENS", "2000"))
+# Generation mode: "sequential" (write, review, rewrite...) or "fan_out"
+# (concurrent candidate drafts ranked by concurrent reviews)
+AGENT_LOOP_MODE = os.getenv("AGENT_LOOP_MODE", "sequential")
+# Number of candidate drafts written in fan-out mode
+AGENT_LOOP_CANDIDATES = int(os.getenv("AGENT_LOOP_CANDIDATES", "3"))
+# Sampling temperature of fan-out writers, high enough for candidates to differ
+AGENT_LOOP_CANDIDATE_TEMPERATURE = float(
+    os.getenv("AGENT_LOOP_CANDIDATE_TEMPERATURE", "0.9")
+)
+# Rewrite the best candidate once when it misses the quality threshold
+AGENT_LOOP_REFINE = os.getenv("AGENT_LOOP_REFINE", "true").lower() == "true"
+# Structured output requested from the reviewer: "json_schema" (strict schema),
+# "json_object" (any JSON) or "none". Providers without support ignore it and
+# the reply is repaired locally (see utils/llm_json.py)
+REVIEWER_RESPONSE_FORMAT = os.getenv("REVIEWER_RESPONSE_FORMAT", "json_schema")
+
+SEQUENTIAL = "sequential"
+FAN_OUT = "fan_out"
 
 
 class AIAgentLoop:
     def __init__(
-        self, max_loops: int = 3, progress_callback: Optional[Callable] = None
+        self,
+        max_loops: int = 3,
+        progress_callback: Optional[Callable] = None,
+        draft_callback: Optional[Callable[..., Awaitable[None]]] = None,
+        mode: str = AGENT_LOOP_MODE,
+        candidates: int = AGENT_LOOP_CANDIDATES,
     ):
         self.max_loops = max_loops
-        self.brand_guide = self._load_brand_guide()
-        self.reference_examples = self._load_references()
-        self.writer_prompt, self.reviewer_prompt = self._load_prompts()
+        # Generation strategy, see generate_report
+        self.mode = mode
+        self.candidates = max(1, candidates)
         # Cache for similar refinements
         self.refinement_cache = {}
         self.cache_max_size = 50  # Maximum cache entries
@@ -43,6 +81,8 @@ class AIAgentLoop:
         self.log_cleanup_interval = 60  # Cleanup logs every 60 seconds
         # Progress callback for real-time updates
         self.progress_callback = progress_callback
+        # Async callback receiving partial writer output; enables streaming
+        self.draft_callback = draft_callback
         # Network resilience settings
         self.network_backoff_factor = 1.5  # Exponential backoff factor
         self.max_retries = 5  # Maximum retry attempts for transient errors
@@ -79,58 +119,177 @@ class AIAgentLoop:
             "cancel_requested", {"message": "Processing cancellation requested"}
         )
 
-    def _update_progress(
+    async def _update_progress(
         self,
         progress: float,
         message: str,
         stage: str = None,
         estimated_time_remaining: float = None,
     ) -> None:
-        """Update progress via callback if provided"""
+        """
+        Update progress via callback if provided.
+        Async callbacks are awaited, so updates are delivered in order and
+        each one has finished before the next stage starts.
+        """
         if self.progress_callback and not self.is_cancelling:
             callback_data = {"progress": progress, "message": message}
             if stage:
                 callback_data["stage"] = stage
             if estimated_time_remaining is not None:
-                callback_data["estimatedTimeRemaining"] = estimated_time_remaining
-            self.progress_callback(**callback_data)
-
-    def _load_brand_guide(self) -> str:
-        """Load the brand guide from the data directory."""
-        guide_path = Path(__file__).parent.parent / "data" / "brand_guide.txt"
-        with open(guide_path, "r", encoding="utf-8") as f:
-            return f.read()
-
-    def _load_references(self) -> List[Dict]:
-        """Load and randomly select reference reports for style examples."""
-        refs_path = Path(__file__).parent.parent / "data" / "reference_reports.jsonl"
-        references = []
-        with open(refs_path, "r", encoding="utf-8") as f:
-            for line in f:
-                if line.strip():
-                    references.append(json.loads(line))
-        # Randomly select 5 examples to avoid bias
-        return random.sample(references, min(5, len(references)))
-
-    def _load_prompts(self) -> Tuple[str, str]:
-        """Load the system prompts from prompts.json."""
-        prompts_path = Path(__file__).parent.parent / "data" / "prompts.json"
-        with open(prompts_path, "r", encoding="utf-8") as f:
-            prompts = json.load(f)
-            return prompts["writer_system_prompt"], prompts["reviewer_system_prompt"]
-
-    def _load_template(self) -> str:
-        """Load the template.docx file for format reference."""
-        template_path = (
-            Path(__file__).parent.parent / "reference_reports" / "template.docx"
-        )
-        with open(template_path, "rb") as f:
-            return f.read()
+                callback_data["estimated_time_remaining"] = estimated_time_remaining
+            result = self.progress_callback(**callback_data)
+            if inspect.isawaitable(result):
+                await result
+
+    async def _forward_draft_delta(self, iteration: int, delta: str, offset: int) -> None:
+        """Forward a partial writer token chunk to the draft callback if provided"""
+        if self.draft_callback and not self.is_cancelling:
+            try:
+                await self.draft_callback(delta=delta, offset=offset, iteration=iteration)
+            except Exception as e:
+                logger.warning(f"Draft callback failed: {e}")
+
+    # Static assets are read from the shared registry on access, so creating a
+    # loop does no I/O and running loops pick up reloaded files
+
+    @property
+    def brand_guide(self) -> str:
+        """Brand guide from the data directory."""
+        return static_assets.get(BRAND_GUIDE)
+
+    @property
+    def writer_prompt(self) -> str:
+        """Writer system prompt from prompts.json."""
+        return static_assets.get(PROMPTS)["writer_system_prompt"]
+
+    @property
+    def reviewer_prompt(self) -> str:
+        """Reviewer system prompt from prompts.json."""
+        return static_assets.get(PROMPTS)["reviewer_system_prompt"]
+
+    def _load_references(self, query: str, k: int = REFERENCE_TOP_K) -> List[Dict]:
+        """Select the reference reports most similar to the claim as style examples."""
+        return reference_index.top_k(query, k)
+
+    def _load_template(self) -> bytes:
+        """Get the template.docx bytes for format reference."""
+        return static_assets.get(TEMPLATE_DOCX)
+
+    def _build_messages(
+        self, prompt: str, system_prompt: str, prefix: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Build the chat messages for a model call.
+        A shared prefix is placed first, ahead of the role's system prompt, so
+        that every writer and reviewer call of a run starts with identical
+        tokens the provider can serve from its prompt cache.
+        """
+        if not prefix:
+            return [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt},
+            ]
+
+        if PROMPT_CACHE_ENABLED:
+            system_content = [
+                {
+                    "type": "text",
+                    "text": prefix,
+                    "cache_control": {"type": "ephemeral"},
+                },
+                {"type": "text", "text": system_prompt},
+            ]
+        else:
+            system_content = f"{prefix}\n\n{system_prompt}"
+
+        return [
+            {"role": "system", "content": system_content},
+            {"role": "user", "content": prompt},
+        ]
+
+    def _prompt_token_report(
+        self, prompt: str, system_prompt: str, prefix: Optional[str], usage: Dict
+    ) -> Dict:
+        """
+        Per-call prompt size: tokens in the shared prefix and in the
+        call-specific suffix, and the prompt tokens the provider reported as
+        served from its cache
+        """
+        return {
+            "prefix_tokens": count_tokens(prefix or ""),
+            "suffix_tokens": count_tokens(system_prompt) + count_tokens(prompt),
+            "cached_tokens": (usage.get("prompt_tokens_details") or {}).get(
+                "cached_tokens", 0
+            ),
+        }
+
+    async def _read_stream(
+        self,
+        response: httpx.Response,
+        on_delta: Optional[Callable[[str, int], Awaitable[None]]] = None,
+    ) -> Tuple[str, Dict]:
+        """
+        Consume an OpenRouter server-sent event stream.
+        Returns the full completion text and the usage block, if the provider sent one.
+        """
+        parts: List[str] = []
+        offset = 0
+        usage: Dict = {}
+
+        async for line in response.aiter_lines():
+            # Skip blank separators and ": OPENROUTER PROCESSING" comments
+            if not line.startswith("data:"):
+                continue
+            payload = line[len("data:") :].strip()
+            if payload == "[DONE]":
+                break
+
+            try:
+                chunk = json.loads(payload)
+            except json.JSONDecodeError:
+                logger.debug(f"Skipping malformed stream chunk: {payload[:100]}")
+                continue
+
+            if "error" in chunk:
+                raise Exception(f"Stream error from provider: {chunk['error']}")
+            if chunk.get("usage"):
+                usage = chunk["usage"]
+
+            choices = chunk.get("choices") or []
+            delta = choices[0].get("delta", {}).get("content") if choices else None
+            if delta:
+                parts.append(delta)
+                if on_delta:
+                    await on_delta(delta, offset)
+                offset += len(delta)
+
+            if self.is_cancelling:
+                raise Exception("Operation cancelled by user")
+
+        return "".join(parts), usage
 
     async def _call_model(
-        self, prompt: str, system_prompt: str, retries: int = None
+        self,
+        prompt: str,
+        system_prompt: str,
+        retries: int = None,
+        stream: bool = False,
+        on_delta: Optional[Callable[[str, int], Awaitable[None]]] = None,
+        prefix: Optional[str] = None,
+        temperature: Optional[float] = None,
+        response_format: Optional[Dict] = None,
     ) -> str:
-        """Make an API call to the configured model via OpenRouter with rate limiting and retries."""
+        """
+        Make an API call to the configured model via OpenRouter with rate limiting and retries.
+        With stream=True the completion is read incrementally and each token chunk is passed
+        to on_delta(delta, offset); offset restarts at 0 if a retry restarts the stream.
+        A prefix shared by several calls is sent ahead of the system prompt and
+        marked for prompt caching (see _build_messages).
+        temperature overrides the provider's default sampling temperature and
+        response_format requests structured output from providers supporting it.
+        Calls with an explicit deterministic temperature are answered from the
+        LLM response cache when it is enabled (see utils/llm_cache.py).
+        """
         if retries is None:
             retries = self.max_retries
 
@@ -147,6 +306,22 @@ class AIAgentLoop:
         last_error = None
         start_time = time.time()
 
+        # Identical deterministic requests are served from the response cache
+        messages = self._build_messages(prompt, system_prompt, prefix)
+        cache_key = None
+        if llm_cache.is_cacheable(temperature):
+            cache_key = llm_cache.make_key(
+                DEFAULT_MODEL, messages, temperature, response_format
+            )
+            cached = await asyncio.to_thread(llm_cache.get, cache_key)
+            if cached is not None:
+                self.log_event("llm_cache_hit", {"model": DEFAULT_MODEL})
+                if stream and on_delta:
+                    await on_delta(cached, 0)
+                return cached
+        elif llm_cache.enabled:
+            llm_cache.record_bypass()
+
         # Get a token from the rate limiter before proceeding
         allowed = await rate_limiter.wait_for_token(
             "openrouter", tokens=1.0, max_wait=10.0
@@ -168,30 +343,84 @@ class AIAgentLoop:
                 self.log_event(
                     "api_call", {"attempt": attempt + 1, "model": DEFAULT_MODEL}
                 )
+                attempt_start = time.time()
 
-                async with httpx.AsyncClient() as client:
+                async with http_client_pool.host_slot(OPENROUTER_API_URL) as client:
                     # Calculate timeout with backoff
                     timeout = 30.0 * (
                         1 + (attempt * 0.5)
                     )  # Increase timeout with each retry
 
-                    response = await client.post(
-                        OPENROUTER_API_URL,
-                        headers={
+                    payload = {
+                        "model": DEFAULT_MODEL,
+                        "messages": messages,
+                        # Ask for usage (including cached tokens) on streams too
+                        "usage": {"include": True},
+                    }
+                    if temperature is not None:
+                        payload["temperature"] = temperature
+                    if response_format is not None:
+                        payload["response_format"] = response_format
+                    if stream:
+                        payload["stream"] = True
+                    request_kwargs = {
+                        "headers": {
                             "Authorization": f"Bearer {OPENROUTER_API_KEY}",
                             "Content-Type": "application/json",
                             "HTTP-Referer": FRONTEND_URL,
                             "X-Title": APP_NAME,
                         },
-                        json={
-                            "model": DEFAULT_MODEL,
-                            "messages": [
-                                {"role": "system", "content": system_prompt},
-                                {"role": "user", "content": prompt},
-                            ],
-                        },
-                        timeout=timeout,
-                    )
+                        "json": payload,
+                        "timeout": timeout,
+                    }
+
+                    if stream:
+                        async with client.stream(
+                            "POST", OPENROUTER_API_URL, **request_kwargs
+                        ) as response:
+                            if response.status_code == 200:
+                                content, usage = await self._read_stream(
+                                    response, on_delta
+                                )
+                                prompt_report = self._prompt_token_report(
+                                    prompt, system_prompt, prefix, usage
+                                )
+                                observe_llm_call(
+                                    DEFAULT_MODEL,
+                                    time.time() - attempt_start,
+                                    usage,
+                                    prompt_sections=prompt_report,
+                                )
+                                self.log_event(
+                                    "api_success",
+                                    {
+                                        "response_time": time.time() - start_time,
+                                        "tokens": usage.get("total_tokens", 0),
+                                        "streamed": True,
+                                        **prompt_report,
+                                    },
+                                )
+                                if cache_key and content:
+                                    await asyncio.to_thread(
+                                        llm_cache.put,
+                                        cache_key,
+                                        content,
+                                        time.time() - attempt_start,
+                                    )
+                                return content
+                            # Read the error body so it is available below
+                            await response.aread()
+                    else:
+                        response = await client.post(
+                            OPENROUTER_API_URL, **request_kwargs
+                        )
+
+                    if response.status_code != 200:
+                        observe_llm_call(
+                            DEFAULT_MODEL,
+                            time.time() - attempt_start,
+                            outcome="error",
+                        )
 
                     if response.status_code == 429:
                         self.log_event(
@@ -242,17 +471,31 @@ class AIAgentLoop:
 
                     response_data = response.json()
                     response_time = time.time() - start_time
+                    usage = response_data.get("usage") or {}
+                    prompt_report = self._prompt_token_report(
+                        prompt, system_prompt, prefix, usage
+                    )
+                    observe_llm_call(
+                        DEFAULT_MODEL,
+                        time.time() - attempt_start,
+                        usage,
+                        prompt_sections=prompt_report,
+                    )
                     self.log_event(
                         "api_success",
                         {
                             "response_time": response_time,
-                            "tokens": response_data.get("usage", {}).get(
-                                "total_tokens", 0
-                            ),
+                            "tokens": usage.get("total_tokens", 0),
+                            **prompt_report,
                         },
                     )
 
-                    return response_data["choices"][0]["message"]["content"]
+                    content = response_data["choices"][0]["message"]["content"]
+                    if cache_key and content:
+                        await asyncio.to_thread(
+                            llm_cache.put, cache_key, content, time.time() - attempt_start
+                        )
+                    return content
 
             except (
                 httpx.NetworkError,
@@ -260,6 +503,9 @@ class AIAgentLoop:
                 httpx.ConnectError,
             ) as e:
                 error_type = type(e).__name__
+                observe_llm_call(
+                    DEFAULT_MODEL, time.time() - attempt_start, outcome="error"
+                )
                 self.log_event(
                     "network_error",
                     {"attempt": attempt + 1, "error": str(e), "type": error_type},
@@ -328,35 +574,168 @@ class AIAgentLoop:
         # Generate MD5 hash
         return md5(key_words.encode()).hexdigest()
 
+    def _build_shared_prefix(self, user_content: str) -> str:
+        """
+        Build the context shared by every writer and reviewer call of a run.
+        It is kept byte-identical across calls so providers can cache it.
+        """
+        # Format the reference examples closest to this claim for prompts
+        reference_examples = self._load_references(user_content)
+        style_examples = [
+            f"=== ESEMPIO {i+1} ===\nInput:\n{ex['messages'][0]['content']}\n\nOutput:\n{ex['messages'][1]['content']}\n"
+            for i, ex in enumerate(reference_examples)
+        ]
+
+        # Fit the shared context into the prompt budget: reference examples
+        # are dropped first, then the brand guide and the user content are
+        # shortened, keeping room for the per-call suffix
+        builder = PromptBuilder(
+            reserved_tokens=PROMPT_SUFFIX_RESERVE_TOKENS, name="agent_loop"
+        )
+        builder.add_section("references", style_examples, priority=1, separator="\n")
+        builder.add_section("brand_guide", self.brand_guide, priority=2, min_tokens=1000)
+        builder.add_section(
+            "user_content", user_content, priority=3, min_tokens=4000, mode=HEAD_TAIL
+        )
+        sections = builder.build()
+        self.log_event("prompt_budget", {"sections": builder.report})
+
+        return (
+            f"=== GUIDA BRAND ===\n{sections['brand_guide']}\n\n"
+            f"=== RIFERIMENTI STILISTICI ===\n{sections['references']}\n\n"
+            f"=== CONTENUTO UTENTE ===\n{sections['user_content']}"
+        )
+
+    @staticmethod
+    def _format_feedback(feedback: Dict) -> str:
+        """Reviewer suggestions formatted for the writer, capped in size"""
+        if not feedback["suggestions"]:
+            return ""
+        suggestions = "\n".join(f"- {s}" for s in feedback["suggestions"])
+        return truncate_text(
+            f"=== FEEDBACK PRECEDENTE ===\n{suggestions}",
+            PROMPT_FEEDBACK_MAX_TOKENS,
+        )
+
+    @staticmethod
+    def _reviewer_response_format() -> Optional[Dict]:
+        """response_format for reviewer calls, per REVIEWER_RESPONSE_FORMAT"""
+        if REVIEWER_RESPONSE_FORMAT == "json_schema":
+            return REVIEW_RESPONSE_FORMAT
+        if REVIEWER_RESPONSE_FORMAT == "json_object":
+            return {"type": "json_object"}
+        return None
+
+    async def _call_reviewer(
+        self,
+        reviewer_input: str,
+        prefix: Optional[str] = None,
+        retry_instruction: str = "\n\nIMPORTANTE: Rispondi SOLO con un oggetto JSON valido nel formato specificato.",
+        span_details: Optional[Dict] = None,
+    ) -> Tuple[Optional[Dict], str]:
+        """
+        Call the reviewer and parse its feedback.
+        Replies wrapped in code fences, surrounded by text or written with
+        single quotes are repaired locally; the call is repeated with an
+        explicit JSON instruction only when no feedback can be recovered.
+
+        Returns:
+            (feedback, outcome): feedback is None if even the retry failed;
+            outcome is one of the utils.llm_json parse outcomes
+        """
+        response_format = self._reviewer_response_format()
+        review_result = await self._call_model(
+            reviewer_input,
+            self.reviewer_prompt,
+            prefix=prefix,
+            response_format=response_format,
+            temperature=DETERMINISTIC_TEMPERATURE,
+        )
+        feedback, outcome = parse_review(review_result)
+
+        if feedback is None:
+            self.log_event("reviewer_parse_error", span_details or {})
+            logger.warning(
+                "Failed to parse reviewer feedback JSON, retrying with explicit JSON instruction"
+            )
+            with tracer.span("reviewer_json_retry", **(span_details or {})):
+                review_result = await self._call_model(
+                    reviewer_input + retry_instruction,
+                    self.reviewer_prompt,
+                    prefix=prefix,
+                    response_format=response_format,
+                    temperature=DETERMINISTIC_TEMPERATURE,
+                )
+            feedback, _ = parse_review(review_result)
+            outcome = RETRIED if feedback is not None else FAILED
+
+        LLM_REVIEW_PARSE.labels(outcome=outcome).inc()
+        return feedback, outcome
+
+    async def _review_draft(
+        self, draft: str, shared_prefix: str, iteration: int, candidate: int = None
+    ) -> Dict:
+        """
+        Have the reviewer score a draft; an unusable reply scores it 0.
+        """
+        reviewer_input = f"=== TESTO GENERATO ===\n{draft}"
+        event_details = {"iteration": iteration}
+        if candidate is not None:
+            event_details["candidate"] = candidate
+
+        self.log_event("reviewer_start", event_details)
+        reviewer_start = time.time()
+        with tracer.span("reviewer", model=DEFAULT_MODEL, **event_details):
+            feedback, outcome = await self._call_reviewer(
+                reviewer_input, prefix=shared_prefix, span_details=event_details
+            )
+        reviewer_duration = time.time() - reviewer_start
+
+        if feedback is None:
+            self.log_event("reviewer_retry_failed", event_details)
+            logger.error("Failed to parse reviewer feedback JSON even after retry")
+            return {"score": 0, "suggestions": ["Errore nel formato del feedback"]}
+
+        if outcome == RETRIED:
+            self.log_event("reviewer_retry_success", {"score": feedback["score"]})
+        self.log_event(
+            "reviewer_complete",
+            {
+                **event_details,
+                "duration": reviewer_duration,
+                "score": feedback["score"],
+                "suggestions_count": len(feedback["suggestions"]),
+                "parse": outcome,
+            },
+        )
+        logger.info(
+            f"Feedback score: {feedback['score']}, suggestions: {len(feedback['suggestions'])}"
+        )
+        return feedback
+
     async def generate_report(self, user_content: str) -> Dict:
-        """Run the AI agent loop to generate and refine the report."""
+        """
+        Run the AI agent loop to generate and refine the report.
+        In fan-out mode the candidates are written and reviewed concurrently
+        instead (see _generate_fan_out).
+        """
+        if self.mode == FAN_OUT:
+            return await self._generate_fan_out(user_content)
+
         draft = ""
         feedback = {"score": 0, "suggestions": []}
         iteration_times = []
         self.is_cancelling = False  # Reset cancellation flag
 
         try:
-            # Format reference examples for prompts
-            style_examples = "\n".join(
-                [
-                    f"=== ESEMPIO {i+1} ===\nInput:\n{ex['messages'][0]['content']}\n\nOutput:\n{ex['messages'][1]['content']}\n"
-                    for i, ex in enumerate(self.reference_examples)
-                ]
-            )
-
-            # Pre-format feedback section
-            def format_feedback():
-                if not feedback["suggestions"]:
-                    return ""
-                suggestions = "\n".join(f"- {s}" for s in feedback["suggestions"])
-                return f"=== FEEDBACK PRECEDENTE ===\n{suggestions}"
+            shared_prefix = self._build_shared_prefix(user_content)
 
             # Initialize process
             self.log_event(
                 "process_start",
                 {"max_iterations": self.max_loops, "content_length": len(user_content)},
             )
-            self._update_progress(
+            await self._update_progress(
                 5, "Inizializzazione del processo di generazione", "initializing"
             )
 
@@ -379,29 +758,29 @@ class AIAgentLoop:
                 )
 
                 # Update progress - Writer phase
-                self._update_progress(
+                await self._update_progress(
                     base_progress,
                     f"L'agente di scrittura sta creando il report (iterazione {i+1}/{self.max_loops})",
                     "writing",
                 )
 
-                # Writer agent generates/refines the report
-                writer_input = f"""
-                === GUIDA BRAND ===
-                {self.brand_guide}
-
-                === RIFERIMENTI STILISTICI ===
-                {style_examples}
-
-                === CONTENUTO UTENTE ===
-                {user_content}
-
-                {format_feedback()}
-                """
+                # Writer agent generates/refines the report; only the
+                # feedback changes between iterations
+                writer_input = (
+                    self._format_feedback(feedback)
+                    or "Redigi il report sulla base del contenuto utente."
+                )
 
                 self.log_event("writer_start", {"iteration": i + 1})
                 writer_start = time.time()
-                draft = await self._call_model(writer_input, self.writer_prompt)
+                with tracer.span("writer", iteration=i + 1, model=DEFAULT_MODEL):
+                    draft = await self._call_model(
+                        writer_input,
+                        self.writer_prompt,
+                        stream=self.draft_callback is not None,
+                        on_delta=functools.partial(self._forward_draft_delta, i + 1),
+                        prefix=shared_prefix,
+                    )
                 writer_duration = time.time() - writer_start
                 self.log_event(
                     "writer_complete",
@@ -424,73 +803,14 @@ class AIAgentLoop:
                     raise Exception("Process cancelled by user")
 
                 # Update progress - Reviewer phase
-                self._update_progress(
+                await self._update_progress(
                     base_progress + 10,
                     f"L'agente di revisione sta analizzando il report (iterazione {i+1}/{self.max_loops})",
                     "reviewing",
                 )
 
                 # Reviewer agent analyzes the draft
-                reviewer_input = f"""
-                === GUIDA BRAND ===
-                {self.brand_guide}
-
-                === RIFERIMENTI STILISTICI ===
-                {style_examples}
-
-                === CONTENUTO UTENTE ===
-                {user_content}
-
-                === TESTO GENERATO ===
-                {draft}
-                """
-
-                self.log_event("reviewer_start", {"iteration": i + 1})
-                reviewer_start = time.time()
-                review_result = await self._call_model(
-                    reviewer_input, self.reviewer_prompt
-                )
-                reviewer_duration = time.time() - reviewer_start
-
-                try:
-                    feedback = json.loads(review_result)
-                    self.log_event(
-                        "reviewer_complete",
-                        {
-                            "iteration": i + 1,
-                            "duration": reviewer_duration,
-                            "score": feedback["score"],
-                            "suggestions_count": len(feedback["suggestions"]),
-                        },
-                    )
-                    logger.info(
-                        f"Feedback score: {feedback['score']}, suggestions: {len(feedback['suggestions'])}"
-                    )
-                except json.JSONDecodeError:
-                    self.log_event("reviewer_parse_error", {"iteration": i + 1})
-                    logger.warning(
-                        "Failed to parse reviewer feedback JSON, retrying with explicit JSON instruction"
-                    )
-                    # Retry with explicit JSON instruction
-                    review_result = await self._call_model(
-                        reviewer_input
-                        + "\n\nIMPORTANTE: Rispondi SOLO con un oggetto JSON valido nel formato specificato.",
-                        self.reviewer_prompt,
-                    )
-                    try:
-                        feedback = json.loads(review_result)
-                        self.log_event(
-                            "reviewer_retry_success", {"score": feedback["score"]}
-                        )
-                    except json.JSONDecodeError:
-                        self.log_event("reviewer_retry_failed", {})
-                        feedback = {
-                            "score": 0,
-                            "suggestions": ["Errore nel formato del feedback"],
-                        }
-                        logger.error(
-                            "Failed to parse reviewer feedback JSON even after retry"
-                        )
+                feedback = await self._review_draft(draft, shared_prefix, i + 1)
 
                 # Track iteration time for estimation
                 iteration_time = time.time() - iteration_start
@@ -505,7 +825,7 @@ class AIAgentLoop:
                     )
 
                     # Update progress with time estimate
-                    self._update_progress(
+                    await self._update_progress(
                         base_progress + 20,
                         f"Analisi completata per iterazione {i+1}/{self.max_loops}",
                         "reviewing",
@@ -530,7 +850,7 @@ class AIAgentLoop:
 
             # Process complete - update final progress
             if not self.is_cancelling:
-                self._update_progress(100, "Generazione report completata", "complete")
+                await self._update_progress(100, "Generazione report completata", "complete")
                 self.log_event(
                     "process_complete",
                     {
@@ -552,6 +872,216 @@ class AIAgentLoop:
             self._cleanup_logs()
             raise
 
+    def _fan_out_slots(self) -> asyncio.Semaphore:
+        """
+        Bound concurrent calls by the burst size of the openrouter rate
+        limiter, so a fan-out never queues behind its own requests
+        """
+        capacity = int(rate_limiter.get_limiter("openrouter").capacity)
+        return asyncio.Semaphore(max(1, min(self.candidates, capacity)))
+
+    @staticmethod
+    def _rank_key(candidate: Tuple[int, str, Dict]) -> Tuple[float, int, int]:
+        """Sort key ranking candidates by score, then fewest suggestions, then order"""
+        index, _, feedback = candidate
+        return (-float(feedback.get("score", 0)), len(feedback.get("suggestions", [])), index)
+
+    async def _generate_fan_out(self, user_content: str) -> Dict:
+        """
+        Generate the report by writing several candidate drafts concurrently,
+        scoring each with a concurrent reviewer call and keeping the best.
+        When the best candidate misses the quality threshold it is rewritten
+        once with its feedback, and the rewrite is kept if it scores higher.
+        This takes one or two write-and-review rounds instead of up to
+        max_loops sequential ones.
+        """
+        self.is_cancelling = False  # Reset cancellation flag
+        process_start = time.time()
+
+        try:
+            shared_prefix = self._build_shared_prefix(user_content)
+            slots = self._fan_out_slots()
+
+            self.log_event(
+                "process_start",
+                {
+                    "mode": FAN_OUT,
+                    "candidates": self.candidates,
+                    "content_length": len(user_content),
+                },
+            )
+            await self._update_progress(
+                10,
+                f"L'agente di scrittura sta creando {self.candidates} versioni del report",
+                "writing",
+            )
+
+            async def write(index: int) -> str:
+                async with slots:
+                    if self.is_cancelling:
+                        raise Exception("Process cancelled by user")
+                    self.log_event("writer_start", {"iteration": 1, "candidate": index})
+                    writer_start = time.time()
+                    with tracer.span(
+                        "writer", iteration=1, candidate=index, model=DEFAULT_MODEL
+                    ):
+                        draft = await self._call_model(
+                            "Redigi il report sulla base del contenuto utente.",
+                            self.writer_prompt,
+                            prefix=shared_prefix,
+                            temperature=AGENT_LOOP_CANDIDATE_TEMPERATURE,
+                        )
+                    self.log_event(
+                        "writer_complete",
+                        {
+                            "iteration": 1,
+                            "candidate": index,
+                            "duration": time.time() - writer_start,
+                            "output_length": len(draft),
+                        },
+                    )
+                    return draft
+
+            async def review(index: int, draft: str) -> Dict:
+                async with slots:
+                    if self.is_cancelling:
+                        raise Exception("Process cancelled by user")
+                    return await self._review_draft(
+                        draft, shared_prefix, iteration=1, candidate=index
+                    )
+
+            results = await asyncio.gather(
+                *(write(index) for index in range(self.candidates)),
+                return_exceptions=True,
+            )
+            if self.is_cancelling:
+                self.log_event(
+                    "process_cancelled",
+                    {"phase": "after_writing", "message": "Process cancelled by user"},
+                )
+                raise Exception("Process cancelled by user")
+
+            drafts = []
+            for index, result in enumerate(results):
+                if isinstance(result, BaseException):
+                    self.log_event(
+                        "candidate_failed", {"candidate": index, "error": str(result)}
+                    )
+                elif result.strip():
+                    drafts.append((index, result))
+            if not drafts:
+                errors = [r for r in results if isinstance(r, BaseException)]
+                raise errors[0] if errors else Exception("All candidate drafts were empty")
+
+            await self._update_progress(
+                50,
+                f"L'agente di revisione sta valutando {len(drafts)} versioni del report",
+                "reviewing",
+            )
+
+            reviews = await asyncio.gather(
+                *(review(index, draft) for index, draft in drafts),
+                return_exceptions=True,
+            )
+            candidates = [
+                (index, draft, feedback)
+                for (index, draft), feedback in zip(drafts, reviews)
+                if not isinstance(feedback, BaseException)
+            ]
+            if not candidates:
+                raise reviews[0]
+
+            candidates.sort(key=self._rank_key)
+            best_index, draft, feedback = candidates[0]
+            self.log_event(
+                "candidates_ranked",
+                {
+                    "ranking": [
+                        {"candidate": index, "score": fb.get("score", 0)}
+                        for index, _, fb in candidates
+                    ],
+                    "selected": best_index,
+                },
+            )
+            await self._forward_draft_delta(1, draft, 0)
+
+            meets_criteria, reason = self._evaluate_quality(feedback)
+            self.log_event(
+                "quality_check",
+                {"iteration": 1, "meets_criteria": meets_criteria, "reason": reason},
+            )
+
+            iterations = 1
+            if not meets_criteria and AGENT_LOOP_REFINE and not self.is_cancelling:
+                iterations = 2
+                await self._update_progress(
+                    70,
+                    "L'agente di scrittura sta migliorando la versione migliore",
+                    "writing",
+                )
+                writer_input = (
+                    f"=== BOZZA DA MIGLIORARE ===\n{draft}\n\n"
+                    f"{self._format_feedback(feedback)}"
+                )
+                self.log_event("writer_start", {"iteration": 2})
+                writer_start = time.time()
+                with tracer.span("writer", iteration=2, model=DEFAULT_MODEL):
+                    refined = await self._call_model(
+                        writer_input,
+                        self.writer_prompt,
+                        stream=self.draft_callback is not None,
+                        on_delta=functools.partial(self._forward_draft_delta, 2),
+                        prefix=shared_prefix,
+                    )
+                self.log_event(
+                    "writer_complete",
+                    {
+                        "iteration": 2,
+                        "duration": time.time() - writer_start,
+                        "output_length": len(refined),
+                    },
+                )
+
+                await self._update_progress(85, "Revisione della versione migliorata", "reviewing")
+                refined_feedback = await self._review_draft(refined, shared_prefix, 2)
+                if float(refined_feedback.get("score", 0)) >= float(feedback.get("score", 0)):
+                    draft, feedback = refined, refined_feedback
+                else:
+                    self.log_event(
+                        "refinement_discarded",
+                        {
+                            "score": refined_feedback.get("score", 0),
+                            "previous_score": feedback.get("score", 0),
+                        },
+                    )
+
+            if not self.is_cancelling:
+                await self._update_progress(100, "Generazione report completata", "complete")
+                self.log_event(
+                    "process_complete",
+                    {
+                        "mode": FAN_OUT,
+                        "iterations_completed": iterations,
+                        "final_score": feedback["score"],
+                        "total_duration": time.time() - process_start,
+                    },
+                )
+
+            self._cleanup_logs()
+
+            return {
+                "draft": draft,
+                "feedback": feedback,
+                "iterations": iterations,
+                "candidates": len(candidates),
+            }
+        except Exception as e:
+            self.log_event(
+                "process_error", {"error": str(e), "error_type": type(e).__name__}
+            )
+            self._cleanup_logs()
+            raise
+
     async def refine_report(
         self, refinement_prompt: str, progress_callback=None
     ) -> Dict:
@@ -646,8 +1176,7 @@ class AIAgentLoop:
             progress_callback(0.1, "Preparing refinement strategy")
 
         # Optimize references - only use 2 examples for refinement to save tokens
-        subset_count = min(2, len(self.reference_examples))
-        selected_examples = random.sample(self.reference_examples, subset_count)
+        selected_examples = self._load_references(content, k=2)
         "\n".join(
             [
                 f"=== ESEMPIO {i+1} ===\nOutput:\n{ex['messages'][1]['content']}"
@@ -732,32 +1261,20 @@ class AIAgentLoop:
             Score: 0-1 (0.9+ se le modifiche rispettano perfettamente le istruzioni)
             """
 
-            review_result = await self._call_model(reviewer_input, self.reviewer_prompt)
-
-            try:
-                feedback = json.loads(review_result)
+            feedback, _ = await self._call_reviewer(
+                reviewer_input,
+                retry_instruction='\n\nIMPORTANTE: RISPONDI SOLO CON JSON VALIDO {"score": 0.X, "suggestions": []}',
+            )
+            if feedback is None:
+                feedback = {
+                    "score": 0,
+                    "suggestions": ["Errore nel formato del feedback"],
+                }
+                logger.error("Failed to parse reviewer feedback JSON even after retry")
+            else:
                 logger.info(
                     f"Feedback score: {feedback['score']}, suggestions: {len(feedback['suggestions'])}"
                 )
-            except json.JSONDecodeError:
-                logger.warning(
-                    "Failed to parse reviewer feedback JSON, retrying with explicit JSON instruction"
-                )
-                review_result = await self._call_model(
-                    reviewer_input
-                    + '\n\nIMPORTANTE: RISPONDI SOLO CON JSON VALIDO {"score": 0.X, "suggestions": []}',
-                    self.reviewer_prompt,
-                )
-                try:
-                    feedback = json.loads(review_result)
-                except json.JSONDecodeError:
-                    feedback = {
-                        "score": 0,
-                        "suggestions": ["Errore nel formato del feedback"],
-                    }
-                    logger.error(
-                        "Failed to parse reviewer feedback JSON even after retry"
-                    )
 
             # Exit early if quality is high enough to save resources
             if feedback["score"] > 0.8:
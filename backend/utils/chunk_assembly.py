@@ -0,0 +1,171 @@
+"""
+In-place assembly of chunked uploads.
+The target file is preallocated when the upload starts and each chunk is
+written straight to its byte offset as it arrives, so finalizing an upload is
+a rename instead of a second read/write pass over every chunk.
+
+Stored uploads may be hard-linked to each other (see link_duplicate), so a
+final path is only ever replaced, never written through.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+from typing import BinaryIO, Union
+
+logger = logging.getLogger(__name__)
+
+# Name of the preallocated file inside an upload's chunks directory
+ASSEMBLY_FILENAME = "assembled.part"
+
+# Block size used when streaming a chunk to disk
+WRITE_BLOCK_SIZE = 1024 * 1024
+
+
+def preallocate_file(path: Union[str, os.PathLike], size: int) -> None:
+    """
+    Create a file of the given size to receive chunks.
+    Uses posix_fallocate where available so disk space is reserved up front;
+    elsewhere the file is extended sparsely.
+
+    Args:
+        path: Path of the file to create
+        size: Final size of the file in bytes
+    """
+    fd = os.open(str(path), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if size > 0 and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(fd, 0, size)
+                return
+            except OSError as e:
+                # Some filesystems (e.g. tmpfs on older kernels) do not support it
+                logger.debug(f"posix_fallocate failed for {path}, truncating: {e}")
+        os.ftruncate(fd, size)
+    finally:
+        os.close(fd)
+
+
+def _pwrite(fd: int, data: bytes, offset: int) -> None:
+    """Write all of data at offset, looping over short writes"""
+    view = memoryview(data)
+    while view:
+        if hasattr(os, "pwrite"):
+            written = os.pwrite(fd, view, offset)
+        else:
+            os.lseek(fd, offset, os.SEEK_SET)
+            written = os.write(fd, view)
+        view = view[written:]
+        offset += written
+
+
+def write_chunk_at(
+    path: Union[str, os.PathLike], offset: int, chunk: Union[bytes, BinaryIO]
+) -> int:
+    """
+    Write a chunk into a preallocated file at its byte offset.
+    Chunks touch disjoint ranges, so several can be written concurrently.
+
+    Args:
+        path: Path of the preallocated file
+        offset: Byte offset of the chunk in the final file
+        chunk: Chunk contents, as bytes or a binary file object to stream from
+
+    Returns:
+        Number of bytes written
+    """
+    fd = os.open(str(path), os.O_WRONLY)
+    try:
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            _pwrite(fd, chunk, offset)
+            return len(chunk)
+
+        written = 0
+        while block := chunk.read(WRITE_BLOCK_SIZE):
+            _pwrite(fd, block, offset + written)
+            written += len(block)
+        return written
+    finally:
+        os.close(fd)
+
+
+def replace_with_copy(
+    source_path: Union[str, os.PathLike], target_path: Union[str, os.PathLike]
+) -> None:
+    """
+    Copy a file to its final location through a temporary file next to it,
+    so an existing file at the target (and any hard link to it) is replaced
+    rather than overwritten.
+
+    Args:
+        source_path: Path of the file to copy
+        target_path: Final path of the upload
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(str(target_path)) or ".", prefix=".upload-"
+    )
+    os.close(fd)
+    try:
+        shutil.copy2(str(source_path), tmp_path)
+        os.replace(tmp_path, str(target_path))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def commit_assembled_file(
+    partial_path: Union[str, os.PathLike], target_path: Union[str, os.PathLike]
+) -> None:
+    """
+    Move a fully written file to its final location.
+    This is an atomic rename when both paths are on the same filesystem.
+
+    Args:
+        partial_path: Path of the preallocated file
+        target_path: Final path of the upload
+    """
+    try:
+        os.replace(str(partial_path), str(target_path))
+    except OSError:
+        # Cross-device move; fall back to a copy
+        replace_with_copy(partial_path, target_path)
+        os.unlink(str(partial_path))
+
+
+def link_duplicate(
+    existing_path: Union[str, os.PathLike], target_path: Union[str, os.PathLike]
+) -> bool:
+    """
+    Hard-link an identical, already stored file to the target path instead of
+    writing a second copy. The link is made under a temporary name and
+    renamed over the target, replacing any file already there.
+
+    Args:
+        existing_path: Path of the stored file with the same content digest
+        target_path: Final path of the upload
+
+    Returns:
+        True if the link was created, False if the caller must store the file
+    """
+    # Renaming a link over another link to the same file is a no-op
+    if os.path.exists(str(target_path)) and os.path.samefile(
+        str(existing_path), str(target_path)
+    ):
+        return True
+
+    tmp_path = os.path.join(
+        os.path.dirname(str(target_path)) or ".",
+        f".upload-{os.getpid()}-{os.urandom(8).hex()}",
+    )
+    try:
+        os.link(str(existing_path), tmp_path)
+        os.replace(tmp_path, str(target_path))
+        return True
+    except OSError as e:
+        logger.debug(f"Could not link {existing_path} to {target_path}: {e}")
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        return False
@@ -0,0 +1,113 @@
+"""
+Batched data access for uploaded files and their reports.
+
+Multi-document requests read and write the files table a page of ids at a
+time instead of once per document: reads use `in_()` filters, and extracted
+text is stored with the update_file_contents function
+(migrations/update_file_contents.sql), which updates only the content
+columns of each row. Documents are linked to a report with the
+append_report_document_ids function (migrations/append_report_document_ids.sql),
+which appends in one atomic statement instead of a read-modify-write of
+reports.document_ids.
+"""
+
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Ids per in_() filter, keeping the request URL well below proxy limits
+DOCUMENT_STORE_BATCH_SIZE = int(os.getenv("DOCUMENT_STORE_BATCH_SIZE", "100"))
+APPEND_DOCUMENT_IDS_FUNCTION = "append_report_document_ids"
+UPDATE_FILE_CONTENTS_FUNCTION = "update_file_contents"
+
+
+def _batches(items: Sequence[Any]) -> Iterable[Sequence[Any]]:
+    """Split a sequence into consecutive slices of DOCUMENT_STORE_BATCH_SIZE items"""
+    size = DOCUMENT_STORE_BATCH_SIZE
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+async def fetch_files(
+    supabase: Any, file_ids: Sequence[Any]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Get the file records of several documents.
+
+    Args:
+        supabase: Async Supabase client
+        file_ids: File ids, in any order and possibly repeated
+
+    Returns:
+        Mapping of file id (as a string) to its record; ids without a record
+        are missing from the mapping
+    """
+    unique_ids = list(dict.fromkeys(str(file_id) for file_id in file_ids))
+    records: Dict[str, Dict[str, Any]] = {}
+    for batch in _batches(unique_ids):
+        response = (
+            await supabase.table("files")
+            .select("*")
+            .in_("file_id", list(batch))
+            .execute()
+        )
+        for record in response.data or []:
+            records[str(record["file_id"])] = record
+    return records
+
+
+async def update_file_contents(
+    supabase: Any, updates: Sequence[Dict[str, Any]]
+) -> None:
+    """
+    Store the extracted text of several files with one call per batch.
+
+    Only the content and processed_at columns are sent and written; the rest
+    of each row is left as it is in the database, and ids without a row are
+    skipped.
+
+    Args:
+        supabase: Async Supabase client
+        updates: One dict per file with file_id, content and processed_at
+    """
+    rows = [
+        {
+            "file_id": str(update["file_id"]),
+            "content": update["content"],
+            "processed_at": update["processed_at"],
+        }
+        for update in updates
+    ]
+    for batch in _batches(rows):
+        await supabase.rpc(
+            UPDATE_FILE_CONTENTS_FUNCTION, {"p_updates": list(batch)}
+        ).execute()
+
+
+async def append_document_ids(
+    supabase: Any, report_id: str, document_ids: Sequence[Any]
+) -> List[str]:
+    """
+    Link documents to a report, skipping ones already linked.
+
+    Args:
+        supabase: Async Supabase client
+        report_id: Report to update
+        document_ids: Document ids to append
+
+    Returns:
+        The report's document ids after the append; empty if the report
+        does not exist
+    """
+    if not document_ids:
+        return []
+    response = await supabase.rpc(
+        APPEND_DOCUMENT_IDS_FUNCTION,
+        {
+            "p_report_id": str(report_id),
+            "p_document_ids": [str(document_id) for document_id in document_ids],
+        },
+    ).execute()
+    return list(response.data or [])
@@ -0,0 +1,374 @@
+"""
+Content-addressed cache for extracted document text.
+Entries are keyed on the SHA-256 of the file contents, so the same document
+uploaded twice (or re-analysed) costs a hash instead of another PDF/OCR pass.
+Two tiers: an in-memory LRU and an on-disk store, both bounded by size.
+"""
+
+import asyncio
+import hashlib
+import inspect
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() in (
+    "true",
+    "1",
+    "yes",
+)
+EXTRACTION_CACHE_DIR = os.getenv(
+    "EXTRACTION_CACHE_DIR",
+    str(Path(__file__).parent.parent / "cache" / "extraction"),
+)
+EXTRACTION_CACHE_MEMORY_ITEMS = int(os.getenv("EXTRACTION_CACHE_MEMORY_ITEMS", "256"))
+EXTRACTION_CACHE_MEMORY_MB = int(os.getenv("EXTRACTION_CACHE_MEMORY_MB", "64"))
+EXTRACTION_CACHE_DISK_MB = int(os.getenv("EXTRACTION_CACHE_DISK_MB", "512"))
+
+# Read size used when hashing files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def compute_file_hash(file_path: Union[str, Path], chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """
+    Compute the SHA-256 digest of a file without loading it into memory.
+
+    Args:
+        file_path: Path to the file
+        chunk_size: Number of bytes to read at a time
+
+    Returns:
+        Hex-encoded SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    with open(str(file_path), "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Two-tier (memory + disk) LRU cache of extracted text keyed on file content.
+    Each extraction entry point uses its own namespace so that different
+    extractors for the same file do not overwrite each other.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path],
+        max_memory_items: int = 256,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        max_disk_bytes: int = 512 * 1024 * 1024,
+        enabled: bool = True,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory for the on-disk store
+            max_memory_items: Maximum number of entries kept in memory
+            max_memory_bytes: Maximum total size of entries kept in memory
+            max_disk_bytes: Maximum total size of the on-disk store
+            enabled: When False every lookup is a miss and nothing is stored
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_memory_items = max_memory_items
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.enabled = enabled
+
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.RLock()
+
+        self.metrics = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "hash_time": 0.0,
+            "extraction_time": 0.0,
+        }
+
+        if self.enabled:
+            self._load_disk_index()
+
+    def _entry_path(self, key: str) -> Path:
+        """Get the on-disk path for a cache key"""
+        return self.cache_dir / key[:2] / f"{key}.txt"
+
+    @staticmethod
+    def make_key(content_hash: str, namespace: str) -> str:
+        """Build the cache key for a content hash and extractor namespace"""
+        return f"{content_hash}.{namespace}"
+
+    def _load_disk_index(self) -> None:
+        """Rebuild the disk index from existing files, oldest first"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            entries = []
+            for entry in self.cache_dir.glob("*/*.txt"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.stem, stat.st_size))
+
+            for _, key, size in sorted(entries):
+                self._disk_index[key] = size
+                self._disk_bytes += size
+
+            logger.info(
+                f"Extraction cache loaded {len(self._disk_index)} entries "
+                f"({self._disk_bytes / (1024 * 1024):.1f} MB) from {self.cache_dir}"
+            )
+            self._evict_disk()
+        except Exception as e:
+            logger.error(f"Error loading extraction cache index: {str(e)}")
+
+    def _remember(self, key: str, text: str) -> None:
+        """Add an entry to the memory tier and evict least recently used entries"""
+        size = len(text.encode("utf-8"))
+        if size > self.max_memory_bytes:
+            return
+
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key).encode("utf-8"))
+        self._memory[key] = text
+        self._memory_bytes += size
+
+        while self._memory and (
+            len(self._memory) > self.max_memory_items
+            or self._memory_bytes > self.max_memory_bytes
+        ):
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted.encode("utf-8"))
+            self.metrics["memory_evictions"] += 1
+
+    def _evict_disk(self) -> None:
+        """Remove least recently used disk entries until under the size limit"""
+        while self._disk_index and self._disk_bytes > self.max_disk_bytes:
+            key, size = self._disk_index.popitem(last=False)
+            self._disk_bytes -= size
+            self.metrics["disk_evictions"] += 1
+            try:
+                self._entry_path(key).unlink()
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Error evicting extraction cache entry {key}: {str(e)}")
+
+    def get(self, content_hash: str, namespace: str) -> Optional[str]:
+        """
+        Look up extracted text.
+
+        Args:
+            content_hash: SHA-256 digest of the file contents
+            namespace: Extractor namespace
+
+        Returns:
+            Cached text, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        key = self.make_key(content_hash, namespace)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.metrics["memory_hits"] += 1
+                return self._memory[key]
+
+            if key in self._disk_index:
+                entry_path = self._entry_path(key)
+                try:
+                    text = entry_path.read_text(encoding="utf-8")
+                    # Touch the entry so LRU order survives restarts
+                    os.utime(entry_path, None)
+                    self._disk_index.move_to_end(key)
+                    self._remember(key, text)
+                    self.metrics["disk_hits"] += 1
+                    return text
+                except FileNotFoundError:
+                    self._disk_bytes -= self._disk_index.pop(key)
+                except Exception as e:
+                    logger.warning(f"Error reading extraction cache entry {key}: {str(e)}")
+
+            self.metrics["misses"] += 1
+            return None
+
+    def put(self, content_hash: str, namespace: str, text: str) -> None:
+        """
+        Store extracted text in both tiers.
+
+        Args:
+            content_hash: SHA-256 digest of the file contents
+            namespace: Extractor namespace
+            text: Extracted text
+        """
+        if not self.enabled:
+            return
+
+        key = self.make_key(content_hash, namespace)
+        data = text.encode("utf-8")
+        with self._lock:
+            self._remember(key, text)
+            self.metrics["stores"] += 1
+
+            if len(data) > self.max_disk_bytes:
+                return
+
+            entry_path = self._entry_path(key)
+            try:
+                entry_path.parent.mkdir(parents=True, exist_ok=True)
+                # Write atomically so a crash never leaves a truncated entry
+                tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, entry_path)
+            except Exception as e:
+                logger.warning(f"Error writing extraction cache entry {key}: {str(e)}")
+                return
+
+            if key in self._disk_index:
+                self._disk_bytes -= self._disk_index.pop(key)
+            self._disk_index[key] = len(data)
+            self._disk_bytes += len(data)
+            self._evict_disk()
+
+    def _hash_file(self, file_path: Union[str, Path]) -> str:
+        """Hash a file and record the time spent"""
+        start_time = time.time()
+        content_hash = compute_file_hash(file_path)
+        with self._lock:
+            self.metrics["hash_time"] += time.time() - start_time
+        return content_hash
+
+    def get_or_extract(
+        self,
+        file_path: Union[str, Path],
+        extractor: Callable[[str], str],
+        namespace: str = "text",
+    ) -> str:
+        """
+        Return cached text for a file, running the extractor on a miss.
+        Extractors signal failure by raising; the exception propagates and
+        nothing is cached, while any text they return is stored as is.
+
+        Args:
+            file_path: Path to the file
+            extractor: Function that extracts text from a file path
+            namespace: Extractor namespace
+
+        Returns:
+            Extracted text
+        """
+        if not self.enabled:
+            return extractor(str(file_path))
+
+        content_hash = self._hash_file(file_path)
+        cached = self.get(content_hash, namespace)
+        if cached is not None:
+            return cached
+
+        start_time = time.time()
+        text = extractor(str(file_path))
+        with self._lock:
+            self.metrics["extraction_time"] += time.time() - start_time
+
+        self.put(content_hash, namespace, text)
+        return text
+
+    async def aget_or_extract(
+        self,
+        file_path: Union[str, Path],
+        extractor: Callable[[str], Union[str, Awaitable[str]]],
+        namespace: str = "text",
+    ) -> str:
+        """
+        Async variant of get_or_extract. Hashing and cache I/O run in a worker
+        thread; the extractor may be a coroutine function or a plain function,
+        which is also run in a thread.
+
+        Args:
+            file_path: Path to the file
+            extractor: Sync or async function that extracts text from a file path
+            namespace: Extractor namespace
+
+        Returns:
+            Extracted text
+        """
+
+        async def run_extractor() -> str:
+            if inspect.iscoroutinefunction(extractor):
+                return await extractor(str(file_path))
+            return await asyncio.to_thread(extractor, str(file_path))
+
+        if not self.enabled:
+            return await run_extractor()
+
+        content_hash = await asyncio.to_thread(self._hash_file, file_path)
+        cached = await asyncio.to_thread(self.get, content_hash, namespace)
+        if cached is not None:
+            return cached
+
+        start_time = time.time()
+        text = await run_extractor()
+        with self._lock:
+            self.metrics["extraction_time"] += time.time() - start_time
+
+        await asyncio.to_thread(self.put, content_hash, namespace, text)
+        return text
+
+    def clear(self) -> None:
+        """Remove every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            for key in list(self._disk_index):
+                try:
+                    self._entry_path(key).unlink()
+                except FileNotFoundError:
+                    pass
+            self._disk_index.clear()
+            self._disk_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with hit/miss counters and tier sizes
+        """
+        with self._lock:
+            hits = self.metrics["memory_hits"] + self.metrics["disk_hits"]
+            lookups = hits + self.metrics["misses"]
+            return {
+                "enabled": self.enabled,
+                **self.metrics,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk_index),
+                "disk_bytes": self._disk_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+            }
+
+
+# Global instance shared by all extraction entry points
+extraction_cache = ExtractionCache(
+    cache_dir=EXTRACTION_CACHE_DIR,
+    max_memory_items=EXTRACTION_CACHE_MEMORY_ITEMS,
+    max_memory_bytes=EXTRACTION_CACHE_MEMORY_MB * 1024 * 1024,
+    max_disk_bytes=EXTRACTION_CACHE_DISK_MB * 1024 * 1024,
+    enabled=EXTRACTION_CACHE_ENABLED,
+)
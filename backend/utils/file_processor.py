@@ -4,6 +4,7 @@ Centralizes common file handling functionality to reduce code duplication.
 """
 
 import base64
+import functools
 import json
 import logging
 import mimetypes
@@ -13,13 +14,34 @@ import shutil
 import time
 import uuid
 from pathlib import Path
-from typing import Any, BinaryIO, Dict, List, Optional, Union
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 import docx2txt
-import fitz
 import magic
 import pytesseract
-from PIL import Image
+from PIL import Image, ImageSequence
+
+from utils.chunk_assembly import (
+    ASSEMBLY_FILENAME,
+    commit_assembled_file,
+    link_duplicate,
+    preallocate_file,
+    write_chunk_at,
+)
+from utils.extraction_cache import extraction_cache
+from utils.monitoring import EXTRACTION_DURATION
+from utils.tracing import tracer
+from utils.parallel_pdf import iter_pdf_pages_parallel
+from utils.prompt_builder import FAIR_SHARE, PromptBuilder
+from utils.upload_checksum import (
+    CHECKSUM_ALGORITHM,
+    checksums_match,
+    ChunkHasher,
+    combine_chunk_checksums,
+    combine_content_digests,
+    hash_chunk,
+)
+from utils.upload_index import session_lock, upload_session_index
 
 # Import custom exceptions
 from utils.exceptions import (
@@ -78,6 +100,16 @@ class FileProcessor:
     # Chunked operation tracking - in production, use Redis or a database
     _chunked_uploads = {}
 
+    # Page-streaming text extractors keyed on detected file type and MIME type,
+    # populated with register_text_extractor
+    _text_extractors: Dict[str, Callable[[str], Iterator[str]]] = {}
+
+    # Separator placed between pages in combined extracted text
+    PAGE_SEPARATOR = "\n\n"
+
+    # Read size used when streaming a chunk to disk while hashing it
+    CHUNK_HASH_BLOCK_SIZE = 1024 * 1024
+
     @staticmethod
     def get_mime_type(file_path: Union[str, Path]) -> str:
         """
@@ -490,6 +522,107 @@ class FileProcessor:
             logger.error(f"Error detecting file type: {str(e)}")
             return None
 
+    @staticmethod
+    def _detect_mime_type(file_path: Union[str, Path]) -> str:
+        """
+        Detect MIME type from file content using libmagic, falling back to
+        the extension-based lookup
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            MIME type as string
+        """
+        try:
+            return magic.from_file(str(file_path), mime=True)
+        except Exception as e:
+            logger.debug(f"Magic MIME detection failed, using extension: {str(e)}")
+            return FileProcessor.get_mime_type(file_path)
+
+    @staticmethod
+    def _iter_pdf_pages(file_path: Union[str, Path]) -> Iterator[str]:
+        """
+        Yield the text of each page of a PDF file.
+        Large documents are split into page ranges extracted in parallel.
+
+        Args:
+            file_path: Path to the PDF file
+
+        Yields:
+            Text of one page
+        """
+        yield from iter_pdf_pages_parallel(file_path)
+
+    @staticmethod
+    def _iter_docx_pages(file_path: Union[str, Path]) -> Iterator[str]:
+        """
+        Yield the text of a DOCX file. DOCX has no fixed pagination, so the
+        whole document is a single page.
+
+        Args:
+            file_path: Path to the DOCX file
+
+        Yields:
+            Document text
+        """
+        yield docx2txt.process(str(file_path))
+
+    @staticmethod
+    def _iter_image_pages(file_path: Union[str, Path]) -> Iterator[str]:
+        """
+        Yield OCR text for each frame of an image (multi-page TIFFs have several)
+
+        Args:
+            file_path: Path to the image file
+
+        Yields:
+            Text of one frame
+        """
+        with Image.open(str(file_path)) as image:
+            for frame in ImageSequence.Iterator(image):
+                yield pytesseract.image_to_string(frame.convert("RGB"))
+
+    @staticmethod
+    def _read_text(file_path: str, chunk_size: int = 8192) -> str:
+        """
+        Read a file as UTF-8 text in chunks.
+
+        Args:
+            file_path: Path to the file
+            chunk_size: Size of chunks to read at a time
+
+        Returns:
+            Decoded text content
+        """
+        text_parts = []
+
+        with open(file_path, 'rb') as f:
+            while chunk := f.read(chunk_size):
+                # Process chunk and extract text
+                if chunk.strip():  # Only process non-empty chunks
+                    try:
+                        text = chunk.decode('utf-8', errors='ignore')
+                        text_parts.append(text)
+                    except Exception as e:
+                        logger.warning(f"Error processing chunk: {str(e)}")
+                        continue
+
+        return ''.join(text_parts)
+
+    @staticmethod
+    def _iter_text_pages(file_path: Union[str, Path]) -> Iterator[str]:
+        """
+        Yield the content of a plain text file as a single page
+
+        Args:
+            file_path: Path to the text file
+
+        Yields:
+            Decoded file content
+        """
+        yield FileProcessor._read_text(str(file_path))
+
     @staticmethod
     def _extract_text_from_pdf(file_path: Union[str, Path]) -> str:
         """
@@ -502,15 +635,7 @@ class FileProcessor:
             Extracted text
         """
         try:
-            doc = fitz.open(str(file_path))
-            text = ""
-
-            for page_num in range(doc.page_count):
-                page = doc[page_num]
-                text += page.get_text()
-
-            doc.close()
-            return text
+            return "".join(FileProcessor._iter_pdf_pages(file_path))
 
         except Exception as e:
             logger.error(f"Error extracting text from PDF: {str(e)}")
@@ -528,7 +653,7 @@ class FileProcessor:
             Extracted text
         """
         try:
-            return docx2txt.process(str(file_path))
+            return "".join(FileProcessor._iter_docx_pages(file_path))
 
         except Exception as e:
             logger.error(f"Error extracting text from DOCX: {str(e)}")
@@ -546,53 +671,210 @@ class FileProcessor:
             Extracted text
         """
         try:
-            image = Image.open(str(file_path))
-            text = pytesseract.image_to_string(image)
-            return text
+            return "\n".join(FileProcessor._iter_image_pages(file_path))
 
         except Exception as e:
             logger.error(f"Error extracting text from image: {str(e)}")
             return f"Error extracting text from image: {str(e)}"
 
+    @classmethod
+    def register_text_extractor(
+        cls, extractor: Callable[[str], Iterator[str]], *keys: str
+    ) -> None:
+        """
+        Register a page-streaming text extractor
+
+        Args:
+            extractor: Function yielding the text of each page of a file
+            *keys: File types (as returned by _detect_file_type, e.g. ".pdf")
+                and/or MIME types the extractor handles
+        """
+        for key in keys:
+            cls._text_extractors[key.lower()] = extractor
+
+    @classmethod
+    def _resolve_text_extractor(
+        cls, file_path: Union[str, Path]
+    ) -> Tuple[Optional[Callable[[str], Iterator[str]]], Optional[str], str]:
+        """
+        Pick the extractor for a file from its magic bytes, then its magic MIME
+        type, then its extension-based MIME type
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            Tuple of (extractor or None, detected file type, MIME type)
+        """
+        file_type = cls._detect_file_type(file_path)
+        mime_type = cls._detect_mime_type(file_path)
+
+        for key in (file_type, mime_type, cls.get_mime_type(file_path)):
+            if key and key.lower() in cls._text_extractors:
+                return cls._text_extractors[key.lower()], file_type, mime_type
+
+        # Anything that decodes as text is handled as plain text
+        if mime_type.startswith("text/") or cls.is_text_file(file_path):
+            return cls._iter_text_pages, file_type, mime_type
+
+        return None, file_type, mime_type
+
+    @staticmethod
+    def iter_text_pages(file_path: Union[str, Path]) -> Iterator[str]:
+        """
+        Stream the text of a file page by page using the registered extractor
+        for its format
+
+        Args:
+            file_path: Path to the file
+
+        Yields:
+            Text of one page
+
+        Raises:
+            FileProcessingException: If the format has no text extractor
+        """
+        extractor, file_type, mime_type = FileProcessor._resolve_text_extractor(
+            file_path
+        )
+        if extractor is None:
+            raise FileProcessingException(
+                message=f"No text extractor for file type {file_type or mime_type}",
+                details={"file_path": str(file_path), "mime_type": mime_type},
+            )
+        yield from extractor(str(file_path))
+
+    @staticmethod
+    def _extract_pages_uncached(
+        file_path: str, extractor: Optional[Callable[[str], Iterator[str]]] = None
+    ) -> str:
+        """
+        Extract all pages of a file and serialize them for the extraction cache.
+        Only runs on a cache miss, so the extraction time histogram measures
+        real extractor work.
+
+        Args:
+            file_path: Path to the file
+            extractor: Extractor to use instead of the one registered for the format
+
+        Returns:
+            JSON document with the list of page texts
+        """
+        start_time = time.time()
+        if extractor is not None:
+            pages = list(extractor(file_path))
+        else:
+            pages = list(FileProcessor.iter_text_pages(file_path))
+        # Files without a known signature are the ones decoded as text
+        file_type = FileProcessor._detect_file_type(file_path)
+        EXTRACTION_DURATION.labels(
+            file_type=file_type.lstrip(".") if file_type else "text"
+        ).observe(time.time() - start_time)
+        return json.dumps({"pages": pages}, ensure_ascii=False)
+
+    @staticmethod
+    def extract_pages(
+        file_path: Union[str, Path],
+        extractor: Optional[Callable[[str], Iterator[str]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Extract text from a file with a per-page index.
+        The index records where each page starts and ends in the combined text,
+        so callers can cap prompt size on page boundaries.
+
+        Args:
+            file_path: Path to the file
+            extractor: Extractor to use instead of the one registered for the format
+
+        Returns:
+            Dictionary with "text" (pages joined by PAGE_SEPARATOR) and "pages",
+            a list of {"page", "start", "end", "chars"} entries. If the file
+            is missing or cannot be read, "text" is empty and "error" holds
+            the reason.
+        """
+        if not os.path.exists(str(file_path)):
+            logger.warning(f"File does not exist: {file_path}")
+            return {
+                "text": "",
+                "pages": [],
+                "error": f"File does not exist: {file_path}",
+            }
+
+        try:
+            # Key the cache on the extractor too, so registering a different
+            # extractor for a format does not serve stale results
+            if extractor is None:
+                resolved, _, _ = FileProcessor._resolve_text_extractor(file_path)
+                namespace = f"pages.{resolved.__name__}" if resolved else "pages"
+            else:
+                namespace = f"pages.{extractor.__name__}"
+            with tracer.span("extraction", file=os.path.basename(str(file_path))):
+                payload = extraction_cache.get_or_extract(
+                    file_path,
+                    functools.partial(
+                        FileProcessor._extract_pages_uncached, extractor=extractor
+                    ),
+                    namespace=namespace,
+                )
+            pages = json.loads(payload)["pages"]
+        except FileProcessingException as e:
+            logger.warning(f"Skipping text extraction for {file_path}: {e.message}")
+            pages = []
+        except Exception as e:
+            logger.error(f"Error extracting text from {file_path}: {str(e)}")
+            return {"text": "", "pages": [], "error": str(e)}
+
+        index = []
+        offset = 0
+        for page_number, page_text in enumerate(pages, start=1):
+            if page_number > 1:
+                offset += len(FileProcessor.PAGE_SEPARATOR)
+            index.append(
+                {
+                    "page": page_number,
+                    "start": offset,
+                    "end": offset + len(page_text),
+                    "chars": len(page_text),
+                }
+            )
+            offset += len(page_text)
+
+        return {"text": FileProcessor.PAGE_SEPARATOR.join(pages), "pages": index}
+
     @staticmethod
     def extract_text(file_path: str, chunk_size: int = 8192) -> str:
         """
-        Extract text from a file using streaming to handle large files efficiently.
+        Extract text from a file, dispatching on its detected format.
+        PDFs, DOCX files and images go through their format extractors, and
+        text files are decoded. Results are served from the content-addressed
+        extraction cache when the same file contents have been extracted before.
         
         Args:
             file_path: Path to the file
-            chunk_size: Size of chunks to read at a time
+            chunk_size: Unused, kept for backwards compatibility
             
         Returns:
             Extracted text content
+
+        Raises:
+            IOError: If the file does not exist or extraction failed
         """
-        text_parts = []
-        
-        try:
-            with open(file_path, 'rb') as f:
-                while chunk := f.read(chunk_size):
-                    # Process chunk and extract text
-                    if chunk.strip():  # Only process non-empty chunks
-                        try:
-                            text = chunk.decode('utf-8', errors='ignore')
-                            text_parts.append(text)
-                        except Exception as e:
-                            logger.warning(f"Error processing chunk: {str(e)}")
-                            continue
-                            
-        except Exception as e:
-            logger.error(f"Error reading file {file_path}: {str(e)}")
-            raise IOError(f"Failed to read file: {str(e)}")
-        
-        return ''.join(text_parts)
+        extraction = FileProcessor.extract_pages(file_path)
+        if "error" in extraction:
+            raise IOError(f"Failed to read file: {extraction['error']}")
+        return extraction["text"]
 
     @staticmethod
-    def extract_text_from_files(file_paths: List[Union[str, Path]]) -> str:
+    def extract_text_from_files(
+        file_paths: List[Union[str, Path]], max_tokens: Optional[int] = None
+    ) -> str:
         """
         Extract text from multiple files and combine
 
         Args:
             file_paths: List of file paths
+            max_tokens: Optional token budget for the combined text. Every
+                document keeps a fair share; long ones are cut in the middle.
 
         Returns:
             Combined text from all files
@@ -600,15 +882,21 @@ class FileProcessor:
         all_text = []
 
         for file_path in file_paths:
-            text = FileProcessor.extract_text(file_path)
-
-            # Skip error messages
-            if not text.startswith("Error:") and not text.startswith(
-                "File does not exist:"
-            ):
-                all_text.append(text)
-
-        combined_text = "\n\n==== NEXT DOCUMENT ====\n\n".join(all_text)
+            # Skip files that could not be read
+            try:
+                all_text.append(FileProcessor.extract_text(file_path))
+            except IOError as e:
+                logger.warning(f"Skipping {file_path}: {str(e)}")
+
+        separator = "\n\n==== NEXT DOCUMENT ====\n\n"
+        if max_tokens is not None:
+            builder = PromptBuilder(budget_tokens=max_tokens, name="documents")
+            builder.add_section(
+                "documents", all_text, priority=1, mode=FAIR_SHARE, separator=separator
+            )
+            combined_text = builder.build()["documents"]
+        else:
+            combined_text = separator.join(all_text)
         logger.info(f"Extracted text from {len(all_text)} files")
 
         return combined_text
@@ -720,6 +1008,83 @@ class FileProcessor:
             )
             return False
 
+    @staticmethod
+    def _read_upload_metadata(chunks_dir: str) -> Dict[str, Any]:
+        """Read an upload's metadata.json"""
+        with open(os.path.join(chunks_dir, "metadata.json"), "r") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_upload_metadata(upload_info: Dict[str, Any]) -> None:
+        """
+        Replace an upload's metadata.json atomically, so readers in other
+        workers never see a partially written file. Callers hold session_lock.
+        """
+        metadata_path = os.path.join(upload_info["chunks_dir"], "metadata.json")
+        tmp_path = f"{metadata_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(upload_info, f)
+        os.replace(tmp_path, metadata_path)
+
+    @staticmethod
+    def _update_chunked_upload(
+        upload_id: str, chunks_dir: str, update: Callable[[Dict[str, Any]], None]
+    ) -> Dict[str, Any]:
+        """
+        Apply a change to an upload's metadata under the session lock.
+        The metadata is re-read from disk first, so changes made by other
+        workers since this one last looked are never overwritten.
+
+        Args:
+            upload_id: Upload ID from init_chunked_upload
+            chunks_dir: Directory holding the chunks and metadata.json
+            update: Function modifying the metadata dictionary in place
+
+        Returns:
+            The updated upload metadata
+        """
+        with session_lock(chunks_dir):
+            upload_info = FileProcessor._read_upload_metadata(chunks_dir)
+            update(upload_info)
+            FileProcessor._write_upload_metadata(upload_info)
+        FileProcessor._chunked_uploads[upload_id] = upload_info
+        return upload_info
+
+    @staticmethod
+    def _load_chunked_upload(upload_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load an upload's metadata from its metadata.json, the only source of
+        truth: chunks of one upload may be received by different workers. The
+        chunks directory comes from memory or, when this process has not seen
+        the upload (after a restart or on another worker), the session index.
+
+        Args:
+            upload_id: Upload ID from init_chunked_upload
+
+        Returns:
+            Upload metadata, or None if the upload is unknown
+        """
+        cached = FileProcessor._chunked_uploads.get(upload_id)
+        chunks_dir = (
+            cached["chunks_dir"] if cached else upload_session_index.lookup(upload_id)
+        )
+        if chunks_dir is None:
+            return None
+
+        try:
+            upload_info = FileProcessor._read_upload_metadata(chunks_dir)
+        except FileNotFoundError:
+            # The chunks directory is gone; drop the stale entries
+            FileProcessor._chunked_uploads.pop(upload_id, None)
+            upload_session_index.remove(upload_id)
+            return None
+        except Exception as e:
+            logger.error(f"Error loading metadata for upload {upload_id}: {str(e)}")
+            return None
+
+        FileProcessor._chunked_uploads[upload_id] = upload_info
+        return upload_info
+
     @staticmethod
     def init_chunked_upload(
         upload_id: str,
@@ -728,6 +1093,7 @@ class FileProcessor:
         file_size: int,
         mime_type: str,
         directory: Union[str, Path],
+        chunk_size: Optional[int] = None,
     ) -> Dict[str, Any]:
         """
         Initialize a chunked upload operation
@@ -739,6 +1105,8 @@ class FileProcessor:
             file_size: Total file size in bytes
             mime_type: File MIME type
             directory: Directory where chunks will be stored
+            chunk_size: Size of every chunk but the last. When given, the target
+                file is preallocated and chunks are written in place
 
         Returns:
             Dictionary with upload metadata
@@ -763,22 +1131,145 @@ class FileProcessor:
             "completed": False,
         }
 
-        # Store metadata
-        FileProcessor._chunked_uploads[upload_id] = upload_info
+        if chunk_size:
+            # Every chunk but the last is full and the last is not empty
+            if not chunk_size * (total_chunks - 1) < file_size <= chunk_size * total_chunks:
+                raise ValidationException(
+                    message=f"Chunk size {chunk_size} does not fit {total_chunks} chunks of {file_size} bytes",
+                    details={
+                        "chunk_size": chunk_size,
+                        "total_chunks": total_chunks,
+                        "file_size": file_size,
+                    },
+                )
+            partial_path = os.path.join(chunks_dir, ASSEMBLY_FILENAME)
+            preallocate_file(partial_path, file_size)
+            upload_info.update(
+                {
+                    "assembly": "in_place",
+                    "chunk_size": chunk_size,
+                    "partial_path": partial_path,
+                }
+            )
 
-        # Also save metadata to a file for persistence
-        metadata_path = os.path.join(chunks_dir, "metadata.json")
-        with open(metadata_path, "w") as f:
-            json.dump(upload_info, f)
+        # Store metadata; the file is what every worker reads
+        FileProcessor._chunked_uploads[upload_id] = upload_info
+        with session_lock(chunks_dir):
+            FileProcessor._write_upload_metadata(upload_info)
+        upload_session_index.register(upload_id, chunks_dir)
 
         logger.info(
             f"Initialized chunked upload {upload_id} for {filename} with {total_chunks} chunks"
         )
         return upload_info
 
+    @staticmethod
+    def _checksum_mismatch(
+        chunk_index: int, expected: str, actual: str
+    ) -> ValidationException:
+        """Build the error raised when a chunk does not match its client checksum"""
+        return ValidationException(
+            message=f"Checksum mismatch for chunk {chunk_index}",
+            details={
+                "chunk_index": chunk_index,
+                "expected_checksum": expected,
+                "actual_checksum": actual,
+                "algorithm": CHECKSUM_ALGORITHM,
+            },
+        )
+
+    @staticmethod
+    def _write_chunk_in_place(
+        upload_info: Dict[str, Any],
+        chunk_index: int,
+        chunk_data: BinaryIO,
+        checksum: Optional[str] = None,
+    ) -> Tuple[str, str]:
+        """
+        Write a chunk straight into the preallocated target file
+
+        Args:
+            upload_info: Upload metadata from init_chunked_upload
+            chunk_index: Index of this chunk (0-based)
+            chunk_data: Binary data for this chunk
+            checksum: Digest of the chunk sent by the client
+
+        Returns:
+            (checksum, content digest) of the chunk
+
+        Raises:
+            ValidationException: If the chunk is not exactly the expected size
+                or does not match its checksum
+        """
+        chunk_size = upload_info["chunk_size"]
+        offset = chunk_index * chunk_size
+        expected_size = min(chunk_size, upload_info["file_size"] - offset)
+
+        # Read one byte past the expected size so oversized chunks are detected,
+        # and check before writing so a bad chunk never clobbers a good one
+        data = chunk_data.read(expected_size + 1)
+        if len(data) != expected_size:
+            raise ValidationException(
+                message=f"Chunk {chunk_index} has the wrong size",
+                details={
+                    "chunk_index": chunk_index,
+                    "expected_size": expected_size,
+                    "received_size": len(data),
+                },
+            )
+
+        digest, content_digest = hash_chunk(data)
+        if not checksums_match(checksum, digest):
+            raise FileProcessor._checksum_mismatch(chunk_index, checksum, digest)
+
+        write_chunk_at(upload_info["partial_path"], offset, data)
+        return digest, content_digest
+
+    @staticmethod
+    def _write_chunk_file(
+        upload_info: Dict[str, Any],
+        chunk_index: int,
+        chunk_data: BinaryIO,
+        checksum: Optional[str] = None,
+    ) -> Tuple[str, str]:
+        """
+        Stream a chunk to its own file, hashing it on the way
+
+        Args:
+            upload_info: Upload metadata from init_chunked_upload
+            chunk_index: Index of this chunk (0-based)
+            chunk_data: Binary data for this chunk
+            checksum: Digest of the chunk sent by the client
+
+        Returns:
+            (checksum, content digest) of the chunk
+
+        Raises:
+            ValidationException: If the chunk does not match its checksum
+        """
+        chunk_path = os.path.join(upload_info["chunks_dir"], f"chunk_{chunk_index}")
+        tmp_path = f"{chunk_path}.tmp"
+        hasher = ChunkHasher()
+        with open(tmp_path, "wb") as chunk_file:
+            while block := chunk_data.read(FileProcessor.CHUNK_HASH_BLOCK_SIZE):
+                hasher.update(block)
+                chunk_file.write(block)
+
+        digest, content_digest = hasher.hexdigests()
+        if not checksums_match(checksum, digest):
+            os.unlink(tmp_path)
+            raise FileProcessor._checksum_mismatch(chunk_index, checksum, digest)
+
+        # Only replace a previously received copy once the new one is verified
+        os.replace(tmp_path, chunk_path)
+        return digest, content_digest
+
     @staticmethod
     def save_chunk(
-        upload_id: str, chunk_index: int, chunk_data: BinaryIO
+        upload_id: str,
+        chunk_index: int,
+        chunk_data: BinaryIO,
+        checksum: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Save a chunk of data for a chunked upload
@@ -787,38 +1278,25 @@ class FileProcessor:
             upload_id: Upload ID from init_chunked_upload
             chunk_index: Index of this chunk (0-based)
             chunk_data: Binary data for this chunk
+            checksum: Optional digest of the chunk computed by the client
+                (CHECKSUM_ALGORITHM, hex, optionally prefixed with "algorithm:")
 
         Returns:
             Dictionary with updated upload info
 
         Raises:
             NotFoundException: If upload_id is not found
-            ValidationException: If chunk_index is out of range
+            ValidationException: If chunk_index is out of range or the chunk
+                does not match its checksum
             FileProcessingException: If there's an error saving the chunk
         """
         # Check if we have this upload
-        if upload_id not in FileProcessor._chunked_uploads:
-            # Try to load from file
-            for root, dirs, files in os.walk(
-                os.path.dirname(os.path.dirname(__file__))
-            ):
-                for dir_name in dirs:
-                    if dir_name.startswith(f"chunks_{upload_id}"):
-                        chunks_dir = os.path.join(root, dir_name)
-                        metadata_path = os.path.join(chunks_dir, "metadata.json")
-                        if os.path.exists(metadata_path):
-                            with open(metadata_path, "r") as f:
-                                FileProcessor._chunked_uploads[upload_id] = json.load(f)
-                            break
-
-            # If still not found, raise error
-            if upload_id not in FileProcessor._chunked_uploads:
-                raise NotFoundException(
-                    message=f"Upload ID {upload_id} not found",
-                    details={"upload_id": upload_id},
-                )
-
-        upload_info = FileProcessor._chunked_uploads[upload_id]
+        upload_info = FileProcessor._load_chunked_upload(upload_id)
+        if upload_info is None:
+            raise NotFoundException(
+                message=f"Upload ID {upload_id} not found",
+                details={"upload_id": upload_id},
+            )
 
         # Validate chunk index
         if chunk_index < 0 or chunk_index >= upload_info["total_chunks"]:
@@ -830,11 +1308,18 @@ class FileProcessor:
                 },
             )
 
-        # Save chunk to file
-        chunk_path = os.path.join(upload_info["chunks_dir"], f"chunk_{chunk_index}")
+        # Write the chunk at its offset in the preallocated file, or to its own file
         try:
-            with open(chunk_path, "wb") as chunk_file:
-                shutil.copyfileobj(chunk_data, chunk_file)
+            if upload_info.get("assembly") == "in_place":
+                digest, content_digest = FileProcessor._write_chunk_in_place(
+                    upload_info, chunk_index, chunk_data, checksum
+                )
+            else:
+                digest, content_digest = FileProcessor._write_chunk_file(
+                    upload_info, chunk_index, chunk_data, checksum
+                )
+        except ValidationException:
+            raise
         except Exception as e:
             raise FileProcessingException(
                 message=f"Failed to save chunk {chunk_index} for upload {upload_id}",
@@ -845,75 +1330,101 @@ class FileProcessor:
                 },
             )
 
-        # Update upload info
-        upload_info["received_chunks"] += 1
-        upload_info["last_updated"] = time.time()
-
-        # Update status
-        if upload_info["received_chunks"] == upload_info["total_chunks"]:
-            upload_info["status"] = "ready_to_combine"
-        else:
-            upload_info["status"] = "in_progress"
-
-        # Update metadata file
+        def record_chunk(current: Dict[str, Any]) -> None:
+            # Count distinct chunks, so a resent chunk is not counted twice
+            checksums = current.setdefault("chunk_checksums", {})
+            checksums[str(chunk_index)] = digest
+            current.setdefault("chunk_content_digests", {})[str(chunk_index)] = content_digest
+            current["received_chunks"] = len(checksums)
+            current["last_updated"] = time.time()
+            if current["received_chunks"] == current["total_chunks"]:
+                current["status"] = "ready_to_combine"
+            else:
+                current["status"] = "in_progress"
+
+        # Record the chunk in the metadata other workers read
         try:
-            metadata_path = os.path.join(upload_info["chunks_dir"], "metadata.json")
-            with open(metadata_path, "w") as f:
-                json.dump(upload_info, f)
+            upload_info = FileProcessor._update_chunked_upload(
+                upload_id, upload_info["chunks_dir"], record_chunk
+            )
         except Exception as e:
-            logger.error(f"Failed to update metadata for upload {upload_id}: {str(e)}")
-            # Continue despite metadata update failure
+            raise FileProcessingException(
+                message=f"Failed to record chunk {chunk_index} for upload {upload_id}",
+                details={
+                    "error": str(e),
+                    "chunk_index": chunk_index,
+                    "upload_id": upload_id,
+                },
+            )
 
         logger.info(
             f"Saved chunk {chunk_index} for upload {upload_id} ({upload_info['received_chunks']}/{upload_info['total_chunks']})"
         )
         return upload_info
 
+    @staticmethod
+    def _combine_chunk_files(
+        upload_id: str, upload_info: Dict[str, Any], target_path: str
+    ) -> None:
+        """
+        Concatenate separately stored chunk files into the target file
+
+        Args:
+            upload_id: Upload ID from init_chunked_upload
+            upload_info: Upload metadata
+            target_path: Path of the combined file
+
+        Raises:
+            ValidationException: If a chunk file is missing
+        """
+        with open(target_path, "wb") as target_file:
+            for i in range(upload_info["total_chunks"]):
+                chunk_path = os.path.join(upload_info["chunks_dir"], f"chunk_{i}")
+                if not os.path.exists(chunk_path):
+                    raise ValidationException(
+                        message=f"Chunk {i} is missing",
+                        details={"upload_id": upload_id, "missing_chunk": i},
+                    )
+
+                with open(chunk_path, "rb") as chunk_file:
+                    shutil.copyfileobj(chunk_file, target_file)
+
     @staticmethod
     def complete_chunked_upload(
         upload_id: str,
         target_directory: Union[str, Path],
         target_filename: Optional[str] = None,
+        checksum: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
-        Complete a chunked upload by combining all chunks
+        Complete a chunked upload by combining all chunks.
+        An upload identical to a file stored earlier is hard-linked to that
+        file instead of being written again.
 
         Args:
             upload_id: Upload ID from init_chunked_upload
             target_directory: Directory where the final file will be saved
             target_filename: Optional custom filename for the final file
+            checksum: Optional whole-file checksum computed by the client
+                (see utils.upload_checksum.combine_chunk_checksums)
 
         Returns:
-            Dictionary with information about the final file
+            Dictionary with information about the final file, including its
+            checksum and whether it was deduplicated
 
         Raises:
             NotFoundException: If upload_id is not found
-            ValidationException: If upload is not complete or some chunks are missing
+            ValidationException: If upload is not complete, some chunks are
+                missing or the checksum does not match
             FileProcessingException: If there's an error combining chunks
         """
         # Check if we have this upload
-        if upload_id not in FileProcessor._chunked_uploads:
-            # Try to load from file
-            for root, dirs, files in os.walk(
-                os.path.dirname(os.path.dirname(__file__))
-            ):
-                for dir_name in dirs:
-                    if dir_name.startswith(f"chunks_{upload_id}"):
-                        chunks_dir = os.path.join(root, dir_name)
-                        metadata_path = os.path.join(chunks_dir, "metadata.json")
-                        if os.path.exists(metadata_path):
-                            with open(metadata_path, "r") as f:
-                                FileProcessor._chunked_uploads[upload_id] = json.load(f)
-                            break
-
-            # If still not found, raise error
-            if upload_id not in FileProcessor._chunked_uploads:
-                raise NotFoundException(
-                    message=f"Upload ID {upload_id} not found",
-                    details={"upload_id": upload_id},
-                )
-
-        upload_info = FileProcessor._chunked_uploads[upload_id]
+        upload_info = FileProcessor._load_chunked_upload(upload_id)
+        if upload_info is None:
+            raise NotFoundException(
+                message=f"Upload ID {upload_id} not found",
+                details={"upload_id": upload_id},
+            )
 
         # Check if all chunks have been received
         if upload_info["received_chunks"] != upload_info["total_chunks"]:
@@ -926,6 +1437,21 @@ class FileProcessor:
                 },
             )
 
+        # Whole-file checksum from the per-chunk digests; no need to re-read
+        file_checksum = combine_chunk_checksums(
+            upload_info.get("chunk_checksums", {}), upload_info["total_chunks"]
+        )
+        if checksum and not checksums_match(checksum, file_checksum or ""):
+            raise ValidationException(
+                message=f"Checksum mismatch for upload {upload_id}",
+                details={
+                    "upload_id": upload_id,
+                    "expected_checksum": checksum,
+                    "actual_checksum": file_checksum,
+                    "algorithm": CHECKSUM_ALGORITHM,
+                },
+            )
+
         # Generate a filename if not provided
         if not target_filename:
             target_filename = upload_info["original_filename"]
@@ -939,22 +1465,41 @@ class FileProcessor:
         # Create full target path
         target_path = FileProcessor.safe_path_join(target_directory, unique_filename)
 
+        content_digest = combine_content_digests(
+            upload_info.get("chunk_content_digests", {}), upload_info["total_chunks"]
+        )
+        duplicate_of = (
+            upload_session_index.find_duplicate(content_digest, upload_info["file_size"])
+            if content_digest
+            else None
+        )
+
         try:
             # Ensure target directory exists
             os.makedirs(os.path.dirname(target_path), exist_ok=True)
 
-            # Combine all chunks into the final file
-            with open(target_path, "wb") as target_file:
-                for i in range(upload_info["total_chunks"]):
-                    chunk_path = os.path.join(upload_info["chunks_dir"], f"chunk_{i}")
-                    if not os.path.exists(chunk_path):
-                        raise ValidationException(
-                            message=f"Chunk {i} is missing",
-                            details={"upload_id": upload_id, "missing_chunk": i},
-                        )
-
-                    with open(chunk_path, "rb") as chunk_file:
-                        shutil.copyfileobj(chunk_file, target_file)
+            deduplicated = bool(duplicate_of) and link_duplicate(
+                duplicate_of, target_path
+            )
+            if deduplicated:
+                logger.info(f"Upload {upload_id} is identical to {duplicate_of}; linked")
+                if upload_info.get("assembly") == "in_place":
+                    os.unlink(upload_info["partial_path"])
+            elif upload_info.get("assembly") == "in_place":
+                # Chunks are already in place; finalizing is a rename
+                partial_path = upload_info["partial_path"]
+                if os.path.getsize(partial_path) != upload_info["file_size"]:
+                    raise ValidationException(
+                        message="Assembled file has the wrong size",
+                        details={
+                            "upload_id": upload_id,
+                            "expected_size": upload_info["file_size"],
+                            "actual_size": os.path.getsize(partial_path),
+                        },
+                    )
+                commit_assembled_file(partial_path, target_path)
+            else:
+                FileProcessor._combine_chunk_files(upload_id, upload_info, target_path)
         except ValidationException:
             # Re-raise validation exceptions
             raise
@@ -964,20 +1509,26 @@ class FileProcessor:
                 details={"error": str(e), "upload_id": upload_id},
             )
 
-        # Update upload info
-        upload_info["status"] = "completed"
-        upload_info["completed"] = True
-        upload_info["final_path"] = target_path
-        upload_info["last_updated"] = time.time()
+        if content_digest and not deduplicated:
+            upload_session_index.record_checksum(content_digest, target_path)
+
+        def mark_completed(current: Dict[str, Any]) -> None:
+            current["status"] = "completed"
+            current["completed"] = True
+            current["final_path"] = target_path
+            current["last_updated"] = time.time()
+            current["checksum"] = file_checksum
+            current["deduplicated"] = deduplicated
 
         # Update metadata file
         try:
-            metadata_path = os.path.join(upload_info["chunks_dir"], "metadata.json")
-            with open(metadata_path, "w") as f:
-                json.dump(upload_info, f)
+            upload_info = FileProcessor._update_chunked_upload(
+                upload_id, upload_info["chunks_dir"], mark_completed
+            )
         except Exception as e:
             logger.error(f"Failed to update metadata for upload {upload_id}: {str(e)}")
             # Continue despite metadata update failure
+            mark_completed(upload_info)
 
         # Return file info for the combined file
         file_info = FileProcessor.get_file_info(target_path)
@@ -1005,6 +1556,9 @@ class FileProcessor:
             "original_filename": upload_info["original_filename"],
             "mime_type": upload_info["mime_type"],
             "size_bytes": file_info["size_bytes"],
+            "checksum": file_checksum,
+            "checksum_algorithm": CHECKSUM_ALGORITHM,
+            "deduplicated": deduplicated,
         }
 
     @staticmethod
@@ -1018,28 +1572,7 @@ class FileProcessor:
         Returns:
             Dictionary with upload status or None if not found
         """
-        if upload_id in FileProcessor._chunked_uploads:
-            return FileProcessor._chunked_uploads[upload_id]
-
-        # Try to load from file
-        for root, dirs, files in os.walk(os.path.dirname(os.path.dirname(__file__))):
-            for dir_name in dirs:
-                if dir_name.startswith(f"chunks_{upload_id}"):
-                    chunks_dir = os.path.join(root, dir_name)
-                    metadata_path = os.path.join(chunks_dir, "metadata.json")
-                    if os.path.exists(metadata_path):
-                        try:
-                            with open(metadata_path, "r") as f:
-                                upload_info = json.load(f)
-                                FileProcessor._chunked_uploads[upload_id] = upload_info
-                                return upload_info
-                        except Exception as e:
-                            logger.error(
-                                f"Error loading metadata for upload {upload_id}: {str(e)}"
-                            )
-                            return None
-
-        return None
+        return FileProcessor._load_chunked_upload(upload_id)
 
     @staticmethod
     def cleanup_chunked_upload(upload_id: str) -> bool:
@@ -1052,35 +1585,48 @@ class FileProcessor:
         Returns:
             True if cleanup was successful, False otherwise
         """
-        if upload_id in FileProcessor._chunked_uploads:
-            upload_info = FileProcessor._chunked_uploads[upload_id]
-            chunks_dir = upload_info["chunks_dir"]
+        upload_info = FileProcessor._chunked_uploads.get(upload_id)
+        chunks_dir = (
+            upload_info["chunks_dir"]
+            if upload_info
+            else upload_session_index.lookup(upload_id)
+        )
+        if chunks_dir is None:
+            return False
 
-            # Remove all files in the chunks directory
-            try:
-                if os.path.exists(chunks_dir) and os.path.isdir(chunks_dir):
-                    shutil.rmtree(chunks_dir)
+        # Remove all files in the chunks directory
+        try:
+            if os.path.exists(chunks_dir) and os.path.isdir(chunks_dir):
+                shutil.rmtree(chunks_dir)
 
-                # Remove from memory
-                del FileProcessor._chunked_uploads[upload_id]
-                return True
-            except Exception as e:
-                logger.error(f"Error cleaning up chunked upload {upload_id}: {str(e)}")
-                return False
+            # Remove from memory and the session index
+            FileProcessor._chunked_uploads.pop(upload_id, None)
+            upload_session_index.remove(upload_id)
+            return True
+        except Exception as e:
+            logger.error(f"Error cleaning up chunked upload {upload_id}: {str(e)}")
+            return False
 
-        # Try to find it on disk
-        for root, dirs, files in os.walk(os.path.dirname(os.path.dirname(__file__))):
-            for dir_name in dirs:
-                if dir_name.startswith(f"chunks_{upload_id}"):
-                    chunks_dir = os.path.join(root, dir_name)
-                    try:
-                        shutil.rmtree(chunks_dir)
-                        return True
-                    except Exception as e:
-                        logger.error(
-                            f"Error cleaning up chunked upload {upload_id}: {str(e)}"
-                        )
-                        return False
 
-        # Not found
-        return False
+# Built-in extractors; other modules can register more formats the same way
+FileProcessor.register_text_extractor(
+    FileProcessor._iter_pdf_pages, ".pdf", "application/pdf"
+)
+FileProcessor.register_text_extractor(
+    FileProcessor._iter_docx_pages,
+    ".docx",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+)
+FileProcessor.register_text_extractor(
+    FileProcessor._iter_image_pages,
+    ".jpg",
+    ".png",
+    ".gif",
+    ".tif",
+    ".bmp",
+    ".webp",
+    *FileProcessor.IMAGE_MIME_TYPES,
+)
+FileProcessor.register_text_extractor(
+    FileProcessor._iter_text_pages, "application/json", "application/xml"
+)
@@ -0,0 +1,228 @@
+"""
+Shared HTTP client pool for outbound API calls (OpenRouter and friends).
+Keeps a single keep-alive httpx.AsyncClient for the whole process, with
+HTTP/2 when available and a per-host concurrency cap on top of httpx limits.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class HttpClientPool:
+    """
+    Process-wide pooled async HTTP client.
+    The client is created once at startup (or lazily on first use) and reused
+    by every caller, so TCP/TLS connections are kept alive between requests.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        max_per_host: int = 10,
+        http2: bool = True,
+    ):
+        """
+        Initialize the pool configuration.
+
+        Args:
+            max_connections: Maximum number of open connections across all hosts
+            max_keepalive_connections: Maximum idle connections kept alive
+            keepalive_expiry: Seconds an idle connection is kept before closing
+            max_per_host: Maximum concurrent in-flight requests per host
+            http2: Whether to negotiate HTTP/2 (requires the h2 package)
+        """
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.max_per_host = max_per_host
+        self.http2 = http2 and HTTP2_AVAILABLE
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("h2 package not installed, HTTP client falling back to HTTP/1.1")
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._host_stats: Dict[str, Dict[str, Any]] = {}
+        self.metrics = {
+            "clients_created": 0,
+            "total_requests": 0,
+            "failed_requests": 0,
+            "total_wait_time": 0.0,
+            "max_wait_time": 0.0,
+        }
+
+    def _create_client(self) -> httpx.AsyncClient:
+        """Create the underlying httpx client with the configured limits"""
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        self.metrics["clients_created"] += 1
+        logger.info(
+            f"Creating shared HTTP client: http2={self.http2}, "
+            f"max_connections={self.max_connections}, max_per_host={self.max_per_host}"
+        )
+        return httpx.AsyncClient(http2=self.http2, limits=limits)
+
+    async def start(self) -> None:
+        """Open the shared client. Safe to call more than once."""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+
+    async def close(self) -> None:
+        """Close the shared client, drop all pooled connections and reset usage stats"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("Shared HTTP client closed")
+        self._client = None
+        self._host_semaphores.clear()
+        self._host_stats.clear()
+        for key in ("total_requests", "failed_requests"):
+            self.metrics[key] = 0
+        for key in ("total_wait_time", "max_wait_time"):
+            self.metrics[key] = 0.0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Get the shared client, creating it lazily if the application
+        lifespan has not started it (e.g. scripts and tests).
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        return self._client
+
+    def _get_host_semaphore(self, host: str) -> asyncio.Semaphore:
+        """Get or create the concurrency semaphore for a host"""
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_per_host)
+            self._host_semaphores[host] = semaphore
+            self._host_stats[host] = {
+                "requests": 0,
+                "in_flight": 0,
+                "waiting": 0,
+                "failures": 0,
+            }
+        return semaphore
+
+    @asynccontextmanager
+    async def host_slot(self, url: str) -> AsyncIterator[httpx.AsyncClient]:
+        """
+        Hold one of the per-host concurrency slots for the duration of a request.
+
+        Args:
+            url: URL of the request, used to resolve the host
+
+        Yields:
+            The shared httpx client
+        """
+        host = urlsplit(url).netloc or url
+        semaphore = self._get_host_semaphore(host)
+        stats = self._host_stats[host]
+
+        wait_start = time.time()
+        stats["waiting"] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            stats["waiting"] -= 1
+        wait_time = time.time() - wait_start
+        self.metrics["total_wait_time"] += wait_time
+        self.metrics["max_wait_time"] = max(self.metrics["max_wait_time"], wait_time)
+
+        stats["in_flight"] += 1
+        stats["requests"] += 1
+        self.metrics["total_requests"] += 1
+        try:
+            yield self.client
+        except Exception:
+            stats["failures"] += 1
+            self.metrics["failed_requests"] += 1
+            raise
+        finally:
+            stats["in_flight"] -= 1
+            semaphore.release()
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a POST request through the shared client.
+
+        Args:
+            url: Target URL
+            **kwargs: Arguments forwarded to httpx.AsyncClient.post
+
+        Returns:
+            The httpx response
+        """
+        async with self.host_slot(url) as client:
+            return await client.post(url, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get pool statistics.
+
+        Returns:
+            Dictionary with pool configuration, counters and per-host usage
+        """
+        total_requests = self.metrics["total_requests"]
+        return {
+            "active": self._client is not None and not self._client.is_closed,
+            "http2": self.http2,
+            "limits": {
+                "max_connections": self.max_connections,
+                "max_keepalive_connections": self.max_keepalive_connections,
+                "keepalive_expiry": self.keepalive_expiry,
+                "max_per_host": self.max_per_host,
+            },
+            **self.metrics,
+            "avg_wait_time": (
+                self.metrics["total_wait_time"] / total_requests if total_requests else 0.0
+            ),
+            "hosts": {host: dict(stats) for host, stats in self._host_stats.items()},
+        }
+
+
+# Global instance
+http_client_pool = HttpClientPool(
+    max_connections=settings.HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    max_per_host=settings.HTTP_MAX_PER_HOST,
+    http2=settings.HTTP2_ENABLED,
+)
+
+
+async def start_http_client_pool() -> None:
+    """
+    Open the shared HTTP client.
+    This function should be called during application startup.
+    """
+    await http_client_pool.start()
+
+
+async def close_http_client_pool() -> None:
+    """
+    Close the shared HTTP client.
+    This function should be called during application shutdown.
+    """
+    await http_client_pool.close()
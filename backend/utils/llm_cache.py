@@ -0,0 +1,313 @@
+"""
+Opt-in cache of LLM responses for identical, deterministic requests.
+
+Entries are keyed on the SHA-256 of the request (model, messages, temperature
+and response format), so a repeated generation — a frontend retry, the same
+claim and reference set — is answered from memory or disk instead of another
+OpenRouter round-trip. Two tiers, as in the extraction cache: an in-memory LRU
+and an on-disk store bounded by entry count, both with a TTL.
+
+Only deterministic requests are cached: calls that do not set a temperature
+(sampled at the provider's default) and calls whose temperature is above
+LLM_CACHE_MAX_TEMPERATURE (such as the fan-out candidates) bypass the cache.
+Call sites whose output should not vary (extraction, analysis, review and
+report generation) opt in by requesting DETERMINISTIC_TEMPERATURE; enabling the
+cache never changes the temperature a request is sent with.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() in (
+    "true",
+    "1",
+    "yes",
+)
+LLM_CACHE_DIR = os.getenv(
+    "LLM_CACHE_DIR", str(Path(__file__).parent.parent / "cache" / "llm")
+)
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_MEMORY_ITEMS = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", "128"))
+LLM_CACHE_DISK_ITEMS = int(os.getenv("LLM_CACHE_DISK_ITEMS", "2048"))
+# Calls sampled above this temperature are not deterministic and bypass the cache
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0"))
+# Temperature requested by call sites whose output should not vary between calls
+DETERMINISTIC_TEMPERATURE = 0.0
+
+
+class LLMResponseCache:
+    """
+    Two-tier (memory + disk) LRU cache of model responses with a TTL
+    """
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path],
+        ttl_seconds: int = 86400,
+        max_memory_items: int = 128,
+        max_disk_items: int = 2048,
+        max_temperature: float = 0.0,
+        enabled: bool = False,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory for the on-disk store
+            ttl_seconds: Age after which an entry is no longer served
+            max_memory_items: Maximum number of entries kept in memory
+            max_disk_items: Maximum number of entries kept on disk
+            max_temperature: Highest temperature considered deterministic
+            enabled: When False every lookup is bypassed and nothing is stored
+        """
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self.max_temperature = max_temperature
+        self.enabled = enabled
+
+        # key -> (created timestamp, original call duration, value)
+        self._memory: "OrderedDict[str, Tuple[float, float, Any]]" = OrderedDict()
+        self._disk_index: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.RLock()
+
+        self.metrics = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "bypassed": 0,
+            "stores": 0,
+            "evictions": 0,
+            "time_saved": 0.0,
+        }
+
+        if self.enabled:
+            self._load_disk_index()
+
+    def _entry_path(self, key: str) -> Path:
+        """Get the on-disk path for a cache key"""
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    @staticmethod
+    def make_key(
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: Optional[float],
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Build the cache key of a request
+
+        Args:
+            model: Model identifier
+            messages: Chat messages, including any system prompt
+            temperature: Sampling temperature
+            response_format: Structured output format, if requested
+
+        Returns:
+            Hex-encoded SHA-256 of the canonical request
+        """
+        request = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "response_format": response_format,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, temperature: Optional[float]) -> bool:
+        """
+        Whether a request with this temperature may be served from the cache
+
+        Args:
+            temperature: Sampling temperature of the request; None means the
+                provider's default, which is not deterministic
+
+        Returns:
+            True if the cache is enabled and the request is deterministic
+        """
+        return (
+            self.enabled
+            and temperature is not None
+            and temperature <= self.max_temperature
+        )
+
+    def _load_disk_index(self) -> None:
+        """Rebuild the disk index from existing files, oldest first"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            entries = sorted(
+                (entry.stat().st_mtime, entry.stem)
+                for entry in self.cache_dir.glob("*/*.json")
+            )
+            for _, key in entries:
+                self._disk_index[key] = None
+            logger.info(
+                f"LLM cache loaded {len(self._disk_index)} entries from {self.cache_dir}"
+            )
+            self._evict_disk()
+        except Exception as e:
+            logger.error(f"Error loading LLM cache index: {str(e)}")
+
+    def _remember(self, key: str, created: float, duration: float, value: Any) -> None:
+        """Add an entry to the memory tier and evict least recently used entries"""
+        self._memory[key] = (created, duration, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _remove_disk_entry(self, key: str) -> None:
+        """Delete an entry file and drop it from the disk index"""
+        self._disk_index.pop(key, None)
+        try:
+            self._entry_path(key).unlink()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Error removing LLM cache entry {key}: {str(e)}")
+
+    def _evict_disk(self) -> None:
+        """Remove least recently used disk entries beyond the size limit"""
+        while len(self._disk_index) > self.max_disk_items:
+            key = next(iter(self._disk_index))
+            self._remove_disk_entry(key)
+            self.metrics["evictions"] += 1
+
+    def _is_fresh(self, created: float) -> bool:
+        """Whether an entry created at this time is within the TTL"""
+        return time.time() - created < self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a response.
+
+        Args:
+            key: Request key from make_key
+
+        Returns:
+            Cached response, or None on a miss or an expired entry
+        """
+        with self._lock:
+            if key in self._memory:
+                created, duration, value = self._memory[key]
+                if self._is_fresh(created):
+                    self._memory.move_to_end(key)
+                    self.metrics["memory_hits"] += 1
+                    self.metrics["time_saved"] += duration
+                    return value
+                del self._memory[key]
+                self._remove_disk_entry(key)
+                self.metrics["expired"] += 1
+                return None
+
+            if key in self._disk_index:
+                entry_path = self._entry_path(key)
+                try:
+                    entry = json.loads(entry_path.read_text(encoding="utf-8"))
+                    if not self._is_fresh(entry["created"]):
+                        self._remove_disk_entry(key)
+                        self.metrics["expired"] += 1
+                        return None
+                    # Touch the entry so LRU order survives restarts
+                    os.utime(entry_path, None)
+                    self._disk_index.move_to_end(key)
+                    duration = entry.get("duration", 0.0)
+                    self._remember(key, entry["created"], duration, entry["value"])
+                    self.metrics["disk_hits"] += 1
+                    self.metrics["time_saved"] += duration
+                    return entry["value"]
+                except FileNotFoundError:
+                    self._disk_index.pop(key, None)
+                except Exception as e:
+                    logger.warning(f"Error reading LLM cache entry {key}: {str(e)}")
+
+            self.metrics["misses"] += 1
+            return None
+
+    def put(self, key: str, value: Any, duration: float = 0.0) -> None:
+        """
+        Store a response in both tiers.
+
+        Args:
+            key: Request key from make_key
+            value: JSON-serializable response
+            duration: Time the model call took, counted as saved on later hits
+        """
+        created = time.time()
+        entry = {"created": created, "duration": duration, "value": value}
+        with self._lock:
+            self._remember(key, created, duration, value)
+            self.metrics["stores"] += 1
+
+            entry_path = self._entry_path(key)
+            try:
+                entry_path.parent.mkdir(parents=True, exist_ok=True)
+                # Write atomically so a crash never leaves a truncated entry
+                tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+                tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+                os.replace(tmp_path, entry_path)
+            except Exception as e:
+                logger.warning(f"Error writing LLM cache entry {key}: {str(e)}")
+                return
+
+            self._disk_index[key] = None
+            self._disk_index.move_to_end(key)
+            self._evict_disk()
+
+    def record_bypass(self) -> None:
+        """Count a request that skipped the cache as non-deterministic"""
+        with self._lock:
+            self.metrics["bypassed"] += 1
+
+    def clear(self) -> None:
+        """Remove every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            for key in list(self._disk_index):
+                self._remove_disk_entry(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with hit/miss counters and tier sizes
+        """
+        with self._lock:
+            hits = self.metrics["memory_hits"] + self.metrics["disk_hits"]
+            lookups = hits + self.metrics["misses"] + self.metrics["expired"]
+            return {
+                "enabled": self.enabled,
+                **self.metrics,
+                "hits": hits,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._disk_index),
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+# Global instance shared by all model-call paths
+llm_cache = LLMResponseCache(
+    cache_dir=LLM_CACHE_DIR,
+    ttl_seconds=LLM_CACHE_TTL_SECONDS,
+    max_memory_items=LLM_CACHE_MEMORY_ITEMS,
+    max_disk_items=LLM_CACHE_DISK_ITEMS,
+    max_temperature=LLM_CACHE_MAX_TEMPERATURE,
+    enabled=LLM_CACHE_ENABLED,
+)
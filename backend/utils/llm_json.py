@@ -0,0 +1,209 @@
+"""
+Tolerant parsing of JSON returned by language models.
+
+Models asked for JSON often wrap it in Markdown code fences, add a sentence
+before or after it, or write Python-style dicts with single-quoted keys (the
+reviewer prompt itself shows that format). Instead of asking the model again,
+these replies are repaired locally; a retry is only worth a call when no JSON
+object can be recovered at all.
+"""
+
+import json
+import re
+from typing import Any, Dict, Optional, Tuple
+
+# Parse outcomes, as counted by the llm_review_parse_total metric
+PARSED = "json"  # valid JSON as returned
+REPAIRED = "repaired"  # valid after local repair
+RETRIED = "retried"  # needed a second model call
+FAILED = "failed"  # no usable reply even after the retry
+
+_FENCE_PATTERN = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+_TRAILING_COMMA_PATTERN = re.compile(r",(\s*[}\]])")
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+# JSON schema of a review, for providers supporting structured outputs
+REVIEW_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "number", "minimum": 0, "maximum": 1},
+        "suggestions": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["score", "suggestions"],
+    "additionalProperties": False,
+}
+REVIEW_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "review", "strict": True, "schema": REVIEW_SCHEMA},
+}
+
+
+def _is_apostrophe(text: str, position: int) -> bool:
+    """Whether the ' at position sits between letters, as in dell'assicurato"""
+    return (
+        0 < position < len(text) - 1
+        and text[position - 1].isalpha()
+        and text[position + 1].isalpha()
+    )
+
+
+def _extract_object(text: str) -> Optional[str]:
+    """Return the first balanced {...} block of a text, skipping braces inside strings"""
+    start = text.find("{")
+    if start < 0:
+        return None
+
+    depth = 0
+    quote = None
+    escaped = False
+    for position in range(start, len(text)):
+        char = text[position]
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == quote and not (quote == "'" and _is_apostrophe(text, position)):
+                quote = None
+        elif char in "\"'":
+            # An apostrophe between letters is part of a word, not a quote
+            if char == "'" and _is_apostrophe(text, position):
+                continue
+            quote = char
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start : position + 1]
+    return None
+
+
+def _to_json_syntax(text: str) -> str:
+    """
+    Rewrite single-quoted strings as double-quoted ones and Python literals
+    (True, False, None) as JSON ones, leaving the content of strings unchanged
+    """
+    out = []
+    quote = None
+    escaped = False
+    position = 0
+    while position < len(text):
+        char = text[position]
+        if quote:
+            if escaped:
+                escaped = False
+                out.append(char)
+            elif char == "\\":
+                escaped = True
+                out.append(char)
+            elif char == quote and not (quote == "'" and _is_apostrophe(text, position)):
+                quote = None
+                out.append('"')
+            elif char == '"' and quote == "'":
+                out.append('\\"')
+            else:
+                out.append(char)
+        elif char in "\"'":
+            quote = char
+            out.append('"')
+        else:
+            word = re.match(r"True|False|None", text[position:])
+            if word and not (position and text[position - 1].isalnum()):
+                out.append(_PYTHON_LITERALS[word.group(0)])
+                position += len(word.group(0))
+                continue
+            out.append(char)
+        position += 1
+    return "".join(out)
+
+
+def parse_json_object(text: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Parse a JSON object from a model reply, repairing common deviations
+
+    Args:
+        text: Model reply
+
+    Returns:
+        (object, outcome): the parsed object and PARSED or REPAIRED, or
+        (None, FAILED) if no object can be recovered
+    """
+    if not text:
+        return None, FAILED
+
+    try:
+        value = json.loads(text)
+        if isinstance(value, dict):
+            return value, PARSED
+    except json.JSONDecodeError:
+        pass
+
+    candidates = [match.group(1) for match in _FENCE_PATTERN.finditer(text)]
+    candidates.append(text)
+    for candidate in candidates:
+        block = _extract_object(candidate)
+        if block is None:
+            continue
+        for repaired in (
+            block,
+            _to_json_syntax(block),
+            _TRAILING_COMMA_PATTERN.sub(r"\1", _to_json_syntax(block)),
+        ):
+            try:
+                value = json.loads(repaired)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(value, dict):
+                return value, REPAIRED
+    return None, FAILED
+
+
+def normalize_review(value: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Coerce a parsed review to {"score": float 0-1, "suggestions": [str]}
+
+    Args:
+        value: Parsed reviewer reply
+
+    Returns:
+        The normalized review, or None if it has no usable score
+    """
+    if not value:
+        return None
+
+    try:
+        score = float(value.get("score"))
+    except (TypeError, ValueError):
+        return None
+    # Some models answer on a 0-10 or 0-100 scale
+    if 1 < score <= 10:
+        score /= 10
+    elif 10 < score <= 100:
+        score /= 100
+    score = min(max(score, 0.0), 1.0)
+
+    suggestions = value.get("suggestions") or []
+    if isinstance(suggestions, str):
+        suggestions = [suggestions]
+    suggestions = [str(s) for s in suggestions if s]
+
+    return {**value, "score": score, "suggestions": suggestions}
+
+
+def parse_review(text: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Parse and normalize a reviewer reply
+
+    Args:
+        text: Reviewer reply
+
+    Returns:
+        (review, outcome) as for parse_json_object; review is None when the
+        reply holds no object with a score
+    """
+    value, outcome = parse_json_object(text)
+    review = normalize_review(value)
+    if review is None:
+        return None, FAILED
+    return review, outcome
@@ -1,17 +1,42 @@
 """
-Metrics collector utility for tracking performance metrics
+Metrics collector utility for tracking performance metrics.
+
+Metrics are kept in memory in a bounded ring buffer per category and appended
+to a JSON Lines log by a background flusher, so recording a metric never
+rewrites the history. Per-minute aggregates of numeric fields are maintained
+as metrics arrive, so time-windowed statistics do not scan raw records.
 """
 
+import atexit
 import json
 import logging
+import os
+import threading
 import time
+from collections import deque
 from pathlib import Path
 from threading import Lock
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Deque, Dict, List, Optional, Union
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Number of recent metrics kept in memory per category
+METRICS_RING_SIZE = int(os.getenv("METRICS_RING_SIZE", "1000"))
+# Seconds between background flushes of pending metrics to the log
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+# Pending metrics that trigger an early flush
+METRICS_FLUSH_BATCH = int(os.getenv("METRICS_FLUSH_BATCH", "100"))
+# The log is compacted to the in-memory rings on startup once it exceeds this size
+METRICS_LOG_MAX_MB = int(os.getenv("METRICS_LOG_MAX_MB", "50"))
+# How long per-minute aggregates are kept
+METRICS_AGGREGATE_RETENTION_HOURS = int(
+    os.getenv("METRICS_AGGREGATE_RETENTION_HOURS", "24")
+)
+
+# Width of an aggregate bucket in seconds
+BUCKET_SECONDS = 60
+
 # A global instance of the metrics collector
 _metrics_collector = None
 
@@ -48,25 +73,48 @@ class MetricsCollector:
     Utility class for collecting and storing performance metrics
     """
 
-    def __init__(self, metrics_file: Optional[Union[str, Path]] = None):
+    def __init__(
+        self,
+        metrics_file: Optional[Union[str, Path]] = None,
+        ring_size: int = METRICS_RING_SIZE,
+        flush_interval: float = METRICS_FLUSH_INTERVAL,
+    ):
         """
         Initialize the metrics collector
 
         Args:
-            metrics_file: File path to store metrics (optional)
+            metrics_file: File path to store metrics (optional). A ".json" path
+                is stored as the ".jsonl" log next to it; an existing JSON file
+                is migrated on first use.
+            ring_size: Number of recent metrics kept in memory per category
+            flush_interval: Seconds between background flushes
         """
-        self.metrics = {}
-        self.metrics_file = Path(metrics_file) if metrics_file else None
+        self.ring_size = ring_size
+        self.flush_interval = flush_interval
+        self.metrics: Dict[str, Deque[Dict[str, Any]]] = {}
         self.lock = Lock()
 
-        # Load existing metrics if file exists
-        if self.metrics_file and self.metrics_file.exists():
-            try:
-                with open(self.metrics_file, "r") as f:
-                    self.metrics = json.load(f)
-            except Exception as e:
-                logger.error(f"Error loading metrics file: {str(e)}")
-                self.metrics = {}
+        self.log_file: Optional[Path] = None
+        if metrics_file:
+            metrics_file = Path(metrics_file)
+            self.log_file = (
+                metrics_file.with_suffix(".jsonl")
+                if metrics_file.suffix == ".json"
+                else metrics_file
+            )
+
+        self._totals: Dict[str, int] = {}
+        # category -> bucket start -> {"count": n, "fields": {name: [n, sum, min, max]}}
+        self._buckets: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._flush_lock = Lock()
+        self._flush_event = threading.Event()
+        self._stopped = False
+        self._flusher: Optional[threading.Thread] = None
+
+        if self.log_file:
+            self._migrate_legacy_file(metrics_file)
+            self._load_log()
 
         # Initialize metric categories if they don't exist
         for category in [
@@ -75,8 +123,156 @@ class MetricsCollector:
             "report_generation_error",
             "system_startup",
         ]:
-            if category not in self.metrics:
-                self.metrics[category] = []
+            self._ring(category)
+
+        if self.log_file:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="metrics-flusher", daemon=True
+            )
+            self._flusher.start()
+            atexit.register(self.close)
+
+    def _ring(self, category: str) -> Deque[Dict[str, Any]]:
+        """Get the ring buffer for a category, creating it if needed"""
+        ring = self.metrics.get(category)
+        if ring is None:
+            ring = self.metrics[category] = deque(maxlen=self.ring_size)
+            self._totals.setdefault(category, 0)
+        return ring
+
+    def _record(self, category: str, data: Dict[str, Any]) -> None:
+        """Add a metric to the in-memory ring and aggregates (lock held)"""
+        self._ring(category).append(data)
+        self._totals[category] += 1
+
+        timestamp = data.get("timestamp", 0)
+        if time.time() - timestamp > METRICS_AGGREGATE_RETENTION_HOURS * 3600:
+            return
+
+        bucket_start = int(timestamp // BUCKET_SECONDS) * BUCKET_SECONDS
+        buckets = self._buckets.setdefault(category, {})
+        bucket = buckets.get(bucket_start)
+        if bucket is None:
+            bucket = buckets[bucket_start] = {"count": 0, "fields": {}}
+            self._expire_buckets(category)
+
+        bucket["count"] += 1
+        for name, value in data.items():
+            if name == "timestamp" or isinstance(value, bool):
+                continue
+            if not isinstance(value, (int, float)):
+                continue
+            stats = bucket["fields"].get(name)
+            if stats is None:
+                bucket["fields"][name] = [1, value, value, value]
+            else:
+                stats[0] += 1
+                stats[1] += value
+                stats[2] = min(stats[2], value)
+                stats[3] = max(stats[3], value)
+
+    def _expire_buckets(self, category: str) -> None:
+        """Drop aggregate buckets older than the retention period"""
+        cutoff = time.time() - METRICS_AGGREGATE_RETENTION_HOURS * 3600
+        buckets = self._buckets.get(category, {})
+        for bucket_start in [b for b in buckets if b + BUCKET_SECONDS < cutoff]:
+            del buckets[bucket_start]
+
+    def _migrate_legacy_file(self, legacy_file: Path) -> None:
+        """Convert a metrics.json written by older versions into the log"""
+        if (
+            legacy_file == self.log_file
+            or not legacy_file.exists()
+            or self.log_file.exists()
+        ):
+            return
+
+        try:
+            with open(legacy_file, "r") as f:
+                legacy = json.load(f)
+
+            self.log_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_file, "w") as f:
+                for category, records in legacy.items():
+                    for data in records:
+                        f.write(json.dumps({"category": category, "data": data}) + "\n")
+
+            legacy_file.rename(legacy_file.with_suffix(".json.migrated"))
+            logger.info(f"Migrated {legacy_file} to {self.log_file}")
+        except Exception as e:
+            logger.error(f"Error migrating metrics file {legacy_file}: {str(e)}")
+
+    def _load_log(self) -> None:
+        """Load recent metrics from the log, compacting it if it has grown too large"""
+        if not self.log_file.exists():
+            return
+
+        try:
+            with open(self.log_file, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self._record(entry["category"], entry["data"])
+                    except (ValueError, KeyError, TypeError):
+                        # Skip a torn line from an interrupted write
+                        continue
+
+            if self.log_file.stat().st_size > METRICS_LOG_MAX_MB * 1024 * 1024:
+                self._rewrite_log()
+        except Exception as e:
+            logger.error(f"Error loading metrics log: {str(e)}")
+
+    def _rewrite_log(self) -> None:
+        """Replace the log with the current ring buffer contents"""
+        with self._flush_lock:
+            with self.lock:
+                lines = [
+                    json.dumps({"category": category, "data": data}, default=str)
+                    for category, ring in self.metrics.items()
+                    for data in ring
+                ]
+                self._pending.clear()
+
+            tmp_path = self.log_file.with_suffix(".jsonl.tmp")
+            with open(tmp_path, "w") as f:
+                f.write("".join(line + "\n" for line in lines))
+            os.replace(tmp_path, self.log_file)
+
+    def _flush_loop(self) -> None:
+        """Background thread that appends pending metrics to the log"""
+        while not self._stopped:
+            self._flush_event.wait(self.flush_interval)
+            self._flush_event.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Append pending metrics to the log"""
+        if not self.log_file:
+            return
+
+        with self._flush_lock:
+            with self.lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return
+
+            try:
+                self.log_file.parent.mkdir(parents=True, exist_ok=True)
+                # One write per batch keeps lines from different workers intact
+                with open(self.log_file, "a") as f:
+                    f.write(
+                        "".join(
+                            json.dumps(entry, default=str) + "\n" for entry in pending
+                        )
+                    )
+            except Exception as e:
+                logger.error(f"Error saving metrics to file: {str(e)}")
+
+    def close(self) -> None:
+        """Stop the background flusher and write any pending metrics"""
+        self._stopped = True
+        self._flush_event.set()
+        self.flush()
 
     def add_metric(self, category: str, data: Dict[str, Any]) -> None:
         """
@@ -87,25 +283,23 @@ class MetricsCollector:
             data: The metric data to store
         """
         with self.lock:
-            # Initialize category if it doesn't exist
-            if category not in self.metrics:
-                self.metrics[category] = []
-
             # Add timestamp if not present
             if "timestamp" not in data:
                 data["timestamp"] = time.time()
 
-            # Add the metric
-            self.metrics[category].append(data)
+            self._record(category, data)
 
-            # Save to file if specified
-            self._save_metrics()
+            if self.log_file:
+                self._pending.append({"category": category, "data": data})
+                if len(self._pending) >= METRICS_FLUSH_BATCH:
+                    self._flush_event.set()
 
     def get_metrics(
         self, category: str, limit: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
-        Retrieve metrics for the specified category
+        Retrieve recent metrics for the specified category.
+        Only the last ring_size metrics of a category are kept in memory.
 
         Args:
             category: The metric category to retrieve
@@ -115,47 +309,97 @@ class MetricsCollector:
             List of metric data dictionaries
         """
         with self.lock:
-            if category not in self.metrics:
+            ring = self.metrics.get(category)
+            if not ring:
                 return []
 
-            # Sort by timestamp (newest first) and return requested number
-            metrics = sorted(
-                self.metrics[category],
-                key=lambda x: x.get("timestamp", 0),
-                reverse=True,
-            )
-
-            return metrics[:limit] if limit else metrics
+            # The ring is in arrival order, so newest first is just reversed
+            metrics = []
+            for data in reversed(ring):
+                if limit and len(metrics) >= limit:
+                    break
+                metrics.append(data)
+            return metrics
 
-    def clear_metrics(self, category: Optional[str] = None) -> None:
+    def count(self, category: str) -> int:
         """
-        Clear metrics for the specified category or all metrics if no category provided
+        Number of metrics recorded for a category, including those no longer
+        held in memory
 
         Args:
-            category: The metric category to clear, or None to clear all
+            category: The metric category
+
+        Returns:
+            Metric count
         """
         with self.lock:
-            if category:
-                if category in self.metrics:
-                    self.metrics[category] = []
-            else:
-                self.metrics = {}
-
-            self._save_metrics()
+            return self._totals.get(category, 0)
 
-    def _save_metrics(self) -> None:
+    def get_aggregates(
+        self, category: str, window_seconds: float = 3600
+    ) -> Dict[str, Any]:
         """
-        Save metrics to the file if a file path is specified
+        Aggregate the numeric fields of a category over a recent time window.
+        Works from per-minute buckets, so the cost depends on the window
+        length rather than the number of metrics.
+
+        Args:
+            category: The metric category
+            window_seconds: Length of the window ending now
+
+        Returns:
+            Dictionary with the metric count and, per numeric field, its
+            count, sum, average, minimum and maximum
         """
-        if not self.metrics_file:
-            return
+        cutoff = time.time() - window_seconds
+        count = 0
+        fields: Dict[str, List[float]] = {}
 
-        try:
-            # Create parent directory if it doesn't exist
-            self.metrics_file.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            for bucket_start, bucket in self._buckets.get(category, {}).items():
+                if bucket_start + BUCKET_SECONDS < cutoff:
+                    continue
+                count += bucket["count"]
+                for name, (n, total, low, high) in bucket["fields"].items():
+                    stats = fields.get(name)
+                    if stats is None:
+                        fields[name] = [n, total, low, high]
+                    else:
+                        stats[0] += n
+                        stats[1] += total
+                        stats[2] = min(stats[2], low)
+                        stats[3] = max(stats[3], high)
+
+        return {
+            "category": category,
+            "window_seconds": window_seconds,
+            "count": count,
+            "fields": {
+                name: {
+                    "count": n,
+                    "sum": total,
+                    "avg": total / n,
+                    "min": low,
+                    "max": high,
+                }
+                for name, (n, total, low, high) in fields.items()
+            },
+        }
 
-            # Save metrics to file
-            with open(self.metrics_file, "w") as f:
-                json.dump(self.metrics, f, indent=2)
-        except Exception as e:
-            logger.error(f"Error saving metrics to file: {str(e)}")
+    def clear_metrics(self, category: Optional[str] = None) -> None:
+        """
+        Clear metrics for the specified category or all metrics if no category provided
+
+        Args:
+            category: The metric category to clear, or None to clear all
+        """
+        with self.lock:
+            categories = [category] if category else list(self.metrics)
+            for name in categories:
+                if name in self.metrics:
+                    self.metrics[name].clear()
+                    self._totals[name] = 0
+                self._buckets.pop(name, None)
+
+        if self.log_file:
+            self._rewrite_log()
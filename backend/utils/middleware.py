@@ -14,6 +14,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 from utils.error_handler import logger
+from utils.monitoring import HTTP_REQUEST_DURATION
+from utils.tracing import set_trace_id
 
 # Check if we're in production mode
 IS_PRODUCTION = os.getenv("NODE_ENV") == "production"
@@ -65,13 +67,18 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
     Middleware that logs all requests and responses along with timing information.
 
     Logs detailed information about each request including:
-    - Request ID (generated unique ID for request tracing)
+    - Request ID (taken from the X-Request-ID header or generated, and used
+      as the trace ID of the request and the background tasks it starts)
     - HTTP method and path
     - Client IP address
     - Request headers (optional)
     - Response status code
     - Response time in milliseconds
     - Response size
+
+    Request latency is also recorded in the HTTP_REQUEST_DURATION histogram,
+    labelled with the route template rather than the raw path to keep the
+    number of series bounded.
     """
 
     def __init__(
@@ -104,8 +111,9 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         if any(request.url.path.startswith(path) for path in self.exclude_paths):
             return await call_next(request)
 
-        # Generate a unique request ID
-        request_id = str(uuid.uuid4())
+        # Reuse the caller's request ID so traces can be correlated across services
+        request_id = request.headers.get("x-request-id", "")[:128] or str(uuid.uuid4())
+        set_trace_id(request_id)
 
         # Get client IP, handling proxy forwarding
         client_host = request.client.host if request.client else "unknown"
@@ -132,6 +140,7 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
 
             # Calculate processing time in milliseconds
             process_time = (time.time() - start_time) * 1000
+            self._observe_latency(request, response.status_code, process_time)
 
             # Get response size if available
             size = len(response.body) if hasattr(response, "body") else 0
@@ -149,12 +158,31 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         except Exception as e:
             # Log exceptions
             process_time = (time.time() - start_time) * 1000
+            self._observe_latency(request, 500, process_time)
             logger.error(
                 f"Request failed | ID: {request_id} | {request.method} {request.url.path} | "
                 f"Error: {str(e)} | {process_time:.2f}ms"
             )
             raise
 
+    @staticmethod
+    def _observe_latency(request: Request, status_code: int, process_time: float) -> None:
+        """
+        Record a request in the latency histogram
+
+        Args:
+            request: The handled request
+            status_code: Response status code
+            process_time: Processing time in milliseconds
+        """
+        # The router stores the matched route in the scope
+        route = request.scope.get("route")
+        HTTP_REQUEST_DURATION.labels(
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status_code),
+        ).observe(process_time / 1000)
+
 
 def setup_middleware(app: FastAPI) -> None:
     """
@@ -1,10 +1,11 @@
 import logging
 import time
 from functools import wraps
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
 import sentry_sdk
-from prometheus_client import Counter, Gauge, Histogram, generate_latest
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
 from sentry_sdk.integrations.fastapi import FastApiIntegration
 from fastapi.responses import Response
 from config import settings
@@ -17,6 +18,99 @@ API_REQUEST_DURATION = Histogram(
     "api_request_duration_seconds", "API request duration in seconds"
 )
 
+# Latency buckets shared by the request, model call and processing histograms
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+TOKEN_BUCKETS = (64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency in seconds",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds",
+    "LLM API call latency in seconds",
+    ["model", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Histogram(
+    "llm_tokens",
+    "Tokens used per LLM API call",
+    ["model", "kind"],
+    buckets=TOKEN_BUCKETS,
+)
+LLM_PROMPT_SECTION_TOKENS = Histogram(
+    "llm_prompt_section_tokens",
+    "Estimated tokens per LLM call in the shared (cacheable) prompt prefix and the call-specific suffix",
+    ["model", "section"],
+    buckets=TOKEN_BUCKETS,
+)
+EXTRACTION_DURATION = Histogram(
+    "document_extraction_duration_seconds",
+    "Text extraction time per file in seconds",
+    ["file_type"],
+    buckets=LATENCY_BUCKETS,
+)
+DOCX_GENERATION_DURATION = Histogram(
+    "docx_generation_duration_seconds",
+    "DOCX generation time in seconds",
+    ["source"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_REVIEW_PARSE = Counter(
+    "llm_review_parse",
+    "Reviewer replies by parse outcome: json, repaired, retried or failed",
+    ["outcome"],
+)
+SUPABASE_POOL_WAIT = Histogram(
+    "supabase_pool_wait_seconds",
+    "Time spent waiting for a free client from the Supabase connection pool",
+    buckets=LATENCY_BUCKETS,
+)
+SUPABASE_POOL_CONNECTIONS = Gauge(
+    "supabase_pool_connections",
+    "Supabase clients held by the connection pool, idle or checked out",
+    ["state"],
+)
+WORKER_POOL_WAIT = Histogram(
+    "worker_pool_wait_seconds",
+    "Time tasks waited for a free worker in the shared worker pools",
+    ["pool"],
+    buckets=LATENCY_BUCKETS,
+)
+WORKER_POOL_TASK_DURATION = Histogram(
+    "worker_pool_task_duration_seconds",
+    "Run time of tasks in the shared worker pools",
+    ["pool", "task"],
+    buckets=LATENCY_BUCKETS,
+)
+WORKER_POOL_QUEUE_DEPTH = Gauge(
+    "worker_pool_queue_depth",
+    "Tasks waiting for a free worker in the shared worker pools",
+    ["pool"],
+)
+WORKER_POOL_BUSY_WORKERS = Gauge(
+    "worker_pool_busy_workers",
+    "Workers running a task in the shared worker pools",
+    ["pool"],
+)
+
+# Histograms whose quantiles are published alongside their buckets
+QUANTILE_HISTOGRAMS = {
+    "http_request_duration_seconds": HTTP_REQUEST_DURATION,
+    "llm_request_duration_seconds": LLM_REQUEST_DURATION,
+    "llm_tokens": LLM_TOKENS,
+    "document_extraction_duration_seconds": EXTRACTION_DURATION,
+    "docx_generation_duration_seconds": DOCX_GENERATION_DURATION,
+    "supabase_pool_wait_seconds": SUPABASE_POOL_WAIT,
+    "worker_pool_wait_seconds": WORKER_POOL_WAIT,
+    "worker_pool_task_duration_seconds": WORKER_POOL_TASK_DURATION,
+}
+QUANTILES = (0.5, 0.95, 0.99)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -39,6 +133,178 @@ def setup_monitoring():
     logger.info("Metrics collector initialized")
 
 
+def histogram_quantile(
+    quantile: float, buckets: Sequence[Tuple[float, float]]
+) -> Optional[float]:
+    """
+    Estimate a quantile from cumulative histogram buckets, interpolating
+    linearly inside the bucket that holds it (as PromQL's histogram_quantile)
+
+    Args:
+        quantile: Quantile between 0 and 1
+        buckets: (upper bound, cumulative count) pairs sorted by upper bound,
+            ending with the +Inf bucket
+
+    Returns:
+        Estimated value, or None if the histogram is empty
+    """
+    if not buckets or buckets[-1][1] == 0:
+        return None
+
+    rank = quantile * buckets[-1][1]
+    lower_bound, lower_count = 0.0, 0.0
+    for upper_bound, count in buckets:
+        if count >= rank:
+            # Values above the largest finite bound can only be bounded below
+            if upper_bound == float("inf"):
+                return lower_bound
+            if count == lower_count:
+                return upper_bound
+            return lower_bound + (upper_bound - lower_bound) * (
+                (rank - lower_count) / (count - lower_count)
+            )
+        lower_bound, lower_count = upper_bound, count
+    return lower_bound
+
+
+def summarize_histogram(
+    histogram: Histogram, quantiles: Sequence[float] = QUANTILES
+) -> List[Dict[str, Any]]:
+    """
+    Summarize each label combination of a histogram
+
+    Args:
+        histogram: The histogram to summarize
+        quantiles: Quantiles to estimate
+
+    Returns:
+        One entry per label combination with its labels, count, sum and
+        quantile estimates keyed "p50", "p95", ...
+    """
+    series: Dict[Tuple, Dict[str, Any]] = {}
+    for family in histogram.collect():
+        for sample in family.samples:
+            labels = {k: v for k, v in sample.labels.items() if k != "le"}
+            entry = series.setdefault(
+                tuple(sorted(labels.items())),
+                {"labels": labels, "count": 0.0, "sum": 0.0, "buckets": []},
+            )
+            if sample.name.endswith("_bucket"):
+                entry["buckets"].append((float(sample.labels["le"]), sample.value))
+            elif sample.name.endswith("_count"):
+                entry["count"] = sample.value
+            elif sample.name.endswith("_sum"):
+                entry["sum"] = sample.value
+
+    summaries = []
+    for entry in series.values():
+        buckets = sorted(entry.pop("buckets"))
+        entry["quantiles"] = {
+            f"p{round(q * 100)}": histogram_quantile(q, buckets) for q in quantiles
+        }
+        summaries.append(entry)
+    return summaries
+
+
+class HistogramQuantileCollector:
+    """
+    Publishes quantile estimates of histograms as "<name>_quantile" gauges,
+    computed from the buckets at scrape time, so dashboards and the text
+    exposition show p50/p95/p99 without running PromQL
+    """
+
+    def __init__(
+        self,
+        histograms: Dict[str, Histogram],
+        quantiles: Sequence[float] = QUANTILES,
+    ):
+        self.histograms = histograms
+        self.quantiles = quantiles
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        for name, histogram in self.histograms.items():
+            summaries = summarize_histogram(histogram, self.quantiles)
+            if not summaries:
+                continue
+
+            label_names = list(summaries[0]["labels"])
+            family = GaugeMetricFamily(
+                f"{name}_quantile",
+                f"Quantile estimates of {name} from its histogram buckets",
+                labels=label_names + ["quantile"],
+            )
+            for summary in summaries:
+                label_values = [summary["labels"][k] for k in label_names]
+                for q in self.quantiles:
+                    value = summary["quantiles"][f"p{round(q * 100)}"]
+                    if value is not None:
+                        family.add_metric(label_values + [str(q)], value)
+            yield family
+
+
+REGISTRY.register(HistogramQuantileCollector(QUANTILE_HISTOGRAMS))
+
+
+def observe_llm_call(
+    model: str,
+    duration: float,
+    usage: Optional[Dict[str, Any]] = None,
+    outcome: str = "success",
+    prompt_sections: Optional[Dict[str, int]] = None,
+) -> None:
+    """
+    Record the latency and token usage of one LLM API call
+
+    Args:
+        model: Model identifier
+        duration: Call duration in seconds
+        usage: The "usage" object of the response, if any
+        outcome: "success" or "error"
+        prompt_sections: Estimated "prefix_tokens" and "suffix_tokens" of the prompt
+    """
+    usage = usage or {}
+    LLM_REQUEST_DURATION.labels(model=model, outcome=outcome).observe(duration)
+    for kind in ("prompt", "completion"):
+        tokens = usage.get(f"{kind}_tokens")
+        if tokens:
+            LLM_TOKENS.labels(model=model, kind=kind).observe(tokens)
+
+    # Prompt tokens the provider served from its prompt cache
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+    if cached:
+        LLM_TOKENS.labels(model=model, kind="cached").observe(cached)
+
+    for section in ("prefix", "suffix"):
+        tokens = (prompt_sections or {}).get(f"{section}_tokens")
+        if tokens:
+            LLM_PROMPT_SECTION_TOKENS.labels(model=model, section=section).observe(
+                tokens
+            )
+
+
+def review_parse_stats() -> Dict[str, Any]:
+    """
+    Reviewer replies counted by parse outcome, with the share that needed a
+    second model call
+
+    Returns:
+        Dict with "outcomes" counts, "total" and "retry_rate"
+    """
+    outcomes = {
+        sample.labels["outcome"]: int(sample.value)
+        for metric in LLM_REVIEW_PARSE.collect()
+        for sample in metric.samples
+        if sample.name.endswith("_total")
+    }
+    total = sum(outcomes.values())
+    retries = outcomes.get("retried", 0) + outcomes.get("failed", 0)
+    return {
+        "outcomes": outcomes,
+        "total": total,
+        "retry_rate": retries / total if total else 0.0,
+    }
+
+
 def get_metrics():
     """Get Prometheus metrics"""
     data = generate_latest()
@@ -0,0 +1,163 @@
+"""
+Parallel PDF text extraction.
+Splits a document into contiguous page ranges and extracts them in the shared
+CPU worker pool (services/worker_pool.py); each worker opens its own fitz
+document and results are joined in page order. Small documents are extracted
+inline, where pool overhead would dominate.
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple, Union
+
+import fitz
+
+logger = logging.getLogger(__name__)
+
+# Documents with fewer pages than this are extracted inline
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+
+# Set while several documents are extracted concurrently; small PDFs are then
+# extracted whole in the pool instead of holding the GIL in the calling thread
+_offload_small_documents: ContextVar[bool] = ContextVar(
+    "offload_small_pdfs", default=False
+)
+
+
+def split_page_ranges(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """
+    Split pages into contiguous, nearly equal ranges.
+
+    Args:
+        page_count: Number of pages in the document
+        parts: Number of ranges to produce (at most page_count)
+
+    Returns:
+        List of (start, end) tuples, end exclusive
+    """
+    parts = max(1, min(parts, page_count))
+    base, extra = divmod(page_count, parts)
+    ranges = []
+    start = 0
+    for i in range(parts):
+        end = start + base + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def extract_page_range(file_path: str, start: int, end: int) -> List[str]:
+    """
+    Extract the text of pages [start, end) of a PDF.
+    Runs in a worker process, so it opens its own document handle.
+
+    Args:
+        file_path: Path to the PDF file
+        start: First page index (inclusive)
+        end: Last page index (exclusive)
+
+    Returns:
+        List of page texts in order
+    """
+    with fitz.open(file_path) as doc:
+        return [doc[page_num].get_text() for page_num in range(start, end)]
+
+
+def get_page_count(file_path: Union[str, os.PathLike]) -> int:
+    """Return the number of pages in a PDF"""
+    with fitz.open(str(file_path)) as doc:
+        return doc.page_count
+
+
+@contextmanager
+def offload_small_pdfs() -> Iterator[None]:
+    """
+    Extract PDFs below PDF_PARALLEL_MIN_PAGES in the process pool too, as a
+    single range, for code running inside the block. Used when documents are
+    extracted concurrently, where the parallelism comes from the documents.
+    """
+    token = _offload_small_documents.set(True)
+    try:
+        yield
+    finally:
+        _offload_small_documents.reset(token)
+
+
+def _can_use_pool() -> bool:
+    """Pool workers are daemonic and cannot start their own children"""
+    return not multiprocessing.current_process().daemon
+
+
+def iter_pdf_pages_parallel(
+    file_path: Union[str, os.PathLike],
+    max_workers: Optional[int] = None,
+    min_pages: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    Yield the text of each page of a PDF, extracting page ranges in parallel.
+    Pages are yielded in order as soon as the range containing them is done.
+
+    Args:
+        file_path: Path to the PDF file
+        max_workers: Number of ranges to fan out (defaults to the size of the
+            shared CPU pool)
+        min_pages: Page count below which extraction runs inline
+            (defaults to PDF_PARALLEL_MIN_PAGES)
+
+    Yields:
+        Text of one page
+    """
+    # Imported here so pool workers unpickling extract_page_range do not
+    # load the services package
+    from services.worker_pool import worker_pool
+
+    file_path = str(file_path)
+    workers = max_workers or worker_pool.cpu_workers
+    threshold = PDF_PARALLEL_MIN_PAGES if min_pages is None else min_pages
+    page_count = get_page_count(file_path)
+
+    offload = page_count > 0 and _offload_small_documents.get()
+    if (page_count < threshold and not offload) or workers <= 1 or not _can_use_pool():
+        yield from extract_page_range(file_path, 0, page_count)
+        return
+
+    ranges = (
+        split_page_ranges(page_count, workers)
+        if page_count >= threshold
+        else [(0, page_count)]
+    )
+    futures: List[Future] = [
+        worker_pool.submit_cpu(extract_page_range, file_path, start, end)
+        for start, end in ranges
+    ]
+    logger.debug(
+        f"Extracting {page_count} pages of {file_path} in {len(futures)} ranges"
+    )
+
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def extract_pdf_pages_parallel(
+    file_path: Union[str, os.PathLike], max_workers: Optional[int] = None
+) -> List[str]:
+    """
+    Extract the text of every page of a PDF using the process pool.
+
+    Args:
+        file_path: Path to the PDF file
+        max_workers: Number of ranges to fan out (defaults to the size of the
+            shared CPU pool)
+
+    Returns:
+        List of page texts in order
+    """
+    return list(iter_pdf_pages_parallel(file_path, max_workers=max_workers))
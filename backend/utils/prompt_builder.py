@@ -0,0 +1,380 @@
+"""
+Token-budgeted prompt assembly.
+
+A prompt is described as named sections (brand guide, reference examples,
+user documents, feedback...) with a priority each. Sections are measured with
+a local tokenizer and, when the prompt would exceed its budget, the
+lowest-priority sections are trimmed first, down to their minimum size, so the
+most important context survives. Each decision is logged and kept in the
+builder's report.
+
+Token counts use tiktoken when it is installed and fall back to an estimate of
+four characters per token otherwise.
+"""
+
+import logging
+import os
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Default prompt budget in tokens, leaving the rest of the context for the reply
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "60000"))
+# Budget for the combined text of user documents pasted into a prompt
+PROMPT_DOCUMENTS_TOKEN_BUDGET = int(os.getenv("PROMPT_DOCUMENTS_TOKEN_BUDGET", "40000"))
+# tiktoken encoding used for counting
+PROMPT_TOKENIZER_ENCODING = os.getenv("PROMPT_TOKENIZER_ENCODING", "cl100k_base")
+
+# Inserted where text was cut
+TRUNCATION_MARKER = "\n[...]\n"
+
+# Trimming modes
+HEAD = "head"  # keep the beginning of the text
+HEAD_TAIL = "head_tail"  # keep the beginning and the end
+ITEMS = "items"  # keep whole list items in order, drop the rest
+FAIR_SHARE = "fair_share"  # give every list item an equal share, cut the long ones
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """Load the tiktoken encoding once, or None if it is unavailable"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        if tiktoken is not None:
+            try:
+                _encoding = tiktoken.get_encoding(PROMPT_TOKENIZER_ENCODING)
+            except Exception as e:
+                logger.warning(
+                    f"Tokenizer {PROMPT_TOKENIZER_ENCODING} unavailable, "
+                    f"estimating token counts: {str(e)}"
+                )
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of a text
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Token count (estimated if no tokenizer is available)
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def _cut_head(text: str, max_tokens: int) -> str:
+    """Keep at most max_tokens from the start of a text, ending on a word boundary"""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    encoding = _get_encoding()
+    if encoding is not None:
+        head = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    else:
+        head = text[: max_tokens * 4]
+
+    boundary = max(head.rfind("\n"), head.rfind(" "))
+    if boundary > len(head) * 0.8:
+        head = head[:boundary]
+    return head
+
+
+def _cut_tail(text: str, max_tokens: int) -> str:
+    """Keep at most max_tokens from the end of a text, starting on a word boundary"""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    encoding = _get_encoding()
+    if encoding is not None:
+        tail = encoding.decode(encoding.encode(text, disallowed_special=())[-max_tokens:])
+    else:
+        tail = text[-max_tokens * 4 :]
+
+    boundary = min(
+        (i for i in (tail.find("\n"), tail.find(" ")) if i >= 0), default=-1
+    )
+    if 0 <= boundary < len(tail) * 0.2:
+        tail = tail[boundary + 1 :]
+    return tail
+
+
+def truncate_text(text: str, max_tokens: int, mode: str = HEAD) -> str:
+    """
+    Shorten a text to a token budget, marking the cut
+
+    Args:
+        text: Text to shorten
+        max_tokens: Token budget, including the truncation marker
+        mode: HEAD to keep the beginning, HEAD_TAIL to keep two thirds of the
+            budget from the beginning and one third from the end
+
+    Returns:
+        The text itself if it fits, otherwise the shortened text
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    budget = max_tokens - count_tokens(TRUNCATION_MARKER)
+    if budget <= 0:
+        return ""
+
+    if mode == HEAD_TAIL:
+        head_tokens = budget * 2 // 3
+        return (
+            _cut_head(text, head_tokens)
+            + TRUNCATION_MARKER
+            + _cut_tail(text, budget - head_tokens)
+        )
+    return _cut_head(text, budget) + TRUNCATION_MARKER
+
+
+class PromptSection:
+    """
+    One named part of a prompt: a text, or a list of texts (documents,
+    examples) joined by a separator
+    """
+
+    def __init__(
+        self,
+        name: str,
+        content: Union[str, Sequence[str]],
+        priority: int,
+        min_tokens: int = 0,
+        max_tokens: Optional[int] = None,
+        mode: Optional[str] = None,
+        separator: str = "\n\n",
+    ):
+        """
+        Initialize the section
+
+        Args:
+            name: Section name, used as the key of the build result
+            content: Section text or list of item texts
+            priority: Higher priorities are trimmed later
+            min_tokens: The section is never trimmed below this size
+            max_tokens: Cap applied even when the prompt is within budget
+            mode: Trimming mode; defaults to HEAD for text and ITEMS for lists
+            separator: Separator between list items
+        """
+        self.name = name
+        self.is_list = not isinstance(content, str)
+        self.items: List[str] = (
+            [item for item in content if item] if self.is_list else [content]
+        )
+        self.total_items = len(self.items)
+        self.priority = priority
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self.mode = mode or (ITEMS if self.is_list else HEAD)
+        self.separator = separator
+
+    @property
+    def text(self) -> str:
+        """Current section text"""
+        return self.separator.join(self.items)
+
+    def tokens(self) -> int:
+        """Current section size in tokens"""
+        return count_tokens(self.text)
+
+    def fit(self, max_tokens: int) -> None:
+        """
+        Shorten the section to at most max_tokens using its mode
+
+        Args:
+            max_tokens: Token budget for the section
+        """
+        if self.tokens() <= max_tokens:
+            return
+
+        if self.mode == ITEMS:
+            self.items = self._fit_items(max_tokens)
+        elif self.mode == FAIR_SHARE:
+            self.items = self._fit_fair_share(max_tokens)
+        else:
+            text = truncate_text(self.text, max_tokens, self.mode)
+            self.items = [text] if text else []
+
+    def _fit_items(self, max_tokens: int) -> List[str]:
+        """Keep whole items in order while they fit"""
+        separator_tokens = count_tokens(self.separator)
+        kept: List[str] = []
+        used = 0
+        for item in self.items:
+            cost = count_tokens(item) + (separator_tokens if kept else 0)
+            if used + cost > max_tokens:
+                break
+            kept.append(item)
+            used += cost
+
+        # Better a shortened first item than nothing at all
+        if not kept and self.items:
+            first = truncate_text(self.items[0], max_tokens)
+            return [first] if first else []
+        return kept
+
+    def _fit_fair_share(self, max_tokens: int) -> List[str]:
+        """Split the budget evenly, letting short items give their unused share to long ones"""
+        separator_tokens = count_tokens(self.separator) * (len(self.items) - 1)
+        remaining = max_tokens - separator_tokens
+        sizes = [count_tokens(item) for item in self.items]
+
+        cap = max(sizes, default=0)
+        pending = len(sizes)
+        for size in sorted(sizes):
+            share = remaining // pending
+            if size > share:
+                cap = share
+                break
+            remaining -= size
+            pending -= 1
+
+        fitted = [
+            item if size <= cap else truncate_text(item, cap, HEAD_TAIL)
+            for item, size in zip(self.items, sizes)
+        ]
+        return [item for item in fitted if item]
+
+
+class PromptBuilder:
+    """
+    Fits prompt sections into a token budget by trimming the lowest-priority
+    sections first
+
+    Usage:
+        builder = PromptBuilder(budget_tokens=30000, name="writer")
+        builder.add_section("user_docs", documents, priority=3, mode=FAIR_SHARE)
+        builder.add_section("references", examples, priority=1)
+        sections = builder.build()
+    """
+
+    def __init__(
+        self,
+        budget_tokens: int = PROMPT_TOKEN_BUDGET,
+        reserved_tokens: int = 0,
+        name: str = "prompt",
+    ):
+        """
+        Initialize the builder
+
+        Args:
+            budget_tokens: Total prompt budget
+            reserved_tokens: Part of the budget kept free for text added later
+                (instructions, a draft, per-call feedback)
+            name: Prompt name used in log messages
+        """
+        self.budget_tokens = budget_tokens
+        self.reserved_tokens = reserved_tokens
+        self.name = name
+        self.sections: List[PromptSection] = []
+        self.report: List[Dict[str, Any]] = []
+
+    def add_section(
+        self,
+        name: str,
+        content: Union[str, Sequence[str]],
+        priority: int,
+        min_tokens: int = 0,
+        max_tokens: Optional[int] = None,
+        mode: Optional[str] = None,
+        separator: str = "\n\n",
+    ) -> "PromptBuilder":
+        """
+        Add a section to the prompt (see PromptSection for the arguments)
+
+        Returns:
+            The builder, for chaining
+        """
+        self.sections.append(
+            PromptSection(
+                name, content, priority, min_tokens, max_tokens, mode, separator
+            )
+        )
+        return self
+
+    def build(self) -> Dict[str, str]:
+        """
+        Fit all sections into the budget
+
+        Returns:
+            Fitted text of each section by name
+        """
+        original = {section.name: section.tokens() for section in self.sections}
+
+        # Per-section caps apply regardless of the overall budget
+        for section in self.sections:
+            if section.max_tokens is not None:
+                section.fit(section.max_tokens)
+
+        available = self.budget_tokens - self.reserved_tokens
+        excess = sum(section.tokens() for section in self.sections) - available
+
+        # sorted() is stable, so equal priorities are trimmed in insertion order
+        for section in sorted(self.sections, key=lambda s: s.priority):
+            if excess <= 0:
+                break
+            current = section.tokens()
+            reducible = current - section.min_tokens
+            if reducible <= 0:
+                continue
+            section.fit(current - min(excess, reducible))
+            excess -= current - section.tokens()
+
+        self.report = []
+        for section in self.sections:
+            tokens = section.tokens()
+            if tokens == original[section.name]:
+                action = "kept"
+            elif tokens == 0:
+                action = "dropped"
+            else:
+                action = "trimmed"
+            entry = {
+                "section": section.name,
+                "priority": section.priority,
+                "original_tokens": original[section.name],
+                "tokens": tokens,
+                "action": action,
+            }
+            if section.is_list:
+                entry["items"] = len(section.items)
+                entry["total_items"] = section.total_items
+            self.report.append(entry)
+
+            if action != "kept":
+                logger.info(
+                    f"Prompt budget ({self.name}): {action} {section.name} from "
+                    f"{original[section.name]} to {tokens} tokens"
+                )
+
+        total = sum(entry["tokens"] for entry in self.report)
+        if excess > 0:
+            logger.warning(
+                f"Prompt budget ({self.name}): {total} tokens exceed the "
+                f"{available} available even with every section at its minimum"
+            )
+        else:
+            logger.info(
+                f"Prompt budget ({self.name}): {total}/{available} tokens used"
+            )
+
+        return {section.name: section.text for section in self.sections}
@@ -0,0 +1,196 @@
+"""
+Similarity index over the reference reports used as style examples.
+
+The reports in data/reference_reports.jsonl are turned into TF-IDF vectors
+once, stored as the rows of an L2-normalised NumPy matrix. Picking examples
+for a claim is then a single matrix-vector product (cosine similarity) and a
+top-k selection, with no file access per request.
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .static_assets import REFERENCE_REPORTS, REFERENCE_REPORTS_PATH, static_assets
+
+logger = logging.getLogger(__name__)
+
+# Number of examples given to the writer and reviewer
+REFERENCE_TOP_K = int(os.getenv("REFERENCE_TOP_K", "3"))
+
+_TOKEN_PATTERN = re.compile(r"[^\W\d_]{3,}")
+
+# Function words that carry no signal about the kind of claim
+STOPWORDS = frozenset(
+    """
+    alla alle allo agli anche ancora avere come con cui dai dal dall dalla dalle
+    degli dei del dell della delle dello detto essere fra gli hanno nei nel nell
+    nella nelle nello non per più poi quale quali quanto quella quelle quello
+    questa queste questo sono stata stati stato sua sue sul sull sulla sulle suo
+    suoi tra una uno che ciò era erano sia tutti tutto the and for with
+    """.split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a text into lowercase word terms, without digits and stopwords
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of terms
+    """
+    return [
+        token
+        for token in _TOKEN_PATTERN.findall(text.lower())
+        if token not in STOPWORDS
+    ]
+
+
+def _example_text(example: Dict) -> str:
+    """Text of a chat-format example: its request and its report"""
+    return "\n".join(
+        message.get("content", "") for message in example.get("messages", [])
+    )
+
+
+class ReferenceIndex:
+    """
+    TF-IDF index of reference report examples
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        loader: Optional[Callable[[], Sequence[Dict]]] = None,
+    ):
+        """
+        Initialize the index; it is built on first use or by build()
+
+        Args:
+            path: Path of the JSON Lines file of examples
+            loader: Function returning the examples, used instead of reading path
+        """
+        self.path = Path(path)
+        self.loader = loader
+        self.examples: Sequence[Dict] = []
+        self.vocabulary: Dict[str, int] = {}
+        self.idf: Optional[np.ndarray] = None
+        self.matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self._built = False
+
+    def build(self, examples: Optional[Sequence[Dict]] = None) -> None:
+        """
+        Build the index from the examples file, or from the given examples
+
+        Args:
+            examples: Examples to index instead of loading them
+        """
+        if examples is None and self.loader is not None:
+            examples = self.loader()
+        if examples is None:
+            examples = []
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        examples.append(json.loads(line))
+
+        documents = [Counter(tokenize(_example_text(ex))) for ex in examples]
+
+        vocabulary: Dict[str, int] = {}
+        document_frequency: Counter = Counter()
+        for terms in documents:
+            document_frequency.update(terms.keys())
+            for term in terms:
+                vocabulary.setdefault(term, len(vocabulary))
+
+        # Smoothed idf, as in scikit-learn's TfidfVectorizer
+        idf = np.zeros(len(vocabulary), dtype=np.float32)
+        for term, index in vocabulary.items():
+            idf[index] = math.log((1 + len(documents)) / (1 + document_frequency[term])) + 1
+
+        matrix = np.zeros((len(documents), len(vocabulary)), dtype=np.float32)
+        for row, terms in enumerate(documents):
+            for term, count in terms.items():
+                # Sublinear tf so long reports are not dominated by repeated words
+                matrix[row, vocabulary[term]] = 1 + math.log(count)
+        matrix *= idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            self.examples = examples
+            self.vocabulary = vocabulary
+            self.idf = idf
+            self.matrix = matrix
+            self._built = True
+
+        logger.info(
+            f"Built reference index: {len(examples)} examples, {len(vocabulary)} terms"
+        )
+
+    def _ensure_built(self) -> None:
+        """Build the index on first use if startup did not"""
+        if not self._built:
+            self.build()
+
+    @staticmethod
+    def _vectorize(
+        text: str, vocabulary: Dict[str, int], idf: np.ndarray
+    ) -> np.ndarray:
+        """TF-IDF vector of a query, normalised; terms outside the vocabulary are ignored"""
+        vector = np.zeros(len(vocabulary), dtype=np.float32)
+        for term, count in Counter(tokenize(text)).items():
+            index = vocabulary.get(term)
+            if index is not None:
+                vector[index] = 1 + math.log(count)
+        vector *= idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def top_k(self, query: str, k: int = REFERENCE_TOP_K) -> List[Dict]:
+        """
+        Find the examples most similar to a query
+
+        Args:
+            query: Claim description or document text
+            k: Number of examples to return
+
+        Returns:
+            Up to k examples, most similar first. Without any overlap the
+            first k examples of the file are returned, so the selection is
+            deterministic.
+        """
+        self._ensure_built()
+        # Read the index as one snapshot, as a reload may replace it meanwhile
+        with self._lock:
+            examples, vocabulary = self.examples, self.vocabulary
+            idf, matrix = self.idf, self.matrix
+        if not examples or k <= 0:
+            return []
+
+        k = min(k, len(examples))
+        scores = matrix @ self._vectorize(query, vocabulary, idf)
+        # argpartition finds the top k in linear time; only those are sorted
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.lexsort((top, -scores[top]))]
+        return [examples[i] for i in top]
+
+
+# Global index shared by all agent loops, fed from the static asset registry
+# and rebuilt whenever the examples file changes
+reference_index = ReferenceIndex(
+    REFERENCE_REPORTS_PATH, loader=lambda: static_assets.get(REFERENCE_REPORTS)
+)
+static_assets.subscribe(REFERENCE_REPORTS, reference_index.build)
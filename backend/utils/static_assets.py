@@ -0,0 +1,237 @@
+"""
+Process-wide registry of static assets used by report generation.
+
+The brand guide, the prompts, the reference report examples and DOCX templates
+are read once and kept in memory as immutable values, so building an agent
+loop or rendering a document does not touch the filesystem. A background task
+started with the application stats the files periodically and swaps in a new
+value when a file's mtime changes; listeners (such as the reference index) are
+notified of each reload.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Union
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+BRAND_GUIDE_PATH = os.getenv("BRAND_GUIDE_PATH", str(DATA_DIR / "brand_guide.txt"))
+PROMPTS_PATH = os.getenv("PROMPTS_PATH", str(DATA_DIR / "prompts.json"))
+REFERENCE_REPORTS_PATH = os.getenv(
+    "REFERENCE_REPORTS_PATH", str(DATA_DIR / "reference_reports.jsonl")
+)
+TEMPLATE_DOCX_PATH = os.getenv(
+    "TEMPLATE_DOCX_PATH",
+    str(Path(__file__).parent.parent / "reference_reports" / "template.docx"),
+)
+# Seconds between mtime checks; 0 disables hot reloading
+STATIC_ASSETS_RELOAD_INTERVAL = float(os.getenv("STATIC_ASSETS_RELOAD_INTERVAL", "5"))
+
+# Asset names
+BRAND_GUIDE = "brand_guide"
+PROMPTS = "prompts"
+REFERENCE_REPORTS = "reference_reports"
+TEMPLATE_DOCX = "template_docx"
+
+_NOT_LOADED = object()
+
+
+def freeze(value: Any) -> Any:
+    """
+    Make a parsed JSON value read-only: dicts become mappingproxies and lists
+    become tuples, recursively
+
+    Args:
+        value: Parsed JSON value
+
+    Returns:
+        Immutable equivalent of the value
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def read_text(path: Path) -> str:
+    """Loader for UTF-8 text files"""
+    return path.read_text(encoding="utf-8")
+
+
+def read_bytes(path: Path) -> bytes:
+    """Loader for binary files"""
+    return path.read_bytes()
+
+
+def read_json(path: Path) -> Any:
+    """Loader for JSON files"""
+    with open(path, "r", encoding="utf-8") as f:
+        return freeze(json.load(f))
+
+
+def read_jsonl(path: Path) -> tuple:
+    """Loader for JSON Lines files"""
+    with open(path, "r", encoding="utf-8") as f:
+        return tuple(freeze(json.loads(line)) for line in f if line.strip())
+
+
+class _Asset:
+    """A registered file with its loaded value and the mtime it was loaded at"""
+
+    __slots__ = ("path", "loader", "value", "mtime")
+
+    def __init__(self, path: Path, loader: Callable[[Path], Any]):
+        self.path = path
+        self.loader = loader
+        self.value = _NOT_LOADED
+        self.mtime = None
+
+
+class StaticAssetRegistry:
+    """
+    In-memory registry of file-backed assets, reloaded when files change
+
+    Usage:
+        static_assets.register("brand_guide", "data/brand_guide.txt", read_text)
+        guide = static_assets.get("brand_guide")
+        template = static_assets.get_file("reference_reports/template.docx")
+    """
+
+    def __init__(self):
+        self._assets: Dict[str, _Asset] = {}
+        self._listeners: Dict[str, List[Callable[[Any], None]]] = {}
+        self._lock = threading.Lock()
+
+    def register(
+        self, name: str, path: Union[str, Path], loader: Callable[[Path], Any]
+    ) -> None:
+        """
+        Register an asset; it is loaded on first access or by load_all()
+
+        Args:
+            name: Asset name
+            path: File to load
+            loader: Function turning the file into the asset value
+        """
+        with self._lock:
+            self._assets[name] = _Asset(Path(path), loader)
+
+    def subscribe(self, name: str, listener: Callable[[Any], None]) -> None:
+        """
+        Call a function with the new value each time an asset is reloaded
+
+        Args:
+            name: Asset name
+            listener: Function receiving the reloaded value
+        """
+        self._listeners.setdefault(name, []).append(listener)
+
+    def _load(self, asset: _Asset) -> Any:
+        """Read an asset from disk and record its mtime"""
+        mtime = asset.path.stat().st_mtime_ns
+        asset.value = asset.loader(asset.path)
+        asset.mtime = mtime
+        return asset.value
+
+    def get(self, name: str) -> Any:
+        """
+        Get the current value of an asset
+
+        Args:
+            name: Asset name
+
+        Returns:
+            The loaded value; the file is only read if it was never loaded
+        """
+        asset = self._assets[name]
+        value = asset.value
+        if value is _NOT_LOADED:
+            with self._lock:
+                value = asset.value
+                if value is _NOT_LOADED:
+                    value = self._load(asset)
+        return value
+
+    def get_file(self, path: Union[str, Path]) -> bytes:
+        """
+        Get the bytes of a file, registering it under its resolved path
+
+        Args:
+            path: File path
+
+        Returns:
+            File contents
+        """
+        name = str(Path(path).resolve())
+        if name not in self._assets:
+            self.register(name, name, read_bytes)
+        return self.get(name)
+
+    def load_all(self) -> None:
+        """Load every registered asset that is not loaded yet"""
+        for name in list(self._assets):
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.error(f"Error loading static asset {name}: {str(e)}")
+
+    def refresh(self) -> List[str]:
+        """
+        Reload the assets whose file changed since they were loaded.
+        A file that fails to load keeps its previous value and is retried on
+        the next refresh.
+
+        Returns:
+            Names of the reloaded assets
+        """
+        reloaded = []
+        for name, asset in list(self._assets.items()):
+            if asset.value is _NOT_LOADED:
+                continue
+            try:
+                if asset.path.stat().st_mtime_ns == asset.mtime:
+                    continue
+                with self._lock:
+                    value = self._load(asset)
+            except Exception as e:
+                logger.warning(f"Error reloading static asset {name}: {str(e)}")
+                continue
+
+            reloaded.append(name)
+            logger.info(f"Reloaded static asset {name} from {asset.path}")
+            for listener in self._listeners.get(name, []):
+                try:
+                    listener(value)
+                except Exception as e:
+                    logger.error(f"Error in reload listener for {name}: {str(e)}")
+        return reloaded
+
+    async def watch(self, interval: float = STATIC_ASSETS_RELOAD_INTERVAL) -> None:
+        """
+        Check for changed files every interval seconds, until cancelled
+
+        Args:
+            interval: Seconds between checks
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.error(f"Error refreshing static assets: {str(e)}")
+
+
+# Global registry
+static_assets = StaticAssetRegistry()
+static_assets.register(BRAND_GUIDE, BRAND_GUIDE_PATH, read_text)
+static_assets.register(PROMPTS, PROMPTS_PATH, read_json)
+static_assets.register(REFERENCE_REPORTS, REFERENCE_REPORTS_PATH, read_jsonl)
+static_assets.register(TEMPLATE_DOCX, TEMPLATE_DOCX_PATH, read_bytes)
@@ -6,7 +6,9 @@ This module provides helper functions to create Supabase clients with proper con
 """
 
 import logging
+import os
 import threading
+from collections import deque
 from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime, timedelta
 from typing import (
@@ -19,12 +21,15 @@ from typing import (
     List,
     Generic,
     AsyncIterator,
+    Deque,
 )
 
-from supabase import create_client
-from supabase.client import Client, ClientOptions
+import httpx
+from supabase import acreate_client, create_client
+from supabase.client import Client
 from postgrest.base_request_builder import APIResponse
-from supabase.lib.auth_client import SupabaseAuthClient
+from utils.monitoring import SUPABASE_POOL_CONNECTIONS, SUPABASE_POOL_WAIT
+from utils.tracing import tracer
 
 # Import only one version of APIResponse to avoid conflicts
 try:
@@ -67,135 +72,249 @@ class SupabaseConfigError(Exception):
 
 
 # Connection pool settings
-MAX_CONNECTIONS = 10
+MAX_CONNECTIONS = int(os.getenv("SUPABASE_POOL_SIZE", "10"))
 MAX_RETRIES = 3
 RETRY_DELAY = 1.0  # Base delay between retries in seconds
-CONNECTION_TIMEOUT = 3600  # 1 hour in seconds
+CONNECTION_TIMEOUT = 3600  # Idle clients older than this are closed (seconds)
 CONNECTION_EXPIRY_SECONDS = 300
 POOL_CLEANUP_INTERVAL = 60  # Cleanup interval in seconds
+# Maximum wait for a free client when the pool is exhausted (seconds)
+POOL_ACQUIRE_TIMEOUT = float(os.getenv("SUPABASE_POOL_ACQUIRE_TIMEOUT", "30"))
 
 
-# Thread-safe connection pool with LRU eviction and expiration
-class SupabaseConnectionPool:
-    """A thread-safe connection pool for Supabase clients."""
-
-    def __init__(self, url: str, key: str, options: Optional[ClientOptions] = None):
-        self.url = url
-        self.key = key
-        self.options = options
-        self.pool: Dict[str, Tuple[Client, float]] = {}
-        self.lock = asyncio.Lock()
-        self._cleanup_task = None
-        self._start_cleanup_task()
-
-    def _start_cleanup_task(self):
-        """Start the periodic cleanup task if not already running."""
-        if self._cleanup_task is None or self._cleanup_task.done():
-            self._cleanup_task = asyncio.create_task(self._periodic_cleanup())
-
-    async def _periodic_cleanup(self):
-        """Periodically clean up expired connections."""
-        while True:
-            try:
-                await asyncio.sleep(POOL_CLEANUP_INTERVAL)
-                await self.cleanup_expired()
-            except Exception as e:
-                logger.error(f"Error during connection pool cleanup: {str(e)}")
+def _is_connection_error(error: BaseException) -> bool:
+    """Whether an error means the client's connection can no longer be trusted"""
+    return isinstance(
+        error, (httpx.TransportError, ConnectionError, SupabaseConnectionError)
+    )
 
-    async def cleanup_expired(self) -> None:
-        """Clean up expired connections from the pool"""
-        async with self.lock:
-            current_time = time.time()
-            expired_keys: List[str] = []
 
-            for key, (client, last_used) in self.pool.items():
-                if current_time - last_used > CONNECTION_TIMEOUT:
-                    expired_keys.append(key)
-                    try:
-                        await client.auth.sign_out()
-                    except Exception as e:
-                        logger.warning(f"Error signing out expired client: {str(e)}")
+async def _close_client(client: Client) -> None:
+    """Close the HTTP sessions a discarded client has opened"""
+    sessions = [
+        getattr(client, "_postgrest", None),
+        getattr(client, "_storage", None),
+        getattr(client, "auth", None),
+    ]
+    for session in sessions:
+        close = getattr(session, "aclose", None) or getattr(session, "close", None)
+        if close is None:
+            continue
+        try:
+            await close()
+        except Exception as e:
+            logger.debug(f"Error closing Supabase client session: {str(e)}")
 
-            for key in expired_keys:
-                del self.pool[key]
 
-            if expired_keys:
-                logger.info(f"Cleaned up {len(expired_keys)} expired connections")
+class _PooledClient:
+    """A pooled client with the time it was last returned"""
 
-    async def get(self, key: str) -> Optional[Client]:
-        """
-        Get a client from the pool.
+    __slots__ = ("client", "last_used")
 
-        Args:
-            key: The unique key for the client
+    def __init__(self, client: Client):
+        self.client = client
+        self.last_used = time.time()
 
-        Returns:
-            The client if found in the pool, None otherwise
-        """
-        async with self.lock:
-            if key in self.pool:
-                client, _ = self.pool[key]
-                # Update last used time
-                self.pool[key] = (client, time.time())
-                return client
-            return None
 
-    async def put(self, key: str, client: Client) -> None:
-        """
-        Add a client to the pool, evicting the least recently used client if necessary.
+class SupabaseConnectionPool:
+    """
+    A bounded pool of long-lived async Supabase clients.
 
-        Args:
-            key: The unique key for the client
-            client: The Supabase client to add to the pool
+    At most max_size clients exist at a time; they are created on demand,
+    handed out most recently used first, and returned after use. Callers wait
+    when every client is checked out. Checkouts are not health-checked, as
+    that would cost a round-trip each; instead a client is closed when a
+    caller hit a connection error with it or it sat idle for too long.
+    """
+
+    def __init__(
+        self,
+        max_size: int = MAX_CONNECTIONS,
+        acquire_timeout: float = POOL_ACQUIRE_TIMEOUT,
+        max_idle_seconds: float = CONNECTION_TIMEOUT,
+    ):
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.max_idle_seconds = max_idle_seconds
+        self._idle: Deque[_PooledClient] = deque()
+        self._in_use: Dict[int, _PooledClient] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.metrics = {
+            "checkouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "timeouts": 0,
+            "wait_time": 0.0,
+        }
+
+    def _bind_loop(self) -> asyncio.Semaphore:
+        """
+        Create the pool's semaphore for the running event loop. Clients hold
+        connections tied to the loop they were created on, so they are
+        dropped if the pool is used from a new loop.
         """
-        async with self.lock:
-            # Check if we need to evict
-            if len(self.pool) >= MAX_CONNECTIONS and key not in self.pool:
-                await self.evict_oldest()
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._idle.clear()
+            self._in_use.clear()
+            self._slots = asyncio.Semaphore(self.max_size)
+            self._loop = loop
+        return self._slots
+
+    def _update_gauges(self) -> None:
+        """Publish the pool size to Prometheus"""
+        SUPABASE_POOL_CONNECTIONS.labels(state="idle").set(len(self._idle))
+        SUPABASE_POOL_CONNECTIONS.labels(state="in_use").set(len(self._in_use))
+
+    async def _create_client(self) -> Client:
+        """Create a client, retrying with backoff"""
+        last_error = None
+        for attempt in range(1, MAX_RETRIES + 1):
+            try:
+                client = await create_supabase_client()
+                self.metrics["created"] += 1
+                return client
+            except SupabaseConfigError:
+                raise
+            except Exception as e:
+                last_error = e
+                logger.warning(
+                    f"Failed to create Supabase client (attempt {attempt}/{MAX_RETRIES}): {str(e)}"
+                )
+                if attempt < MAX_RETRIES:
+                    await asyncio.sleep(RETRY_DELAY * attempt)  # Exponential backoff
 
-            self.pool[key] = (client, time.time())
+        raise SupabaseConnectionError(
+            f"Failed to establish Supabase connection after {MAX_RETRIES} attempts. "
+            f"Last error: {str(last_error)}"
+        )
 
-    async def evict_oldest(self) -> None:
-        """Evict the least recently used client from the pool"""
-        if not self.pool:
-            return
+    async def _discard(self, clients: List[Client]) -> None:
+        """Close clients that leave the pool"""
+        self.metrics["discarded"] += len(clients)
+        for client in clients:
+            await _close_client(client)
 
-        oldest_key = None
-        oldest_time = None
+    async def acquire(self) -> Client:
+        """
+        Check out a client, waiting for one to be returned if the pool is full.
 
-        for key, (client, last_used) in self.pool.items():
-            if oldest_time is None or last_used < oldest_time:
-                oldest_key = key
-                oldest_time = last_used
+        Returns:
+            A Supabase client, to be handed back with release()
 
-        if oldest_key:
-            logger.debug(
-                f"Evicting oldest Supabase connection: last used {oldest_time}"
+        Raises:
+            SupabaseConnectionError: If no client is free within acquire_timeout
+                or a new client cannot be created
+        """
+        slots = self._bind_loop()
+        wait_start = time.time()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.metrics["timeouts"] += 1
+            raise SupabaseConnectionError(
+                f"No Supabase client available after {self.acquire_timeout}s "
+                f"({self.max_size} in use)"
             )
-            client, _ = self.pool[oldest_key]
-            try:
-                await client.auth.sign_out()
-            except Exception as e:
-                logger.warning(f"Error signing out client during eviction: {str(e)}")
-            del self.pool[oldest_key]
-
-    async def size(self) -> int:
-        """Get the current size of the pool"""
-        async with self.lock:
-            return len(self.pool)
+        wait_time = time.time() - wait_start
+        SUPABASE_POOL_WAIT.observe(wait_time)
+        self.metrics["wait_time"] += wait_time
+        self.metrics["checkouts"] += 1
 
-    async def get_session(self, client: Client) -> Optional[Dict[str, Any]]:
-        """Get the current session from the client"""
         try:
-            session = await client.auth.get_session()
-            return session.model_dump() if session else None
-        except Exception as e:
-            logger.error(f"Error getting session: {str(e)}")
-            return None
+            pooled = None
+            while self._idle:
+                candidate = self._idle.pop()
+                if time.time() - candidate.last_used <= self.max_idle_seconds:
+                    pooled = candidate
+                    break
+                await self._discard([candidate.client])
+
+            if pooled is None:
+                pooled = _PooledClient(await self._create_client())
+        except BaseException:
+            slots.release()
+            self._update_gauges()
+            raise
+
+        self._in_use[id(pooled.client)] = pooled
+        self._update_gauges()
+        return pooled.client
+
+    async def release(self, client: Client, healthy: bool = True) -> None:
+        """
+        Return a client to the pool.
+
+        Args:
+            client: Client obtained from acquire()
+            healthy: False to close the client instead of reusing it
+        """
+        pooled = self._in_use.pop(id(client), None)
+        if pooled is None:
+            # Checked out before the pool moved to a new event loop
+            return
+        if healthy:
+            pooled.last_used = time.time()
+            self._idle.append(pooled)
+        if self._slots is not None:
+            self._slots.release()
+        self._update_gauges()
+        if not healthy:
+            await self._discard([client])
+
+    async def cleanup_expired(self) -> int:
+        """
+        Close idle clients unused for longer than max_idle_seconds.
+
+        Returns:
+            Number of clients removed
+        """
+        now = time.time()
+        expired = [
+            p.client for p in self._idle if now - p.last_used > self.max_idle_seconds
+        ]
+        self._idle = deque(
+            p for p in self._idle if now - p.last_used <= self.max_idle_seconds
+        )
+        self._update_gauges()
+        await self._discard(expired)
+        return len(expired)
+
+    async def clear(self) -> None:
+        """Close every idle client; checked-out clients are kept until returned"""
+        idle = [p.client for p in self._idle]
+        self._idle.clear()
+        self._update_gauges()
+        await self._discard(idle)
+
+    def size(self) -> int:
+        """Get the number of clients currently open"""
+        return len(self._idle) + len(self._in_use)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get pool statistics.
+
+        Returns:
+            Dictionary with pool sizes and checkout counters
+        """
+        checkouts = self.metrics["checkouts"]
+        return {
+            "max_size": self.max_size,
+            "idle": len(self._idle),
+            "in_use": len(self._in_use),
+            **self.metrics,
+            "avg_wait_time": self.metrics["wait_time"] / checkouts if checkouts else 0.0,
+        }
 
 
 # Initialize the global connection pool
-_connection_pool = SupabaseConnectionPool(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+_connection_pool = SupabaseConnectionPool()
+
+# Synchronous client for legacy synchronous code paths
+_sync_client: Optional[Any] = None
+_sync_client_lock = threading.Lock()
 
 
 async def create_supabase_client() -> Client:
@@ -214,7 +333,7 @@ async def create_supabase_client() -> Client:
         raise SupabaseConfigError("Supabase configuration is missing")
 
     try:
-        client = await create_client(
+        client = await acreate_client(
             supabase_url=settings_obj.SUPABASE_URL,
             supabase_key=settings_obj.SUPABASE_KEY,
         )
@@ -232,22 +351,13 @@ def get_supabase_client() -> Client:
     Returns:
         A Supabase client instance
     """
-    # This is a simplified version that should only be used in synchronous contexts
-    client_key = f"{settings.SUPABASE_URL}:{settings.SUPABASE_KEY}"
+    global _sync_client
 
-    # Check if client already exists in pool
-    client = _connection_pool.get(client_key)
-    if client:
-        return client
-
-    # Create a new synchronous client - not ideal, but necessary for backward compatibility
-    from supabase import create_client as create_sync_client
-
-    supabase = create_sync_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
-    _connection_pool.put(
-        client_key, cast(Client, supabase)
-    )  # Type casting for compatibility
-    return cast(Client, supabase)
+    # One client is shared by all synchronous callers
+    with _sync_client_lock:
+        if _sync_client is None:
+            _sync_client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+        return cast(Client, _sync_client)
 
 
 @contextmanager
@@ -278,7 +388,8 @@ def supabase_client_context():
 async def async_supabase_client_context() -> AsyncIterator[Client]:
     """
     Async context manager for Supabase client access.
-    Ensures connections are properly managed and includes retry logic.
+    Checks a long-lived client out of the connection pool and returns it
+    afterwards; a client that hit a connection error is closed instead.
 
     Usage:
         async with async_supabase_client_context() as supabase:
@@ -286,43 +397,19 @@ async def async_supabase_client_context() -> AsyncIterator[Client]:
 
     Raises:
         SupabaseConnectionError: If unable to establish connection after retries
+            or no pooled client becomes free in time
         SupabaseConfigError: If Supabase configuration is invalid
     """
-    client = None
-    attempt = 0
-    last_error = None
-
-    while attempt < MAX_RETRIES:
-        try:
-            client = await create_supabase_client()
-            # Test the connection
-            await client.auth.get_session()
-            break
-        except Exception as e:
-            attempt += 1
-            last_error = e
-            logger.warning(
-                f"Failed to create Supabase client (attempt {attempt}/{MAX_RETRIES}): {str(e)}"
-            )
-            if attempt < MAX_RETRIES:
-                import asyncio
-                await asyncio.sleep(RETRY_DELAY * attempt)  # Exponential backoff
-            continue
-
-    if client is None:
-        raise SupabaseConnectionError(
-            f"Failed to establish Supabase connection after {MAX_RETRIES} attempts. "
-            f"Last error: {str(last_error)}"
-        )
-
+    client = await _connection_pool.acquire()
+    healthy = True
     try:
-        yield client
+        with tracer.span("supabase"):
+            yield client
+    except BaseException as e:
+        healthy = not _is_connection_error(e)
+        raise
     finally:
-        if client:
-            try:
-                await client.auth.sign_out()
-            except Exception as e:
-                logger.warning(f"Error during Supabase client sign out: {str(e)}")
+        await _connection_pool.release(client, healthy)
 
 
 def get_supabase_storage_url(bucket: str, path: str) -> Optional[str]:
@@ -382,13 +469,14 @@ async def get_supabase_connection_status() -> dict:
         A dictionary with status information
     """
     try:
-        client = await create_supabase_client()
-        # Use the client to do a simple query to check connection
-        await client.table("reports").select("*").limit(1).execute()
+        async with async_supabase_client_context() as client:
+            # Use the client to do a simple query to check connection
+            await client.table("reports").select("*").limit(1).execute()
 
         return {
             "status": "connected",
             "pool_size": _connection_pool.size(),
+            "pool": _connection_pool.get_stats(),
             "url": (
                 settings.SUPABASE_URL.split("@")[-1]
                 if "@" in settings.SUPABASE_URL
@@ -482,7 +570,7 @@ async def cleanup_database():
         logger.error(f"Error cleaning up database: {str(e)}")
 
 
-def cleanup_expired_connections() -> int:
+async def cleanup_expired_connections() -> int:
     """
     Clean up expired Supabase connections from the pool.
     This should be called periodically to prevent stale connections.
@@ -490,13 +578,13 @@ def cleanup_expired_connections() -> int:
     Returns:
         Number of connections removed
     """
-    removed = _connection_pool.cleanup_expired()
+    removed = await _connection_pool.cleanup_expired()
     if removed > 0:
         logger.info(f"Cleaned up {removed} expired Supabase connections")
     return removed
 
 
-def close_all_connections() -> None:
+async def close_all_connections() -> None:
     """
     Close all Supabase connections in the pool.
     This should be called during application shutdown.
@@ -504,10 +592,20 @@ def close_all_connections() -> None:
     logger.info(
         f"Closing all Supabase connections (pool size: {_connection_pool.size()})"
     )
-    _connection_pool.clear()
+    await _connection_pool.clear()
     logger.info("All Supabase connections closed")
 
 
+def get_supabase_pool_stats() -> Dict[str, Any]:
+    """
+    Get statistics of the Supabase connection pool.
+
+    Returns:
+        Dictionary with pool sizes, checkout counters and wait times
+    """
+    return _connection_pool.get_stats()
+
+
 class ResourceTracker(Generic[T]):
     def __init__(
         self, name: str, cleanup_func: callable, resource_type: str = "resource"
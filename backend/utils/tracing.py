@@ -0,0 +1,353 @@
+"""
+Lightweight tracing for the report generation pipeline.
+
+A trace is a set of timed, nested spans sharing a trace ID. The current trace
+and span IDs live in context variables, so they follow a request into the
+background tasks and asyncio tasks it starts without being passed around.
+RequestLoggingMiddleware seeds the trace ID from the X-Request-ID header.
+
+Spans are only stored for traces bound to a task with Tracer.bind_task, so
+instrumented code shared with short requests (status polls, Supabase reads)
+costs nothing there. Stored traces are bounded in number and size, and can be
+exported as a per-task waterfall or as OTLP/JSON.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Number of traces kept in memory
+TRACE_MAX_TRACES = int(os.getenv("TRACE_MAX_TRACES", "200"))
+# Spans kept per trace; later spans are counted but dropped
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "500"))
+# Service name reported in OTLP exports
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "report-gen-backend")
+# Optional OTLP/HTTP JSON endpoint finished traces are posted to,
+# e.g. http://otel-collector:4318/v1/traces
+OTLP_TRACES_ENDPOINT = os.getenv("OTLP_TRACES_ENDPOINT", "")
+
+_current_trace_id: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+_current_span_id: ContextVar[Optional[str]] = ContextVar("span_id", default=None)
+
+_HEX_TRACE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def get_trace_id() -> Optional[str]:
+    """
+    Get the trace ID of the current context
+
+    Returns:
+        Trace ID, or None outside a traced context
+    """
+    return _current_trace_id.get()
+
+
+def set_trace_id(trace_id: Optional[str] = None) -> str:
+    """
+    Make a trace ID current for this context and the tasks it starts
+
+    Args:
+        trace_id: Trace ID to use, e.g. a request ID; a new one is
+            generated if not given
+
+    Returns:
+        The trace ID
+    """
+    trace_id = trace_id or secrets.token_hex(16)
+    _current_trace_id.set(trace_id)
+    _current_span_id.set(None)
+    return trace_id
+
+
+def _otlp_trace_id(trace_id: str) -> str:
+    """Convert a trace ID to the 32 hex digit form OTLP requires"""
+    normalized = trace_id.replace("-", "").lower()
+    if _HEX_TRACE_ID.match(normalized):
+        return normalized
+    return hashlib.md5(trace_id.encode()).hexdigest()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    """Convert an attribute value to an OTLP AnyValue"""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Tracer:
+    """
+    In-memory store of task traces
+    """
+
+    def __init__(
+        self, max_traces: int = TRACE_MAX_TRACES, max_spans: int = TRACE_MAX_SPANS
+    ):
+        """
+        Initialize the tracer
+
+        Args:
+            max_traces: Number of traces kept, oldest evicted first
+            max_spans: Spans kept per trace
+        """
+        self.max_traces = max_traces
+        self.max_spans = max_spans
+        self._traces: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._task_traces: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def bind_task(self, task_id: str) -> str:
+        """
+        Start recording the current trace and associate it with a task.
+        Starts a new trace if the context has none.
+
+        Args:
+            task_id: Task ID the trace is looked up by
+
+        Returns:
+            The trace ID
+        """
+        trace_id = get_trace_id() or set_trace_id()
+
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is None:
+                trace = self._traces[trace_id] = {
+                    "trace_id": trace_id,
+                    "task_ids": [],
+                    "spans": [],
+                    "dropped_spans": 0,
+                }
+                while len(self._traces) > self.max_traces:
+                    _, evicted = self._traces.popitem(last=False)
+                    for evicted_task in evicted["task_ids"]:
+                        self._task_traces.pop(evicted_task, None)
+            trace["task_ids"].append(task_id)
+            self._task_traces[task_id] = trace_id
+        return trace_id
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Time a block of work as a child of the current span.
+        Works in both sync and async code; the span is only stored when the
+        current trace is bound to a task.
+
+        Args:
+            name: Span name, e.g. "writer" or "docx_render"
+            **attributes: Attributes recorded with the span
+
+        Yields:
+            The span record, whose "attributes" may be extended in the block
+        """
+        trace_id = get_trace_id()
+        span = {
+            "span_id": secrets.token_hex(8),
+            "parent_id": _current_span_id.get(),
+            "name": name,
+            "start": time.time(),
+            "duration_ms": None,
+            "status": "ok",
+            "attributes": attributes,
+        }
+        token = _current_span_id.set(span["span_id"])
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span["status"] = "error"
+            span["attributes"]["error"] = str(e) or type(e).__name__
+            raise
+        finally:
+            span["duration_ms"] = (time.perf_counter() - start) * 1000
+            _current_span_id.reset(token)
+            if trace_id is not None:
+                self._record(trace_id, span)
+
+    def _record(self, trace_id: str, span: Dict[str, Any]) -> None:
+        """Store a finished span if its trace is being recorded"""
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is None:
+                return
+            if len(trace["spans"]) >= self.max_spans:
+                trace["dropped_spans"] += 1
+                return
+            trace["spans"].append(span)
+
+    def get_task_trace_id(self, task_id: str) -> Optional[str]:
+        """
+        Find the trace recorded for a task
+
+        Args:
+            task_id: Task ID
+
+        Returns:
+            Trace ID, or None if the task has no stored trace
+        """
+        with self._lock:
+            return self._task_traces.get(task_id)
+
+    def _get_spans(self, trace_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Copy the spans of a trace, ordered by start time"""
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is None:
+                return None
+            return sorted(
+                (dict(span) for span in trace["spans"]), key=lambda s: s["start"]
+            )
+
+    def waterfall(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Lay out a trace as a waterfall: spans in start order with their
+        offset from the trace start and their nesting depth
+
+        Args:
+            trace_id: Trace ID
+
+        Returns:
+            Waterfall dictionary, or None if the trace is not stored
+        """
+        spans = self._get_spans(trace_id)
+        if spans is None:
+            return None
+
+        trace_start = spans[0]["start"] if spans else 0.0
+        trace_end = max(
+            (s["start"] + s["duration_ms"] / 1000 for s in spans), default=trace_start
+        )
+        depths: Dict[str, int] = {}
+        rows = []
+        for span in spans:
+            depth = depths.get(span["parent_id"], -1) + 1
+            depths[span["span_id"]] = depth
+            rows.append(
+                {
+                    "name": span["name"],
+                    "span_id": span["span_id"],
+                    "parent_id": span["parent_id"],
+                    "depth": depth,
+                    "offset_ms": (span["start"] - trace_start) * 1000,
+                    "duration_ms": span["duration_ms"],
+                    "status": span["status"],
+                    "attributes": span["attributes"],
+                }
+            )
+
+        with self._lock:
+            trace = self._traces.get(trace_id, {})
+            dropped = trace.get("dropped_spans", 0)
+            task_ids = list(trace.get("task_ids", []))
+
+        return {
+            "trace_id": trace_id,
+            "task_ids": task_ids,
+            "start": trace_start,
+            "duration_ms": (trace_end - trace_start) * 1000,
+            "dropped_spans": dropped,
+            "spans": rows,
+        }
+
+    def to_otlp(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Export a trace in the OTLP/JSON format accepted by OpenTelemetry
+        collectors on /v1/traces
+
+        Args:
+            trace_id: Trace ID
+
+        Returns:
+            ExportTraceServiceRequest dictionary, or None if the trace is not stored
+        """
+        spans = self._get_spans(trace_id)
+        if spans is None:
+            return None
+
+        otlp_trace_id = _otlp_trace_id(trace_id)
+        otlp_spans = []
+        for span in spans:
+            start_ns = int(span["start"] * 1e9)
+            otlp_span = {
+                "traceId": otlp_trace_id,
+                "spanId": span["span_id"],
+                "name": span["name"],
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(start_ns),
+                "endTimeUnixNano": str(start_ns + int(span["duration_ms"] * 1e6)),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)}
+                    for key, value in span["attributes"].items()
+                ],
+                # STATUS_CODE_OK = 1, STATUS_CODE_ERROR = 2
+                "status": {"code": 2 if span["status"] == "error" else 1},
+            }
+            if span["parent_id"]:
+                otlp_span["parentSpanId"] = span["parent_id"]
+            otlp_spans.append(otlp_span)
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": TRACE_SERVICE_NAME},
+                            },
+                        ]
+                    },
+                    "scopeSpans": [
+                        {"scope": {"name": __name__}, "spans": otlp_spans}
+                    ],
+                }
+            ]
+        }
+
+    async def export(self, trace_id: str) -> bool:
+        """
+        Post a trace to OTLP_TRACES_ENDPOINT, if one is configured
+
+        Args:
+            trace_id: Trace ID
+
+        Returns:
+            True if the trace was accepted by the collector
+        """
+        if not OTLP_TRACES_ENDPOINT:
+            return False
+
+        payload = self.to_otlp(trace_id)
+        if payload is None:
+            return False
+
+        # Imported here so the tracer has no import-time dependencies
+        from utils.http_client import http_client_pool
+
+        try:
+            async with http_client_pool.host_slot(OTLP_TRACES_ENDPOINT) as client:
+                response = await client.post(
+                    OTLP_TRACES_ENDPOINT, json=payload, timeout=5.0
+                )
+                response.raise_for_status()
+            return True
+        except Exception as e:
+            logger.warning(f"Error exporting trace {trace_id}: {str(e)}")
+            return False
+
+
+# Global tracer shared by the pipeline and the trace endpoints
+tracer = Tracer()
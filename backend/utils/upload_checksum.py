@@ -0,0 +1,151 @@
+"""
+Checksums for chunked uploads.
+Each chunk is hashed while it is written and checked against the digest the
+client sent. The whole-file checksum is the hash of the ordered chunk digests,
+so it is available at finalize without reading the assembled file again, even
+when chunks arrived out of order or on different workers.
+
+Identical uploads are deduplicated across users and reports, so that match is
+keyed on SHA-256 content digests even when chunks are verified with xxh3.
+"""
+
+import hashlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import xxhash
+
+    CHECKSUM_ALGORITHM = "xxh3_128"
+except ImportError:
+    xxhash = None
+    CHECKSUM_ALGORITHM = "sha256"
+
+# Algorithm of the content digests deduplication is keyed on
+CONTENT_DIGEST_ALGORITHM = "sha256"
+
+
+def new_hasher():
+    """Create an incremental hasher for the configured algorithm"""
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    return hashlib.sha256()
+
+
+def hash_bytes(data: bytes) -> str:
+    """
+    Hash a chunk held in memory.
+
+    Args:
+        data: Chunk contents
+
+    Returns:
+        Hex digest
+    """
+    hasher = new_hasher()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+class ChunkHasher:
+    """
+    Incremental hasher computing a chunk's checksum and its content digest
+    in one pass; a single SHA-256 serves as both when xxhash is unavailable
+    """
+
+    def __init__(self):
+        self._checksum = new_hasher()
+        self._content = hashlib.sha256() if xxhash is not None else None
+
+    def update(self, data: bytes) -> None:
+        self._checksum.update(data)
+        if self._content is not None:
+            self._content.update(data)
+
+    def hexdigests(self) -> Tuple[str, str]:
+        """Return (checksum, content digest) as hex strings"""
+        checksum = self._checksum.hexdigest()
+        if self._content is None:
+            return checksum, checksum
+        return checksum, self._content.hexdigest()
+
+
+def hash_chunk(data: bytes) -> Tuple[str, str]:
+    """
+    Hash a chunk held in memory for verification and deduplication.
+
+    Args:
+        data: Chunk contents
+
+    Returns:
+        (checksum, content digest) as hex strings
+    """
+    hasher = ChunkHasher()
+    hasher.update(data)
+    return hasher.hexdigests()
+
+
+def checksums_match(expected: Optional[str], actual: str) -> bool:
+    """
+    Compare a client-supplied digest with a computed one.
+    A missing client digest always matches; an "algorithm:" prefix is allowed.
+
+    Args:
+        expected: Digest sent by the client, if any
+        actual: Digest computed on the server
+
+    Returns:
+        True if the chunk should be accepted
+    """
+    if not expected:
+        return True
+    algorithm, _, digest = expected.strip().lower().rpartition(":")
+    if algorithm and algorithm != CHECKSUM_ALGORITHM:
+        return False
+    return digest == actual
+
+
+def _combine_digests(
+    chunk_digests: Dict[str, str],
+    total_chunks: int,
+    hash_func: Callable[[bytes], str],
+) -> Optional[str]:
+    """Hash the ordered chunk digests, or None if a chunk has none recorded"""
+    digests: List[str] = []
+    for i in range(total_chunks):
+        digest = chunk_digests.get(str(i))
+        if digest is None:
+            return None
+        digests.append(digest)
+    return f"{hash_func(''.join(digests).encode('ascii'))}-{total_chunks}"
+
+
+def combine_chunk_checksums(chunk_checksums: Dict[str, str], total_chunks: int) -> Optional[str]:
+    """
+    Build the whole-file checksum from per-chunk digests.
+
+    Args:
+        chunk_checksums: Mapping of chunk index (as a string) to hex digest
+        total_chunks: Number of chunks in the upload
+
+    Returns:
+        Hex digest of the concatenated chunk digests, or None if a chunk has
+        no recorded digest
+    """
+    return _combine_digests(chunk_checksums, total_chunks, hash_bytes)
+
+
+def combine_content_digests(chunk_digests: Dict[str, str], total_chunks: int) -> Optional[str]:
+    """
+    Build the deduplication key of an upload from its chunks' content digests.
+
+    Args:
+        chunk_digests: Mapping of chunk index (as a string) to SHA-256 hex digest
+        total_chunks: Number of chunks in the upload
+
+    Returns:
+        SHA-256 hex digest of the concatenated chunk digests, or None if a
+        chunk has no recorded digest
+    """
+    return _combine_digests(
+        chunk_digests, total_chunks, lambda data: hashlib.sha256(data).hexdigest()
+    )
@@ -0,0 +1,255 @@
+"""
+Persistent index of chunked upload sessions.
+Maps an upload ID to the directory holding its chunks and metadata, so a
+session can be found in constant time after a restart or from another worker
+process instead of scanning the filesystem for its chunks directory. Also
+records the content digests of completed uploads so identical files can be
+deduplicated, together with the identity (inode, size, mtime) of the stored
+file so one rewritten since is never linked to.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Lock file guarding metadata.json inside an upload's chunks directory
+SESSION_LOCK_FILENAME = "metadata.lock"
+
+# Fallback per-directory locks where fcntl is unavailable
+_session_thread_locks: Dict[str, threading.Lock] = {}
+_session_thread_locks_guard = threading.Lock()
+
+# Location of the index database; must be shared by all workers
+UPLOAD_SESSION_INDEX_PATH = os.getenv(
+    "UPLOAD_SESSION_INDEX_PATH",
+    str(Path(__file__).parent.parent / "data" / "upload_sessions.db"),
+)
+
+
+class UploadSessionIndex:
+    """
+    SQLite-backed upload_id -> chunks_dir mapping.
+    Each thread gets its own connection; the database runs in WAL mode so
+    readers in one worker never block writers in another.
+    """
+
+    def __init__(self, db_path: Union[str, Path]):
+        """
+        Initialize the index
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = str(db_path)
+        self._local = threading.local()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, creating the schema on first use"""
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = conn
+
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute(
+                        """
+                    CREATE TABLE IF NOT EXISTS upload_sessions (
+                        upload_id TEXT PRIMARY KEY,
+                        chunks_dir TEXT NOT NULL,
+                        created_at REAL NOT NULL
+                    )
+                    """
+                    )
+                    # Superseded by upload_contents, keyed on SHA-256 digests
+                    conn.execute("DROP TABLE IF EXISTS upload_checksums")
+                    conn.execute(
+                        """
+                    CREATE TABLE IF NOT EXISTS upload_contents (
+                        content_digest TEXT PRIMARY KEY,
+                        file_path TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        inode INTEGER NOT NULL,
+                        mtime_ns INTEGER NOT NULL
+                    )
+                    """
+                    )
+                    self._initialized = True
+        return conn
+
+    def register(self, upload_id: str, chunks_dir: str) -> None:
+        """
+        Record where an upload session keeps its chunks
+
+        Args:
+            upload_id: Upload ID
+            chunks_dir: Directory holding the chunks and metadata.json
+        """
+        try:
+            self._get_connection().execute(
+                "INSERT OR REPLACE INTO upload_sessions (upload_id, chunks_dir, created_at) "
+                "VALUES (?, ?, ?)",
+                (upload_id, chunks_dir, time.time()),
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Error indexing upload session {upload_id}: {str(e)}")
+
+    def lookup(self, upload_id: str) -> Optional[str]:
+        """
+        Find the chunks directory of an upload session
+
+        Args:
+            upload_id: Upload ID
+
+        Returns:
+            Chunks directory, or None if the session is not indexed
+        """
+        try:
+            row = (
+                self._get_connection()
+                .execute(
+                    "SELECT chunks_dir FROM upload_sessions WHERE upload_id = ?",
+                    (upload_id,),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Error looking up upload session {upload_id}: {str(e)}")
+            return None
+        return row[0] if row else None
+
+    def remove(self, upload_id: str) -> None:
+        """
+        Drop an upload session from the index
+
+        Args:
+            upload_id: Upload ID
+        """
+        try:
+            self._get_connection().execute(
+                "DELETE FROM upload_sessions WHERE upload_id = ?", (upload_id,)
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Error removing upload session {upload_id}: {str(e)}")
+
+    def record_checksum(self, content_digest: str, file_path: str) -> None:
+        """
+        Remember where a completed upload with this content is stored
+
+        Args:
+            content_digest: Whole-file content digest
+                (see utils.upload_checksum.combine_content_digests)
+            file_path: Path of the stored file
+        """
+        try:
+            stat = os.stat(file_path)
+            self._get_connection().execute(
+                "INSERT OR REPLACE INTO upload_contents "
+                "(content_digest, file_path, size, inode, mtime_ns) VALUES (?, ?, ?, ?, ?)",
+                (content_digest, file_path, stat.st_size, stat.st_ino, stat.st_mtime_ns),
+            )
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"Error recording content digest for {file_path}: {str(e)}")
+
+    def find_duplicate(self, content_digest: str, size: int) -> Optional[str]:
+        """
+        Find a stored file with the same content digest and size.
+        The file must still be the one recorded: an entry whose path has
+        since been replaced or rewritten (a different inode, size or mtime)
+        is dropped instead of returned.
+
+        Args:
+            content_digest: Whole-file content digest
+            size: File size in bytes
+
+        Returns:
+            Path of the existing file, or None if there is none on disk
+        """
+        try:
+            row = (
+                self._get_connection()
+                .execute(
+                    "SELECT file_path, inode, mtime_ns FROM upload_contents "
+                    "WHERE content_digest = ? AND size = ?",
+                    (content_digest, size),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Error looking up content digest {content_digest}: {str(e)}")
+            return None
+
+        if row is None:
+            return None
+
+        file_path, inode, mtime_ns = row
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            stat = None
+        if (
+            stat is not None
+            and stat.st_ino == inode
+            and stat.st_size == size
+            and stat.st_mtime_ns == mtime_ns
+        ):
+            return file_path
+
+        logger.info(f"Stored file {file_path} changed since it was recorded; not linking")
+        try:
+            self._get_connection().execute(
+                "DELETE FROM upload_contents WHERE content_digest = ?", (content_digest,)
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Error dropping content digest {content_digest}: {str(e)}")
+        return None
+
+
+@contextmanager
+def session_lock(chunks_dir: Union[str, Path]) -> Iterator[None]:
+    """
+    Hold an exclusive lock on an upload session's metadata.json.
+    The lock is an flock on a file in the chunks directory, so it serializes
+    read-modify-write cycles across threads and worker processes alike.
+    Where fcntl is unavailable it only serializes threads of this process.
+    Blocks, so async callers should take it in a worker thread.
+
+    Args:
+        chunks_dir: Directory holding the session's chunks and metadata.json
+    """
+    lock_path = os.path.join(str(chunks_dir), SESSION_LOCK_FILENAME)
+    if fcntl is None:
+        with _session_thread_locks_guard:
+            lock = _session_thread_locks.setdefault(lock_path, threading.Lock())
+        with lock:
+            yield
+        return
+
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+# Global instance shared by FileProcessor's chunked upload methods
+upload_session_index = UploadSessionIndex(UPLOAD_SESSION_INDEX_PATH)